@@ -0,0 +1,124 @@
+"""Benchmark: Verlauf aus dem Recorder nachladen (HistoryBackfillTask)
+
+Vergleicht Größe und Dauer einer History-Antwort mit allen Feldern und mit
+minimal_response/no_attributes und misst das vollständige Nachladen
+mehrerer Sensoren (Werte/s, Anfragen, Transaktionen) gegen einen lokalen
+Stub-Server.
+
+    python benchmarks/bench_backfill.py --sensors 5 --days 10 --step 10
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+from common import measure, print_table, write_json
+from stub_ha import StubHAServer
+
+from haminiems import database
+from haminiems.ha_client import HAClient
+from haminiems.maintenance import HistoryBackfillTask
+from haminiems.sensors import SensorManager
+from haminiems.utils import history_values
+
+
+def count_commits(db: database.Database):
+    """Zählt COMMIT-Statements über den Trace-Callback"""
+    counter = {"commits": 0}
+
+    def trace(statement: str):
+        if statement.strip().upper().startswith("COMMIT"):
+            counter["commits"] += 1
+
+    db.conn.set_trace_callback(trace)
+    return counter
+
+
+def payload_rows(stub: StubHAServer, client: HAClient, repeat: int):
+    """Eine Tagesabfrage mit und ohne minimal_response/no_attributes"""
+    end = datetime.now(timezone.utc)
+    start = end - timedelta(days=1)
+    rows = []
+    for name, minimal in (("alle Felder", False), ("minimal_response + no_attributes", True)):
+        params = {"filter_entity_id": "sensor.bench_1", "end_time": end.isoformat()}
+        if minimal:
+            params.update(minimal_response="", no_attributes="")
+        body = requests.get(f"{stub.url}/api/history/period/{start.isoformat()}", params=params).content
+
+        def fetch():
+            states = client.get_history(
+                "sensor.bench_1", start, end, minimal_response=minimal, no_attributes=minimal
+            )
+            return sum(1 for _ in history_values(states))
+
+        rows.append({
+            "case": f"1 Tag: {name}",
+            "points": fetch(),
+            "bytes": len(body),
+            **measure(fetch, repeat=repeat),
+        })
+    return rows
+
+
+def backfill_row(stub: StubHAServer, client: HAClient, sensors: int, days: int):
+    """Lädt den Verlauf aller Sensoren in eine leere Datenbank"""
+    with tempfile.TemporaryDirectory() as tmp:
+        database._db_instance = database.Database(os.path.join(tmp, "bench.db"))
+        manager = SensorManager()
+        manager.save_configs([
+            {"sensor_key": f"bench_{i}", "entity_id": entity_id, "enabled": True}
+            for i, entity_id in enumerate(stub.entity_ids(sensors))
+        ])
+        counter = count_commits(manager.db)
+        task = HistoryBackfillTask(client, manager, days=days, pause=0)
+        requests_before = stub.request_count
+        started = time.perf_counter()
+        while task.step():
+            pass
+        elapsed = time.perf_counter() - started
+        status = task.status()
+        database._db_instance.close()
+        database._db_instance = None
+    return {
+        "case": f"Nachladen {sensors} Sensoren x {days} Tage",
+        "points": status["imported"],
+        "bytes": "",
+        "requests": stub.request_count - requests_before,
+        "commits": counter["commits"],
+        "seconds": round(elapsed, 2),
+        "points_per_s": round(status["imported"] / elapsed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sensors", type=int, default=5, help="Anzahl nachzuladender Sensoren")
+    parser.add_argument("--days", type=int, default=10, help="Tage pro Sensor")
+    parser.add_argument("--step", type=int, default=10, help="Sekunden zwischen zwei History-Punkten")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Latenz pro Anfrage")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON schreiben")
+    args = parser.parse_args()
+
+    with StubHAServer(max(args.sensors, 2), args.latency_ms) as stub:
+        stub.history_step = args.step
+        client = HAClient(stub.url, "bench-token", request_timeout=60)
+        try:
+            rows = payload_rows(stub, client, args.repeat)
+            rows.append(backfill_row(stub, client, args.sensors, args.days))
+        finally:
+            client.close()
+
+    print_table(rows, [
+        "case", "points", "bytes", "min_ms", "median_ms", "max_ms",
+        "requests", "commits", "seconds", "points_per_s",
+    ])
+    write_json({"benchmark": "backfill", "params": vars(args), "results": rows}, args.json)
+
+
+if __name__ == "__main__":
+    main()
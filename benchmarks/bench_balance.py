@@ -0,0 +1,83 @@
+"""Benchmark: Energiebilanz neu berechnen vs. inkrementell gepflegt
+
+Misst die Dauer eines Bilanz-Abrufs bei vollständiger Neuberechnung aus
+allen Werten gegenüber dem BalanceModel (Bilanz wird nur nach Änderungen
+neu aufgebaut) sowie die Kosten einer Aktualisierung pro Erfassung.
+
+    python benchmarks/bench_balance.py --reads 100000
+"""
+
+import argparse
+import random
+import time
+
+from common import print_table, write_json
+
+from haminiems.balance import BalanceModel, build_balance
+from haminiems.const import SENSOR_KEYS
+
+
+def make_values(step: int):
+    return {
+        key: {
+            "value": random.uniform(0, 5000),
+            "unit": "W" if key != "battery_soc" else "%",
+            "entity_id": f"sensor.{key}",
+            "state_class": "measurement",
+            "state": str(step),
+            "last_updated": None,
+        }
+        for key in SENSOR_KEYS
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reads", type=int, default=100000)
+    parser.add_argument("--updates", type=int, default=10000)
+    parser.add_argument("--reads-per-update", type=int, default=10)
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON schreiben")
+    args = parser.parse_args()
+
+    values = make_values(0)
+
+    def recompute():
+        amounts = {key: value["value"] for key, value in values.items()}
+        return build_balance(amounts)
+
+    model = BalanceModel()
+    model.update_values(values)
+
+    rows = []
+    for variant, func in (("recompute", recompute), ("model_read", model.snapshot)):
+        t0 = time.perf_counter()
+        for _ in range(args.reads):
+            func()
+        elapsed = time.perf_counter() - t0
+        rows.append({
+            "variant": variant,
+            "calls": args.reads,
+            "us_per_call": round(elapsed / args.reads * 1e6, 2),
+        })
+
+    # Erfassung mit wechselnden Werten, dazwischen mehrere Abrufe
+    batches = [make_values(n) for n in range(100)]
+    t0 = time.perf_counter()
+    for n in range(args.updates):
+        model.update_values(batches[n % len(batches)])
+        for _ in range(args.reads_per_update):
+            model.snapshot()
+    elapsed = time.perf_counter() - t0
+    rows.append({
+        "variant": f"model_update+{args.reads_per_update}_reads",
+        "calls": args.updates,
+        "us_per_call": round(elapsed / args.updates * 1e6, 2),
+    })
+
+    print_table(rows, ["variant", "calls", "us_per_call"])
+    print(f"Bilanz neu aufgebaut: {model.rebuilds}x bei {model.updates} Aktualisierungen")
+    write_json({"benchmark": "balance", "params": vars(args), "results": rows}, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Benchmark: HA-Last und Latenz bei mehreren gleichzeitigen Dashboards
+
+Jeder simulierte Client ruft wie main.js /api/entities und
+/api/calculations direkt nacheinander ab (zwei Snapshots pro Refresh).
+Gemessen wird mit und ohne State-Cache.
+
+    python benchmarks/bench_cache.py --clients 1 5 20
+"""
+
+import argparse
+import statistics
+import threading
+import time
+
+from common import print_table, write_json
+from stub_ha import StubHAServer
+
+from haminiems.ha_client import HAClient
+
+
+def simulate(client: HAClient, entity_ids, clients: int, refreshes: int):
+    latencies = []
+    lock = threading.Lock()
+
+    def dashboard():
+        for _ in range(refreshes):
+            start = time.perf_counter()
+            client.get_states_snapshot(entity_ids)  # /api/entities
+            client.get_states_snapshot(entity_ids)  # /api/calculations
+            with lock:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=dashboard) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies
+
+
+def run(entities: int, latency_ms: float, client_counts, refreshes: int, sensors: int, ttl: float):
+    rows = []
+    with StubHAServer(entities, latency_ms) as stub:
+        entity_ids = stub.entity_ids(sensors)
+        for cache_ttl in (0, ttl):
+            for clients in client_counts:
+                client = HAClient(stub.url, "bench-token", cache_ttl=cache_ttl)
+                before = stub.request_count
+                latencies = simulate(client, entity_ids, clients, refreshes)
+                client.close()
+                rows.append({
+                    "cache_ttl": cache_ttl,
+                    "clients": clients,
+                    "ha_requests": stub.request_count - before,
+                    "median_ms": round(statistics.median(latencies), 3),
+                    "max_ms": round(max(latencies), 3),
+                })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--sensors", type=int, default=10)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--refreshes", type=int, default=5)
+    parser.add_argument("--ttl", type=float, default=30.0)
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON schreiben")
+    args = parser.parse_args()
+
+    rows = run(args.entities, args.latency_ms, args.clients, args.refreshes, args.sensors, args.ttl)
+    print_table(rows, ["cache_ttl", "clients", "ha_requests", "median_ms", "max_ms"])
+    write_json({"benchmark": "cache", "params": vars(args), "results": rows}, args.json)
+
+
+if __name__ == "__main__":
+    main()
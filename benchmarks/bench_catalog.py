@@ -0,0 +1,76 @@
+"""Benchmark: Entity-Liste der Konfiguration mit und ohne Katalog
+
+Vergleicht den bisherigen Weg (alle States von Home Assistant laden und
+filtern) mit dem zwischengespeicherten, indizierten EntityCatalog gegen
+einen lokalen Stub-Server. Gemessen wird inklusive JSON-Serialisierung.
+
+    python benchmarks/bench_catalog.py --entities 1000 5000
+"""
+
+import argparse
+import json
+
+from common import measure, print_table, write_json
+from stub_ha import StubHAServer
+
+from haminiems.catalog import EntityCatalog
+from haminiems.ha_client import HAClient
+
+
+def legacy_entities(client: HAClient):
+    """Bisheriger Ablauf von GET /api/config"""
+    return [
+        {
+            "entity_id": e.get("entity_id"),
+            "friendly_name": e.get("attributes", {}).get("friendly_name"),
+            "state_class": e.get("attributes", {}).get("state_class"),
+            "unit": e.get("attributes", {}).get("unit_of_measurement"),
+        }
+        for e in client.get_energy_entities()
+    ]
+
+
+def run(entity_counts, latency_ms: float, repeat: int):
+    rows = []
+    for count in entity_counts:
+        with StubHAServer(count, latency_ms) as stub:
+            client = HAClient(stub.url, "bench-token")
+            catalog = EntityCatalog(client)
+            catalog.refresh()
+            cases = [
+                ("vorher: /api/states + Filter", lambda: legacy_entities(client)),
+                ("Katalog: alle Einträge", catalog.entries),
+                ("Katalog: q=bench_12, limit=100", lambda: catalog.search(query="bench_12")[0]),
+                ("Katalog: unit=kWh, limit=100", lambda: catalog.search(unit="kWh")[0]),
+            ]
+            try:
+                for name, func in cases:
+                    body = json.dumps(func())
+                    timing = measure(lambda: json.dumps(func()), repeat=repeat)
+                    rows.append({"entities": count, "case": name, "bytes": len(body), **timing})
+                rows.append({
+                    "entities": count,
+                    "case": "refresh (Hintergrund)",
+                    "bytes": "",
+                    **measure(catalog.refresh, repeat=repeat),
+                })
+            finally:
+                client.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=int, nargs="+", default=[1000, 5000], help="Anzahl Entities im Stub-HA")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Latenz pro Anfrage")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON schreiben")
+    args = parser.parse_args()
+
+    rows = run(args.entities, args.latency_ms, args.repeat)
+    print_table(rows, ["entities", "case", "bytes", "min_ms", "median_ms", "max_ms"])
+    write_json({"benchmark": "catalog", "params": vars(args), "results": rows}, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Lasttest: Lesedurchsatz mehrerer Threads bei gleichzeitigem Schreiber
+
+Ein Schreiber-Thread speichert fortlaufend Erfassungsdurchläufe, während
+N Leser-Threads Bereichsabfragen wie /api/data ausführen. Verglichen wird
+die gemeinsame Verbindung (Pool-Größe 0) mit dem Read-Pool.
+
+    python benchmarks/bench_db_concurrency.py --readers 1 2 4 8
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from common import print_table, write_json
+
+from haminiems import database
+from haminiems.sensors import SensorManager
+
+SENSORS = 10
+
+
+def populate(manager: SensorManager, rows: int):
+    start = datetime(2024, 1, 1)
+    batch = []
+    for i in range(rows):
+        batch.append({
+            "entity_id": f"sensor.bench_{i % SENSORS}",
+            "value": float(i),
+            "timestamp": start + timedelta(seconds=30 * (i // SENSORS)),
+        })
+        if len(batch) >= 10000:
+            manager.save_entity_values(batch)
+            batch = []
+    manager.save_entity_values(batch)
+
+
+def run(pool_size: int, readers: int, duration: float, db_path: str):
+    database._db_instance = database.Database(db_path, read_pool_size=pool_size)
+    manager = SensorManager()
+    stop = threading.Event()
+    reads = [0] * readers
+    writes = [0]
+
+    def writer():
+        cycle = 0
+        base = datetime(2025, 1, 1)
+        while not stop.is_set():
+            ts = base + timedelta(seconds=30 * cycle)
+            manager.save_entity_values([
+                {"entity_id": f"sensor.bench_{i}", "value": float(cycle), "timestamp": ts}
+                for i in range(SENSORS)
+            ])
+            writes[0] += 1
+            cycle += 1
+            time.sleep(0.002)
+
+    def reader(index: int):
+        start = datetime(2024, 1, 1, 6)
+        while not stop.is_set():
+            manager.get_entity_values(
+                f"sensor.bench_{index % SENSORS}",
+                start, start + timedelta(hours=6)
+            )
+            reads[index] += 1
+
+    threads = [threading.Thread(target=writer)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    manager.db.close()
+    database._db_instance = None
+
+    return {
+        "pool_size": pool_size,
+        "readers": readers,
+        "reads_per_s": round(sum(reads) / duration),
+        "write_cycles_per_s": round(writes[0] / duration),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000, help="Vorbefüllte Zeilen")
+    parser.add_argument("--readers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[0, 4])
+    parser.add_argument("--duration", type=float, default=3.0, help="Sekunden pro Messung")
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON schreiben")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        database._db_instance = database.Database(db_path)
+        populate(SensorManager(), args.rows)
+        database._db_instance.close()
+
+        for pool_size in args.pool_sizes:
+            for readers in args.readers:
+                results.append(run(pool_size, readers, args.duration, db_path))
+
+    print_table(results, ["pool_size", "readers", "reads_per_s", "write_cycles_per_s"])
+    write_json({"benchmark": "db_concurrency", "params": vars(args), "results": results}, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark: Verlaufsabfragen über ein Jahr 30-Sekunden-Messwerte
+
+Prüft per EXPLAIN QUERY PLAN, dass get_entity_values() den Primärschlüssel
+(entity_ref, ts) nutzt und ohne temporären Sortierbaum auskommt, und
+misst Bereichsabfragen unterschiedlicher Länge.
+
+    python benchmarks/bench_history.py --days 365 --sensors 3
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from common import measure, print_table, write_json
+
+from haminiems import database
+from haminiems.sensors import SensorManager, build_entity_values_query
+
+INDEX_NAME = "PRIMARY KEY"
+STEP_S = 30
+
+
+def populate(manager: SensorManager, days: int, sensors: int, start: datetime):
+    samples = days * 86400 // STEP_S
+    batch = []
+    for n in range(samples):
+        ts = start + timedelta(seconds=n * STEP_S)
+        for s in range(sensors):
+            batch.append({"entity_id": f"sensor.bench_{s}", "value": float(n), "timestamp": ts})
+        if len(batch) >= 50000:
+            manager.save_entity_values(batch)
+            batch = []
+    manager.save_entity_values(batch)
+    return samples * sensors
+
+
+def check_plan(manager: SensorManager, start: datetime) -> list:
+    query, params = build_entity_values_query(
+        manager.get_entity_ref("sensor.bench_0", create=False),
+        start, start + timedelta(days=1)
+    )
+    plan = manager.db.explain_query_plan(query, params)
+    if not any(INDEX_NAME in line for line in plan):
+        raise AssertionError(f"Index {INDEX_NAME} wird nicht verwendet: {plan}")
+    if any("TEMP B-TREE" in line for line in plan):
+        raise AssertionError(f"Abfrage benötigt einen Sortierbaum: {plan}")
+    return plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--sensors", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON schreiben")
+    args = parser.parse_args()
+
+    start = datetime(2024, 1, 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        database._db_instance = database.Database(os.path.join(tmp, "bench.db"))
+        manager = SensorManager()
+
+        t0 = time.perf_counter()
+        total = populate(manager, args.days, args.sensors, start)
+        print(f"{total} Zeilen in {time.perf_counter() - t0:.1f}s erzeugt")
+
+        try:
+            plan = check_plan(manager, start)
+        except AssertionError as e:
+            print(f"FEHLER: {e}")
+            sys.exit(1)
+        print("Query-Plan:", " | ".join(plan))
+
+        rows = []
+        middle = start + timedelta(days=args.days // 2)
+        for label, span in (("1h", timedelta(hours=1)), ("1d", timedelta(days=1)),
+                            ("7d", timedelta(days=7)), ("30d", timedelta(days=30))):
+            result = manager.get_entity_values("sensor.bench_0", middle, middle + span)
+            timing = measure(
+                lambda: manager.get_entity_values("sensor.bench_0", middle, middle + span),
+                repeat=args.repeat
+            )
+            rows.append({"range": label, "rows": len(result), **timing})
+
+        latest = measure(lambda: manager.get_latest_value("sensor.bench_0"), repeat=args.repeat)
+        rows.append({"range": "latest", "rows": 1, **latest})
+        manager.db.close()
+
+    print_table(rows, ["range", "rows", "min_ms", "median_ms", "max_ms"])
+    write_json({"benchmark": "history", "params": vars(args), "plan": plan, "results": rows}, args.json)
+
+
+if __name__ == "__main__":
+    main()
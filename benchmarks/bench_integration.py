@@ -0,0 +1,123 @@
+"""Benchmark: Integration von Leistungswerten zu Energie (NumPy vs. Python)
+
+Erzeugt ein Jahr 10-Sekunden-Leistungswerte (PV-Tagesgang mit Lücken) und
+misst die Integration zu Tageswerten mit integrate_windows() gegenüber
+einer reinen Python-Schleife. Zusätzlich wird für --db-days Tage gemessen,
+wie lange das Laden der Werte aus entity_values als Arrays dauert.
+
+    python benchmarks/bench_integration.py --days 365 --db-days 31
+"""
+
+import argparse
+import math
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from common import measure, print_table, write_json
+
+from haminiems import database, integration
+from haminiems.energy_stats import local_day_bounds
+from haminiems.sensors import SensorManager
+
+STEP_S = 10
+MAX_GAP_S = 900
+
+
+def generate(days: int, start: datetime):
+    """PV-Leistung in W: Sinus von 6 bis 20 Uhr, jede 1000. Stunde fehlt"""
+    n = days * 86400 // STEP_S
+    ts = start.timestamp() * 1000 + np.arange(n, dtype=np.float64) * STEP_S * 1000
+    hour = (np.arange(n) * STEP_S / 3600.0) % 24
+    values = np.clip(np.sin((hour - 6) / 14 * math.pi), 0, None) * 5000.0
+    keep = (np.arange(n) * STEP_S // 3600) % 1000 != 999
+    return ts[keep], values[keep]
+
+
+def python_windows(ts, values, edges, max_gap_s):
+    """Referenz: Trapez-Summe pro Fenster in einer Python-Schleife (lange Intervalle gehalten)"""
+    result = [0.0] * (len(edges) - 1)
+    window = 0
+    for i in range(1, len(ts)):
+        while window < len(result) - 1 and ts[i - 1] >= edges[window + 1]:
+            window += 1
+        dt = (ts[i] - ts[i - 1]) / 1000.0
+        if dt <= max_gap_s:
+            result[window] += (values[i] + values[i - 1]) * 0.5 * dt / 3600.0
+        else:
+            result[window] += values[i - 1] * dt / 3600.0
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--db-days", type=int, default=31)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON schreiben")
+    args = parser.parse_args()
+
+    start = datetime(2024, 1, 1)
+    ts, values = generate(args.days, start)
+    days = [start.date() + timedelta(days=n) for n in range(args.days)]
+    edges = [local_day_bounds(day)[0] for day in days] + [local_day_bounds(days[-1])[1]]
+    print(f"{len(ts)} Messwerte über {args.days} Tage")
+
+    rows = []
+    for method in integration.INTEGRATION_METHODS:
+        timing = measure(
+            lambda: integration.integrate_windows(ts, values, edges, method, MAX_GAP_S),
+            repeat=args.repeat
+        )
+        energy = integration.integrate_windows(ts, values, edges, method, MAX_GAP_S)
+        rows.append({
+            "variant": f"numpy_{method}",
+            "samples": len(ts),
+            "median_ms": timing["median_ms"],
+            "kwh": round(float(energy.sum()) / 1000, 1),
+        })
+
+    ts_list, values_list = ts.tolist(), values.tolist()
+    t0 = time.perf_counter()
+    energy = python_windows(ts_list, values_list, edges, MAX_GAP_S)
+    rows.append({
+        "variant": "python_trapezoid",
+        "samples": len(ts),
+        "median_ms": round((time.perf_counter() - t0) * 1000, 3),
+        "kwh": round(sum(energy) / 1000, 1),
+    })
+
+    # Laden aus der Datenbank (für die Tageswerte eines Monats)
+    with tempfile.TemporaryDirectory() as tmp:
+        database._db_instance = database.Database(os.path.join(tmp, "bench.db"))
+        manager = SensorManager()
+        db_ts, db_values = generate(args.db_days, start)
+        for offset in range(0, len(db_ts), 50000):
+            manager.save_entity_values([
+                {"entity_id": "sensor.pv_power", "value": value, "unit": "W",
+                 "timestamp": datetime.fromtimestamp(stamp / 1000)}
+                for stamp, value in zip(db_ts[offset:offset + 50000].tolist(),
+                                        db_values[offset:offset + 50000].tolist())
+            ])
+        ref = manager.get_entity_ref("sensor.pv_power", create=False)
+        timing = measure(
+            lambda: integration.load_samples(manager.db, ref, edges[0], edges[args.db_days]),
+            repeat=args.repeat
+        )
+        rows.append({
+            "variant": f"load_{args.db_days}d",
+            "samples": len(db_ts),
+            "median_ms": timing["median_ms"],
+            "kwh": "",
+        })
+        manager.db.close()
+
+    print_table(rows, ["variant", "samples", "median_ms", "kwh"])
+    write_json({"benchmark": "integration", "params": vars(args), "results": rows}, args.json)
+
+
+if __name__ == "__main__":
+    main()
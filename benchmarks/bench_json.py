@@ -0,0 +1,112 @@
+"""Benchmark: Speicher und Dauer beim Lesen großer /api/states Antworten
+
+Vergleicht das vollständige Dekodieren mit response.json() mit dem
+blockweisen Lesen (fastjson.ArrayItemParser), jeweils mit Spitzen-Speicher
+(tracemalloc) und Dauer, gegen einen lokalen Stub-Server mit synthetischen
+States. Zusätzlich: Serialisierung der Flask-Antworten mit dem
+Standard-Provider und mit orjson.
+
+    python benchmarks/bench_json.py --entities 10000
+"""
+
+import argparse
+import tracemalloc
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from common import measure, print_table, write_json
+from stub_ha import StubHAServer
+
+from haminiems import fastjson
+from haminiems.catalog import catalog_entry, select_entry
+from haminiems.const import SNAPSHOT_MODE_BULK
+from haminiems.ha_client import HAClient
+
+
+def peak_kib(func) -> int:
+    """Spitzen-Speicher (Python-Allokationen) eines Aufrufs in KiB"""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        result = func()
+        peak = tracemalloc.get_traced_memory()[1]
+        del result
+    finally:
+        tracemalloc.stop()
+    return peak // 1024
+
+
+def read_cases(stub: StubHAServer, client: HAClient, sensors: int):
+    wanted = stub.entity_ids(sensors)
+    return [
+        (
+            "vorher: response.json()",
+            lambda: client.session.get(f"{stub.url}/api/states").json(),
+        ),
+        ("Stream: alle States", lambda: client.get_states(use_cache=False)),
+        (
+            f"Stream: Snapshot {sensors} Sensoren",
+            lambda: client.get_states_snapshot(wanted, SNAPSHOT_MODE_BULK, use_cache=False),
+        ),
+        ("Stream: Katalog-Einträge", lambda: client.select_states(select_entry)),
+    ]
+
+
+def run_reads(entities: int, sensors: int, repeat: int):
+    rows = []
+    with StubHAServer(entities, latency_ms=0) as stub:
+        client = HAClient(stub.url, "bench-token", request_timeout=60)
+        try:
+            for name, func in read_cases(stub, client, sensors):
+                rows.append({
+                    "case": name,
+                    "peak_kib": peak_kib(func),
+                    **measure(func, repeat=repeat),
+                })
+        finally:
+            client.close()
+    return rows, len(stub._states_body)
+
+
+def run_dumps(entities: int, repeat: int):
+    """Serialisierung einer großen Antwort (Katalog aller Entities)"""
+    app = Flask(__name__)
+    payload = {
+        "success": True,
+        "data": [catalog_entry(entity) for entity in StubHAServer(entities, 0).entities],
+    }
+    providers = [("Standard-Provider", DefaultJSONProvider(app))]
+    if fastjson.HAS_ORJSON:
+        providers.append(("orjson", fastjson.OrjsonProvider(app)))
+    return [
+        {
+            "case": f"{entities} Katalog-Einträge serialisieren: {name}",
+            **measure(lambda: provider.dumps(payload, separators=(",", ":")), repeat=repeat),
+        }
+        for name, provider in providers
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=int, default=10000, help="Anzahl Entities im Stub-HA")
+    parser.add_argument("--sensors", type=int, default=20, help="Sensoren im Snapshot")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON schreiben")
+    args = parser.parse_args()
+
+    rows, body_size = run_reads(args.entities, args.sensors, args.repeat)
+    rows.extend(run_dumps(args.entities, args.repeat))
+    print(f"/api/states: {args.entities} Entities, {body_size / 1e6:.1f} MB")
+    print_table(rows, ["case", "peak_kib", "min_ms", "median_ms", "max_ms"])
+    write_json({
+        "benchmark": "json",
+        "params": vars(args),
+        "body_bytes": body_size,
+        "results": rows,
+    }, args.json)
+
+
+if __name__ == "__main__":
+    main()
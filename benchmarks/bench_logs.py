@@ -0,0 +1,106 @@
+"""Benchmark: /api/logs mit vollständigem Einlesen vs. Lesen vom Dateiende
+
+Erzeugt Log-Dateien im Format von setup_logging (mit gelegentlichen
+Tracebacks) und vergleicht das bisherige readlines() + Regex pro Zeile mit
+tail_logs (blockweise vom Ende, vorkompilierter Ausdruck), mit Level-Filter
+und mit Cursor ohne neue Einträge.
+
+    python benchmarks/bench_logs.py --sizes-mb 1 10 100
+"""
+
+import argparse
+import os
+import re
+import tempfile
+from datetime import datetime, timedelta
+
+from common import measure, print_table, write_json
+
+from haminiems.logtail import tail_logs
+
+LEVELS = ["INFO", "INFO", "INFO", "DEBUG", "WARNING", "INFO", "INFO", "ERROR"]
+TRACEBACK = (
+    "Traceback (most recent call last):\n"
+    '  File "/usr/bin/haminiems/ha_client.py", line 120, in _request\n'
+    "    response.raise_for_status()\n"
+    "requests.exceptions.HTTPError: 502 Server Error\n"
+)
+
+
+def write_log(path: str, size_mb: float):
+    """Schreibt eine Log-Datei der angegebenen Größe"""
+    target = int(size_mb * 1024 * 1024)
+    moment = datetime(2024, 1, 1)
+    written = 0
+    index = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < target:
+            level = LEVELS[index % len(LEVELS)]
+            stamp = moment.strftime("%Y-%m-%d %H:%M:%S") + f",{index % 1000:03d}"
+            line = f"{stamp} - haminiems.main - {level} - Snapshot {index}: 8 Sensoren aktualisiert\n"
+            if level == "ERROR":
+                line += TRACEBACK
+            f.write(line)
+            written += len(line)
+            moment += timedelta(seconds=2)
+            index += 1
+
+
+def legacy_logs(path: str):
+    """Bisheriger Ablauf von GET /api/logs"""
+    logs = []
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+        for line in lines[-100:]:
+            line = line.strip()
+            if line:
+                match = re.match(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) - (\w+) - (.+)', line)
+                if match:
+                    logs.append({
+                        "timestamp": match.group(1).replace(',', '.'),
+                        "level": match.group(2),
+                        "message": match.group(3)
+                    })
+                else:
+                    logs.append({"timestamp": "", "level": "INFO", "message": line})
+    return logs
+
+
+def run(sizes_mb, repeat: int):
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes_mb:
+            path = os.path.join(tmp, f"haminiems-{size}.log")
+            write_log(path, size)
+            cursor = tail_logs(path)["cursor"]
+            cases = [
+                ("vorher: readlines + Regex", lambda: legacy_logs(path)),
+                ("tail_logs limit=100", lambda: tail_logs(path)["entries"]),
+                ("tail_logs level=ERROR", lambda: tail_logs(path, min_level=40)["entries"]),
+                ("tail_logs cursor (keine neuen)", lambda: tail_logs(path, cursor=cursor)["entries"]),
+            ]
+            for name, func in cases:
+                entries = len(func())
+                rows.append({
+                    "size_mb": size,
+                    "case": name,
+                    "entries": entries,
+                    **measure(func, repeat=repeat),
+                })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 10, 100], help="Größen der Log-Dateien")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON schreiben")
+    args = parser.parse_args()
+
+    rows = run(args.sizes_mb, args.repeat)
+    print_table(rows, ["size_mb", "case", "entries", "min_ms", "median_ms", "max_ms"])
+    write_json({"benchmark": "logs", "params": vars(args), "results": rows}, args.json)
+
+
+if __name__ == "__main__":
+    main()
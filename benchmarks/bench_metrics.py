@@ -0,0 +1,102 @@
+"""Benchmark: Kosten der Laufzeit-Metriken
+
+Misst die Dauer eines observe() im Histogramm ohne Lock (Zähler je
+Thread) gegenüber einem Histogramm mit gemeinsamem Lock, mit einem und
+mit mehreren gleichzeitig schreibenden Threads, sowie die Dauer eines
+/metrics-Abrufs.
+
+    python benchmarks/bench_metrics.py --threads 1 8 --observations 200000
+"""
+
+import argparse
+import threading
+import time
+from bisect import bisect_left
+
+from common import measure, print_table, write_json
+
+from haminiems.const import METRICS_BUCKETS
+from haminiems.metrics import MetricsRegistry
+
+
+class LockedHistogram:
+    """Vergleich: alle Threads zählen unter einem gemeinsamen Lock"""
+
+    def __init__(self, buckets=METRICS_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            counts = self._series.get(labels)
+            if counts is None:
+                counts = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+
+def observe_rate(histogram, threads: int, observations: int) -> float:
+    """Nanosekunden pro observe() bei `threads` gleichzeitig schreibenden Threads"""
+    per_thread = observations // threads
+    start_barrier = threading.Barrier(threads + 1)
+
+    def worker(index):
+        label = f"/api/route_{index % 4}"
+        start_barrier.wait()
+        for i in range(per_thread):
+            histogram.observe(i % 100 / 1000, label, "GET", "200")
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    start_barrier.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    return (time.perf_counter() - started) / (per_thread * threads) * 1e9
+
+
+def run(thread_counts, observations: int, series: int, repeat: int):
+    rows = []
+    for threads in thread_counts:
+        for name, factory in (
+            ("ohne Lock (je Thread)", lambda: MetricsRegistry().histogram("bench", "", ("route", "method", "status"))),
+            ("gemeinsamer Lock", LockedHistogram),
+        ):
+            timings = [observe_rate(factory(), threads, observations) for _ in range(repeat)]
+            rows.append({
+                "case": f"observe(), {name}",
+                "threads": threads,
+                "ns_per_op": round(min(timings)),
+            })
+
+    registry = MetricsRegistry()
+    histogram = registry.histogram("bench", "", ("route", "method", "status"))
+    for index in range(series):
+        histogram.observe(0.01, f"/api/route_{index}", "GET", "200")
+    timing = measure(registry.render, repeat=repeat)
+    rows.append({
+        "case": f"/metrics rendern ({series} Reihen)",
+        "threads": 1,
+        "ns_per_op": round(timing["median_ms"] * 1e6),
+    })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8], help="Gleichzeitig schreibende Threads")
+    parser.add_argument("--observations", type=int, default=200000, help="Messungen pro Durchlauf")
+    parser.add_argument("--series", type=int, default=200, help="Label-Kombinationen beim Rendern")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON schreiben")
+    args = parser.parse_args()
+
+    rows = run(args.threads, args.observations, args.series, args.repeat)
+    print_table(rows, ["case", "threads", "ns_per_op"])
+    write_json({"benchmark": "metrics", "params": vars(args), "results": rows}, args.json)
+
+
+if __name__ == "__main__":
+    main()
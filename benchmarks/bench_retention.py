@@ -0,0 +1,97 @@
+"""Benchmark: Datenbankwachstum mit und ohne Aufbewahrung
+
+Simuliert die Datenerfassung Tag für Tag (30-Sekunden-Werte, Rollups per
+Trigger) und lässt nach jedem Tag das Aufräumen laufen, wie es im Add-on
+stündlich geschieht. Ausgegeben werden Datenbankgröße, gelöschte Zeilen und
+die längste Sperre der Schreib-Verbindung durch einen Lösch-Block.
+
+    python benchmarks/bench_retention.py --days 180 --raw-days 30 --sensors 5
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from common import print_table, write_json
+
+from haminiems import database
+from haminiems.maintenance import RetentionTask
+from haminiems.sensors import SensorManager
+
+STEP_S = 30
+
+
+def simulate(days: int, sensors: int, retention, report_every: int):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db = database.Database(os.path.join(tmp, "bench.db"))
+        database._db_instance = db
+        # Frische Datenbank: auto_vacuum ist erst nach VACUUM wirksam
+        db.vacuum()
+        db.execute("DELETE FROM app_meta")
+        manager = SensorManager()
+
+        clock = {"now": start.timestamp()}
+        task = RetentionTask(db, retention, clock=lambda: clock["now"]) if retention else None
+        pruned_total = 0
+
+        for day in range(days):
+            day_start = start + timedelta(days=day)
+            manager.save_entity_values([
+                {
+                    "entity_id": f"sensor.bench_{s}",
+                    "value": float(n),
+                    "timestamp": day_start + timedelta(seconds=n * STEP_S),
+                }
+                for n in range(86400 // STEP_S)
+                for s in range(sensors)
+            ])
+            clock["now"] = (day_start + timedelta(days=1)).timestamp()
+
+            if task is not None:
+                while task.step():
+                    pass
+                pruned_total += task.last_pruned
+
+            if (day + 1) % report_every == 0 or day + 1 == days:
+                stats = db.storage_stats()
+                rows.append({
+                    "day": day + 1,
+                    "size_mb": round(stats["size_bytes"] / 1e6, 2),
+                    "free_mb": round(stats["free_bytes"] / 1e6, 2),
+                    "pruned": pruned_total,
+                    "max_chunk_ms": round(task.max_chunk_ms, 1) if task else "-",
+                })
+        db.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--sensors", type=int, default=5)
+    parser.add_argument("--raw-days", type=int, default=30)
+    parser.add_argument("--rollup-1m-days", type=int, default=60)
+    parser.add_argument("--report-every", type=int, default=30)
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON schreiben")
+    args = parser.parse_args()
+
+    results = {}
+    for label, retention in (
+        ("unbegrenzt", None),
+        ("aufbewahrung", {"raw": args.raw_days, "1m": args.rollup_1m_days}),
+    ):
+        t0 = time.perf_counter()
+        rows = simulate(args.days, args.sensors, retention, args.report_every)
+        print(f"\n{label} ({time.perf_counter() - t0:.1f}s)")
+        print_table(rows, ["day", "size_mb", "free_mb", "pruned", "max_chunk_ms"])
+        results[label] = rows
+
+    write_json({"benchmark": "retention", "params": vars(args), "results": results}, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark: Verlaufsabfragen mit Rohwerten vs. Punkte-Budget (Rollups)
+
+Erzeugt 30-Sekunden-Messwerte (die Rollups werden dabei per Trigger
+gepflegt) und vergleicht für verschiedene Zeiträume Anzahl Zeilen,
+JSON-Größe und Dauer von get_entity_values() ohne und mit max_points.
+
+    python benchmarks/bench_rollups.py --days 365 --points 1000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from common import measure, print_table, write_json
+
+from haminiems import database
+from haminiems.sensors import SensorManager
+
+STEP_S = 30
+
+RANGES = (
+    ("1d", timedelta(days=1)),
+    ("7d", timedelta(days=7)),
+    ("30d", timedelta(days=30)),
+    ("365d", timedelta(days=365)),
+)
+
+
+def populate(manager: SensorManager, days: int, start: datetime) -> int:
+    samples = days * 86400 // STEP_S
+    batch = []
+    for n in range(samples):
+        ts = start + timedelta(seconds=n * STEP_S)
+        batch.append({"entity_id": "sensor.bench_0", "value": float(n % 5000), "timestamp": ts})
+        if len(batch) >= 50000:
+            manager.save_entity_values(batch)
+            batch = []
+    manager.save_entity_values(batch)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--points", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON schreiben")
+    args = parser.parse_args()
+
+    start = datetime(2024, 1, 1)
+    end = start + timedelta(days=args.days)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        database._db_instance = database.Database(os.path.join(tmp, "bench.db"))
+        manager = SensorManager()
+
+        t0 = time.perf_counter()
+        total = populate(manager, args.days, start)
+        elapsed = time.perf_counter() - t0
+        print(f"{total} Zeilen in {elapsed:.1f}s erzeugt ({total / elapsed:.0f} Zeilen/s inkl. Rollups)")
+
+        for label, span in RANGES:
+            if span > end - start:
+                continue
+            range_start = end - span
+            for points in (None, args.points):
+                result = manager.get_entity_values("sensor.bench_0", range_start, end, max_points=points)
+                timing = measure(
+                    lambda: manager.get_entity_values("sensor.bench_0", range_start, end, max_points=points),
+                    repeat=args.repeat
+                )
+                rows.append({
+                    "range": label,
+                    "points": points or "-",
+                    "resolution": result[0].get("resolution", "raw") if result else "-",
+                    "rows": len(result),
+                    "json_kb": round(len(json.dumps(result)) / 1024, 1),
+                    "median_ms": timing["median_ms"],
+                })
+        manager.db.close()
+
+    print_table(rows, ["range", "points", "resolution", "rows", "json_kb", "median_ms"])
+    write_json({"benchmark": "rollups", "params": vars(args), "results": rows}, args.json)
+
+
+if __name__ == "__main__":
+    main()
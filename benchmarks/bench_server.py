@@ -0,0 +1,139 @@
+"""Lasttest: Latenz von /api/entities mit waitress, gunicorn und Werkzeug
+
+Startet HAminiEMS je Server in einem eigenen Prozess gegen den Stub-Server
+und lässt mehrere Clients für eine feste Dauer /api/entities abrufen
+(mit Keep-Alive). Ausgegeben werden Anfragen/s sowie p50/p99 der Latenz.
+
+    python benchmarks/bench_server.py --servers waitress gunicorn werkzeug --clients 16
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+from common import PACKAGE_ROOT, print_table, write_json
+from stub_ha import StubHAServer
+
+LAUNCHER = """
+import sys
+sys.path.insert(0, {root!r})
+import haminiems.const as const
+const.DB_PATH = {db!r}
+from haminiems import main
+main.main()
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(base: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(base + "/api/entities", timeout=1).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server unter {base} nicht erreichbar")
+
+
+def load(base: str, clients: int, duration: float):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop = time.monotonic() + duration
+
+    def client():
+        session = requests.Session()
+        local = []
+        while time.monotonic() < stop:
+            start = time.perf_counter()
+            try:
+                session.get(base + "/api/entities", timeout=10).raise_for_status()
+                local.append((time.perf_counter() - start) * 1000)
+            except requests.RequestException:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0]
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--servers", nargs="+", default=["waitress", "gunicorn", "werkzeug"])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON schreiben")
+    args = parser.parse_args()
+
+    stub = StubHAServer(entity_count=50, latency_ms=5).start()
+    rows = []
+    for server in args.servers:
+        port = free_port()
+        base = f"http://127.0.0.1:{port}"
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ, HA_URL=stub.url, HA_TOKEN="bench", PORT=str(port),
+                SERVER=server, SERVER_THREADS=str(args.threads), WEBSOCKET="false",
+                REFRESH_INTERVAL="5",
+            )
+            code = LAUNCHER.format(root=str(PACKAGE_ROOT), db=os.path.join(tmp, "bench.db"))
+            process = subprocess.Popen(
+                [sys.executable, "-c", code], env=env,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            try:
+                wait_ready(base)
+                requests.post(base + "/api/config", json={"configs": [
+                    {"sensor_key": "pv_production", "entity_id": "sensor.bench_1"},
+                    {"sensor_key": "grid_import", "entity_id": "sensor.bench_2"},
+                ]}, timeout=10)
+                latencies, errors = load(base, args.clients, args.duration)
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+
+        rows.append({
+            "server": server,
+            "requests": len(latencies),
+            "errors": errors,
+            "req_per_s": round(len(latencies) / args.duration, 1),
+            "p50_ms": round(statistics.median(latencies), 2) if latencies else None,
+            "p99_ms": round(percentile(latencies, 0.99), 2) if latencies else None,
+            "exit_code": process.returncode,
+        })
+        print(rows[-1])
+
+    stub.stop()
+    print_table(rows, ["server", "requests", "errors", "req_per_s", "p50_ms", "p99_ms", "exit_code"])
+    write_json({"benchmark": "server", "params": vars(args), "results": rows}, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Benchmark: serieller, Bulk- und paralleler Abruf von Sensor-States
+
+Vergleicht die Snapshot-Modi von HAClient.get_states_snapshot gegen einen
+lokalen Stub-Server mit künstlicher Latenz pro Anfrage. Der Modus "async"
+läuft über den aiohttp-Client (falls installiert), die übrigen über
+requests.
+
+    python benchmarks/bench_snapshot.py --entities 500 --latency-ms 20
+"""
+
+import argparse
+
+from common import measure, print_table, write_json
+from stub_ha import StubHAServer
+
+from haminiems.const import SNAPSHOT_MODE_ASYNC, SNAPSHOT_MODES
+from haminiems.ha_async import HAS_AIOHTTP
+from haminiems.ha_client import HAClient
+
+
+def run(entities: int, latency_ms: float, sensor_counts, repeat: int, max_concurrency: int):
+    rows = []
+    with StubHAServer(entities, latency_ms) as stub:
+        requests_client = HAClient(stub.url, "bench-token", max_concurrency=max_concurrency)
+        async_client = HAClient(
+            stub.url, "bench-token", max_concurrency=max_concurrency, use_async=True
+        )
+        try:
+            for count in sensor_counts:
+                entity_ids = stub.entity_ids(count)
+                for mode in SNAPSHOT_MODES:
+                    if mode == SNAPSHOT_MODE_ASYNC and not HAS_AIOHTTP:
+                        continue
+                    client = async_client if mode == SNAPSHOT_MODE_ASYNC else requests_client
+                    before = stub.request_count
+                    timing = measure(
+                        lambda: client.get_states_snapshot(entity_ids, mode=mode),
+                        repeat=repeat
+                    )
+                    requests_per_call = (stub.request_count - before) / (repeat + 1)
+                    rows.append({
+                        "sensors": count,
+                        "mode": mode,
+                        "requests": round(requests_per_call, 1),
+                        **timing,
+                    })
+        finally:
+            requests_client.close()
+            async_client.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entities", type=int, default=500, help="Anzahl Entities im Stub-HA")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Latenz pro Anfrage")
+    parser.add_argument("--sensors", type=int, nargs="+", default=[1, 5, 10, 20])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-concurrency", type=int, default=8, help="Parallele Anfragen (concurrent/async)")
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON schreiben")
+    args = parser.parse_args()
+
+    rows = run(args.entities, args.latency_ms, args.sensors, args.repeat, args.max_concurrency)
+    print_table(rows, ["sensors", "mode", "requests", "min_ms", "median_ms", "max_ms"])
+    write_json({"benchmark": "snapshot", "params": vars(args), "results": rows}, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Benchmark: Energie-Statistiken aus Zählerständen mit/ohne gespeicherte Tage
+
+Erzeugt 30-Sekunden-Zählerstände (kWh, mit gelegentlichem Reset) und misst
+die Dauer von get_period_statistics() für Tag, Woche und Monat, einmal mit
+vollständiger Neuberechnung und einmal mit in daily_statistics gespeicherten
+abgeschlossenen Tagen (nur der aktuelle Tag wird neu berechnet).
+
+    python benchmarks/bench_statistics.py --days 60 --sensors 3
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from common import measure, print_table, write_json
+
+from haminiems import database
+from haminiems.calculations import CalculationEngine
+from haminiems.maintenance import LegacyImportTask, StatisticsTask
+from haminiems.sensors import SensorManager
+
+STEP_S = 30
+KEYS = ("pv_production", "grid_import", "house_consumption", "grid_export", "heat_pump")
+
+
+def populate(manager: SensorManager, days: int, sensors: int, end: datetime) -> int:
+    start = end - timedelta(days=days)
+    samples = days * 86400 // STEP_S
+    batch = []
+    for n in range(samples):
+        ts = start + timedelta(seconds=n * STEP_S)
+        for s in range(sensors):
+            # 1 kWh pro Stunde, Reset alle 20 Tage
+            value = (n % (20 * 86400 // STEP_S)) * STEP_S / 3600
+            batch.append({
+                "entity_id": f"sensor.energy_{s}", "value": value, "timestamp": ts,
+                "unit": "kWh", "state_class": "total_increasing",
+            })
+        if len(batch) >= 50000:
+            manager.save_entity_values(batch)
+            batch = []
+    manager.save_entity_values(batch)
+    return samples * sensors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--sensors", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON schreiben")
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        database._db_instance = database.Database(os.path.join(tmp, "bench.db"))
+        manager = SensorManager()
+        legacy = LegacyImportTask(manager)
+        while legacy.step():
+            pass
+
+        total = populate(manager, args.days, min(args.sensors, len(KEYS)), datetime.now())
+        print(f"{total} Zählerstände erzeugt")
+        manager.save_configs([
+            {"sensor_key": key, "entity_id": f"sensor.energy_{s}"}
+            for s, key in enumerate(KEYS[:args.sensors])
+        ])
+        engine = CalculationEngine(None, manager)
+
+        def uncached(period):
+            manager.db.execute("DELETE FROM daily_statistics")
+            return engine.get_period_statistics(period)
+
+        results = {}
+        for period in ("day", "week", "month"):
+            results[period] = {
+                "uncached_ms": measure(lambda: uncached(period), repeat=args.repeat)["median_ms"]
+            }
+
+        task = StatisticsTask(engine.energy_statistics, manager)
+        t0 = time.perf_counter()
+        while task.step():
+            pass
+        materialize_s = time.perf_counter() - t0
+        print(f"{task.days_stored} Tage in {materialize_s:.2f}s gespeichert")
+
+        for period in ("day", "week", "month"):
+            stats = engine.get_period_statistics(period)
+            timing = measure(lambda: engine.get_period_statistics(period), repeat=args.repeat)
+            rows.append({
+                "period": period,
+                "days": len(next(iter(stats["sensors"].values()))["days"]),
+                "uncached_ms": results[period]["uncached_ms"],
+                "cached_ms": timing["median_ms"],
+                "production_kwh": round(stats["summary"]["total_production"], 2),
+            })
+        manager.db.close()
+
+    print_table(rows, ["period", "days", "uncached_ms", "cached_ms", "production_kwh"])
+    write_json({
+        "benchmark": "statistics",
+        "params": vars(args),
+        "results": rows,
+        "materialize_s": round(materialize_s, 2),
+    }, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Benchmark: Datenbankgröße und Bereichsabfragen vor/nach Migration 003
+
+Erzeugt eine Datenbank im alten Format (Text-Zeitstempel, entity_id,
+state_class und unit pro Zeile), misst Dateigröße und Bereichsabfragen,
+migriert sie wie beim Add-on-Start auf Epoch-Millisekunden mit
+Entity-Verzeichnis und misst erneut. Zusätzlich wird die Dauer der
+Migration beim Start und der Altdaten-Übernahme im Hintergrund erfasst.
+
+    python benchmarks/bench_storage.py --days 90 --sensors 5
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from common import measure, print_table, write_json
+
+from haminiems import database
+from haminiems.maintenance import LegacyImportTask
+from haminiems.migrations.migration_manager import MigrationManager
+from haminiems.sensors import SensorManager, build_entity_values_query
+
+STEP_S = 30
+
+LEGACY_QUERY = """
+    SELECT timestamp, value FROM entity_values
+    WHERE entity_id = ? AND timestamp >= ? AND timestamp <= ?
+    ORDER BY timestamp DESC
+"""
+
+RANGES = (
+    ("1h", timedelta(hours=1)),
+    ("1d", timedelta(days=1)),
+    ("7d", timedelta(days=7)),
+    ("30d", timedelta(days=30)),
+)
+
+
+def file_size(path: str) -> int:
+    return sum(
+        os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p)
+    )
+
+
+def build_legacy(path: str, days: int, sensors: int, start: datetime) -> int:
+    """Legt eine Datenbank im Format von Schema-Version 2 an"""
+    conn = sqlite3.connect(path)
+    MigrationManager(conn).migrate_to(2)
+    samples = days * 86400 // STEP_S
+    batch = []
+    for n in range(samples):
+        ts = start + timedelta(seconds=n * STEP_S)
+        for s in range(sensors):
+            batch.append((ts, f"sensor.bench_{s}", float(n), "measurement", "W"))
+        if len(batch) >= 50000:
+            conn.executemany(
+                "INSERT INTO entity_values (timestamp, entity_id, value, state_class, unit) "
+                "VALUES (?, ?, ?, ?, ?)", batch
+            )
+            batch = []
+    conn.executemany(
+        "INSERT INTO entity_values (timestamp, entity_id, value, state_class, unit) "
+        "VALUES (?, ?, ?, ?, ?)", batch
+    )
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+    return samples * sensors
+
+
+def scan_legacy(path: str, middle: datetime, repeat: int) -> dict:
+    conn = sqlite3.connect(path)
+    results = {}
+    for label, span in RANGES:
+        params = ("sensor.bench_0", middle, middle + span)
+        results[label] = measure(
+            lambda: conn.execute(LEGACY_QUERY, params).fetchall(), repeat=repeat
+        )["median_ms"]
+    conn.close()
+    return results
+
+
+def scan_compact(manager: SensorManager, middle: datetime, repeat: int) -> dict:
+    ref = manager.get_entity_ref("sensor.bench_0", create=False)
+    results = {}
+    for label, span in RANGES:
+        query, params = build_entity_values_query(ref, middle, middle + span)
+        results[label] = measure(
+            lambda: manager.db.fetch_all(query, params), repeat=repeat
+        )["median_ms"]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--sensors", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON schreiben")
+    args = parser.parse_args()
+
+    start = datetime(2024, 1, 1)
+    middle = start + timedelta(days=args.days // 2)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        total = build_legacy(path, args.days, args.sensors, start)
+        legacy_size = file_size(path)
+        legacy_scan = scan_legacy(path, middle, args.repeat)
+        print(f"{total} Zeilen im alten Format erzeugt")
+
+        # Migration beim Start (nur Umbenennen/Anlegen der Tabellen)
+        t0 = time.perf_counter()
+        database._db_instance = database.Database(path)
+        startup_ms = (time.perf_counter() - t0) * 1000
+        manager = SensorManager()
+
+        # Übernahme der Altdaten, wie sie im Hintergrund läuft
+        task = LegacyImportTask(manager)
+        t0 = time.perf_counter()
+        while task.step():
+            pass
+        import_s = time.perf_counter() - t0
+
+        # Die gelöschte Alt-Tabelle hinterlässt freie Seiten
+        manager.db.execute("VACUUM")
+        manager.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        compact_size = file_size(path)
+        compact_scan = scan_compact(manager, middle, args.repeat)
+        manager.db.close()
+
+    rows = [
+        {"format": "legacy", "size_mb": round(legacy_size / 1e6, 2),
+         "bytes_per_row": round(legacy_size / total, 1), **legacy_scan},
+        {"format": "compact", "size_mb": round(compact_size / 1e6, 2),
+         "bytes_per_row": round(compact_size / total, 1), **compact_scan},
+    ]
+    print_table(rows, ["format", "size_mb", "bytes_per_row"] + [label for label, _ in RANGES])
+    print(f"Migration beim Start: {startup_ms:.1f} ms, "
+          f"Altdaten-Übernahme im Hintergrund: {import_s:.1f} s")
+    write_json({
+        "benchmark": "storage",
+        "params": vars(args),
+        "results": rows,
+        "startup_migration_ms": round(startup_ms, 1),
+        "legacy_import_s": round(import_s, 2),
+    }, args.json)
+
+
+if __name__ == "__main__":
+    main()
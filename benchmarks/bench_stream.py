@@ -0,0 +1,108 @@
+"""Benchmark: HA-Anfragen und Server-Last mit Polling vs. Server-Sent Events
+
+Startet HAminiEMS gegen den Stub-Server und simuliert mehrere offene
+Dashboards: einmal wie bisher mit Polling von /api/health, /api/entities
+und /api/calculations pro Tick, einmal über /api/stream. Gemessen werden
+Anfragen an Home Assistant und an HAminiEMS während der Laufzeit.
+
+    python benchmarks/bench_stream.py --clients 1 5 20 --duration 10
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import requests
+from werkzeug.serving import make_server
+
+from common import print_table, write_json
+from stub_ha import StubHAServer
+
+
+def poll(base: str, stop: threading.Event, tick: float, counter: list):
+    session = requests.Session()
+    while not stop.is_set():
+        for path in ("/api/health", "/api/entities", "/api/calculations?type=balance"):
+            session.get(base + path, timeout=10)
+            counter.append(1)
+        stop.wait(tick)
+
+
+def listen(base: str, stop: threading.Event, counter: list):
+    with requests.get(base + "/api/stream", stream=True, timeout=30) as response:
+        counter.append(1)
+        for line in response.iter_lines():
+            if line.startswith(b"event:"):
+                counter.append(1)
+            if stop.is_set():
+                break
+
+
+def run(mode: str, base: str, stub: StubHAServer, clients: int, duration: float, tick: float):
+    stop = threading.Event()
+    counter: list = []
+    if mode == "polling":
+        target, args = poll, (base, stop, tick, counter)
+    else:
+        target, args = listen, (base, stop, counter)
+    threads = [threading.Thread(target=target, args=args, daemon=True) for _ in range(clients)]
+    before = stub.request_count
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    ha_requests = stub.request_count - before
+    for thread in threads:
+        thread.join(timeout=20)
+    return {
+        "mode": mode,
+        "clients": clients,
+        "ha_requests": ha_requests,
+        "app_requests_or_events": len(counter),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--tick", type=float, default=2.0, help="Polling-Intervall der Dashboards")
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON schreiben")
+    args = parser.parse_args()
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    stub = StubHAServer(entity_count=50, latency_ms=5).start()
+    os.environ.update(
+        HA_URL=stub.url, HA_TOKEN="bench", REFRESH_INTERVAL="2", WEBSOCKET="false"
+    )
+    from haminiems import database
+    database._db_instance = database.Database(os.path.join(tempfile.mkdtemp(), "bench.db"))
+    from haminiems import main as app_main
+    app_main.init_app()
+    app_main.sensor_manager.save_configs([
+        {"sensor_key": key, "entity_id": entity_id}
+        for key, entity_id in zip(("pv_production", "grid_import", "house_consumption"),
+                                  stub.entity_ids(3))
+    ])
+    server = make_server("127.0.0.1", 0, app_main.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    rows = []
+    for clients in args.clients:
+        for mode in ("polling", "stream"):
+            rows.append(run(mode, base, stub, clients, args.duration, args.tick))
+            print(rows[-1])
+
+    app_main.shutdown_app()
+    server.shutdown()
+    stub.stop()
+    print_table(rows, ["mode", "clients", "ha_requests", "app_requests_or_events"])
+    write_json({"benchmark": "stream", "params": vars(args), "results": rows}, args.json)
+
+
+if __name__ == "__main__":
+    main()
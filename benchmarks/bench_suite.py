@@ -0,0 +1,285 @@
+"""Benchmark-Suite: Regressionsvergleich zwischen Releases
+
+Misst die zentralen Pfade in einem Durchlauf gegen einen lokalen Stub-Server
+und eine synthetische Datenbank aus dataset.py (Standard: 1 Mio. Messwerte):
+
+- ha_client: HAClient.get_state/get_states/get_history und Snapshot-Abruf
+- sensors: SensorManager.save_entity_value(s), get_entity_values, get_latest_value
+- calculations: CalculationEngine.calculate_energy_balance und Statistiken
+- flask: API-Endpunkte über den Flask Test-Client (mit init_app())
+
+Die Ergebnisse enthalten die Umgebung (Python, Commit, optionale Pakete)
+und lassen sich mit --compare gegen eine frühere JSON-Datei vergleichen;
+Verschlechterungen über --threshold Prozent führen zum Exit-Code 1.
+
+    python benchmarks/bench_suite.py --json v0.5.json
+    python benchmarks/bench_suite.py --compare v0.5.json --json v0.6.json
+    python benchmarks/bench_suite.py --only ha_client flask --rows 200000
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from common import measure, print_table, write_json
+from dataset import generate
+from stub_ha import StubHAServer
+
+from haminiems import database
+from haminiems.calculations import CalculationEngine
+from haminiems.const import SENSOR_KEYS, SNAPSHOT_MODE_ASYNC, SNAPSHOT_MODE_BULK, SNAPSHOT_MODE_CONCURRENT
+from haminiems.ha_client import HAS_AIOHTTP, HAClient
+from haminiems.sensors import SensorManager
+
+SECTIONS = ("ha_client", "sensors", "calculations", "flask")
+STEP_S = 30
+# Unterschiede unterhalb dieser Schwelle gelten nie als Verschlechterung
+NOISE_MS = 0.05
+
+
+def environment() -> dict:
+    """Beschreibt die Umgebung, damit Ergebnisse vergleichbar bleiben"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    from haminiems.fastjson import HAS_ORJSON
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "orjson": HAS_ORJSON,
+        "aiohttp": HAS_AIOHTTP,
+    }
+
+
+def run_case(section: str, name: str, func, repeat: int) -> dict:
+    """Misst einen Fall; der erste Aufruf dient als Aufwärmen und liefert die Ergebnisgröße"""
+    result = func()
+    size = len(result) if isinstance(result, (list, dict, bytes)) else ""
+    return {"section": section, "case": name, "result": size, **measure(func, repeat=repeat, warmup=0)}
+
+
+def bench_ha_client(stub: StubHAServer, entity_ids, repeat: int):
+    client = HAClient(stub.url, "bench", cache_ttl=0, use_async=HAS_AIOHTTP)
+    end = datetime.now()
+    cases = [
+        ("get_state", lambda: client.get_state(entity_ids[1])),
+        ("get_states (ohne Cache)", lambda: client.get_states(use_cache=False)),
+        ("get_history 1d", lambda: client.get_history(entity_ids[1], end - timedelta(days=1), end)),
+        ("get_history 1d minimal", lambda: client.get_history(
+            entity_ids[1], end - timedelta(days=1), end, minimal_response=True, no_attributes=True
+        )),
+        ("Snapshot bulk", lambda: client.get_states_snapshot(entity_ids, SNAPSHOT_MODE_BULK, use_cache=False)),
+        ("Snapshot concurrent", lambda: client.get_states_snapshot(
+            entity_ids, SNAPSHOT_MODE_CONCURRENT, use_cache=False
+        )),
+    ]
+    if HAS_AIOHTTP:
+        cases.append(("Snapshot async", lambda: client.get_states_snapshot(
+            entity_ids, SNAPSHOT_MODE_ASYNC, use_cache=False
+        )))
+    try:
+        return [run_case("ha_client", name, func, repeat) for name, func in cases]
+    finally:
+        client.close()
+
+
+def bench_sensors(manager: SensorManager, entity_ids, repeat: int):
+    # Schreibfälle verwenden eine eigene Entity, damit die Messreihen unverändert bleiben
+    written = [datetime.now() + timedelta(days=1)]
+
+    def save_one():
+        written[0] += timedelta(seconds=1)
+        return manager.save_entity_value("sensor.bench_write", 1.0, "measurement", "W", written[0])
+
+    def save_many():
+        written[0] += timedelta(seconds=100)
+        return manager.save_entity_values([
+            {"entity_id": "sensor.bench_write", "value": float(i), "timestamp": written[0] + timedelta(seconds=i)}
+            for i in range(100)
+        ])
+
+    now = datetime.now()
+    entity_id = entity_ids[1]
+    cases = [
+        ("save_entity_value", save_one),
+        ("save_entity_values (100)", save_many),
+        ("get_entity_values 1h", lambda: manager.get_entity_values(entity_id, now - timedelta(hours=1), now)),
+        ("get_entity_values 1d", lambda: manager.get_entity_values(entity_id, now - timedelta(days=1), now)),
+        ("get_entity_values 7d", lambda: manager.get_entity_values(entity_id, now - timedelta(days=7), now)),
+        ("get_entity_values 30d, 500 Punkte", lambda: manager.get_entity_values(
+            entity_id, now - timedelta(days=30), now, max_points=500
+        )),
+        ("get_latest_value", lambda: manager.get_latest_value(entity_id)),
+    ]
+    return [run_case("sensors", name, func, repeat) for name, func in cases]
+
+
+def bench_calculations(stub: StubHAServer, manager: SensorManager, repeat: int):
+    client = HAClient(stub.url, "bench", cache_ttl=0)
+    collected = CalculationEngine(client, manager)
+    collected.update_current_values(collected.fetch_current_values(use_cache=False))
+    fetching = CalculationEngine(client, manager)
+    cases = [
+        ("calculate_energy_balance (erfasste Werte)", collected.calculate_energy_balance),
+        ("calculate_energy_balance (Abruf bei HA)", fetching.calculate_energy_balance),
+        ("get_daily_statistics", collected.get_daily_statistics),
+        ("get_period_statistics week", lambda: collected.get_period_statistics("week")),
+        ("get_period_statistics month", lambda: collected.get_period_statistics("month")),
+    ]
+    try:
+        return [run_case("calculations", name, func, repeat) for name, func in cases]
+    finally:
+        client.close()
+
+
+def bench_flask(stub: StubHAServer, entity_ids, repeat: int):
+    os.environ.update(
+        HA_URL=stub.url,
+        HA_TOKEN="bench",
+        REFRESH_INTERVAL="3600",
+        WEBSOCKET="false",
+        HISTORY_BACKFILL_DAYS="0",
+    )
+    from haminiems import main as app_main
+    logging.getLogger("haminiems").setLevel(logging.WARNING)
+
+    app_main.init_app()
+    try:
+        deadline = time.monotonic() + 30
+        while app_main.data_collector.runs < 1 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        # Nach der ersten Erfassung ruhen die Hintergrund-Threads, damit sie die Messung nicht stören
+        app_main.maintenance_worker.stop()
+        app_main.data_collector.stop()
+
+        client = app_main.app.test_client()
+        now = datetime.now()
+        day = f"start={(now - timedelta(days=1)).isoformat()}&end={now.isoformat()}"
+
+        def get(url):
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f"{url}: HTTP {response.status_code}")
+            return response.data
+
+        urls = [
+            ("/api/entities", "/api/entities"),
+            ("/api/config", "/api/config"),
+            ("/api/catalog", "/api/catalog"),
+            ("/api/data 1d", f"/api/data?entity_id={entity_ids[1]}&{day}"),
+            ("/api/data 1d, 500 Punkte", f"/api/data?entity_id={entity_ids[1]}&{day}&points=500"),
+            ("/api/calculations balance", "/api/calculations?type=balance"),
+            ("/api/calculations daily", "/api/calculations?type=daily"),
+            ("/api/status", "/api/status"),
+            ("/api/health", "/api/health"),
+        ]
+        return [run_case("flask", name, lambda url=url: get(url), repeat) for name, url in urls]
+    finally:
+        app_main.shutdown_app()
+
+
+def compare(rows, path: str, threshold: float):
+    """Ergänzt die Abweichung zum Median der Vergleichsdatei, gibt Verschlechterungen zurück"""
+    with open(path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(row["section"], row["case"]): row["median_ms"] for row in baseline.get("results", [])}
+    regressions = []
+    for row in rows:
+        old = previous.get((row["section"], row["case"]))
+        if old is None:
+            row["change"] = "neu"
+            continue
+        row["baseline_ms"] = old
+        change = (row["median_ms"] - old) / old * 100 if old else 0.0
+        row["change"] = f"{change:+.1f}%"
+        if change > threshold and row["median_ms"] - old > NOISE_MS:
+            row["change"] += " !"
+            regressions.append(row)
+    return regressions
+
+
+def run(args):
+    sections = args.only or SECTIONS
+    rows = []
+    setup = {}
+    with StubHAServer(args.entities, args.latency_ms) as stub, tempfile.TemporaryDirectory() as tmp:
+        entity_ids = stub.entity_ids(len(SENSOR_KEYS))
+        if {"sensors", "calculations", "flask"} & set(sections):
+            database._db_instance = database.Database(args.db or os.path.join(tmp, "bench.db"))
+            manager = SensorManager()
+            if manager.get_latest_value(entity_ids[0]) is None:
+                # Synthetischer Datensatz im 30-s-Raster bis jetzt, Sensoren den Stub-Entities zugeordnet
+                end = datetime.now().replace(microsecond=0)
+                days = args.rows * STEP_S / 86400 / len(SENSOR_KEYS)
+                started = time.perf_counter()
+                setup = generate(
+                    manager, end - timedelta(days=days), end, STEP_S,
+                    entity_ids=dict(zip(SENSOR_KEYS, entity_ids))
+                )
+                setup["populate_s"] = round(time.perf_counter() - started, 1)
+                print(f"{setup['rows']} Zeilen in {setup['populate_s']}s erzeugt")
+
+        if "ha_client" in sections:
+            rows += bench_ha_client(stub, entity_ids, args.repeat)
+        if "sensors" in sections:
+            rows += bench_sensors(manager, entity_ids, args.repeat)
+        if "calculations" in sections:
+            rows += bench_calculations(stub, manager, args.repeat)
+        if "flask" in sections:
+            rows += bench_flask(stub, entity_ids, args.repeat)
+
+        if database._db_instance is not None:
+            database._db_instance.close()
+            database._db_instance = None
+    return rows, setup
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=SECTIONS, help="Nur diese Bereiche messen")
+    parser.add_argument("--entities", type=int, default=500, help="Entities im Stub-Server")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Latenz des Stub-Servers pro Anfrage")
+    parser.add_argument("--rows", type=int, default=1000000, help="Messwerte in der synthetischen Datenbank")
+    parser.add_argument("--db", help="Datenbank-Datei (wird beim ersten Lauf befüllt und wiederverwendet)")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--compare", help="Frühere JSON-Ergebnisse zum Vergleich")
+    parser.add_argument("--threshold", type=float, default=20.0, help="Verschlechterung in Prozent (Median)")
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON schreiben")
+    args = parser.parse_args()
+
+    rows, setup = run(args)
+    columns = ["section", "case", "result", "min_ms", "median_ms", "max_ms"]
+    regressions = []
+    if args.compare:
+        regressions = compare(rows, args.compare, args.threshold)
+        columns += ["baseline_ms", "change"]
+    print_table(rows, columns)
+    write_json({
+        "benchmark": "suite",
+        "environment": environment(),
+        "params": vars(args),
+        "setup": setup,
+        "results": rows,
+    }, args.json)
+
+    if regressions:
+        print(f"{len(regressions)} Verschlechterung(en) über {args.threshold:.0f}%")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Benchmark: Einzel-INSERTs vs. gebündelte Transaktionen für entity_values
+
+Simuliert Erfassungsdurchläufe mit mehreren Sensoren und misst Zeilen pro
+Sekunde sowie Commits (jeweils mindestens ein fsync) pro Durchlauf.
+
+    python benchmarks/bench_writes.py --cycles 200 --sensors 10
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from common import print_table, write_json
+
+from haminiems import database
+from haminiems.sensors import SensorManager
+
+
+def make_manager(db_path: str) -> SensorManager:
+    database._db_instance = database.Database(db_path)
+    return SensorManager()
+
+
+def count_commits(db: database.Database):
+    """Zählt COMMIT-Statements über den Trace-Callback"""
+    counter = {"commits": 0}
+
+    def trace(statement: str):
+        if statement.strip().upper().startswith("COMMIT"):
+            counter["commits"] += 1
+
+    db.conn.set_trace_callback(trace)
+    return counter
+
+
+def cycle_rows(cycle: int, sensors: int):
+    ts = datetime(2024, 1, 1) + timedelta(seconds=30 * cycle)
+    return [
+        {
+            "entity_id": f"sensor.bench_{i}",
+            "value": float(cycle + i),
+            "state_class": "measurement",
+            "unit": "W",
+            "timestamp": ts,
+        }
+        for i in range(sensors)
+    ]
+
+
+def run_mode(mode: str, cycles: int, sensors: int, buffer_rows: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        manager = make_manager(os.path.join(tmp, "bench.db"))
+        if mode == "buffered":
+            manager.enable_write_buffer(buffer_rows, max_age=3600)
+        counter = count_commits(manager.db)
+
+        start = time.perf_counter()
+        for cycle in range(cycles):
+            rows = cycle_rows(cycle, sensors)
+            if mode == "single":
+                for row in rows:
+                    manager.save_entity_value(**row)
+            else:
+                manager.save_entity_values(rows)
+        manager.close()
+        elapsed = time.perf_counter() - start
+
+        total = manager.db.fetch_one("SELECT COUNT(*) FROM entity_values")[0]
+        manager.db.close()
+
+    return {
+        "mode": mode,
+        "rows": total,
+        "rows_per_s": round(total / elapsed),
+        "commits": counter["commits"],
+        "commits_per_cycle": round(counter["commits"] / cycles, 3),
+        "elapsed_s": round(elapsed, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cycles", type=int, default=200)
+    parser.add_argument("--sensors", type=int, default=10)
+    parser.add_argument("--buffer-rows", type=int, default=500)
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON schreiben")
+    args = parser.parse_args()
+
+    rows = [
+        run_mode(mode, args.cycles, args.sensors, args.buffer_rows)
+        for mode in ("single", "batch", "buffered")
+    ]
+    print_table(rows, ["mode", "rows", "rows_per_s", "commits", "commits_per_cycle", "elapsed_s"])
+    write_json({"benchmark": "writes", "params": vars(args), "results": rows}, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Gemeinsame Hilfsfunktionen für die HAminiEMS Benchmarks"""
+
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# Python-Paket des Add-Ons importierbar machen
+PACKAGE_ROOT = Path(__file__).resolve().parents[1] / "haminiems" / "rootfs" / "usr" / "bin"
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.insert(0, str(PACKAGE_ROOT))
+
+
+def measure(func: Callable[[], Any], repeat: int = 5, warmup: int = 1) -> Dict[str, float]:
+    """Misst die Laufzeit einer Funktion in Millisekunden"""
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "min_ms": round(min(timings), 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "max_ms": round(max(timings), 3),
+    }
+
+
+def print_table(rows: List[Dict[str, Any]], columns: List[str]):
+    """Gibt Ergebnisse als einfache Tabelle aus"""
+    widths = {
+        column: max([len(column)] + [len(str(row.get(column, ""))) for row in rows])
+        for column in columns
+    }
+    print("  ".join(column.ljust(widths[column]) for column in columns))
+    for row in rows:
+        print("  ".join(str(row.get(column, "")).ljust(widths[column]) for column in columns))
+
+
+def write_json(results: Dict[str, Any], path: Optional[str]):
+    """Schreibt Ergebnisse als JSON-Datei (falls ein Pfad angegeben ist)"""
+    if not path:
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Ergebnisse geschrieben: {path}")
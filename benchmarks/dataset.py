@@ -0,0 +1,343 @@
+"""Synthetischer Datensatz: mehrjährige Messwerte für alle Sensoren
+
+Erzeugt Messwerte für alle SENSOR_KEYS aus einem einfachen Haushaltsmodell:
+PV-Kurven nach Jahreszeit und Bewölkung, Grundlast mit Tagesprofil,
+Wärmepumpe mit Heizbedarf im Winter, E-Auto-Ladungen und eine Batterie,
+die den Überschuss puffert (Ladezustand in %). Dazu kommen Zählerresets
+und Lücken, in denen die Erfassung ausgefallen ist.
+
+Die Datenbank entsteht über die echten Migrationen (Database). Zum Laden
+wird der Rollup-Trigger entfernt, die Werte werden in großen Transaktionen
+eingefügt und die Rollups danach mengenbasiert je Entity und Auflösung
+berechnet; anschließend wird der Trigger wiederhergestellt. Wird der
+Generator hart beendet, legt Database den Trigger beim nächsten Öffnen
+wieder an.
+
+    python benchmarks/dataset.py --years 3 --step-s 30 --out synthetic.db
+
+Als Fixture für Benchmarks (globale Datenbank-Instanz setzen), für die
+Tests siehe das Fixture dataset in tests/conftest.py:
+
+    database._db_instance = database.Database(path)
+    stats = generate(SensorManager(), start, end, step_s=30)
+"""
+
+import argparse
+import math
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from datetime import time as day_time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Auch außerhalb von benchmarks/ importierbar (z.B. aus tests/conftest.py)
+BENCHMARKS_ROOT = Path(__file__).resolve().parent
+if str(BENCHMARKS_ROOT) not in sys.path:
+    sys.path.append(str(BENCHMARKS_ROOT))
+
+from common import print_table, write_json  # noqa: E402
+
+from haminiems import database  # noqa: E402
+from haminiems.const import DAY_MS, ROLLUP_RESOLUTIONS, SENSOR_KEYS  # noqa: E402
+from haminiems.maintenance import REBUILD_ROLLUPS  # noqa: E402
+from haminiems.sensors import INSERT_ENTITY_VALUE, SensorManager  # noqa: E402
+from haminiems.utils import to_epoch_ms  # noqa: E402
+
+MODE_ENERGY = "energy"    # Zählerstände in kWh (total_increasing)
+MODE_POWER = "power"      # Leistungswerte in W (measurement)
+
+ROLLUP_TRIGGER = "trg_entity_values_rollup"
+BATCH_ROWS = 200000
+# Synchronous OFF und großer Cache nur für die Datei des Generators
+BULK_PRAGMAS = {"synchronous": "OFF", "cache_size": -256000}
+
+
+class Household:
+    """Haushalt mit PV-Anlage, Batterie, Wärmepumpe und E-Auto
+
+    step() liefert je Sensor-Key die Leistung in W, für battery_soc den
+    Ladezustand in %. Zufallswerte stammen aus dem übergebenen Generator,
+    gleiche Seeds ergeben gleiche Daten.
+    """
+
+    def __init__(
+        self,
+        rng: random.Random,
+        pv_kwp: float = 8.0,
+        battery_kwh: float = 10.0,
+        battery_kw: float = 5.0
+    ):
+        self.rng = rng
+        self.pv_w = pv_kwp * 1000
+        self.battery_wh = battery_kwh * 1000
+        self.battery_w = battery_kw * 1000
+        self.soc_wh = self.battery_wh / 2
+        self.season = 0.0
+        self.weather = 1.0
+        self.ev_start = None
+        self.ev_remaining_wh = 0.0
+
+    def start_day(self, day: date):
+        """Legt Jahreszeit, Bewölkung und E-Auto-Ladung des Tages fest"""
+        # +1 im Hochsommer, -1 im Winter
+        self.season = math.cos(2 * math.pi * (day.timetuple().tm_yday - 172) / 365)
+        self.weather = self.rng.uniform(0.15, 1.0)
+        if self.rng.random() < 0.3:
+            self.ev_start = self.rng.uniform(17.0, 20.0)
+            self.ev_remaining_wh = self.rng.uniform(8000, 35000)
+        else:
+            self.ev_start = None
+
+    def step(self, hour: float, step_s: int) -> Dict[str, float]:
+        rng = self.rng
+        hours = step_s / 3600
+
+        # Sonnenstand: Tageslänge 8-16 h um 13 Uhr, im Winter flacher
+        day_length = 12 + 4 * self.season
+        sunrise = 13 - day_length / 2
+        pv = 0.0
+        if sunrise < hour < sunrise + day_length:
+            shape = math.sin(math.pi * (hour - sunrise) / day_length) ** 1.5
+            peak = 0.6 + 0.25 * self.season
+            clouds = rng.uniform(1 - 0.6 * (1 - self.weather), 1.0)
+            pv = self.pv_w * peak * shape * self.weather * clouds
+
+        house = max(100.0, 250
+                    + 450 * math.exp(-((hour - 7) / 1.2) ** 2)
+                    + 150 * math.exp(-((hour - 12.5) / 1.0) ** 2)
+                    + 800 * math.exp(-((hour - 19) / 2.0) ** 2)
+                    + rng.gauss(0, 40))
+        other = 60 + 80 * rng.random()
+
+        # Heizbedarf 0 (Sommer) bis 1 (Winter), Takten in 30-Minuten-Blöcken
+        demand = 0.5 - 0.5 * self.season
+        minute = hour * 60 % 30
+        heat_pump = 0.0
+        if minute < (0.1 + 0.8 * demand) * 30:
+            heat_pump = 1600 + 1200 * demand
+        if 6.0 <= hour < 6.75:
+            heat_pump = 2500.0    # Warmwasser
+
+        ev = 0.0
+        if self.ev_start is not None and hour >= self.ev_start and self.ev_remaining_wh > 0:
+            ev = min(11000.0, self.ev_remaining_wh / hours)
+            self.ev_remaining_wh -= ev * hours
+
+        load = house + other + heat_pump + ev
+        surplus = pv - load
+        charge = discharge = 0.0
+        if surplus > 0:
+            charge = min(surplus, self.battery_w, (self.battery_wh - self.soc_wh) / 0.95 / hours)
+            self.soc_wh += charge * hours * 0.95
+        else:
+            discharge = min(-surplus, self.battery_w, max(0.0, self.soc_wh - 0.05 * self.battery_wh) / hours)
+            self.soc_wh -= discharge * hours
+
+        return {
+            "pv_production": pv,
+            "grid_import": max(0.0, load - pv - discharge),
+            "grid_export": max(0.0, pv - load - charge),
+            "battery_charge": charge,
+            "battery_discharge": discharge,
+            "battery_soc": self.soc_wh / self.battery_wh * 100,
+            "house_consumption": house,
+            "ev_charging": ev,
+            "heat_pump": heat_pump,
+            "other_consumption": other,
+        }
+
+
+def sensor_meta(key: str, mode: str) -> Tuple[str, str]:
+    """state_class und Einheit eines Sensors im gewählten Modus"""
+    if key == "battery_soc":
+        return "measurement", "%"
+    if mode == MODE_ENERGY:
+        return "total_increasing", "kWh"
+    return "measurement", "W"
+
+
+def generate_rows(
+    refs: Dict[str, int],
+    start: datetime,
+    end: datetime,
+    step_s: int = 30,
+    mode: str = MODE_ENERGY,
+    seed: int = 1,
+    gap_rate: float = 0.02,
+    reset_rate: float = 0.005,
+    outages: Optional[List[Tuple[int, int]]] = None
+) -> Iterator[List[Tuple[int, int, float]]]:
+    """Erzeugt die Zeilen (entity_ref, ts, value) tageweise
+
+    gap_rate ist die Wahrscheinlichkeit je Tag für einen Ausfall der
+    Erfassung (10 Minuten bis 6 Stunden, die Zähler laufen weiter),
+    reset_rate die Wahrscheinlichkeit je Tag und Zähler, dass er um
+    Mitternacht auf 0 zurückgesetzt wird. Die Ausfälle werden an
+    outages angehängt, falls angegeben.
+    """
+    rng = random.Random(seed)
+    model = Household(rng)
+    counters = {key: rng.uniform(100, 5000) for key in refs}
+    start_ms = to_epoch_ms(start)
+    end_ms = to_epoch_ms(end)
+    step_ms = step_s * 1000
+
+    day = start.date()
+    while True:
+        day_start = to_epoch_ms(datetime.combine(day, day_time()))
+        day_end = to_epoch_ms(datetime.combine(day + timedelta(days=1), day_time()))
+        if day_start >= end_ms:
+            break
+        model.start_day(day)
+        if mode == MODE_ENERGY:
+            for key in counters:
+                if rng.random() < reset_rate:
+                    counters[key] = 0.0
+        gap = None
+        if rng.random() < gap_rate:
+            gap_start = day_start + int(rng.uniform(0, DAY_MS))
+            gap = (gap_start, gap_start + int(rng.uniform(600, 6 * 3600)) * 1000)
+            if outages is not None:
+                outages.append(gap)
+
+        rows = []
+        # Zeitraster ab Mitternacht, damit Folgetage lückenlos anschließen
+        ts = day_start
+        while ts < day_end:
+            values = model.step((ts - day_start) / 3600000, step_s)
+            if start_ms <= ts < end_ms and not (gap and gap[0] <= ts < gap[1]):
+                for key, ref in refs.items():
+                    value = values[key]
+                    if key == "battery_soc":
+                        rows.append((ref, ts, round(value, 1)))
+                    elif mode == MODE_ENERGY:
+                        rows.append((ref, ts, round(counters[key] + value * step_s / 3600000, 3)))
+                    else:
+                        rows.append((ref, ts, round(value, 1)))
+            if mode == MODE_ENERGY:
+                for key in counters:
+                    counters[key] += values[key] * step_s / 3600000
+            ts += step_ms
+        yield rows
+        day += timedelta(days=1)
+
+
+def generate(
+    manager: SensorManager,
+    start: datetime,
+    end: datetime,
+    step_s: int = 30,
+    mode: str = MODE_ENERGY,
+    seed: int = 1,
+    gap_rate: float = 0.02,
+    reset_rate: float = 0.005,
+    entity_ids: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
+    """Schreibt den Datensatz in die Datenbank des SensorManager
+
+    entity_ids ordnet Sensor-Keys Entity-IDs zu (Standard:
+    sensor.synthetic_<key>); die Zuordnung wird als Sensor-Konfiguration
+    gespeichert. Gibt Zeilenzahl und Dauer der Schritte zurück.
+    """
+    db = manager.db
+    entity_ids = entity_ids or {key: f"sensor.synthetic_{key}" for key in SENSOR_KEYS}
+    refs = {
+        key: manager.get_entity_ref(entity_id, *sensor_meta(key, mode))
+        for key, entity_id in entity_ids.items()
+    }
+    manager.save_configs([
+        {"sensor_key": key, "entity_id": entity_id} for key, entity_id in entity_ids.items()
+    ])
+    fresh = db.fetch_one("SELECT 1 FROM entity_values LIMIT 1") is None
+
+    trigger = db.fetch_one(
+        "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (ROLLUP_TRIGGER,)
+    )
+    if trigger is not None:
+        db.execute(f"DROP TRIGGER {ROLLUP_TRIGGER}")
+
+    stats = {"rows": 0}
+    started = time.perf_counter()
+    rollups_done = False
+    try:
+        batch: List[Tuple[int, int, float]] = []
+        outages: List[Tuple[int, int]] = []
+        for rows in generate_rows(refs, start, end, step_s, mode, seed, gap_rate, reset_rate, outages):
+            batch.extend(rows)
+            if len(batch) >= BATCH_ROWS:
+                db.execute_many(INSERT_ENTITY_VALUE, batch)
+                stats["rows"] += len(batch)
+                batch = []
+        db.execute_many(INSERT_ENTITY_VALUE, batch)
+        stats["rows"] += len(batch)
+        # Ausfälle wie der Collector vermerken, damit sie nicht gehalten werden
+        for gap_start, gap_end in outages:
+            manager.record_outage(gap_start, gap_end, "synthetic")
+        stats["insert_s"] = round(time.perf_counter() - started, 1)
+
+        started = time.perf_counter()
+        rebuild_rollups(db, list(refs.values()), to_epoch_ms(start), to_epoch_ms(end))
+        stats["rollups_s"] = round(time.perf_counter() - started, 1)
+        rollups_done = True
+    finally:
+        if trigger is not None:
+            db.execute(trigger["sql"])
+        if not rollups_done:
+            # Abgebrochen: die Wartung rechnet die Rollups beim nächsten Start nach
+            db.set_meta("rollup_backfill", {})
+        elif fresh:
+            # Alle Werte stammen vom Generator, das Nachrechnen aus Migration 004 entfällt
+            db.execute("DELETE FROM app_meta WHERE key = ?", ("rollup_backfill",))
+    return stats
+
+
+def rebuild_rollups(db: database.Database, refs: List[int], start_ms: int, end_ms: int):
+    """Berechnet die Rollups aller Auflösungen für ganze Tage im Bereich neu"""
+    start = start_ms - start_ms % DAY_MS
+    end = end_ms - end_ms % DAY_MS + DAY_MS
+    for ref in refs:
+        with db.get_connection() as conn:
+            for resolution in ROLLUP_RESOLUTIONS.values():
+                conn.execute(REBUILD_ROLLUPS, {
+                    "bucket_ms": resolution * 1000,
+                    "resolution": resolution,
+                    "ref": ref,
+                    "start": start,
+                    "end": end,
+                })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", required=True, help="Datenbank-Datei (wird angelegt oder ergänzt)")
+    parser.add_argument("--years", type=float, default=3, help="Zeitraum bis jetzt in Jahren")
+    parser.add_argument("--step-s", type=int, default=30, help="Abstand der Messwerte in Sekunden")
+    parser.add_argument("--mode", choices=[MODE_ENERGY, MODE_POWER], default=MODE_ENERGY,
+                        help="Zählerstände (kWh) oder Leistungswerte (W)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--gap-rate", type=float, default=0.02, help="Erfassungslücken pro Tag (Wahrscheinlichkeit)")
+    parser.add_argument("--reset-rate", type=float, default=0.005, help="Zählerresets pro Tag und Zähler")
+    parser.add_argument("--json", help="Ergebnisse zusätzlich als JSON schreiben")
+    args = parser.parse_args()
+
+    end = datetime.now().replace(microsecond=0)
+    start = end - timedelta(days=args.years * 365)
+    database._db_instance = database.Database(args.out, **BULK_PRAGMAS)
+    try:
+        stats = generate(
+            SensorManager(), start, end, args.step_s, args.mode,
+            args.seed, args.gap_rate, args.reset_rate
+        )
+    finally:
+        database._db_instance.close()
+
+    rows = [{"rows": stats["rows"], "insert_s": stats["insert_s"], "rollups_s": stats["rollups_s"],
+             "rows_per_s": round(stats["rows"] / max(stats["insert_s"] + stats["rollups_s"], 0.001))}]
+    print_table(rows, ["rows", "insert_s", "rollups_s", "rows_per_s"])
+    write_json({"benchmark": "dataset", "params": vars(args), "results": rows}, args.json)
+
+
+if __name__ == "__main__":
+    main()
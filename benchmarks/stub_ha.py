@@ -0,0 +1,185 @@
+"""Lokaler Home Assistant Stub-Server für Benchmarks
+
+Simuliert die REST-Endpunkte, die HAminiEMS verwendet, mit einer
+konfigurierbaren Anzahl Entities und einer künstlichen Latenz pro Anfrage.
+"""
+
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+from urllib.parse import parse_qs, urlparse
+
+
+def make_entity(index: int, now: str) -> Dict[str, Any]:
+    """Erzeugt eine synthetische Sensor-Entity"""
+    return {
+        "entity_id": f"sensor.bench_{index}",
+        "state": f"{(index * 37) % 5000 + 0.5:.1f}",
+        "attributes": {
+            "state_class": "measurement" if index % 3 else "total_increasing",
+            "unit_of_measurement": "W" if index % 3 else "kWh",
+            "device_class": "power" if index % 3 else "energy",
+            "friendly_name": f"Bench Sensor {index}",
+        },
+        "last_changed": now,
+        "last_updated": now,
+        "context": {"id": f"ctx{index:020d}", "parent_id": None, "user_id": None},
+    }
+
+
+class StubHAServer:
+    """Threaded HTTP-Server, der die Home Assistant REST API nachbildet"""
+
+    def __init__(self, entity_count: int = 500, latency_ms: float = 5.0, port: int = 0):
+        self.entity_count = entity_count
+        self.latency = latency_ms / 1000
+        self.history_step = 30
+        self.request_count = 0
+        self._lock = threading.Lock()
+
+        now = datetime.now(timezone.utc).isoformat()
+        self.entities = [make_entity(i, now) for i in range(entity_count)]
+        self.by_id = {entity["entity_id"]: entity for entity in self.entities}
+        self._states_body = json.dumps(self.entities).encode()
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def entity_ids(self, count: int) -> List[str]:
+        """Gibt die ersten `count` Entity-IDs zurück"""
+        return [entity["entity_id"] for entity in self.entities[:count]]
+
+    def history(
+        self,
+        entity_id: str,
+        start: datetime,
+        end: datetime,
+        step_s: int = 30,
+        minimal: bool = False,
+        attributes: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Erzeugt synthetische History-Punkte für eine Entity
+
+        Wie Home Assistant: mit minimal=True enthält nur der erste Eintrag
+        alle Felder, die übrigen nur state und last_changed.
+        """
+        template = self.by_id.get(entity_id, {})
+        points = []
+        ts = start
+        value = 0.0
+        while ts < end:
+            value += 0.01
+            changed = ts.isoformat()
+            if minimal and points:
+                points.append({"state": f"{value:.3f}", "last_changed": changed})
+            else:
+                point = {
+                    "entity_id": entity_id,
+                    "state": f"{value:.3f}",
+                    "last_changed": changed,
+                    "last_updated": changed,
+                }
+                if attributes:
+                    point["attributes"] = template.get("attributes", {})
+                points.append(point)
+            ts += timedelta(seconds=step_s)
+        return points
+
+    def start(self) -> "StubHAServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "StubHAServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: bytes):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.request_count += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+                parsed = urlparse(self.path)
+                path = parsed.path
+
+                if path == "/api/":
+                    self._send(200, b'{"message": "API running."}')
+                elif path == "/api/states":
+                    self._send(200, stub._states_body)
+                elif path.startswith("/api/states/"):
+                    entity = stub.by_id.get(path[len("/api/states/"):])
+                    if entity is None:
+                        self._send(404, b'{"message": "Entity not found."}')
+                    else:
+                        self._send(200, json.dumps(entity).encode())
+                elif path.startswith("/api/history/period/"):
+                    query = parse_qs(parsed.query, keep_blank_values=True)
+                    start = datetime.fromisoformat(path[len("/api/history/period/"):])
+                    end_param = query.get("end_time", [None])[0]
+                    end = datetime.fromisoformat(end_param) if end_param else start + timedelta(days=1)
+                    entity_ids = query.get("filter_entity_id", [""])[0].split(",")
+                    body = [
+                        stub.history(
+                            entity_id,
+                            start,
+                            end,
+                            step_s=stub.history_step,
+                            minimal="minimal_response" in query,
+                            attributes="no_attributes" not in query,
+                        )
+                        for entity_id in entity_ids if entity_id
+                    ]
+                    self._send(200, json.dumps(body).encode())
+                else:
+                    self._send(404, b'{"message": "Not found."}')
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Home Assistant Stub-Server")
+    parser.add_argument("--entities", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=8123)
+    args = parser.parse_args()
+
+    stub = StubHAServer(args.entities, args.latency_ms, args.port)
+    print(f"Stub-Server läuft auf {stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.server.server_close()
@@ -0,0 +1,273 @@
+"""Inkrementell gepflegte Energiebilanz für HAminiEMS"""
+
+import logging
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Optional
+
+from .const import (
+    BALANCE_CHECKPOINT_INTERVAL,
+    COUNTER_RESET_RATIO,
+    ENERGY_UNIT_FACTORS,
+    INTEGRATION_MAX_GAP,
+    POWER_UNIT_FACTORS,
+)
+
+logger = logging.getLogger("haminiems.balance")
+
+# Sensor-Keys je Summe der Bilanz
+PRODUCTION_KEYS = ("pv_production",)
+SOURCE_KEYS = ("pv_production", "grid_import", "battery_discharge")
+CONSUMPTION_KEYS = (
+    "house_consumption",
+    "ev_charging",
+    "heat_pump",
+    "other_consumption",
+    "battery_charge",
+)
+TOTAL_KEYS = {
+    "production": PRODUCTION_KEYS,
+    "available": SOURCE_KEYS,
+    "consumption": CONSUMPTION_KEYS,
+}
+
+
+def compute_totals(amounts: Dict[str, float]) -> Dict[str, float]:
+    """Berechnet die Summen der Bilanz aus Werten pro Sensor-Key"""
+    return {
+        total: sum(amounts.get(key, 0.0) for key in keys)
+        for total, keys in TOTAL_KEYS.items()
+    }
+
+
+def build_balance(
+    amounts: Dict[str, float],
+    totals: Optional[Dict[str, float]] = None
+) -> Dict[str, Any]:
+    """Berechnet die Bilanz aus Werten pro Sensor-Key (Leistung oder Energie)"""
+    if totals is None:
+        totals = compute_totals(amounts)
+    grid_import = amounts.get("grid_import", 0.0)
+    battery_discharge = amounts.get("battery_discharge", 0.0)
+    battery_charge = amounts.get("battery_charge", 0.0)
+    total_production = totals["production"]
+    total_consumption = totals["consumption"]
+
+    self_consumption = min(total_production, total_consumption - grid_import - battery_discharge)
+    self_consumption_rate = (
+        (self_consumption / total_production * 100)
+        if total_production > 0 else 0
+    )
+
+    return {
+        "production": {
+            "pv": amounts.get("pv_production", 0.0),
+            "total": total_production,
+        },
+        "consumption": {
+            "house": amounts.get("house_consumption", 0.0),
+            "ev": amounts.get("ev_charging", 0.0),
+            "heat_pump": amounts.get("heat_pump", 0.0),
+            "other": amounts.get("other_consumption", 0.0),
+            "battery_charge": battery_charge,
+            "total": total_consumption,
+        },
+        "grid": {
+            "import": grid_import,
+            "export": amounts.get("grid_export", 0.0),
+        },
+        "battery": {
+            "charge": battery_charge,
+            "discharge": battery_discharge,
+            "soc": None,
+        },
+        "balance": {
+            "self_consumption": self_consumption,
+            "self_consumption_rate": self_consumption_rate,
+            "total_available": totals["available"],
+        },
+    }
+
+
+class BalanceModel:
+    """Hält die aktuelle Energiebilanz und die Tagesenergie im Speicher
+
+    update_values() passt nur die Summen der geänderten Sensoren an, die
+    Bilanz wird erst beim nächsten Lesen (einmal pro Änderung) neu
+    aufgebaut. Zusätzlich wird pro Sensor die Energie des laufenden Tages
+    fortgeschrieben: Zählerstände (Wh, kWh, MWh) über ihre Differenzen,
+    Leistungswerte (W, kW, MW) als gehaltener Wert bis zur nächsten
+    Erfassung. Die Tageswerte werden regelmäßig in app_meta gesichert und
+    nach einem Neustart wiederhergestellt.
+    """
+
+    META_KEY = "balance_today"
+
+    def __init__(
+        self,
+        db=None,
+        checkpoint_interval: float = BALANCE_CHECKPOINT_INTERVAL,
+        max_gap_s: float = INTEGRATION_MAX_GAP,
+        clock: Callable[[], float] = time.time
+    ):
+        self.db = db
+        self.checkpoint_interval = checkpoint_interval
+        self.max_gap_s = max_gap_s
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._values: Dict[str, Dict[str, Any]] = {}
+        self._amounts: Dict[str, float] = {}
+        self._totals = {total: 0.0 for total in TOTAL_KEYS}
+        self._updated: Optional[float] = None
+        self._snapshot: Optional[Dict[str, Any]] = None
+
+        self._day: Optional[str] = None
+        self._energy: Dict[str, float] = {}
+        self._last: Dict[str, Dict[str, Any]] = {}
+        self._last_checkpoint = 0.0
+        self.updates = 0
+        self.rebuilds = 0
+
+        self._restore()
+
+    @property
+    def has_values(self) -> bool:
+        """Prüft ob bereits Werte übernommen wurden"""
+        return self._updated is not None
+
+    def update_values(self, values: Dict[str, Any]):
+        """Übernimmt die aktuellen Werte aller Sensoren (sensor_key -> Wert-Dict)"""
+        now = self.clock()
+        with self._lock:
+            self._roll_day(now)
+            for sensor_key in set(self._amounts) | set(values):
+                entry = values.get(sensor_key)
+                if entry is not None:
+                    self._accumulate(sensor_key, entry, now)
+                self._apply(sensor_key, entry)
+            self._values = values
+            self._updated = now
+            self._snapshot = None
+            self.updates += 1
+
+        # Während eines VACUUM nicht auf die Datenbank warten, später nachholen
+        vacuum_running = self.db is not None and self.db.vacuum_running.is_set()
+        if now - self._last_checkpoint >= self.checkpoint_interval and not vacuum_running:
+            self.checkpoint()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Gibt die aktuelle Bilanz zurück (nicht verändern, wird wiederverwendet)"""
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = self._build()
+                self.rebuilds += 1
+            return self._snapshot
+
+    def today(self) -> Dict[str, Any]:
+        """Gibt die bisher erfasste Energie des laufenden Tages (kWh) zurück"""
+        with self._lock:
+            return {"date": self._day, "energy": dict(self._energy)}
+
+    def checkpoint(self):
+        """Sichert die Tageswerte in app_meta"""
+        self._last_checkpoint = self.clock()
+        if self.db is None:
+            return
+        with self._lock:
+            state = {
+                "date": self._day,
+                "energy": dict(self._energy),
+                "last": {key: dict(last) for key, last in self._last.items()},
+            }
+        try:
+            self.db.set_meta(self.META_KEY, state)
+        except Exception as e:
+            logger.warning(f"Tageswerte der Bilanz konnten nicht gesichert werden: {e}")
+
+    def _restore(self):
+        """Stellt die Tageswerte nach einem Neustart wieder her"""
+        self._day = date.fromtimestamp(self.clock()).isoformat()
+        if self.db is None:
+            return
+        state = self.db.get_meta(self.META_KEY)
+        if not state or state.get("date") != self._day:
+            return
+        self._energy = {key: float(value) for key, value in state.get("energy", {}).items()}
+        self._last = state.get("last", {})
+        logger.info(f"Tageswerte der Bilanz wiederhergestellt ({len(self._energy)} Sensoren)")
+
+    def _roll_day(self, now: float):
+        """Beginnt um Mitternacht neue Tageswerte"""
+        today = date.fromtimestamp(now).isoformat()
+        if today == self._day:
+            return
+        self._day = today
+        self._energy = {}
+        # Summen einmal täglich neu bilden (Rundungsfehler der Deltas)
+        self._totals = compute_totals(self._amounts)
+        # Zählerstände bleiben Bezugswert, Leistung beginnt um Mitternacht neu
+        self._last = {
+            key: last for key, last in self._last.items() if last.get("kind") == "counter"
+        }
+
+    def _apply(self, sensor_key: str, entry: Optional[Dict[str, Any]]):
+        """Passt die Summen an, in denen der Sensor vorkommt"""
+        new = entry["value"] if entry is not None else 0.0
+        old = self._amounts.get(sensor_key, 0.0)
+        if entry is None:
+            self._amounts.pop(sensor_key, None)
+        else:
+            self._amounts[sensor_key] = new
+        if new == old:
+            return
+        delta = new - old
+        for total, keys in TOTAL_KEYS.items():
+            if sensor_key in keys:
+                self._totals[total] += delta
+
+    def _accumulate(self, sensor_key: str, entry: Dict[str, Any], now: float):
+        """Schreibt die Tagesenergie eines Sensors fort"""
+        unit = entry.get("unit")
+        value = entry["value"]
+        if unit in ENERGY_UNIT_FACTORS:
+            kind, factor = "counter", ENERGY_UNIT_FACTORS[unit]
+        elif unit in POWER_UNIT_FACTORS:
+            kind, factor = "power", POWER_UNIT_FACTORS[unit]
+        else:
+            return
+
+        last = self._last.get(sensor_key)
+        self._last[sensor_key] = {"kind": kind, "ts": now, "value": value, "factor": factor}
+        if last is None or last.get("kind") != kind:
+            self._energy.setdefault(sensor_key, 0.0)
+            return
+
+        if kind == "counter":
+            previous = last["value"]
+            if value >= previous:
+                delta = value - previous
+            elif value < previous * COUNTER_RESET_RATIO:
+                delta = value
+            else:
+                delta = 0.0
+            energy = delta * factor
+        else:
+            elapsed = now - last["ts"]
+            if elapsed <= 0 or elapsed > self.max_gap_s:
+                energy = 0.0
+            else:
+                energy = last["value"] * last["factor"] * elapsed / 3600.0
+        self._energy[sensor_key] = self._energy.get(sensor_key, 0.0) + energy
+
+    def _build(self) -> Dict[str, Any]:
+        """Baut die Bilanz aus den gepflegten Summen auf"""
+        balance = build_balance(self._amounts, self._totals)
+        balance["battery"]["soc"] = self._values.get("battery_soc", {}).get("value")
+        balance["today"] = {"date": self._day, "energy": dict(self._energy), "unit": "kWh"}
+        balance["timestamp"] = (
+            datetime.fromtimestamp(self._updated).isoformat()
+            if self._updated else datetime.now().isoformat()
+        )
+        return balance
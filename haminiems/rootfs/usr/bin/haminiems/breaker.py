@@ -0,0 +1,149 @@
+"""Circuit Breaker für Anfragen an Home Assistant"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from .const import (
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_TIMEOUT,
+    BREAKER_RESET_TIMEOUT_MAX,
+)
+
+logger = logging.getLogger("haminiems.breaker")
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Schützt vor Wartezeiten, solange Home Assistant nicht erreichbar ist
+
+    Nach `failure_threshold` Fehlern in Folge wird der Breaker geöffnet:
+    Anfragen werden sofort abgelehnt statt bis zum Timeout zu warten. Nach
+    `reset_timeout` Sekunden wird genau eine Probe-Anfrage durchgelassen
+    (half_open). Gelingt sie, wird der Breaker geschlossen, sonst bleibt er
+    offen und die Wartezeit verdoppelt sich bis `reset_timeout_max`.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = BREAKER_RESET_TIMEOUT,
+        reset_timeout_max: float = BREAKER_RESET_TIMEOUT_MAX,
+        clock: Callable[[], float] = time.monotonic,
+        name: str = "home_assistant"
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.reset_timeout_max = max(reset_timeout, reset_timeout_max)
+        self.clock = clock
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._timeout = reset_timeout
+        self._probe_running = False
+        self.rejected = 0
+        self.trips = 0
+        self.last_failure: Optional[float] = None
+        self.last_success: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    @property
+    def closed(self) -> bool:
+        return self.state == STATE_CLOSED
+
+    @property
+    def healthy(self) -> bool:
+        """Geschlossen und letzte Anfrage erfolgreich"""
+        with self._lock:
+            return self._current_state() == STATE_CLOSED and self._failures == 0
+
+    def allow(self) -> bool:
+        """Prüft ob eine Anfrage ausgeführt werden darf
+
+        Im Zustand half_open wird nur eine Probe gleichzeitig zugelassen.
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == STATE_CLOSED:
+                return True
+            if state == STATE_HALF_OPEN and not self._probe_running:
+                self._probe_running = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        """Meldet eine erfolgreiche Anfrage (Home Assistant hat geantwortet)"""
+        with self._lock:
+            self.last_success = self.clock()
+            self._failures = 0
+            self._probe_running = False
+            if self._state != STATE_CLOSED:
+                logger.info("Home Assistant wieder erreichbar, Circuit Breaker geschlossen")
+            self._state = STATE_CLOSED
+            self._opened_at = None
+            self._timeout = self.reset_timeout
+
+    def record_failure(self):
+        """Meldet eine fehlgeschlagene Anfrage (Timeout, Verbindungs- oder Serverfehler)"""
+        with self._lock:
+            now = self.clock()
+            self.last_failure = now
+            self._failures += 1
+            state = self._current_state()
+            if state == STATE_HALF_OPEN:
+                # Probe fehlgeschlagen: länger warten
+                self._probe_running = False
+                self._timeout = min(self._timeout * 2, self.reset_timeout_max)
+                self._open(now)
+            elif state == STATE_CLOSED and self._failures >= self.failure_threshold:
+                self.trips += 1
+                self._open(now)
+                logger.warning(
+                    f"Home Assistant nicht erreichbar ({self._failures} Fehler in Folge), "
+                    f"Anfragen werden für {self._timeout:.0f}s sofort abgelehnt"
+                )
+
+    def stats(self) -> Dict[str, Any]:
+        """Gibt den Zustand des Breakers zurück"""
+        with self._lock:
+            now = self.clock()
+            state = self._current_state()
+            return {
+                "name": self.name,
+                "state": state,
+                "failures": self._failures,
+                "trips": self.trips,
+                "rejected": self.rejected,
+                "retry_in": (
+                    round(max(0.0, self._opened_at + self._timeout - now), 1)
+                    if state == STATE_OPEN else None
+                ),
+                "last_success_age": (
+                    round(now - self.last_success, 1)
+                    if self.last_success is not None else None
+                ),
+            }
+
+    def _open(self, now: float):
+        """Öffnet den Breaker (Lock muss gehalten werden)"""
+        self._state = STATE_OPEN
+        self._opened_at = now
+
+    def _current_state(self) -> str:
+        """Zustand unter Berücksichtigung der Wartezeit (Lock muss gehalten werden)"""
+        if self._state == STATE_OPEN and self.clock() - self._opened_at >= self._timeout:
+            self._state = STATE_HALF_OPEN
+            self._probe_running = False
+        return self._state
@@ -0,0 +1,190 @@
+"""Thread-sicherer TTL-Cache für HAminiEMS"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger("haminiems.cache")
+
+# Marker für "nicht im Cache" (None ist ein gültiger Wert)
+MISSING = object()
+
+
+class _Flight:
+    """Ein laufender Ladevorgang, auf den weitere Aufrufer warten"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class TTLCache:
+    """TTL-Cache mit LRU-Verdrängung und Single-Flight beim Nachladen
+
+    Gleichzeitige Misses auf denselben Key lösen nur einen Ladevorgang aus,
+    alle anderen Aufrufer warten auf dessen Ergebnis. Abgelaufene Einträge
+    bleiben bis zur Verdrängung erhalten und sind über get_stale() lesbar,
+    auch bei ttl = 0 (Cache deaktiviert, nur zuletzt bekannte Werte).
+    """
+
+    def __init__(self, ttl: float, max_size: int = 1024, name: str = "cache"):
+        self.ttl = ttl
+        self.max_size = max(1, max_size)
+        self.name = name
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.loads = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _lookup(self, key: Hashable) -> Any:
+        """Sucht einen gültigen Eintrag (Lock muss gehalten werden)"""
+        entry = self._data.get(key)
+        if entry is None:
+            return MISSING
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            # Bleibt als veralteter Wert für get_stale() erhalten
+            return MISSING
+        self._data.move_to_end(key)
+        return value
+
+    def _store(self, key: Hashable, value: Any):
+        """Speichert einen Eintrag (Lock muss gehalten werden)"""
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Gibt einen Wert aus dem Cache zurück"""
+        if not self.enabled:
+            return default
+        with self._lock:
+            value = self._lookup(key)
+            if value is MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def get_many(self, keys) -> Dict[Hashable, Any]:
+        """Gibt alle gültigen Einträge zu den Keys zurück
+
+        Nur Treffer werden gezählt; fehlende Keys werden typischerweise
+        anschließend gesammelt über get_or_load() nachgeladen und dort als
+        Miss erfasst.
+        """
+        if not self.enabled:
+            return {}
+        found = {}
+        with self._lock:
+            for key in keys:
+                value = self._lookup(key)
+                if value is not MISSING:
+                    found[key] = value
+            self.hits += len(found)
+        return found
+
+    def get_stale(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        """Gibt einen Eintrag auch nach Ablauf der TTL zurück (Wert, Alter in Sekunden)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            return value, max(0.0, time.monotonic() - (expires_at - self.ttl))
+
+    def set(self, key: Hashable, value: Any):
+        """Legt einen Wert im Cache ab (deaktiviert nur für get_stale())"""
+        with self._lock:
+            self._store(key, value)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Gibt einen Wert zurück und lädt ihn bei Bedarf genau einmal nach
+
+        Ergebnisse, die None sind, werden nicht gecacht, damit fehlgeschlagene
+        Abrufe beim nächsten Aufruf erneut versucht werden.
+        """
+        if not self.enabled:
+            # Ohne Wiederverwendung laden, aber als zuletzt bekannten Wert merken
+            value = loader()
+            if value is not None:
+                self.set(key, value)
+            return value
+
+        with self._lock:
+            value = self._lookup(key)
+            if value is not MISSING:
+                self.hits += 1
+                return value
+
+            flight = self._inflight.get(key)
+            if flight is None:
+                self.misses += 1
+                flight = _Flight()
+                self._inflight[key] = flight
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+            with self._lock:
+                self.loads += 1
+                if flight.value is not None:
+                    self._store(key, flight.value)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Entfernt einen Eintrag oder leert den gesamten Cache"""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Gibt Cache-Statistiken zurück"""
+        with self._lock:
+            requests_total = self.hits + self.misses + self.coalesced
+            return {
+                "name": self.name,
+                "ttl": self.ttl,
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "hit_rate": (
+                    round((self.hits + self.coalesced) / requests_total, 4)
+                    if requests_total else 0.0
+                ),
+            }
@@ -1,12 +1,17 @@
 """Berechnungslogik für HAminiEMS"""
 
 import logging
-from typing import Dict, Any, Optional
-from datetime import datetime, timedelta
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple
+from datetime import date as date_type, datetime
 
 from .sensors import SensorManager
 from .ha_client import HAClient
+from .balance import BalanceModel, build_balance
+from .energy_stats import EnergyStatistics, period_days
 from .utils import parse_float
+from .const import DEFAULT_SNAPSHOT_MODE
 
 logger = logging.getLogger("haminiems.calculations")
 
@@ -14,30 +19,120 @@ logger = logging.getLogger("haminiems.calculations")
 class CalculationEngine:
     """Berechnet Energieflüsse und Statistiken"""
     
-    def __init__(self, ha_client: HAClient, sensor_manager: SensorManager):
+    def __init__(
+        self,
+        ha_client: HAClient,
+        sensor_manager: SensorManager,
+        snapshot_mode: str = DEFAULT_SNAPSHOT_MODE
+    ):
         self.ha_client = ha_client
         self.sensor_manager = sensor_manager
+        self.snapshot_mode = snapshot_mode
+        # Zuletzt von der Datenerfassung gelieferte Werte
+        self._current_values: Optional[Dict[str, Any]] = None
+        self._current_values_at: Optional[float] = None
+        self._current_values_lock = threading.Lock()
+        self.energy_statistics = EnergyStatistics(sensor_manager)
+        self.balance = BalanceModel(sensor_manager.db)
     
     def get_current_values(self) -> Dict[str, Any]:
-        """Holt aktuelle Werte aller konfigurierten Sensoren"""
-        configs = self.sensor_manager.get_enabled_sensors()
+        """Gibt die aktuellen Werte aller konfigurierten Sensoren zurück
+
+        Läuft die Datenerfassung, werden die zuletzt erfassten Werte ohne
+        Anfrage an Home Assistant geliefert.
+        """
+        return self.get_current_values_with_status()[0]
+    
+    def get_current_values_with_status(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Gibt die aktuellen Werte und deren Aktualität zurück
+
+        Ist Home Assistant nicht erreichbar und liegen noch keine erfassten
+        Werte vor, werden die zuletzt gespeicherten Werte aus der Datenbank
+        geliefert. Der Status enthält Quelle (home_assistant, database),
+        Zeitpunkt, Alter in Sekunden und ob die Werte veraltet sind.
+        """
+        with self._current_values_lock:
+            if self._current_values is not None:
+                return self._current_values, self._values_status(
+                    "home_assistant", self._current_values_at
+                )
+        values = self.fetch_current_values()
+        if values or self.ha_client.available:
+            return values, self._values_status("home_assistant", time.time())
+        values, updated_at = self.load_last_known_values()
+        return values, self._values_status("database", updated_at)
+    
+    def update_current_values(self, values: Dict[str, Any]):
+        """Übernimmt die von der Datenerfassung gelieferten Werte"""
+        with self._current_values_lock:
+            self._current_values = values
+            self._current_values_at = time.time()
+        self.balance.update_values(values)
+    
+    def load_last_known_values(self) -> Tuple[Dict[str, Any], Optional[float]]:
+        """Liest die zuletzt gespeicherten Werte aller Sensoren aus der Datenbank
+
+        Gibt die Werte und den Zeitpunkt (Epoch) des ältesten Werts zurück.
+        """
+        values = {}
+        oldest: Optional[float] = None
+        for config in self.sensor_manager.get_enabled_sensors():
+            entity_id = config.get("entity_id")
+            if not entity_id:
+                continue
+            row = self.sensor_manager.get_latest_value(entity_id)
+            if row is None:
+                continue
+            timestamp = datetime.fromisoformat(row["timestamp"])
+            oldest = min(oldest, timestamp.timestamp()) if oldest else timestamp.timestamp()
+            values[config["sensor_key"]] = {
+                "value": row["value"],
+                "unit": row["unit"],
+                "state_class": row["state_class"],
+                "entity_id": entity_id,
+                "state": str(row["value"]),
+                "last_updated": row["timestamp"],
+            }
+        return values, oldest
+    
+    def _values_status(self, source: str, updated_at: Optional[float]) -> Dict[str, Any]:
+        """Beschreibt Quelle und Alter der aktuellen Werte"""
+        return {
+            "source": source,
+            "updated_at": (
+                datetime.fromtimestamp(updated_at).isoformat() if updated_at else None
+            ),
+            "age_s": round(time.time() - updated_at, 1) if updated_at else None,
+            "stale": source != "home_assistant" or not self.ha_client.available,
+        }
+    
+    def fetch_current_values(self, use_cache: bool = True) -> Dict[str, Any]:
+        """Holt aktuelle Werte aller konfigurierten Sensoren von Home Assistant"""
+        configs = [
+            config for config in self.sensor_manager.get_enabled_sensors()
+            if config.get("entity_id")
+        ]
+        
+        # Hole alle States in einem Snapshot von Home Assistant
+        states = self.ha_client.get_states_snapshot(
+            [config["entity_id"] for config in configs],
+            mode=self.snapshot_mode,
+            use_cache=use_cache
+        )
         values = {}
         
         for config in configs:
             sensor_key = config.get("sensor_key")
             entity_id = config.get("entity_id")
             
-            if not entity_id:
-                continue
-            
-            # Hole aktuellen State von Home Assistant
-            state = self.ha_client.get_state(entity_id)
+            state = states.get(entity_id)
             if state:
                 value = parse_float(state.get("state"))
                 if value is not None:
                     values[sensor_key] = {
                         "value": value,
                         "unit": state.get("attributes", {}).get("unit_of_measurement"),
+                        "state_class": state.get("attributes", {}).get("state_class"),
                         "entity_id": entity_id,
                         "state": state.get("state"),
                         "last_updated": state.get("last_updated"),
@@ -46,84 +141,77 @@ class CalculationEngine:
         return values
     
     def calculate_energy_balance(self) -> Dict[str, Any]:
-        """Berechnet Energiebilanz"""
-        values = self.get_current_values()
-        
-        # Energiequellen
-        pv_production = values.get("pv_production", {}).get("value", 0.0)
-        grid_import = values.get("grid_import", {}).get("value", 0.0)
-        battery_discharge = values.get("battery_discharge", {}).get("value", 0.0)
-        
-        # Energieverbraucher
-        grid_export = values.get("grid_export", {}).get("value", 0.0)
-        battery_charge = values.get("battery_charge", {}).get("value", 0.0)
-        house_consumption = values.get("house_consumption", {}).get("value", 0.0)
-        ev_charging = values.get("ev_charging", {}).get("value", 0.0)
-        heat_pump = values.get("heat_pump", {}).get("value", 0.0)
-        other_consumption = values.get("other_consumption", {}).get("value", 0.0)
-        
-        # Berechnungen
-        total_production = pv_production
-        total_available = total_production + grid_import + battery_discharge
-        
-        total_consumption = (
-            house_consumption +
-            ev_charging +
-            heat_pump +
-            other_consumption +
-            battery_charge
-        )
-        
-        self_consumption = min(total_production, total_consumption - grid_import - battery_discharge)
-        self_consumption_rate = (
-            (self_consumption / total_production * 100)
-            if total_production > 0 else 0
-        )
-        
-        return {
-            "production": {
-                "pv": pv_production,
-                "total": total_production,
-            },
-            "consumption": {
-                "house": house_consumption,
-                "ev": ev_charging,
-                "heat_pump": heat_pump,
-                "other": other_consumption,
-                "battery_charge": battery_charge,
-                "total": total_consumption,
-            },
-            "grid": {
-                "import": grid_import,
-                "export": grid_export,
-            },
-            "battery": {
-                "charge": battery_charge,
-                "discharge": battery_discharge,
-                "soc": values.get("battery_soc", {}).get("value"),
-            },
-            "balance": {
-                "self_consumption": self_consumption,
-                "self_consumption_rate": self_consumption_rate,
-                "total_available": total_available,
-            },
-            "timestamp": datetime.now().isoformat(),
-        }
+        """Gibt die Energiebilanz zurück
+
+        Läuft die Datenerfassung, wird die dort fortgeschriebene Bilanz ohne
+        Neuberechnung geliefert, sonst werden die Werte vorher abgerufen.
+        """
+        with self._current_values_lock:
+            collected = self._current_values is not None
+        if not collected:
+            self.balance.update_values(self.fetch_current_values())
+        return self.balance.snapshot()
     
     def get_daily_statistics(self, date: Optional[datetime] = None) -> Dict[str, Any]:
-        """Berechnet Tagesstatistiken"""
-        if date is None:
-            date = datetime.now()
-        
-        start_time = date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_time = start_time + timedelta(days=1)
+        """Berechnet Tagesstatistiken aus den gespeicherten Zählerständen"""
+        statistics = self.get_period_statistics("day", date)
+        statistics["date"] = statistics["start"]
+        return statistics
+    
+    def get_period_statistics(
+        self,
+        period: str = "day",
+        date: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """Berechnet Energiemengen (kWh) für einen Tag, eine Woche oder einen Monat
+
+        Woche ist Montag bis Sonntag, Monat der Kalendermonat, jeweils
+        höchstens bis heute. Energiezähler (Wh, kWh, MWh) werden über ihre
+        Differenzen, Leistungssensoren (W, kW, MW) über die Zeit integriert;
+        andere Sensoren werden mit energy=None und einem Hinweis geliefert.
+        """
+        if isinstance(date, datetime):
+            date = date.date()
+        days = period_days(period, date if isinstance(date, date_type) else None)
         
-        # Hier könnten historische Daten aus der DB verwendet werden
-        # Für jetzt verwenden wir aktuelle Werte
-        balance = self.calculate_energy_balance()
+        sensors = {}
+        amounts = {}
+        for config in self.sensor_manager.get_enabled_sensors():
+            sensor_key = config.get("sensor_key")
+            entity_id = config.get("entity_id")
+            if not entity_id:
+                continue
+            
+            daily = self.energy_statistics.get_daily_energy(
+                entity_id, days, config.get("daily_total")
+            )
+            if daily is None:
+                sensors[sensor_key] = {
+                    "entity_id": entity_id,
+                    "energy": None,
+                    "reason": "Keine Energie- oder Leistungs-Einheit (Wh, kWh, MWh, W, kW, MW)",
+                }
+                continue
+            
+            energy = sum(day["energy"] for day in daily.values())
+            gaps = [day["max_gap_s"] for day in daily.values() if day["max_gap_s"] is not None]
+            amounts[sensor_key] = energy
+            sensors[sensor_key] = {
+                "entity_id": entity_id,
+                "energy": energy,
+                "unit": "kWh",
+                "samples": sum(day["samples"] for day in daily.values()),
+                "max_gap_s": max(gaps) if gaps else None,
+                "days": {day: values["energy"] for day, values in daily.items()},
+            }
         
+        balance = build_balance(amounts)
         return {
-            "date": date.date().isoformat(),
+            "period": period,
+            "start": days[0].isoformat(),
+            "end": days[-1].isoformat(),
+            "unit": "kWh",
+            "sensors": sensors,
             "balance": balance,
             "summary": {
                 "total_production": balance["production"]["total"],
@@ -0,0 +1,216 @@
+"""Katalog der Energie-Entities von Home Assistant für HAminiEMS"""
+
+import bisect
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .const import CATALOG_PAGE_SIZE, CATALOG_PAGE_SIZE_MAX, CATALOG_REFRESH_INTERVAL
+from .utils import is_energy_entity
+
+logger = logging.getLogger("haminiems.catalog")
+
+
+def catalog_entry(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduziert einen State auf die Felder, die die Konfiguration braucht"""
+    attributes = state.get("attributes", {})
+    return {
+        "entity_id": state.get("entity_id", ""),
+        "friendly_name": attributes.get("friendly_name"),
+        "state_class": attributes.get("state_class"),
+        "unit": attributes.get("unit_of_measurement"),
+    }
+
+
+def select_entry(state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Katalog-Eintrag für Energie-Entities, None für alle anderen"""
+    return catalog_entry(state) if is_energy_entity(state) else None
+
+
+def entry_domain(entry: Dict[str, Any]) -> str:
+    """Domain einer Entity ("sensor" bei "sensor.pv_power")"""
+    return entry["entity_id"].split(".", 1)[0]
+
+
+# Filter mit eigenem Index (Name -> Wert eines Eintrags)
+INDEXED_FIELDS = {
+    "domain": entry_domain,
+    "unit": lambda entry: entry["unit"],
+    "state_class": lambda entry: entry["state_class"],
+}
+
+
+class EntityCatalog:
+    """Zwischengespeicherte, indizierte Liste der Energie-Entities
+
+    Statt bei jedem Aufruf der Konfiguration alle States von Home Assistant
+    zu laden und zu filtern, wird die Liste einmal aufgebaut und nach
+    `refresh_interval` Sekunden oder nach invalidate() (z.B. bei
+    entity_registry_updated) im Hintergrund erneuert. Bis dahin wird die
+    bisherige Liste geliefert. Die Version (ETag) ändert sich nur, wenn sich
+    Einträge tatsächlich geändert haben.
+    """
+
+    def __init__(self, ha_client, refresh_interval: float = CATALOG_REFRESH_INTERVAL):
+        self.ha_client = ha_client
+        self.refresh_interval = refresh_interval
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._entries: List[Dict[str, Any]] = []
+        self._index: Dict[str, Dict[Any, List[int]]] = {}
+        # (Kleinbuchstaben, Position) sortiert, für die Präfix-Suche
+        self._names: List[Tuple[str, int]] = []
+        self._ids: List[Tuple[str, int]] = []
+        self._etag: Optional[str] = None
+        self._loaded_at: Optional[float] = None
+        self._dirty = False
+        self.refreshes = 0
+        self.changes = 0
+
+    @property
+    def etag(self) -> Optional[str]:
+        """Version des Katalogs (None solange nicht geladen)"""
+        return self._etag
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Gibt alle Einträge zurück (sortiert nach entity_id)"""
+        self._ensure_fresh()
+        return self._entries
+
+    def search(
+        self,
+        domain: Optional[str] = None,
+        unit: Optional[str] = None,
+        state_class: Optional[str] = None,
+        query: Optional[str] = None,
+        offset: int = 0,
+        limit: int = CATALOG_PAGE_SIZE
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """Sucht Einträge und gibt eine Seite sowie die Gesamtanzahl zurück
+
+        domain, unit und state_class müssen exakt passen, query ist ein
+        Präfix von friendly_name oder entity_id (ohne Groß-/Kleinschreibung,
+        entity_id auch ohne Domain).
+        """
+        self._ensure_fresh()
+        with self._lock:
+            entries = self._entries
+            selected: Optional[set] = None
+            for field, value in zip(INDEXED_FIELDS, (domain, unit, state_class)):
+                if value is None:
+                    continue
+                positions = set(self._index[field].get(value, ()))
+                selected = positions if selected is None else selected & positions
+            if query:
+                prefix = query.lower()
+                positions = (
+                    self._prefix_positions(self._names, prefix)
+                    | self._prefix_positions(self._ids, prefix)
+                )
+                selected = positions if selected is None else selected & positions
+
+        if selected is None:
+            matches = entries
+        else:
+            matches = [entries[position] for position in sorted(selected)]
+        offset = max(0, offset)
+        limit = max(1, min(limit, CATALOG_PAGE_SIZE_MAX))
+        return matches[offset:offset + limit], len(matches)
+
+    def invalidate(self, event: Optional[Dict[str, Any]] = None):
+        """Markiert den Katalog als veraltet und erneuert ihn im Hintergrund"""
+        self._dirty = True
+        self._refresh_in_background()
+
+    def refresh(self) -> bool:
+        """Lädt die Entities neu, gibt True zurück wenn sich etwas geändert hat"""
+        with self._refresh_lock:
+            self._dirty = False
+            # Beim Lesen auf die Einträge reduziert, nie alle States im Speicher
+            entries = self.ha_client.select_states(select_entry)
+            if entries is None:
+                # Home Assistant nicht erreichbar: bisherigen Katalog behalten
+                logger.debug("Entity-Katalog nicht aktualisiert (Home Assistant nicht erreichbar)")
+                return False
+
+            entries.sort(key=lambda entry: entry["entity_id"])
+            etag = hashlib.sha1(
+                json.dumps(entries, sort_keys=True, separators=(",", ":")).encode()
+            ).hexdigest()[:16]
+            self.refreshes += 1
+            self._loaded_at = time.monotonic()
+            if etag == self._etag:
+                return False
+
+            index: Dict[str, Dict[Any, List[int]]] = {field: {} for field in INDEXED_FIELDS}
+            for position, entry in enumerate(entries):
+                for field, key in INDEXED_FIELDS.items():
+                    index[field].setdefault(key(entry), []).append(position)
+            names = sorted(
+                ((entry["friendly_name"] or "").lower(), position)
+                for position, entry in enumerate(entries)
+            )
+            # entity_id mit und ohne Domain ("sensor.pv_power", "pv_power")
+            ids = []
+            for position, entry in enumerate(entries):
+                entity_id = entry["entity_id"].lower()
+                ids.append((entity_id, position))
+                ids.append((entity_id.split(".", 1)[-1], position))
+            ids.sort()
+
+            with self._lock:
+                self._entries = entries
+                self._index = index
+                self._names = names
+                self._ids = ids
+                self._etag = etag
+            self.changes += 1
+            logger.info(f"Entity-Katalog aktualisiert: {len(entries)} Energie-Entities")
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Gibt den Status des Katalogs zurück"""
+        return {
+            "entities": len(self._entries),
+            "etag": self._etag,
+            "age_s": (
+                round(time.monotonic() - self._loaded_at, 1)
+                if self._loaded_at is not None else None
+            ),
+            "refreshes": self.refreshes,
+            "changes": self.changes,
+        }
+
+    def _ensure_fresh(self):
+        """Lädt beim ersten Zugriff synchron, danach im Hintergrund"""
+        if self._loaded_at is None:
+            self.refresh()
+        elif self._dirty or time.monotonic() - self._loaded_at >= self.refresh_interval:
+            self._refresh_in_background()
+
+    def _refresh_in_background(self):
+        """Startet eine Aktualisierung, falls nicht bereits eine läuft"""
+        if self._refresh_lock.locked():
+            return
+        threading.Thread(target=self._safe_refresh, name="entity-catalog", daemon=True).start()
+
+    def _safe_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Fehler beim Aktualisieren des Entity-Katalogs: {e}", exc_info=True)
+
+    @staticmethod
+    def _prefix_positions(keys: List[Tuple[str, int]], prefix: str) -> set:
+        """Positionen aller Einträge, deren Schlüssel mit prefix beginnt"""
+        start = bisect.bisect_left(keys, (prefix, -1))
+        positions = set()
+        for key, position in keys[start:]:
+            if not key.startswith(prefix):
+                break
+            positions.add(position)
+        return positions
@@ -0,0 +1,298 @@
+"""Hintergrund-Erfassung der Sensor-Werte für HAminiEMS"""
+
+import logging
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from .calculations import CalculationEngine
+from .const import COLLECTOR_BACKOFF_MAX, COLLECTOR_HEARTBEAT_INTERVAL, DEFAULT_REFRESH_INTERVAL
+from .metrics import COLLECTOR_CYCLE_SECONDS, COLLECTOR_LAG_SECONDS
+from .profiling import PROFILER
+from .sensors import SensorManager
+from .utils import parse_datetime
+
+logger = logging.getLogger("haminiems.collector")
+
+
+class DataCollector:
+    """Erfasst die Werte aller aktivierten Sensoren im festen Takt
+
+    Die Zeitpunkte liegen auf einem festen Raster (kein Drift). Dauert ein
+    Durchlauf länger als das Intervall, werden die verpassten Zeitpunkte
+    übersprungen statt nachgeholt. Ist Home Assistant nicht erreichbar,
+    wird mit exponentiellem Backoff und Jitter erneut versucht.
+
+    Zeiträume ohne Erfassung (Add-On gestoppt, Home Assistant nicht
+    erreichbar) werden in collector_outages gespeichert; dafür wird die
+    letzte erfolgreiche Erfassung regelmäßig in app_meta gesichert.
+    """
+
+    def __init__(
+        self,
+        calculation_engine: CalculationEngine,
+        sensor_manager: SensorManager,
+        interval: float = DEFAULT_REFRESH_INTERVAL,
+        backoff_max: float = COLLECTOR_BACKOFF_MAX,
+        heartbeat_interval: float = COLLECTOR_HEARTBEAT_INTERVAL
+    ):
+        self.calculation_engine = calculation_engine
+        self.sensor_manager = sensor_manager
+        self.interval = max(1.0, float(interval))
+        self.backoff_max = max(self.interval, backoff_max)
+        self.heartbeat_interval = heartbeat_interval
+
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._listeners: List[Callable[[Dict[str, Any], bool], None]] = []
+        self._values: Dict[str, Any] = {}
+
+        self.runs = 0
+        self.skipped = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_run: Optional[datetime] = None
+        self.last_duration: Optional[float] = None
+        self.last_lag: Optional[float] = None
+        self.last_result: Dict[str, int] = {}
+        self._next_run: Optional[float] = None
+        self.outages = 0
+        self._last_success_ms: Optional[int] = None
+        self._outage_start: Optional[int] = None
+        self._outage_reason = "stopped"
+        self._heartbeat_written = 0.0
+
+    def start(self):
+        """Startet den Hintergrund-Thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        try:
+            # Seit der letzten gesicherten Erfassung lief keine Erfassung
+            self._outage_start = self.sensor_manager.get_heartbeat()
+            self._outage_reason = "stopped"
+        except Exception as e:
+            logger.warning(f"Letzte Erfassung konnte nicht gelesen werden: {e}")
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, name="collector", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Datenerfassung gestartet (Intervall: {self.interval:.0f}s)")
+
+    def stop(self, timeout: float = 10.0):
+        """Stoppt den Hintergrund-Thread"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self._write_heartbeat()
+        logger.info("Datenerfassung gestoppt")
+
+    def add_listener(self, callback: Callable[[Dict[str, Any], bool], None]):
+        """Registriert eine Funktion, die nach jedem Durchlauf aufgerufen wird
+
+        Sie erhält die aktuellen Werte und ob Home Assistant erreichbar war.
+        """
+        self._listeners.append(callback)
+
+    def trigger(self):
+        """Löst einen zusätzlichen Durchlauf außerhalb des Rasters aus"""
+        self._wake.set()
+
+    def run_once(self) -> Optional[Dict[str, int]]:
+        """Führt einen Erfassungsdurchlauf aus
+
+        Gibt None zurück, wenn bereits ein Durchlauf läuft.
+        """
+        if not self._run_lock.acquire(blocking=False):
+            self.skipped += 1
+            logger.debug("Erfassung läuft bereits, Durchlauf übersprungen")
+            return None
+
+        profile = PROFILER.start() if PROFILER.enabled else None
+        started = time.monotonic()
+        try:
+            result = self._collect()
+        finally:
+            self.last_duration = time.monotonic() - started
+            COLLECTOR_CYCLE_SECONDS.observe(self.last_duration)
+            if profile is not None:
+                PROFILER.finish(profile, "collector", "cycle")
+            self.last_run = datetime.now()
+            self.runs += 1
+            self._run_lock.release()
+
+        self.last_result = result
+        if result["configured"] and not result["fetched"]:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self._track_availability(False)
+        else:
+            self.consecutive_failures = 0
+            self._track_availability(True)
+        self._notify()
+        return result
+
+    def _notify(self):
+        """Meldet den neuen Stand an alle Listener"""
+        connected = self.consecutive_failures == 0
+        for callback in self._listeners:
+            try:
+                callback(self._values, connected)
+            except Exception as e:
+                logger.error(f"Fehler in Listener der Datenerfassung: {e}", exc_info=True)
+
+    def _collect(self) -> Dict[str, int]:
+        """Holt die aktuellen Werte und speichert sie in der Datenbank"""
+        configured = sum(
+            1 for config in self.sensor_manager.get_enabled_sensors()
+            if config.get("entity_id")
+        )
+        values = self.calculation_engine.fetch_current_values(use_cache=False)
+
+        # Alle Werte eines Durchlaufs in einer Transaktion speichern
+        now = datetime.now()
+        updated = self.sensor_manager.save_entity_values([
+            {
+                "entity_id": value["entity_id"],
+                "value": value["value"],
+                "state_class": value.get("state_class"),
+                "unit": value.get("unit"),
+                "timestamp": parse_datetime(value.get("last_updated")) or now,
+            }
+            for value in values.values()
+        ])
+
+        if values or not configured:
+            self.calculation_engine.update_current_values(values)
+            self._values = values
+
+        return {"configured": configured, "fetched": len(values), "updated": updated}
+
+    def _loop(self):
+        """Scheduler-Schleife auf festem Zeitraster"""
+        base = time.monotonic()
+        self._next_run = base
+
+        while not self._stop.is_set():
+            delay = self._next_run - time.monotonic()
+            if delay > 0:
+                self._wake.wait(delay)
+                if self._stop.is_set():
+                    break
+                if self._wake.is_set():
+                    # Zusätzlicher Durchlauf, Raster bleibt unverändert
+                    self._wake.clear()
+                    self._safe_run()
+                    continue
+
+            self.last_lag = max(0.0, time.monotonic() - self._next_run)
+            COLLECTOR_LAG_SECONDS.observe(self.last_lag)
+            self._safe_run()
+            now = time.monotonic()
+
+            if self.consecutive_failures:
+                # Home Assistant nicht erreichbar: Backoff mit Jitter
+                backoff = min(
+                    self.interval * (2 ** (self.consecutive_failures - 1)),
+                    self.backoff_max
+                )
+                retry_at = now + random.uniform(backoff / 2, backoff)
+                # Danach wieder auf das ursprüngliche Raster einrasten
+                ticks = int((retry_at - base) // self.interval) + 1
+                self._next_run = base + ticks * self.interval
+                logger.warning(
+                    f"Home Assistant nicht erreichbar, nächster Versuch in "
+                    f"{self._next_run - now:.0f}s"
+                )
+                continue
+
+            self._next_run += self.interval
+            if self._next_run <= now:
+                missed = int((now - self._next_run) // self.interval) + 1
+                self._next_run += missed * self.interval
+                self.skipped += missed
+                logger.warning(
+                    f"Erfassung dauerte {self.last_duration:.1f}s, "
+                    f"{missed} Durchlauf/Durchläufe übersprungen"
+                )
+
+    def _safe_run(self):
+        try:
+            self.run_once()
+        except Exception as e:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self._track_availability(False)
+            logger.error(f"Fehler bei der Datenerfassung: {e}", exc_info=True)
+
+    def _track_availability(self, ok: bool):
+        """Speichert beendete Ausfälle und sichert regelmäßig die letzte Erfassung"""
+        now_ms = int(time.time() * 1000)
+        if not ok:
+            if self._outage_start is None:
+                self._outage_start = self._last_success_ms or now_ms
+                self._outage_reason = "ha_unavailable"
+            return
+
+        if self._outage_start is not None:
+            # Einzelne verpasste Durchläufe sind kein Ausfall
+            if now_ms - self._outage_start > 2 * self.interval * 1000:
+                try:
+                    self.sensor_manager.record_outage(
+                        self._outage_start, now_ms, self._outage_reason
+                    )
+                    self.outages += 1
+                    logger.info(
+                        f"Erfassung war {(now_ms - self._outage_start) / 1000:.0f}s "
+                        f"unterbrochen ({self._outage_reason})"
+                    )
+                except Exception as e:
+                    logger.warning(f"Ausfall der Erfassung konnte nicht gespeichert werden: {e}")
+            self._outage_start = None
+
+        self._last_success_ms = now_ms
+        # Während eines VACUUM nicht auf die Datenbank warten, später nachholen
+        if (
+            time.monotonic() - self._heartbeat_written >= self.heartbeat_interval
+            and not self.sensor_manager.db.vacuum_running.is_set()
+        ):
+            self._write_heartbeat()
+
+    def _write_heartbeat(self):
+        """Sichert den Zeitpunkt der letzten erfolgreichen Erfassung"""
+        if self._last_success_ms is None:
+            return
+        try:
+            self.sensor_manager.set_heartbeat(self._last_success_ms)
+        except Exception as e:
+            logger.warning(f"Letzte Erfassung konnte nicht gesichert werden: {e}")
+        self._heartbeat_written = time.monotonic()
+
+    def status(self) -> Dict[str, Any]:
+        """Gibt den Status der Datenerfassung zurück"""
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "interval": self.interval,
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "outages": self.outages,
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+            "last_duration": (
+                round(self.last_duration, 3) if self.last_duration is not None else None
+            ),
+            "last_lag": round(self.last_lag, 3) if self.last_lag is not None else None,
+            "next_run_in": (
+                round(max(0.0, self._next_run - time.monotonic()), 1)
+                if self._next_run is not None else None
+            ),
+            "last_result": self.last_result,
+        }
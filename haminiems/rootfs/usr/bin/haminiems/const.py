@@ -5,7 +5,7 @@ APP_VERSION = "1.0.0"
 
 # DB-Schema-Version (unabhängig von App-Version)
 # Erhöht sich nur bei Schema-Änderungen
-DB_VERSION = 1
+DB_VERSION = 7
 
 # Sensor-Keys (definierte Sensoren im System)
 SENSOR_KEYS = [
@@ -29,8 +29,165 @@ HA_API_HISTORY = "/api/history/period"
 # Datenbank-Pfad
 DB_PATH = "/config/haminiems.db"
 
+# Log-Datei (Logs-Seite) mit Rotation
+LOG_FILE = "/config/haminiems.log"
+LOG_MAX_BYTES = 1024 * 1024        # Größe, ab der die Datei rotiert wird
+LOG_BACKUP_COUNT = 3               # Aufbewahrte rotierte Dateien (.1 bis .3)
+LOG_BLOCK_SIZE = 16 * 1024         # Bytes pro Block beim Lesen vom Dateiende
+LOG_PAGE_SIZE = 100                # Einträge pro Abruf (Standard)
+LOG_PAGE_SIZE_MAX = 1000           # Maximale Einträge pro Abruf
+
+# Datenbank-Tuning (SQLite-Pragmas)
+DB_SYNCHRONOUS = "NORMAL"          # Im WAL-Modus sicher und deutlich schneller als FULL
+DB_CACHE_SIZE = -8000              # Negativ = KiB (hier 8 MiB pro Verbindung)
+DB_MMAP_SIZE = 64 * 1024 * 1024    # Bytes
+DB_TEMP_STORE = "MEMORY"
+DB_READ_POOL_SIZE = 4              # Read-Only-Verbindungen
+DB_BUSY_TIMEOUT = 5000             # Millisekunden
+
+# Hintergrund-Wartung der Datenbank
+MAINTENANCE_PAUSE = 0.05           # Pause zwischen zwei Arbeitsschritten (Sekunden)
+MAINTENANCE_RETRY = 60             # Wartezeit nach einem Fehler (Sekunden)
+LEGACY_IMPORT_CHUNK = 5000         # Zeilen pro Schritt beim Übernehmen der Altdaten
+ROLLUP_BACKFILL_DAYS = 7           # Tage pro Entity und Schritt beim Nachrechnen der Rollups
+
+# Verlauf neu aktivierter Sensoren aus dem Recorder von Home Assistant laden
+HISTORY_BACKFILL_DAYS = 10         # Tage vor dem ersten gespeicherten Wert (Recorder-Standard: 10)
+HISTORY_BACKFILL_WINDOW = 12 * 3600  # Start-Größe eines Abfrage-Fensters (Sekunden)
+HISTORY_BACKFILL_MAX_POINTS = 5000 # Ziel-Werte pro Fenster; die Fenstergröße passt sich an
+HISTORY_BACKFILL_PAUSE = 1.0       # Pause zwischen zwei Anfragen an Home Assistant (Sekunden)
+HISTORY_BACKFILL_INTERVAL = 3600   # Abstand zwischen zwei Prüfungen auf neue Sensoren (Sekunden)
+
+# Aufbewahrung (Tage, 0 = unbegrenzt): Rohwerte und je Rollup-Auflösung
+DEFAULT_RETENTION_DAYS = {
+    "raw": 90,
+    "1m": 180,
+    "15m": 730,
+    "1h": 0,
+    "1d": 0,
+}
+RETENTION_INTERVAL = 3600          # Abstand zwischen zwei Aufräum-Läufen (Sekunden)
+RETENTION_CHUNK = 2000             # Start-Größe eines Lösch-Blocks (Zeilen)
+RETENTION_MAX_CHUNK_SECONDS = 0.05 # Ziel-Dauer eines Lösch-Blocks; die Blockgröße passt sich an
+INCREMENTAL_VACUUM_PAGES = 256     # Seiten pro incremental_vacuum-Schritt
+VACUUM_MIN_FREE_RATIO = 0.2        # Volles VACUUM erst ab diesem Anteil freier Seiten ...
+VACUUM_SMALL_DB_BYTES = 32 * 1024 * 1024  # ... oder solange die Datenbank so klein ist
+DB_SIZE_HISTORY_DAYS = 365         # Tage in der Größen-Historie (app_meta)
+
+DAY_MS = 86400 * 1000
+
+# Tagesstatistiken aus gespeicherten Zählerständen
+ENERGY_UNIT_FACTORS = {            # Umrechnung nach kWh
+    "Wh": 0.001,
+    "kWh": 1.0,
+    "MWh": 1000.0,
+}
+COUNTER_RESET_RATIO = 0.9          # Rückgang unter 90 % des Vorwerts = Zähler-Reset
+STATISTICS_CLOSE_DELAY = 600       # Sekunden nach Mitternacht, bis ein Tag als abgeschlossen gilt
+STATISTICS_INTERVAL = 3600         # Abstand zwischen zwei Materialisierungs-Läufen (Sekunden)
+STATISTICS_CHUNK_DAYS = 31         # Tage pro Entity und Schritt beim Materialisieren
+
+# Integration von Leistungswerten zu Energie
+POWER_UNIT_FACTORS = {             # Umrechnung nach kW
+    "W": 0.001,
+    "kW": 1.0,
+    "MW": 1000.0,
+}
+INTEGRATION_METHOD = "trapezoid"   # "trapezoid" oder "left" (linke Riemann-Summe)
+INTEGRATION_MAX_GAP = 900          # Längere Intervalle (Sekunden) gelten als gehaltener Wert, kürzere Ausfälle werden überbrückt
+
+# Abstand zwischen zwei Sicherungen der Tageswerte der Bilanz (Sekunden)
+BALANCE_CHECKPOINT_INTERVAL = 60
+
+# Web-Server
+SERVERS = ("waitress", "gunicorn", "werkzeug")
+DEFAULT_SERVER = "waitress"
+DEFAULT_SERVER_THREADS = 16        # Jede offene SSE-Verbindung belegt einen Thread
+SERVER_KEEPALIVE = 5               # Sekunden, die eine HTTP-Verbindung offen bleibt (gunicorn)
+SERVER_CHANNEL_TIMEOUT = 120       # Sekunden ohne Aktivität bis zum Schließen (waitress)
+INGRESS_PROXY_ADDRESS = "172.30.32.2"  # Absender aller Ingress-Anfragen (Supervisor)
+# Absender, die Einstellungen zur Laufzeit ändern dürfen (Ingress und lokal im Container)
+TRUSTED_ADDRESSES = (INGRESS_PROXY_ADDRESS, "127.0.0.1", "::1")
+
+# Große JSON-Antworten von Home Assistant blockweise lesen
+JSON_STREAM_CHUNK_SIZE = 64 * 1024 # Bytes pro gelesenem Block
+
+# Bucket-Grenzen der Laufzeit-Histogramme für /metrics (Sekunden)
+METRICS_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+METRICS_SHARD_LIMIT = 64           # Ab so vielen Thread-Zählersätzen werden beendete beim Anlegen übernommen
+
+# Profiling (optional, Ablage im geteilten Verzeichnis /share)
+PROFILE_DIR = "/share/haminiems/profiles"
+PROFILE_SAMPLE_RATE = 0.05         # Anteil der profilierten Anfragen und Durchläufe
+PROFILE_MAX_FILES = 50             # Ältere Profile werden gelöscht
+PROFILE_TOP_FUNCTIONS = 25         # Funktionen in der Hot-Spot-Übersicht
+
+# Server-Sent Events (/api/stream)
+STREAM_KEEPALIVE = 15              # Sekunden ohne Ereignis bis zum Keepalive-Kommentar
+STREAM_QUEUE_SIZE = 100            # Ereignisse pro Client, danach vollständiger Stand
+
+# Auflösungen der verdichteten Messwerte (Name -> Bucket-Größe in Sekunden)
+ROLLUP_RESOLUTIONS = {
+    "1m": 60,
+    "15m": 900,
+    "1h": 3600,
+    "1d": 86400,
+}
+
 # Standard-Refresh-Interval (Sekunden)
 DEFAULT_REFRESH_INTERVAL = 30
 
+# Maximales Alter gepufferter Werte vor dem Schreiben (Sekunden)
+DEFAULT_WRITE_BUFFER_SECONDS = 60
+
+# Maximale Wartezeit der Datenerfassung, wenn HA nicht erreichbar ist (Sekunden)
+COLLECTOR_BACKOFF_MAX = 300
+
+# Abstand zwischen zwei Sicherungen der letzten erfolgreichen Erfassung (Sekunden)
+COLLECTOR_HEARTBEAT_INTERVAL = 60
+
+# Snapshot-Modi für das Abrufen mehrerer States
+SNAPSHOT_MODE_BULK = "bulk"                # Ein einziger /api/states Abruf
+SNAPSHOT_MODE_CONCURRENT = "concurrent"    # Parallele Einzelabrufe
+SNAPSHOT_MODE_SERIAL = "serial"            # Sequenzielle Einzelabrufe
+SNAPSHOT_MODE_ASYNC = "async"              # Parallele Einzelabrufe über aiohttp
+SNAPSHOT_MODES = [
+    SNAPSHOT_MODE_BULK,
+    SNAPSHOT_MODE_CONCURRENT,
+    SNAPSHOT_MODE_SERIAL,
+    SNAPSHOT_MODE_ASYNC,
+]
+DEFAULT_SNAPSHOT_MODE = SNAPSHOT_MODE_BULK
+
+# Maximale Anzahl paralleler Anfragen an Home Assistant
+DEFAULT_MAX_CONCURRENCY = 8
+
+# Timeout einer Anfrage an Home Assistant (Sekunden)
+DEFAULT_HA_REQUEST_TIMEOUT = 10
+
+# Leerlaufzeit, nach der Keep-Alive-Verbindungen geschlossen werden (Sekunden)
+DEFAULT_HA_KEEPALIVE = 30
+
+# Entity-Katalog für die Konfiguration
+CATALOG_REFRESH_INTERVAL = 300     # Sekunden bis zur Aktualisierung im Hintergrund
+CATALOG_PAGE_SIZE = 100            # Einträge pro Seite (Standard)
+CATALOG_PAGE_SIZE_MAX = 1000       # Maximale Einträge pro Seite
+
+# Circuit Breaker für Home Assistant
+BREAKER_FAILURE_THRESHOLD = 3      # Fehler in Folge bis zum Öffnen
+BREAKER_RESET_TIMEOUT = 10         # Sekunden bis zur ersten Probe-Anfrage
+BREAKER_RESET_TIMEOUT_MAX = 120    # Maximale Wartezeit nach fehlgeschlagenen Proben
+
+# Maximale Anzahl Einträge im State-Cache
+DEFAULT_CACHE_SIZE = 1024
+
+# WebSocket-Verbindung (Sekunden)
+WS_BACKOFF_MIN = 1
+WS_BACKOFF_MAX = 60
+WS_PING_INTERVAL = 30
+
 
 
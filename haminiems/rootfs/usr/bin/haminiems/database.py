@@ -1,25 +1,97 @@
 """SQLite-Datenbank-Handler mit Migration-Integration"""
 
+import importlib
+import json
+import queue
+import re
 import sqlite3
 import logging
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Iterable, List, Optional
 from contextlib import contextmanager
 
-from .const import DB_VERSION, DB_PATH
+from .const import (
+    DB_VERSION,
+    DB_PATH,
+    DB_BUSY_TIMEOUT,
+    DB_CACHE_SIZE,
+    DB_MMAP_SIZE,
+    DB_READ_POOL_SIZE,
+    DB_SYNCHRONOUS,
+    DB_TEMP_STORE,
+)
+from .metrics import DB_QUERY_SECONDS
 from .migrations.migration_manager import MigrationManager
 
 logger = logging.getLogger("haminiems.database")
 
+SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+TEMP_STORE_MODES = ("DEFAULT", "FILE", "MEMORY")
+AUTO_VACUUM_MODES = {0: "NONE", 1: "FULL", 2: "INCREMENTAL"}
+
+# Art der Abfrage und erste Tabelle für die Metriken, z.B. "select:entity_values"
+STATEMENT_VERB = re.compile(r"\s*(\w+)")
+STATEMENT_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+(\w+)", re.IGNORECASE)
+STATEMENT_LABELS_MAX = 1024
+_statement_labels: Dict[str, str] = {}
+
+
+def statement_label(query: str) -> str:
+    """Kurzbezeichnung einer SQL-Abfrage für die Metriken (gecacht)"""
+    label = _statement_labels.get(query)
+    if label is None:
+        verb = STATEMENT_VERB.match(query)
+        table = STATEMENT_TABLE.search(query)
+        label = verb.group(1).lower() if verb else "other"
+        if table and label != "pragma":
+            label = f"{label}:{table.group(1)}"
+        # Abfragen mit variabler Anzahl Platzhalter nicht unbegrenzt cachen
+        if len(_statement_labels) < STATEMENT_LABELS_MAX:
+            _statement_labels[query] = label
+    return label
+
 
 class Database:
-    """Datenbank-Handler mit automatischer Migration"""
+    """Datenbank-Handler mit automatischer Migration
+
+    Schreibzugriffe laufen über eine einzige Verbindung (serialisiert per
+    Lock), Lesezugriffe über einen begrenzten Pool von Read-Only-Verbindungen.
+    Im WAL-Modus blockieren sich Leser und Schreiber dadurch nicht.
+    """
     
-    def __init__(self, db_path: str = DB_PATH):
+    def __init__(
+        self,
+        db_path: str = DB_PATH,
+        read_pool_size: int = DB_READ_POOL_SIZE,
+        synchronous: str = DB_SYNCHRONOUS,
+        cache_size: int = DB_CACHE_SIZE,
+        mmap_size: int = DB_MMAP_SIZE,
+        temp_store: str = DB_TEMP_STORE
+    ):
         self.db_path = db_path
+        self.synchronous = str(synchronous).upper()
+        if self.synchronous not in SYNCHRONOUS_MODES:
+            raise ValueError(f"Ungültiger synchronous-Modus: {synchronous}")
+        self.temp_store = str(temp_store).upper()
+        if self.temp_store not in TEMP_STORE_MODES:
+            raise ValueError(f"Ungültiger temp_store-Modus: {temp_store}")
+        self.cache_size = int(cache_size)
+        self.mmap_size = int(mmap_size)
+        
+        # In-Memory-Datenbanken können nicht geteilt werden
+        self.read_pool_size = 0 if db_path == ":memory:" else max(0, read_pool_size)
+        self._read_pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._read_connections = 0
+        self._read_pool_lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        # Gesetzt während eines vollen VACUUM (Schreibzugriffe warten)
+        self.vacuum_running = threading.Event()
+        
         self._ensure_db_directory()
         self._init_database()
         self._run_migrations()
+        self._ensure_rollup_trigger()
     
     def _ensure_db_directory(self):
         """Stellt sicher, dass das DB-Verzeichnis existiert"""
@@ -27,13 +99,62 @@ class Database:
         db_file.parent.mkdir(parents=True, exist_ok=True)
     
     def _init_database(self):
-        """Initialisiert die Datenbank-Verbindung"""
-        self.conn = sqlite3.connect(
-            self.db_path,
-            check_same_thread=False
+        """Initialisiert die Schreib-Verbindung"""
+        self.conn = self._connect()
+        journal_mode = self.conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        logger.info(
+            f"Datenbank verbunden: {self.db_path} "
+            f"(journal_mode={journal_mode}, synchronous={self.synchronous})"
         )
-        self.conn.row_factory = sqlite3.Row
-        logger.info(f"Datenbank verbunden: {self.db_path}")
+    
+    def _connect(self, read_only: bool = False) -> sqlite3.Connection:
+        """Öffnet eine Verbindung und setzt die Pragmas"""
+        if read_only:
+            uri = Path(self.db_path).resolve().as_uri() + "?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {int(DB_BUSY_TIMEOUT)}")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        conn.execute(f"PRAGMA cache_size = {self.cache_size}")
+        conn.execute(f"PRAGMA mmap_size = {self.mmap_size}")
+        conn.execute(f"PRAGMA temp_store = {self.temp_store}")
+        return conn
+    
+    @contextmanager
+    def read_connection(self):
+        """Context Manager für eine Verbindung aus dem Read-Pool"""
+        if self.read_pool_size == 0:
+            with self._write_lock:
+                yield self.conn
+            return
+        
+        try:
+            conn = self._read_pool.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._read_pool_lock:
+                if self._read_connections < self.read_pool_size:
+                    self._read_connections += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    conn = self._connect(read_only=True)
+                except Exception:
+                    with self._read_pool_lock:
+                        self._read_connections -= 1
+                    raise
+            else:
+                # Pool ausgeschöpft: auf freie Verbindung warten
+                conn = self._read_pool.get()
+        
+        try:
+            yield conn
+        finally:
+            self._read_pool.put(conn)
     
     def _run_migrations(self):
         """Führt automatische Migrationen aus"""
@@ -61,40 +182,139 @@ class Database:
             logger.error(f"Fehler bei Migration: {e}", exc_info=True)
             raise
     
+    def _ensure_rollup_trigger(self):
+        """Stellt den Rollup-Trigger (Migration 004) wieder her, falls er fehlt
+
+        Ein abgebrochener Bulk-Import (benchmarks/dataset.py) kann die
+        Datenbank ohne Trigger hinterlassen. Die seitdem gespeicherten Werte
+        rechnet RollupBackfillTask nach.
+        """
+        if not self.table_exists("entity_rollups"):
+            return
+        rollups = importlib.import_module(".migrations.004_entity_rollups", __package__)
+        row = self.fetch_one(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?",
+            (rollups.TRIGGER_NAME,)
+        )
+        if row is not None:
+            return
+        logger.warning("Rollup-Trigger fehlt, wird wiederhergestellt; Rollups werden nachgerechnet")
+        with self._transaction() as conn:
+            rollups.create_trigger(conn)
+            conn.execute(
+                "INSERT OR IGNORE INTO app_meta (key, value) VALUES ('rollup_backfill', '{}')"
+            )
+    
     @contextmanager
     def get_connection(self):
-        """Context Manager für Datenbank-Verbindungen"""
-        try:
-            yield self.conn
-            self.conn.commit()
-        except Exception as e:
-            self.conn.rollback()
-            logger.error(f"Datenbank-Fehler: {e}", exc_info=True)
-            raise
+        """Context Manager für die Schreib-Verbindung (eine Transaktion)"""
+        with DB_QUERY_SECONDS.time("transaction"), self._transaction() as conn:
+            yield conn
+    
+    @contextmanager
+    def _transaction(self):
+        """Transaktion auf der Schreib-Verbindung (ohne Metrik)"""
+        with self._write_lock:
+            try:
+                yield self.conn
+                self.conn.commit()
+            except Exception as e:
+                self.conn.rollback()
+                logger.error(f"Datenbank-Fehler: {e}", exc_info=True)
+                raise
     
     def execute(self, query: str, params: tuple = ()):
         """Führt eine SQL-Query aus"""
-        cursor = self.conn.cursor()
-        cursor.execute(query, params)
-        self.conn.commit()
+        with DB_QUERY_SECONDS.time(statement_label(query)), self._write_lock:
+            cursor = self.conn.cursor()
+            cursor.execute(query, params)
+            self.conn.commit()
+            return cursor
+    
+    def execute_many(self, query: str, params_seq: Iterable[tuple]):
+        """Führt eine SQL-Query für viele Parameter-Sätze in einer Transaktion aus"""
+        with DB_QUERY_SECONDS.time(statement_label(query)), self._transaction() as conn:
+            cursor = conn.executemany(query, params_seq)
         return cursor
     
     def fetch_one(self, query: str, params: tuple = ()):
         """Holt einen einzelnen Datensatz"""
-        cursor = self.conn.cursor()
-        cursor.execute(query, params)
-        return cursor.fetchone()
+        with DB_QUERY_SECONDS.time(statement_label(query)), self.read_connection() as conn:
+            return conn.execute(query, params).fetchone()
     
     def fetch_all(self, query: str, params: tuple = ()):
         """Holt alle Datensätze"""
-        cursor = self.conn.cursor()
-        cursor.execute(query, params)
-        return cursor.fetchall()
+        with DB_QUERY_SECONDS.time(statement_label(query)), self.read_connection() as conn:
+            return conn.execute(query, params).fetchall()
+    
+    def get_meta(self, key: str, default: Any = None) -> Any:
+        """Liest einen JSON-Wert aus der app_meta Tabelle"""
+        row = self.fetch_one("SELECT value FROM app_meta WHERE key = ?", (key,))
+        return json.loads(row["value"]) if row else default
+    
+    def set_meta(self, key: str, value: Any):
+        """Schreibt einen JSON-Wert in die app_meta Tabelle"""
+        self.execute(
+            "INSERT OR REPLACE INTO app_meta (key, value) VALUES (?, ?)",
+            (key, json.dumps(value))
+        )
+    
+    def table_exists(self, name: str) -> bool:
+        """Prüft ob eine Tabelle existiert"""
+        row = self.fetch_one(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (name,)
+        )
+        return row is not None
+    
+    def storage_stats(self) -> Dict[str, Any]:
+        """Gibt Größe und Speicher-Einstellungen der Datenbank zurück"""
+        with self.read_connection() as conn:
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            freelist_count = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        wal_path = Path(f"{self.db_path}-wal")
+        return {
+            "size_bytes": page_size * page_count,
+            "free_bytes": page_size * freelist_count,
+            "wal_bytes": wal_path.stat().st_size if wal_path.exists() else 0,
+            "auto_vacuum": AUTO_VACUUM_MODES.get(auto_vacuum, auto_vacuum),
+        }
+    
+    def vacuum(self):
+        """Baut die Datenbank neu auf (blockiert Schreibzugriffe währenddessen)"""
+        self.vacuum_running.set()
+        try:
+            with self._write_lock:
+                self.conn.execute("VACUUM")
+        finally:
+            self.vacuum_running.clear()
+    
+    def incremental_vacuum(self, pages: int) -> int:
+        """Gibt bis zu `pages` freie Seiten zurück, liefert die verbleibenden freien Seiten"""
+        with self._write_lock:
+            # executescript führt das Pragma vollständig aus; execute() würde
+            # nur eine Seite pro Aufruf freigeben
+            self.conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+            return self.conn.execute("PRAGMA freelist_count").fetchone()[0]
+    
+    def explain_query_plan(self, query: str, params: tuple = ()) -> List[str]:
+        """Gibt den Query-Plan (EXPLAIN QUERY PLAN) als Liste von Zeilen zurück"""
+        rows = self.fetch_all(f"EXPLAIN QUERY PLAN {query}", params)
+        return [row["detail"] for row in rows]
     
     def close(self):
-        """Schließt die Datenbank-Verbindung"""
+        """Schließt alle Datenbank-Verbindungen"""
+        while True:
+            try:
+                self._read_pool.get_nowait().close()
+            except queue.Empty:
+                break
+        self._read_connections = 0
         if self.conn:
-            self.conn.close()
+            with self._write_lock:
+                self.conn.close()
             logger.info("Datenbank-Verbindung geschlossen")
 
 
@@ -102,11 +322,15 @@ class Database:
 _db_instance: Optional[Database] = None
 
 
-def get_database() -> Database:
-    """Gibt die globale Datenbank-Instanz zurück"""
+def get_database(**kwargs) -> Database:
+    """Gibt die globale Datenbank-Instanz zurück
+
+    Die Keyword-Argumente (z.B. Pragmas) werden nur beim ersten Aufruf
+    verwendet, wenn die Instanz erzeugt wird.
+    """
     global _db_instance
     if _db_instance is None:
-        _db_instance = Database()
+        _db_instance = Database(**kwargs)
     return _db_instance
 
 
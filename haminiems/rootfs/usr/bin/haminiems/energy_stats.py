@@ -0,0 +1,342 @@
+"""Energie-Tagesstatistiken aus gespeicherten Zählerständen für HAminiEMS"""
+
+import logging
+import time
+from datetime import date, datetime, timedelta
+from datetime import time as dt_time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import integration
+from .const import (
+    COUNTER_RESET_RATIO,
+    ENERGY_UNIT_FACTORS,
+    INTEGRATION_MAX_GAP,
+    INTEGRATION_METHOD,
+    STATISTICS_CLOSE_DELAY,
+)
+from .sensors import SensorManager
+from .utils import to_epoch_ms
+
+logger = logging.getLogger("haminiems.energy_stats")
+
+# Energie pro Tag aus Zählerständen: Differenz zum Vorwert per LAG(), ein
+# Rückgang unter reset_ratio * Vorwert gilt als Reset (der neue Wert ist dann
+# die seitdem gezählte Energie), kleinere Rückgänge werden ignoriert. Der
+# letzte Wert vor dem Zeitraum wird mitgelesen, damit auch die Differenz
+# über Mitternacht dem ersten Tag zugerechnet wird.
+DAILY_ENERGY_QUERY = """
+    WITH days(day, start_ts, end_ts) AS (VALUES {days}),
+    samples AS (
+        SELECT ts, value,
+               LAG(value) OVER w AS prev_value,
+               LAG(ts) OVER w AS prev_ts
+        FROM entity_values
+        WHERE entity_ref = :ref AND value IS NOT NULL
+          AND ts >= COALESCE(
+              (SELECT MAX(ts) FROM entity_values
+               WHERE entity_ref = :ref AND ts < :start AND value IS NOT NULL),
+              :start)
+          AND ts < :end
+        WINDOW w AS (ORDER BY ts)
+    )
+    SELECT days.day AS day,
+           SUM(CASE
+               WHEN prev_value IS NULL THEN 0
+               WHEN value >= prev_value THEN value - prev_value
+               WHEN value < prev_value * :reset_ratio THEN value
+               ELSE 0
+           END) AS energy,
+           COUNT(*) AS samples,
+           MAX(ts - prev_ts) / 1000.0 AS max_gap_s
+    FROM samples
+    JOIN days ON samples.ts >= days.start_ts AND samples.ts < days.end_ts
+    GROUP BY days.day
+"""
+
+
+def local_day_bounds(day: date) -> Tuple[int, int]:
+    """Gibt Beginn und Ende eines lokalen Tages als Epoch-Millisekunden zurück"""
+    start = datetime.combine(day, dt_time.min)
+    end = datetime.combine(day + timedelta(days=1), dt_time.min)
+    return to_epoch_ms(start), to_epoch_ms(end)
+
+
+def period_days(period: str, day: Optional[date] = None, today: Optional[date] = None) -> List[date]:
+    """Gibt die Tage eines Zeitraums (day, week, month) bis einschließlich heute zurück"""
+    today = today or date.today()
+    day = day or today
+    if period == "day":
+        first, last = day, day
+    elif period == "week":
+        first = day - timedelta(days=day.weekday())
+        last = first + timedelta(days=6)
+    elif period == "month":
+        first = day.replace(day=1)
+        next_month = (first + timedelta(days=32)).replace(day=1)
+        last = next_month - timedelta(days=1)
+    else:
+        raise ValueError(f"Unbekannter Zeitraum: {period}")
+
+    last = min(last, today)
+    return [first + timedelta(days=n) for n in range((last - first).days + 1)]
+
+
+class EnergyStatistics:
+    """Berechnet die Energie pro Tag aus gespeicherten Messwerten
+
+    Energiezähler (Wh, kWh, MWh) werden über ihre Differenzen ausgewertet,
+    Leistungssensoren (W, kW, MW) mit NumPy über die Zeit integriert; ein
+    Leistungswert gilt bis zum nächsten, außer während Ausfällen der
+    Erfassung.
+    Abgeschlossene Tage werden im Hintergrund in daily_statistics
+    gespeichert (materialize, siehe maintenance.StatisticsTask) und danach
+    nur noch gelesen; Abfragen berechnen fehlende Tage, ohne zu schreiben.
+    """
+
+    def __init__(
+        self,
+        sensor_manager: SensorManager,
+        close_delay: float = STATISTICS_CLOSE_DELAY,
+        clock: Callable[[], float] = time.time,
+        method: str = INTEGRATION_METHOD,
+        max_gap_s: float = INTEGRATION_MAX_GAP
+    ):
+        self.sensor_manager = sensor_manager
+        self.db = sensor_manager.db
+        self.close_delay = close_delay
+        self.clock = clock
+        self.method = method
+        self.max_gap_s = max_gap_s
+
+    def source(self, entity_id: str) -> Optional[Tuple[str, float]]:
+        """Art der Entity ("counter" oder "power") und Umrechnungsfaktor nach kWh bzw. kW
+
+        Gibt None zurück, wenn die Einheit weder Energie noch Leistung ist
+        (oder NumPy für die Integration fehlt).
+        """
+        unit = self.sensor_manager.get_entity_meta(entity_id)["unit"]
+        if unit in ENERGY_UNIT_FACTORS:
+            return "counter", ENERGY_UNIT_FACTORS[unit]
+        factor = integration.power_factor(unit)
+        if factor is not None and integration.HAS_NUMPY:
+            return "power", factor
+        return None
+
+    def can_store(self) -> bool:
+        """Prüft ob Tage gespeichert werden dürfen
+
+        Während der Übernahme von Altdaten können noch Werte nachkommen.
+        """
+        return not self.db.table_exists("entity_values_legacy")
+
+    def is_closed(self, day: date) -> bool:
+        """Prüft ob ein Tag abgeschlossen ist und gespeichert werden darf"""
+        _, end_ms = local_day_bounds(day)
+        return end_ms + self.close_delay * 1000 <= self.clock() * 1000
+
+    def compute_days(
+        self,
+        entity_ref: int,
+        days: List[date],
+        reset_ratio: float = COUNTER_RESET_RATIO
+    ) -> Dict[str, Dict[str, Any]]:
+        """Berechnet die Energie eines Zählers (in seiner Einheit) für die angegebenen Tage"""
+        if not days:
+            return {}
+
+        params: Dict[str, Any] = {"ref": entity_ref, "reset_ratio": reset_ratio}
+        placeholders = []
+        for n, day in enumerate(days):
+            start_ms, end_ms = local_day_bounds(day)
+            params[f"d{n}"] = day.isoformat()
+            params[f"s{n}"] = start_ms
+            params[f"e{n}"] = end_ms
+            placeholders.append(f"(:d{n}, :s{n}, :e{n})")
+        params["start"] = min(params[f"s{n}"] for n in range(len(days)))
+        params["end"] = max(params[f"e{n}"] for n in range(len(days)))
+
+        rows = self.db.fetch_all(
+            DAILY_ENERGY_QUERY.format(days=", ".join(placeholders)), params
+        )
+        result = {
+            day.isoformat(): {"energy": 0.0, "samples": 0, "max_gap_s": None}
+            for day in days
+        }
+        for row in rows:
+            result[row["day"]] = {
+                "energy": row["energy"] or 0.0,
+                "samples": row["samples"],
+                "max_gap_s": row["max_gap_s"],
+            }
+        return result
+
+    def integrate_days(self, entity_ref: int, days: List[date]) -> Dict[str, Dict[str, Any]]:
+        """Integriert Leistungswerte (Einheit der Entity * h) für die angegebenen Tage"""
+        if not days:
+            return {}
+
+        # Zusammenhängende Tagesgrenzen vom ersten bis zum letzten Tag
+        first, last = min(days), max(days)
+        span = [first + timedelta(days=n) for n in range((last - first).days + 1)]
+        edges = [local_day_bounds(day)[0] for day in span]
+        edges.append(local_day_bounds(last)[1])
+
+        ts, values = integration.load_samples(self.db, entity_ref, edges[0], edges[-1])
+        # Der letzte Wert gilt bis zur letzten erfolgreichen Erfassung, nicht
+        # gezählt werden nur gespeicherte Ausfälle der Erfassung
+        heartbeat = self.sensor_manager.get_heartbeat()
+        now_ms = self.clock() * 1000
+        hold_until = min(edges[-1], now_ms, heartbeat if heartbeat is not None else now_ms)
+        outages = self.sensor_manager.get_outages(edges[0], edges[-1])
+        energy = integration.integrate_windows(
+            ts, values, edges, self.method, self.max_gap_s, outages, hold_until
+        )
+        stats = integration.window_stats(ts, edges)
+
+        wanted = {day.isoformat() for day in days}
+        result = {}
+        for n, day in enumerate(span):
+            if day.isoformat() not in wanted:
+                continue
+            gap = stats["max_gap_s"][n]
+            result[day.isoformat()] = {
+                "energy": float(energy[n]),
+                "samples": int(stats["samples"][n]),
+                "max_gap_s": None if gap != gap else float(gap),
+            }
+        return result
+
+    def get_daily_energy(
+        self,
+        entity_id: str,
+        days: List[date],
+        daily_total: Optional[str] = None
+    ) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Gibt die Energie in kWh pro Tag zurück
+
+        daily_total="daily" kennzeichnet Tageszähler, die um Mitternacht auf
+        0 gehen; bei ihnen gilt jeder Rückgang als Reset. Gibt None zurück,
+        wenn die Entity weder Energie- noch Leistungs-Einheit hat.
+        """
+        source = self.source(entity_id)
+        if source is None:
+            return None
+        ref = self.sensor_manager.get_entity_ref(entity_id, create=False)
+        if ref is None:
+            return {
+                day.isoformat(): {"energy": 0.0, "samples": 0, "max_gap_s": None}
+                for day in days
+            }
+
+        wanted = [day.isoformat() for day in days]
+        rows = self.db.fetch_all(
+            "SELECT day, energy, samples, max_gap_s FROM daily_statistics "
+            "WHERE entity_ref = ? AND day >= ? AND day <= ?",
+            (ref, min(wanted), max(wanted))
+        )
+        result = {
+            row["day"]: {
+                "energy": row["energy"],
+                "samples": row["samples"],
+                "max_gap_s": row["max_gap_s"],
+            }
+            for row in rows if row["day"] in wanted
+        }
+
+        missing = [day for day in days if day.isoformat() not in result]
+        result.update(self._compute(ref, source, missing, daily_total))
+        return {day: result[day] for day in wanted}
+
+    def _compute(
+        self,
+        entity_ref: int,
+        source: Tuple[str, float],
+        days: List[date],
+        daily_total: Optional[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Berechnet die Energie in kWh pro Tag aus den Rohwerten"""
+        kind, factor = source
+        if kind == "power":
+            computed = self.integrate_days(entity_ref, days)
+        else:
+            reset_ratio = 1.0 if daily_total == "daily" else COUNTER_RESET_RATIO
+            computed = self.compute_days(entity_ref, days, reset_ratio)
+        for stats in computed.values():
+            stats["energy"] *= factor
+        return computed
+
+    def materialize(self, entity_id: str, daily_total: Optional[str], max_days: int) -> int:
+        """Speichert bis zu max_days noch fehlende abgeschlossene Tage (älteste zuerst)
+
+        Gibt die Anzahl gespeicherter Tage zurück.
+        """
+        source = self.source(entity_id)
+        if not self.can_store() or source is None:
+            return 0
+        ref = self.sensor_manager.get_entity_ref(entity_id, create=False)
+        if ref is None:
+            return 0
+        first_ts, last_ts = self.db.fetch_one(
+            "SELECT MIN(ts), MAX(ts) FROM entity_values WHERE entity_ref = ?", (ref,)
+        )
+        if first_ts is None:
+            return 0
+
+        # Nur Tage mit Messwerten, spätere Tage werden bei Abfrage berechnet
+        first = datetime.fromtimestamp(first_ts / 1000).date()
+        last = min(datetime.fromtimestamp(last_ts / 1000).date(), date.fromtimestamp(self.clock()))
+        while last >= first and not self.is_closed(last):
+            last -= timedelta(days=1)
+        if last < first:
+            return 0
+
+        stored = {
+            row["day"] for row in self.db.fetch_all(
+                "SELECT day FROM daily_statistics WHERE entity_ref = ? AND day >= ?",
+                (ref, first.isoformat())
+            )
+        }
+        missing = []
+        day = first
+        while day <= last and len(missing) < max_days:
+            if day.isoformat() not in stored:
+                missing.append(day)
+            day += timedelta(days=1)
+
+        if missing:
+            self._store(ref, missing, self._compute(ref, source, missing, daily_total))
+        return len(missing)
+
+    def _store(self, entity_ref: int, days: List[date], computed: Dict[str, Dict[str, Any]]):
+        """Speichert abgeschlossene Tage"""
+        if not days or not self.can_store():
+            return
+        now_ms = int(self.clock() * 1000)
+        self.db.execute_many(
+            "INSERT OR REPLACE INTO daily_statistics "
+            "(entity_ref, day, energy, samples, max_gap_s, computed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    entity_ref,
+                    day.isoformat(),
+                    computed[day.isoformat()]["energy"],
+                    computed[day.isoformat()]["samples"],
+                    computed[day.isoformat()]["max_gap_s"],
+                    now_ms,
+                )
+                for day in days
+            ]
+        )
+
+    def invalidate(self, entity_ref: Optional[int] = None, since: Optional[date] = None):
+        """Verwirft gespeicherte Tage, z.B. nach dem Nachladen von Verläufen"""
+        query = "DELETE FROM daily_statistics WHERE 1 = 1"
+        params: List[Any] = []
+        if entity_ref is not None:
+            query += " AND entity_ref = ?"
+            params.append(entity_ref)
+        if since is not None:
+            query += " AND day >= ?"
+            params.append(since.isoformat())
+        self.db.execute(query, tuple(params))
@@ -0,0 +1,151 @@
+"""Schnelle und speicherschonende JSON-Verarbeitung für HAminiEMS"""
+
+import codecs
+import json
+from typing import Any, Callable, Iterable, List, Optional
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    orjson = None
+    HAS_ORJSON = False
+
+from flask.json.provider import DefaultJSONProvider
+
+# Wählt ein Element aus (Rückgabe None = verwerfen) und kann es dabei verkleinern
+Selector = Callable[[Any], Optional[Any]]
+
+
+class ArrayItemParser:
+    """Inkrementeller Parser für die Elemente eines JSON-Arrays
+
+    feed() nimmt die Antwort blockweise entgegen und gibt die darin
+    vollständig enthaltenen Elemente zurück, so dass nie die ganze Antwort
+    und alle Elemente gleichzeitig im Speicher liegen. Mit depth=2 werden
+    die Elemente des inneren Arrays gelesen (History-API: [[...]]).
+
+    Jedes Element wird mit json.JSONDecoder.raw_decode (C-Scanner)
+    dekodiert; das ist bei Home Assistant States etwa dreimal so schnell
+    wie ein ereignisbasierter Parser wie ijson.
+    """
+
+    def __init__(self, depth: int = 1):
+        self.depth = max(1, depth)
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._opened = 0
+        self._finished = False
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        """Verarbeitet einen Block und gibt die fertigen Elemente zurück"""
+        if self._finished:
+            return []
+        self._buffer += self._utf8.decode(chunk)
+        return self._drain(final=False)
+
+    def close(self) -> List[Any]:
+        """Schließt den Parser ab (Fehler bei unvollständigem JSON)
+
+        Fehlt die schließende Klammer (z.B. abgebrochene Übertragung), ist
+        das Array unvollständig, auch wenn alle Elemente gelesen wurden.
+        """
+        if self._finished:
+            return []
+        self._buffer += self._utf8.decode(b"", final=True)
+        items = self._drain(final=True)
+        if not self._finished:
+            raise ValueError("Unvollständiges JSON-Array")
+        return items
+
+    def _drain(self, final: bool) -> List[Any]:
+        """Liest alle vollständigen Elemente aus dem Puffer"""
+        buffer, pos, items = self._buffer, 0, []
+        while pos < len(buffer):
+            char = buffer[pos]
+            if char in " \t\r\n,":
+                pos += 1
+            elif self._opened < self.depth:
+                if char != "[":
+                    raise ValueError(f"JSON-Array erwartet, gefunden: {char!r}")
+                self._opened += 1
+                pos += 1
+            elif char == "]":
+                # Ende des (ersten) Arrays, der Rest wird ignoriert
+                self._finished = True
+                pos = len(buffer)
+            else:
+                try:
+                    item, end = self._decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                    break
+                # Eine Zahl am Pufferende könnte noch weitergehen ("1" + "2",
+                # "1" + ".5", "2e" + "3"), ebenso vor einem Dezimalpunkt/Exponenten
+                if not final and (end == len(buffer) or buffer[end] in ".eE"):
+                    break
+                items.append(item)
+                pos = end
+        self._buffer = buffer[pos:]
+        return items
+
+
+def collect_items(
+    chunks: Iterable[bytes],
+    select: Optional[Selector] = None,
+    depth: int = 1
+) -> List[Any]:
+    """Liest die Elemente eines JSON-Arrays blockweise und behält nur die ausgewählten"""
+    parser = ArrayItemParser(depth)
+    result: List[Any] = []
+    for chunk in chunks:
+        result.extend(select_items(parser.feed(chunk), select))
+    result.extend(select_items(parser.close(), select))
+    return result
+
+
+def select_items(items: List[Any], select: Optional[Selector]) -> List[Any]:
+    """Wendet select auf die Elemente an und verwirft None"""
+    if select is None:
+        return items
+    selected = []
+    for item in items:
+        item = select(item)
+        if item is not None:
+            selected.append(item)
+    return selected
+
+
+def dumps(data: Any) -> str:
+    """Serialisiert kompakt, mit orjson falls installiert"""
+    if HAS_ORJSON:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(data, separators=(",", ":"))
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON-Provider für Flask auf Basis von orjson
+
+    Liefert dieselbe Ausgabe wie der Standard-Provider (sortierte Schlüssel,
+    Datumswerte im HTTP-Format über default()), ist aber deutlich schneller.
+    Aufrufe mit weiteren Optionen (z.B. indent im Debug-Modus) gehen an den
+    Standard-Provider.
+    """
+
+    OPTIONS = (
+        (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME)
+        if HAS_ORJSON else 0
+    )
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        # response() übergibt immer separators, orjson ist ohnehin kompakt
+        if kwargs.keys() - {"separators"}:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self.OPTIONS).decode()
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
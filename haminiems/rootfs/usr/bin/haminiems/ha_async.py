@@ -0,0 +1,292 @@
+"""Asynchroner Home Assistant REST API Client (aiohttp)"""
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+try:
+    import aiohttp
+    HAS_AIOHTTP = True
+except ImportError:
+    aiohttp = None
+    HAS_AIOHTTP = False
+
+from .breaker import CircuitBreaker
+from .const import (
+    DEFAULT_HA_KEEPALIVE,
+    DEFAULT_HA_REQUEST_TIMEOUT,
+    DEFAULT_MAX_CONCURRENCY,
+    JSON_STREAM_CHUNK_SIZE,
+)
+from .fastjson import ArrayItemParser, Selector, select_items
+from .metrics import HA_REQUEST_SECONDS, endpoint_label
+
+logger = logging.getLogger("haminiems.ha_async")
+
+
+class AsyncHAClient:
+    """Client für die Home Assistant REST API auf Basis von aiohttp
+
+    Alle Anfragen laufen auf einer eigenen Event-Loop in einem
+    Hintergrund-Thread über einen Keep-Alive-Pool. Die synchronen Methoden
+    (request, get_states) blockieren nur den aufrufenden Thread und brechen
+    nach ihrem Timeout die noch laufenden Anfragen ab, statt sie zu Ende
+    laufen zu lassen. Ein Semaphor begrenzt die gleichzeitigen Anfragen; der
+    Timeout einer Anfrage beginnt erst, wenn sie an der Reihe ist.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        token: str,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        request_timeout: float = DEFAULT_HA_REQUEST_TIMEOUT,
+        keepalive: float = DEFAULT_HA_KEEPALIVE,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        if not HAS_AIOHTTP:
+            raise RuntimeError("aiohttp ist nicht installiert")
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.max_concurrency = max(1, max_concurrency)
+        self.request_timeout = request_timeout
+        self.keepalive = keepalive
+        self.breaker = breaker
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        # Werden in der Event-Loop angelegt (an die Loop gebunden)
+        self._session: Optional["aiohttp.ClientSession"] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.cancelled = 0
+
+    # Synchrone Schnittstelle
+
+    def request(
+        self,
+        method: str,
+        endpoint: str,
+        timeout: Optional[float] = None,
+        **kwargs
+    ) -> Optional[Any]:
+        """Führt eine Anfrage aus und wartet auf das Ergebnis (None bei Fehler)"""
+        timeout = self.request_timeout if timeout is None else timeout
+        return self._run(self.async_request(method, endpoint, timeout, **kwargs), timeout)
+
+    def request_items(
+        self,
+        endpoint: str,
+        select: Optional[Selector] = None,
+        depth: int = 1,
+        timeout: Optional[float] = None,
+        **kwargs
+    ) -> Optional[List[Any]]:
+        """Liest das JSON-Array einer GET-Antwort blockweise (siehe HAClient._request_items)"""
+
+        async def read_items(response: "aiohttp.ClientResponse") -> List[Any]:
+            parser = ArrayItemParser(depth)
+            items: List[Any] = []
+            async for chunk in response.content.iter_chunked(JSON_STREAM_CHUNK_SIZE):
+                items.extend(select_items(parser.feed(chunk), select))
+            items.extend(select_items(parser.close(), select))
+            return items
+
+        return self.request("GET", endpoint, timeout, reader=read_items, **kwargs)
+
+    def get_states(
+        self,
+        entity_ids: Iterable[str],
+        timeout: Optional[float] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Holt die States mehrerer Entities gleichzeitig
+
+        Die Dauer entspricht etwa der langsamsten Einzelanfrage. Nach
+        `timeout` Sekunden werden offene Anfragen abgebrochen und die bis
+        dahin erhaltenen States zurückgegeben.
+        """
+        timeout = self.request_timeout if timeout is None else timeout
+        return self._run(self.async_get_states(list(entity_ids), timeout), timeout) or {}
+
+    def stats(self) -> Dict[str, Any]:
+        """Gibt Statistiken zu den Anfragen zurück"""
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "max_concurrency": self.max_concurrency,
+            "request_timeout": self.request_timeout,
+        }
+
+    def close(self):
+        """Schließt den Pool und beendet die Event-Loop"""
+        with self._start_lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_session(), loop).result(5)
+        except Exception as e:
+            logger.warning(f"Fehler beim Schließen der HTTP-Session: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
+        loop.close()
+
+    # Coroutinen (laufen in der Event-Loop)
+
+    async def async_request(
+        self,
+        method: str,
+        endpoint: str,
+        timeout: Optional[float] = None,
+        reader: Optional[Callable[["aiohttp.ClientResponse"], Awaitable[Any]]] = None,
+        **kwargs
+    ) -> Optional[Any]:
+        """Führt eine Anfrage aus (None bei Fehler oder Timeout)
+
+        reader liest die Antwort selbst (z.B. blockweise), sonst wird sie
+        vollständig als JSON dekodiert.
+        """
+        session = self._get_session()
+        timeout = self.request_timeout if timeout is None else timeout
+        async with self._semaphore:
+            if self.breaker is not None and not self.breaker.allow():
+                logger.debug(f"Home Assistant nicht erreichbar, Anfrage {endpoint} übersprungen")
+                return None
+            self.requests += 1
+            started = time.perf_counter()
+            status = "error"
+            try:
+                async with session.request(
+                    method,
+                    f"{self.base_url}{endpoint}",
+                    timeout=aiohttp.ClientTimeout(total=timeout),
+                    **kwargs
+                ) as response:
+                    status = str(response.status)
+                    response.raise_for_status()
+                    self._record(True)
+                    if reader is not None:
+                        return await reader(response)
+                    body = await response.read()
+                    return await response.json(content_type=None) if body else None
+            except asyncio.TimeoutError:
+                status = "timeout"
+                self.timeouts += 1
+                self._record(False)
+                logger.error(f"Timeout bei API-Anfrage {endpoint} ({timeout}s)")
+            except aiohttp.ClientResponseError as e:
+                self.errors += 1
+                # Home Assistant hat geantwortet, nur Serverfehler zählen als Ausfall
+                self._record(e.status < 500)
+                logger.error(f"Fehler bei API-Anfrage {endpoint}: {e}")
+            except (aiohttp.ClientError, ValueError) as e:
+                self.errors += 1
+                self._record(False)
+                logger.error(f"Fehler bei API-Anfrage {endpoint}: {e}")
+            except asyncio.CancelledError:
+                # Abgebrochen wegen Zeitüberschreitung des Aufrufers
+                status = "cancelled"
+                self._record(False)
+                raise
+            finally:
+                HA_REQUEST_SECONDS.observe(
+                    time.perf_counter() - started, endpoint_label(endpoint), status
+                )
+        return None
+
+    async def async_get_states(
+        self,
+        entity_ids: Iterable[str],
+        timeout: Optional[float] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """Holt die States mehrerer Entities gleichzeitig"""
+        timeout = self.request_timeout if timeout is None else timeout
+        tasks = {
+            asyncio.ensure_future(self.async_request("GET", f"/api/states/{entity_id}")): entity_id
+            for entity_id in dict.fromkeys(entity_ids)
+        }
+        if not tasks:
+            return {}
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            self.cancelled += len(pending)
+            logger.warning(f"{len(pending)} State-Abrufe nach {timeout}s abgebrochen")
+        return {
+            tasks[task]: task.result()
+            for task in done
+            if not task.cancelled() and task.exception() is None and task.result()
+        }
+
+    # Interne Hilfsfunktionen
+
+    def _record(self, success: bool):
+        """Meldet das Ergebnis einer Anfrage an den Circuit Breaker"""
+        if self.breaker is None:
+            return
+        if success:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+    def _run(self, coro, timeout: float) -> Optional[Any]:
+        """Führt eine Coroutine in der Event-Loop aus und wartet auf das Ergebnis"""
+        future = asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+        try:
+            # Die Coroutinen begrenzen sich selbst, hier nur die Absicherung
+            return future.result(timeout + 1)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            self.timeouts += 1
+            logger.error(f"Anfrage an Home Assistant nach {timeout}s abgebrochen")
+            return None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Startet die Event-Loop beim ersten Aufruf"""
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=self._run_loop, args=(loop,), name="ha-async", daemon=True
+                )
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop):
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        """Gibt die HTTP-Session zurück (nur in der Event-Loop aufrufen)"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency,
+                keepalive_timeout=self.keepalive,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={
+                    "Authorization": f"Bearer {self.token}",
+                    "Content-Type": "application/json",
+                },
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    async def _close_session(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
@@ -1,24 +1,93 @@
 """Home Assistant REST API Client"""
 
 import logging
+import threading
+import time
 import requests
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Iterable, Optional, Tuple
 from datetime import datetime
 
+from .breaker import CircuitBreaker
+from .cache import TTLCache
+from .fastjson import Selector, collect_items
+from .ha_async import HAS_AIOHTTP, AsyncHAClient
+from .ha_websocket import HAWebSocketClient
+from .metrics import HA_REQUEST_SECONDS, endpoint_label
+from .const import (
+    DEFAULT_CACHE_SIZE,
+    DEFAULT_HA_KEEPALIVE,
+    DEFAULT_HA_REQUEST_TIMEOUT,
+    DEFAULT_MAX_CONCURRENCY,
+    HA_API_HISTORY,
+    HA_API_STATES,
+    JSON_STREAM_CHUNK_SIZE,
+    SNAPSHOT_MODE_ASYNC,
+    SNAPSHOT_MODE_BULK,
+    SNAPSHOT_MODE_CONCURRENT,
+)
+from .utils import is_energy_entity
+
 logger = logging.getLogger("haminiems.ha_client")
 
 
 class HAClient:
-    """Client für Home Assistant REST API"""
+    """Client für Home Assistant REST API
+
+    Mit use_async=True (und installiertem aiohttp) laufen alle Anfragen
+    über AsyncHAClient; die Methoden hier bleiben synchron. Ohne aiohttp
+    wird requests verwendet. Ein Circuit Breaker lehnt Anfragen sofort ab,
+    solange Home Assistant nicht erreichbar ist.
+    """
     
-    def __init__(self, base_url: str, token: str):
+    def __init__(
+        self,
+        base_url: str,
+        token: str,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        cache_ttl: float = 0,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        request_timeout: float = DEFAULT_HA_REQUEST_TIMEOUT,
+        keepalive: float = DEFAULT_HA_KEEPALIVE,
+        use_async: bool = False
+    ):
         self.base_url = base_url.rstrip("/")
         self.token = token
+        self.max_concurrency = max(1, max_concurrency)
+        self.request_timeout = request_timeout
+        # State-Cache (ttl <= 0 deaktiviert den Cache)
+        self.cache = TTLCache(cache_ttl, cache_size, name="ha_states")
         self.session = requests.Session()
         self.session.headers.update({
             "Authorization": f"Bearer {self.token}",
             "Content-Type": "application/json",
         })
+        # Connection-Pool so groß wie die maximale Parallelität
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.max_concurrency
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        # Live-States über die WebSocket API (optional)
+        self.live_states: Optional[HAWebSocketClient] = None
+        self.breaker = CircuitBreaker()
+        # Asynchroner Client mit Keep-Alive-Pool (optional)
+        self.async_client: Optional[AsyncHAClient] = None
+        if use_async:
+            if HAS_AIOHTTP:
+                self.async_client = AsyncHAClient(
+                    self.base_url,
+                    self.token,
+                    max_concurrency=self.max_concurrency,
+                    request_timeout=request_timeout,
+                    keepalive=keepalive,
+                    breaker=self.breaker,
+                )
+            else:
+                logger.warning("aiohttp nicht installiert, verwende requests für Anfragen an Home Assistant")
     
     def _request(
         self,
@@ -27,39 +96,260 @@ class HAClient:
         **kwargs
     ) -> Optional[Dict[str, Any]]:
         """Führt eine HTTP-Anfrage aus"""
+        if self.async_client is not None:
+            return self.async_client.request(method, endpoint, **kwargs)
+        
+        if not self.breaker.allow():
+            logger.debug(f"Home Assistant nicht erreichbar, Anfrage {endpoint} übersprungen")
+            return None
+        
         url = f"{self.base_url}{endpoint}"
+        started = time.perf_counter()
+        status = "error"
         
         try:
-            response = self.session.request(method, url, timeout=10, **kwargs)
+            response = self.session.request(method, url, timeout=self.request_timeout, **kwargs)
+            status = str(response.status_code)
             response.raise_for_status()
+            self.breaker.record_success()
             return response.json() if response.content else None
+        except requests.exceptions.HTTPError as e:
+            # Home Assistant hat geantwortet, nur Serverfehler zählen als Ausfall
+            if e.response is not None and e.response.status_code < 500:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+            logger.error(f"Fehler bei API-Anfrage {endpoint}: {e}")
+            return None
         except requests.exceptions.RequestException as e:
+            if isinstance(e, requests.exceptions.Timeout):
+                status = "timeout"
+            self.breaker.record_failure()
+            logger.error(f"Fehler bei API-Anfrage {endpoint}: {e}")
+            return None
+        finally:
+            HA_REQUEST_SECONDS.observe(
+                time.perf_counter() - started, endpoint_label(endpoint), status
+            )
+    
+    def _request_items(
+        self,
+        endpoint: str,
+        select: Optional[Selector] = None,
+        depth: int = 1,
+        **kwargs
+    ) -> Optional[List[Any]]:
+        """Führt eine GET-Anfrage aus und liest das JSON-Array der Antwort blockweise
+
+        Behalten werden nur die Elemente, für die select() nicht None
+        zurückgibt (ohne select alle). Große Antworten wie /api/states
+        liegen so nie vollständig als Text und Objekte im Speicher.
+        """
+        if self.async_client is not None:
+            return self.async_client.request_items(endpoint, select, depth, **kwargs)
+        
+        if not self.breaker.allow():
+            logger.debug(f"Home Assistant nicht erreichbar, Anfrage {endpoint} übersprungen")
+            return None
+        
+        url = f"{self.base_url}{endpoint}"
+        started = time.perf_counter()
+        status = "error"
+        
+        try:
+            with self.session.get(url, timeout=self.request_timeout, stream=True, **kwargs) as response:
+                status = str(response.status_code)
+                response.raise_for_status()
+                items = collect_items(
+                    response.iter_content(JSON_STREAM_CHUNK_SIZE), select, depth
+                )
+            self.breaker.record_success()
+            return items
+        except requests.exceptions.HTTPError as e:
+            # Home Assistant hat geantwortet, nur Serverfehler zählen als Ausfall
+            if e.response is not None and e.response.status_code < 500:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+            logger.error(f"Fehler bei API-Anfrage {endpoint}: {e}")
+            return None
+        except (requests.exceptions.RequestException, ValueError) as e:
+            if isinstance(e, requests.exceptions.Timeout):
+                status = "timeout"
+            self.breaker.record_failure()
             logger.error(f"Fehler bei API-Anfrage {endpoint}: {e}")
             return None
+        finally:
+            HA_REQUEST_SECONDS.observe(
+                time.perf_counter() - started, endpoint_label(endpoint), status
+            )
+    
+    @property
+    def available(self) -> bool:
+        """Prüft ob Home Assistant als erreichbar gilt (ohne Anfrage)"""
+        return self.breaker.healthy
     
-    def get_states(self) -> List[Dict[str, Any]]:
+    def get_states(self, use_cache: bool = True) -> List[Dict[str, Any]]:
         """Holt alle States von Home Assistant"""
-        result = self._request("GET", "/api/states")
+        if use_cache:
+            result = self.cache.get_or_load(
+                ("states",),
+                lambda: self._request_items(HA_API_STATES)
+            )
+        else:
+            result = self._request_items(HA_API_STATES)
+            if result:
+                self.cache.set(("states",), result)
+        if not result and not self.available:
+            # Home Assistant nicht erreichbar: zuletzt bekannte States
+            stale = self.cache.get_stale(("states",))
+            if stale is not None:
+                return stale[0]
         return result if result else []
     
+    def select_states(self, select: Selector) -> Optional[List[Any]]:
+        """Holt alle States und behält nur die von select() zurückgegebenen Werte
+
+        Die vollständige Liste wird dabei nie aufgebaut; select() kann die
+        States auch verkleinern. Gibt None zurück, wenn der Abruf fehlschlägt.
+        """
+        return self._request_items(HA_API_STATES, select)
+    
     def get_state(self, entity_id: str) -> Optional[Dict[str, Any]]:
         """Holt den State einer einzelnen Entity"""
-        result = self._request("GET", f"/api/states/{entity_id}")
-        return result
+        if self.live_states is not None:
+            state = self.live_states.get_state(entity_id)
+            if state is not None:
+                return state
+        
+        return self.cache.get_or_load(
+            ("state", entity_id),
+            lambda: self._request("GET", f"/api/states/{entity_id}")
+        )
+    
+    def get_last_known_state(self, entity_id: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Gibt den zuletzt abgerufenen State und sein Alter in Sekunden zurück"""
+        return self.cache.get_stale(("state", entity_id))
+    
+    def get_states_snapshot(
+        self,
+        entity_ids: Iterable[str],
+        mode: str = SNAPSHOT_MODE_BULK,
+        use_cache: bool = True
+    ) -> Dict[str, Dict[str, Any]]:
+        """Holt die States mehrerer Entities in einem Durchgang
+
+        Im Modus "bulk" wird ein einziger /api/states Abruf gemacht und
+        gefiltert, im Modus "concurrent" werden die Einzelabrufe parallel
+        ausgeführt (Thread-Pool), im Modus "async" gleichzeitig auf der
+        Event-Loop des asynchronen Clients, im Modus "serial" nacheinander. States aus der
+        WebSocket-Tabelle oder dem Cache werden nicht erneut abgerufen;
+        mit use_cache=False wird der Cache übersprungen, aber aktualisiert.
+        """
+        wanted = list(dict.fromkeys(e for e in entity_ids if e))
+        snapshot = (
+            self.live_states.get_states(wanted)
+            if self.live_states is not None else {}
+        )
+        pending = [entity_id for entity_id in wanted if entity_id not in snapshot]
+        
+        if use_cache:
+            cached = self.cache.get_many(("state", entity_id) for entity_id in pending)
+            snapshot.update((key[1], state) for key, state in cached.items())
+        missing = [entity_id for entity_id in pending if entity_id not in snapshot]
+        
+        if missing:
+            # Gleichzeitige Misses auf dieselben Entities nur einmal abrufen
+            if use_cache:
+                fetched = self.cache.get_or_load(
+                    ("snapshot", mode, tuple(missing)),
+                    lambda: self._fetch_snapshot(missing, mode)
+                )
+            else:
+                fetched = self._fetch_snapshot(missing, mode, use_cache=False)
+            fetched = fetched or {}
+            for entity_id, state in fetched.items():
+                self.cache.set(("state", entity_id), state)
+            snapshot.update(fetched)
+        
+        return snapshot
+    
+    def _fetch_snapshot(
+        self,
+        entity_ids: List[str],
+        mode: str,
+        use_cache: bool = True
+    ) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Ruft die States der angegebenen Entities von Home Assistant ab"""
+        if mode == SNAPSHOT_MODE_BULK:
+            # Nur die gesuchten States aus der Antwort übernehmen
+            wanted_set = set(entity_ids)
+            selected = self.select_states(
+                lambda state: state if state.get("entity_id") in wanted_set else None
+            )
+            states = {state["entity_id"]: state for state in selected or []}
+        elif mode == SNAPSHOT_MODE_ASYNC and self.async_client is not None:
+            states = self.async_client.get_states(entity_ids)
+        else:
+            fetch = (
+                self.get_state if use_cache
+                else lambda entity_id: self._request("GET", f"/api/states/{entity_id}")
+            )
+            # Ohne asynchronen Client wird "async" über den Thread-Pool ausgeführt
+            if mode in (SNAPSHOT_MODE_CONCURRENT, SNAPSHOT_MODE_ASYNC) and len(entity_ids) > 1:
+                results = self._get_executor().map(fetch, entity_ids)
+            else:
+                results = map(fetch, entity_ids)
+            states = {
+                entity_id: state
+                for entity_id, state in zip(entity_ids, results)
+                if state
+            }
+        
+        # Leere Ergebnisse (z.B. HA nicht erreichbar) nicht cachen
+        return states or None
+    
+    def enable_websocket(
+        self,
+        entity_ids: Iterable[str],
+        event_listeners: Optional[Dict[str, Callable[[Dict[str, Any]], None]]] = None
+    ) -> bool:
+        """Startet die WebSocket-Verbindung für Live-States
+
+        Solange die Verbindung steht, werden die States der angegebenen
+        Entities aus dem Speicher gelesen, sonst per REST abgefragt.
+        event_listeners (Event-Typ -> Funktion) werden zusätzlich abonniert.
+        """
+        if self.live_states is None:
+            self.live_states = HAWebSocketClient(
+                self.base_url, self.token, entity_ids, event_listeners=event_listeners
+            )
+        else:
+            self.live_states.set_entity_ids(entity_ids)
+        return self.live_states.start()
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Gibt den Thread-Pool für parallele Abrufe zurück"""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency,
+                    thread_name_prefix="ha-fetch"
+                )
+            return self._executor
     
     def get_entities_by_domain(self, domain: str) -> List[Dict[str, Any]]:
         """Holt alle Entities einer Domain"""
-        states = self.get_states()
-        return [
-            state for state in states
-            if state.get("entity_id", "").startswith(f"{domain}.")
-        ]
+        prefix = f"{domain}."
+        return self.select_states(
+            lambda state: state if state.get("entity_id", "").startswith(prefix) else None
+        ) or []
     
     def get_energy_entities(self) -> List[Dict[str, Any]]:
         """Holt alle Energie-Entities (mit state_class)"""
-        from .utils import filter_energy_entities
-        states = self.get_states()
-        return filter_energy_entities(states)
+        return self.select_states(
+            lambda state: state if is_energy_entity(state) else None
+        ) or []
     
     def set_state(
         self,
@@ -87,24 +377,33 @@ class HAClient:
         self,
         entity_id: str,
         start_time: datetime,
-        end_time: Optional[datetime] = None
-    ) -> List[Dict[str, Any]]:
-        """Holt historische Daten für eine Entity"""
+        end_time: Optional[datetime] = None,
+        minimal_response: bool = False,
+        no_attributes: bool = False
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Holt historische Daten für eine Entity (None bei Fehler)
+
+        minimal_response liefert ab dem zweiten Eintrag nur state und
+        last_changed, no_attributes lässt die Attribute weg. Beides verkleinert
+        die Antwort bei langen Zeiträumen erheblich.
+        """
         params = {
             "filter_entity_id": entity_id,
             "end_time": end_time.isoformat() if end_time else datetime.now().isoformat(),
         }
+        # Home Assistant wertet nur das Vorhandensein der Parameter aus
+        if minimal_response:
+            params["minimal_response"] = ""
+        if no_attributes:
+            params["no_attributes"] = ""
         
-        # Home Assistant History API erwartet start_time als Query-Parameter
-        result = self._request(
-            "GET",
-            f"/api/history/period/{start_time.isoformat()}",
+        # Home Assistant History API erwartet start_time als Query-Parameter.
+        # Die Antwort ist eine Liste von Listen, gelesen wird die innere.
+        return self._request_items(
+            f"{HA_API_HISTORY}/{start_time.isoformat()}",
+            depth=2,
             params=params
         )
-        
-        if result and len(result) > 0:
-            return result[0]  # API gibt Liste von Listen zurück
-        return []
     
     def test_connection(self) -> bool:
         """Testet die Verbindung zu Home Assistant"""
@@ -114,6 +413,14 @@ class HAClient:
         except Exception as e:
             logger.error(f"Verbindungstest fehlgeschlagen: {e}")
             return False
-
-
-
+    
+    def close(self):
+        """Schließt Session, WebSocket und Thread-Pool"""
+        if self.live_states is not None:
+            self.live_states.stop()
+        if self.async_client is not None:
+            self.async_client.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self.session.close()
@@ -0,0 +1,323 @@
+"""Home Assistant WebSocket API Client"""
+
+import json
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+# websocket-client ist optional - ohne Paket wird nur REST verwendet
+try:
+    import websocket
+    HAS_WEBSOCKET = True
+except ImportError:
+    websocket = None
+    HAS_WEBSOCKET = False
+
+from .const import (
+    WS_BACKOFF_MAX,
+    WS_BACKOFF_MIN,
+    WS_PING_INTERVAL,
+)
+
+logger = logging.getLogger("haminiems.ha_websocket")
+
+
+class AuthenticationError(Exception):
+    """Home Assistant hat den Token abgelehnt"""
+
+
+def build_websocket_url(base_url: str) -> str:
+    """Leitet die WebSocket-URL aus der REST-Basis-URL ab"""
+    url = base_url.rstrip("/")
+    if url.startswith("https://"):
+        url = "wss://" + url[len("https://"):]
+    elif url.startswith("http://"):
+        url = "ws://" + url[len("http://"):]
+
+    # Der Supervisor-Proxy stellt die API unter /core/websocket bereit
+    if url.endswith("/core"):
+        return f"{url}/websocket"
+    return f"{url}/api/websocket"
+
+
+class HAWebSocketClient:
+    """Hält eine Tabelle der aktuellen States über state_changed Events aktuell
+
+    Läuft in einem eigenen Thread, verbindet sich bei Abbrüchen mit
+    exponentiellem Backoff neu und synchronisiert die Tabelle nach jedem
+    (Re-)Connect über get_states.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        token: str,
+        entity_ids: Optional[Iterable[str]] = None,
+        backoff_min: float = WS_BACKOFF_MIN,
+        backoff_max: float = WS_BACKOFF_MAX,
+        ping_interval: float = WS_PING_INTERVAL,
+        event_listeners: Optional[Dict[str, Callable[[Dict[str, Any]], None]]] = None
+    ):
+        self.url = build_websocket_url(base_url)
+        self.token = token
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+        self.ping_interval = ping_interval
+
+        self._entity_ids: Set[str] = set(entity_ids or [])
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._resync = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._ws = None
+        self._next_id = 1
+        self._subscription_id: Optional[int] = None
+        self._sync_id: Optional[int] = None
+        # Weitere abonnierte Events (z.B. entity_registry_updated)
+        self._event_listeners = dict(event_listeners or {})
+        self._event_subscriptions: Dict[int, str] = {}
+
+        self.connected = False
+        self.connects = 0
+        self.events_received = 0
+        self.last_event_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    # Öffentliche API
+
+    def start(self) -> bool:
+        """Startet den Hintergrund-Thread"""
+        if not HAS_WEBSOCKET:
+            logger.warning(
+                "websocket-client nicht installiert, verwende nur REST-Abfragen"
+            )
+            return False
+        if self._thread and self._thread.is_alive():
+            return True
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="ha-websocket", daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def stop(self, timeout: float = 5.0):
+        """Beendet die Verbindung und den Hintergrund-Thread"""
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+        if self._thread:
+            self._thread.join(timeout)
+        self.connected = False
+
+    def set_entity_ids(self, entity_ids: Iterable[str]):
+        """Setzt die zu verfolgenden Entities und stößt eine Synchronisation an"""
+        new_ids = set(e for e in entity_ids if e)
+        with self._lock:
+            added = new_ids - self._entity_ids
+            self._entity_ids = new_ids
+            for entity_id in list(self._states):
+                if entity_id not in new_ids:
+                    del self._states[entity_id]
+        if added:
+            self._resync.set()
+
+    def get_state(self, entity_id: str) -> Optional[Dict[str, Any]]:
+        """Gibt den zuletzt empfangenen State einer Entity zurück"""
+        if not self.connected:
+            return None
+        with self._lock:
+            return self._states.get(entity_id)
+
+    def get_states(self, entity_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Gibt alle bekannten States der angegebenen Entities zurück"""
+        if not self.connected:
+            return {}
+        with self._lock:
+            return {
+                entity_id: self._states[entity_id]
+                for entity_id in entity_ids
+                if entity_id in self._states
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        """Gibt Status-Informationen zurück"""
+        with self._lock:
+            tracked = len(self._entity_ids)
+            known = len(self._states)
+        return {
+            "available": HAS_WEBSOCKET,
+            "connected": self.connected,
+            "url": self.url,
+            "connects": self.connects,
+            "tracked_entities": tracked,
+            "known_states": known,
+            "events_received": self.events_received,
+            "last_event_age": (
+                round(time.monotonic() - self.last_event_at, 1)
+                if self.last_event_at else None
+            ),
+            "last_error": self.last_error,
+        }
+
+    # Verbindungs-Handling
+
+    def _run(self):
+        """Hauptschleife mit Reconnect und Backoff"""
+        backoff = self.backoff_min
+        while not self._stop.is_set():
+            try:
+                self._connect()
+                backoff = self.backoff_min
+                self._listen()
+            except AuthenticationError as e:
+                self.last_error = str(e)
+                logger.error(f"WebSocket-Authentifizierung fehlgeschlagen: {e}")
+                backoff = self.backoff_max
+            except Exception as e:
+                self.last_error = str(e)
+                if not self._stop.is_set():
+                    logger.warning(f"WebSocket-Verbindung unterbrochen: {e}")
+            finally:
+                self._disconnect()
+
+            if self._stop.is_set():
+                break
+
+            # Exponentieller Backoff mit Jitter
+            delay = random.uniform(backoff / 2, backoff)
+            logger.info(f"WebSocket-Reconnect in {delay:.1f}s")
+            self._stop.wait(delay)
+            backoff = min(backoff * 2, self.backoff_max)
+
+    def _connect(self):
+        """Baut die Verbindung auf, authentifiziert und abonniert Events"""
+        self._ws = websocket.create_connection(self.url, timeout=10)
+        self._next_id = 1
+
+        message = self._receive()
+        if message.get("type") != "auth_required":
+            raise ConnectionError(f"Unerwartete Nachricht: {message.get('type')}")
+
+        self._send({"type": "auth", "access_token": self.token})
+        message = self._receive()
+        if message.get("type") != "auth_ok":
+            raise AuthenticationError(message.get("message", message.get("type")))
+
+        self._subscription_id = self._send_command({
+            "type": "subscribe_events",
+            "event_type": "state_changed",
+        })
+        self._event_subscriptions = {
+            self._send_command({"type": "subscribe_events", "event_type": event_type}): event_type
+            for event_type in self._event_listeners
+        }
+        self._sync_id = self._send_command({"type": "get_states"})
+
+        # "connected" wird erst nach der ersten Synchronisation gesetzt,
+        # damit keine veralteten States aus dem Speicher gelesen werden
+        self.connects += 1
+        logger.info(f"WebSocket verbunden: {self.url}")
+
+    def _disconnect(self):
+        """Schließt die aktuelle Verbindung"""
+        self.connected = False
+        with self._lock:
+            self._states.clear()
+        ws, self._ws = self._ws, None
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+
+    def _listen(self):
+        """Empfängt Nachrichten bis zum Verbindungsabbruch"""
+        self._ws.settimeout(1.0)
+        last_message = time.monotonic()
+        ping_sent = False
+
+        while not self._stop.is_set():
+            if self._resync.is_set():
+                self._resync.clear()
+                self._sync_id = self._send_command({"type": "get_states"})
+
+            try:
+                message = self._receive()
+            except websocket.WebSocketTimeoutException:
+                idle = time.monotonic() - last_message
+                if idle > 2 * self.ping_interval:
+                    raise ConnectionError("Keine Antwort auf Ping")
+                if idle > self.ping_interval and not ping_sent:
+                    self._send_command({"type": "ping"})
+                    ping_sent = True
+                continue
+
+            last_message = time.monotonic()
+            ping_sent = False
+            self._handle(message)
+
+    def _handle(self, message: Dict[str, Any]):
+        """Verarbeitet eine eingehende Nachricht"""
+        msg_type = message.get("type")
+
+        if msg_type == "event" and message.get("id") == self._subscription_id:
+            data = message.get("event", {}).get("data", {})
+            entity_id = data.get("entity_id")
+            with self._lock:
+                if entity_id not in self._entity_ids:
+                    return
+                new_state = data.get("new_state")
+                if new_state is None:
+                    self._states.pop(entity_id, None)
+                else:
+                    self._states[entity_id] = new_state
+            self.events_received += 1
+            self.last_event_at = time.monotonic()
+
+        elif msg_type == "event" and message.get("id") in self._event_subscriptions:
+            event_type = self._event_subscriptions[message["id"]]
+            try:
+                self._event_listeners[event_type](message.get("event", {}).get("data", {}))
+            except Exception as e:
+                logger.error(f"Fehler bei Verarbeitung von {event_type}: {e}", exc_info=True)
+
+        elif msg_type == "result" and message.get("id") == self._sync_id:
+            if not message.get("success"):
+                logger.warning(f"get_states fehlgeschlagen: {message.get('error')}")
+                return
+            with self._lock:
+                for state in message.get("result") or []:
+                    entity_id = state.get("entity_id")
+                    if entity_id in self._entity_ids:
+                        self._states[entity_id] = state
+            self.connected = True
+            logger.debug("WebSocket State-Tabelle synchronisiert")
+
+        elif msg_type == "result" and not message.get("success"):
+            logger.warning(f"WebSocket-Befehl fehlgeschlagen: {message.get('error')}")
+
+    # Low-Level
+
+    def _send(self, payload: Dict[str, Any]):
+        self._ws.send(json.dumps(payload))
+
+    def _send_command(self, payload: Dict[str, Any]) -> int:
+        """Sendet einen Befehl mit fortlaufender ID"""
+        message_id = self._next_id
+        self._next_id += 1
+        self._send({"id": message_id, **payload})
+        return message_id
+
+    def _receive(self) -> Dict[str, Any]:
+        raw = self._ws.recv()
+        if not raw:
+            raise ConnectionError("Verbindung geschlossen")
+        return json.loads(raw)
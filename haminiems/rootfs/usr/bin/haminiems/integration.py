@@ -0,0 +1,184 @@
+"""Integration von Leistungswerten zu Energie für HAminiEMS"""
+
+import logging
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    np = None
+    HAS_NUMPY = False
+
+from .const import INTEGRATION_MAX_GAP, INTEGRATION_METHOD, POWER_UNIT_FACTORS
+
+logger = logging.getLogger("haminiems.integration")
+
+INTEGRATION_METHODS = ("trapezoid", "left")
+
+# Letzter Wert vor dem Zeitraum, alle Werte im Zeitraum und erster Wert
+# danach, aufsteigend (ein gehaltener Wert reicht über die Grenzen hinaus)
+POWER_SAMPLES_QUERY = """
+    SELECT ts, value FROM entity_values
+    WHERE entity_ref = :ref AND value IS NOT NULL
+      AND ts >= COALESCE(
+          (SELECT MAX(ts) FROM entity_values
+           WHERE entity_ref = :ref AND ts < :start AND value IS NOT NULL),
+          :start)
+      AND ts <= COALESCE(
+          (SELECT MIN(ts) FROM entity_values
+           WHERE entity_ref = :ref AND ts >= :end AND value IS NOT NULL),
+          :end - 1)
+    ORDER BY ts
+"""
+
+# Ausfall der Erfassung: (Beginn, Ende) in Epoch-Millisekunden
+Outage = Tuple[float, float]
+
+
+def load_samples(db, entity_ref: int, start_ms: int, end_ms: int) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Liest Zeitstempel (ms) und Werte als NumPy-Arrays"""
+    with db.read_connection() as conn:
+        cursor = conn.cursor()
+        # Tupel statt sqlite3.Row, damit NumPy direkt ein 2D-Array bauen kann
+        cursor.row_factory = None
+        rows = cursor.execute(
+            POWER_SAMPLES_QUERY, {"ref": entity_ref, "start": start_ms, "end": end_ms}
+        ).fetchall()
+    if not rows:
+        return np.empty(0), np.empty(0)
+    data = np.array(rows, dtype=np.float64)
+    return data[:, 0], data[:, 1]
+
+
+def cumulative_energy(
+    ts_ms: "np.ndarray",
+    values: "np.ndarray",
+    method: str = INTEGRATION_METHOD,
+    max_gap_s: float = INTEGRATION_MAX_GAP,
+    outages: Sequence[Outage] = ()
+) -> "np.ndarray":
+    """Kumulierte Energie (Einheit der Werte * h) an jedem Messzeitpunkt
+
+    Home Assistant meldet nur Änderungen, daher gilt ein Wert bis zum
+    nächsten Messwert. Intervalle länger als max_gap_s werden mit dem
+    gehaltenen Wert gerechnet statt interpoliert. Nicht gezählt werden nur
+    Ausfälle der Erfassung (outages), die länger als max_gap_s dauerten.
+    """
+    if method not in INTEGRATION_METHODS:
+        raise ValueError(f"Unbekannte Integrationsmethode: {method}")
+    if len(ts_ms) < 2:
+        return np.zeros(len(ts_ms))
+
+    dt_ms = np.diff(ts_ms)
+    dt_h = dt_ms / 3_600_000.0
+    if method == "trapezoid":
+        area = (values[1:] + values[:-1]) * 0.5 * dt_h
+    else:
+        area = values[:-1] * dt_h
+    if max_gap_s:
+        held = dt_h * 3600.0 > max_gap_s
+        area[held] = values[:-1][held] * dt_h[held]
+    down_ms = outage_overlap(ts_ms, outages, max_gap_s)
+    if down_ms is not None:
+        area *= 1.0 - np.minimum(down_ms / dt_ms, 1.0)
+
+    cumulative = np.empty(len(ts_ms))
+    cumulative[0] = 0.0
+    np.cumsum(area, out=cumulative[1:])
+    return cumulative
+
+
+def outage_overlap(
+    ts_ms: "np.ndarray",
+    outages: Sequence[Outage],
+    max_gap_s: float = INTEGRATION_MAX_GAP
+) -> Optional["np.ndarray"]:
+    """Ausfallzeit (ms) innerhalb jedes Intervalls, None ohne relevante Ausfälle
+
+    Ausfälle bis max_gap_s werden wie kurze Lücken überbrückt.
+    """
+    min_ms = (max_gap_s or 0) * 1000.0
+    spans = sorted((start, end) for start, end in outages if end - start > min_ms)
+    if not spans:
+        return None
+    # Überlappende Ausfälle zusammenfassen
+    merged = [list(spans[0])]
+    for start, end in spans[1:]:
+        if start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    # Kumulierte Ausfallzeit als stückweise lineare Funktion der Zeit
+    points = np.array(merged, dtype=np.float64)
+    durations = points[:, 1] - points[:, 0]
+    before = np.concatenate(([0.0], np.cumsum(durations)[:-1]))
+    xs = points.ravel()
+    ys = np.column_stack((before, before + durations)).ravel()
+    down = np.interp(ts_ms, xs, ys)
+    return np.diff(down)
+
+
+def integrate_windows(
+    ts_ms: "np.ndarray",
+    values: "np.ndarray",
+    edges_ms: Sequence[float],
+    method: str = INTEGRATION_METHOD,
+    max_gap_s: float = INTEGRATION_MAX_GAP,
+    outages: Sequence[Outage] = (),
+    hold_until_ms: Optional[float] = None
+) -> "np.ndarray":
+    """Integriert über aufeinanderfolgende Fenster [edges[i], edges[i+1])
+
+    Intervalle, die eine Fenstergrenze überspannen, werden anteilig
+    (linear) aufgeteilt. Der letzte Wert gilt bis hold_until_ms (z.B. bis
+    zur letzten Erfassung), falls kein späterer Messwert folgt. Gibt die
+    Energie pro Fenster zurück.
+    """
+    edges = np.asarray(edges_ms, dtype=np.float64)
+    if len(ts_ms) and hold_until_ms is not None and hold_until_ms > ts_ms[-1]:
+        ts_ms = np.append(ts_ms, float(hold_until_ms))
+        values = np.append(values, values[-1])
+    if len(ts_ms) < 2:
+        return np.zeros(max(len(edges) - 1, 0))
+    cumulative = cumulative_energy(ts_ms, values, method, max_gap_s, outages)
+    return np.diff(np.interp(edges, ts_ms, cumulative))
+
+
+def integrate(
+    ts_ms: "np.ndarray",
+    values: "np.ndarray",
+    method: str = INTEGRATION_METHOD,
+    max_gap_s: float = INTEGRATION_MAX_GAP,
+    outages: Sequence[Outage] = ()
+) -> float:
+    """Integriert alle Werte zu einer Energie (Einheit der Werte * h)"""
+    cumulative = cumulative_energy(ts_ms, values, method, max_gap_s, outages)
+    return float(cumulative[-1]) if len(cumulative) else 0.0
+
+
+def window_stats(
+    ts_ms: "np.ndarray",
+    edges_ms: Sequence[float]
+) -> Dict[str, Any]:
+    """Anzahl Messwerte und größte Lücke (Sekunden) pro Fenster"""
+    edges = np.asarray(edges_ms, dtype=np.float64)
+    windows = len(edges) - 1
+    # Fenster pro Messwert, -1 bzw. windows für Werte außerhalb
+    index = np.searchsorted(edges, ts_ms, side="right") - 1
+    inside = (index >= 0) & (index < windows)
+    samples = np.bincount(index[inside], minlength=windows)
+
+    gaps = np.full(windows, np.nan)
+    if len(ts_ms) >= 2:
+        gap_s = np.diff(ts_ms) / 1000.0
+        # Lücke wird dem Fenster des späteren Messwerts zugerechnet
+        gap_index = index[1:]
+        valid = inside[1:]
+        np.fmax.at(gaps, gap_index[valid], gap_s[valid])
+    return {"samples": samples, "max_gap_s": gaps}
+
+
+def power_factor(unit: Optional[str]) -> Optional[float]:
+    """Umrechnungsfaktor nach kW, None wenn die Einheit keine Leistung ist"""
+    return POWER_UNIT_FACTORS.get(unit)
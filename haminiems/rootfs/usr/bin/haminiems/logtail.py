@@ -0,0 +1,207 @@
+"""Lesen der Log-Datei vom Ende für die Logs-Seite von HAminiEMS"""
+
+import logging
+import os
+import re
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .const import LOG_BLOCK_SIZE, LOG_PAGE_SIZE
+
+# Format aus setup_logging: "2024-01-15 10:30:00,123 - haminiems.main - INFO - Nachricht"
+# (Zeilen ohne Logger-Namen werden ebenfalls erkannt)
+LOG_LINE = re.compile(
+    r"(\d{4}-\d{2}-\d{2}) (\d{2}:\d{2}:\d{2}),(\d{3}) - (?:(\S+) - )?"
+    r"(DEBUG|INFO|WARNING|ERROR|CRITICAL) - (.*)"
+)
+
+
+def level_number(name: str) -> Optional[int]:
+    """Numerischer Log-Level zu einem Namen (None wenn unbekannt)"""
+    value = logging.getLevelName(name.upper())
+    return value if isinstance(value, int) else None
+
+
+def read_lines_reverse(
+    f: BinaryIO,
+    end: int,
+    start: int = 0,
+    block_size: int = LOG_BLOCK_SIZE
+) -> Iterator[bytes]:
+    """Liefert die Zeilen zwischen start und end von hinten nach vorne
+
+    Es werden nur so viele Blöcke gelesen, wie der Aufrufer Zeilen abnimmt.
+    """
+    position = end
+    remainder = b""
+    while position > start:
+        size = min(block_size, position - start)
+        position -= size
+        f.seek(position)
+        lines = (f.read(size) + remainder).split(b"\n")
+        # Die erste Zeile kann im vorherigen Block beginnen
+        remainder = lines.pop(0)
+        for line in reversed(lines):
+            yield line
+    yield remainder
+
+
+def complete_end(f: BinaryIO, size: int, block_size: int = LOG_BLOCK_SIZE) -> int:
+    """Position hinter der letzten vollständigen Zeile (ohne gerade geschriebene Zeile)"""
+    f.seek(max(0, size - block_size))
+    tail = f.read()
+    index = tail.rfind(b"\n")
+    return size if index < 0 else size - len(tail) + index + 1
+
+
+def collect_entries(
+    lines: Iterable[bytes],
+    limit: int,
+    min_level: Optional[int] = None,
+    since: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Baut aus Zeilen (neueste zuerst) bis zu `limit` Einträge, älteste zuerst
+
+    Folgezeilen ohne Zeitstempel (z.B. Tracebacks) gehören zum Eintrag
+    davor. Da die Datei zeitlich sortiert ist, endet die Suche beim ersten
+    Eintrag vor `since` (Format wie "timestamp").
+    """
+    entries: List[Dict[str, Any]] = []
+    continuation: List[str] = []
+    for raw in lines:
+        line = raw.decode("utf-8", errors="replace").rstrip("\r")
+        match = LOG_LINE.fullmatch(line)
+        if match is None:
+            if line:
+                continuation.append(line)
+            continue
+
+        day, time_of_day, millis, name, level, message = match.groups()
+        if continuation:
+            message = "\n".join([message] + continuation[::-1])
+            continuation = []
+        timestamp = f"{day}T{time_of_day}.{millis}"
+        if since is not None and timestamp < since:
+            return entries[::-1]
+        if min_level is not None and logging.getLevelName(level) < min_level:
+            continue
+        entries.append({
+            "timestamp": timestamp,
+            "level": level,
+            "logger": name or "",
+            "message": message,
+        })
+        if len(entries) >= limit:
+            return entries[::-1]
+
+    # Zeilen ohne Kopfzeile am Anfang des gelesenen Bereichs
+    if continuation and since is None and (min_level is None or min_level <= logging.INFO):
+        entries.append({
+            "timestamp": "",
+            "level": "INFO",
+            "logger": "",
+            "message": "\n".join(continuation[::-1]),
+        })
+    return entries[::-1]
+
+
+def read_entries_forward(
+    f: BinaryIO,
+    start: int,
+    end: int,
+    limit: int,
+    min_level: Optional[int] = None,
+    since: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], int, bool]:
+    """Liest ab start bis zu `limit` Einträge vorwärts (älteste zuerst)
+
+    Gibt die Einträge, die Position hinter dem letzten gelieferten Eintrag
+    (samt Folgezeilen) und ob danach weitere Einträge folgen zurück.
+    """
+    entries: List[Dict[str, Any]] = []
+    current: Optional[Dict[str, Any]] = None
+    f.seek(start)
+    position = start
+    while position < end:
+        raw = f.readline(end - position)
+        line_start, position = position, position + len(raw)
+        line = raw.rstrip(b"\n").decode("utf-8", errors="replace").rstrip("\r")
+        match = LOG_LINE.fullmatch(line)
+        if match is None:
+            if not line:
+                continue
+            if current is not None:
+                current["message"] += "\n" + line
+            elif not entries and since is None and (min_level is None or min_level <= logging.INFO):
+                # Zeilen ohne Kopfzeile am Anfang des gelesenen Bereichs
+                current = {"timestamp": "", "level": "INFO", "logger": "", "message": line}
+                entries.append(current)
+            continue
+
+        day, time_of_day, millis, name, level, message = match.groups()
+        timestamp = f"{day}T{time_of_day}.{millis}"
+        if (since is not None and timestamp < since) or (
+            min_level is not None and logging.getLevelName(level) < min_level
+        ):
+            # Folgezeilen ausgelassener Einträge ebenfalls überspringen
+            current = None
+            continue
+        if len(entries) >= limit:
+            return entries, line_start, True
+        current = {
+            "timestamp": timestamp,
+            "level": level,
+            "logger": name or "",
+            "message": message,
+        }
+        entries.append(current)
+    return entries, end, False
+
+
+def parse_cursor(cursor: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Zerlegt einen Cursor "<inode>:<offset>" (None wenn ungültig)"""
+    try:
+        inode, offset = cursor.split(":")
+        return int(inode), int(offset)
+    except (AttributeError, ValueError):
+        return None
+
+
+def tail_logs(
+    path: str,
+    limit: int = LOG_PAGE_SIZE,
+    min_level: Optional[int] = None,
+    since: Optional[str] = None,
+    cursor: Optional[str] = None
+) -> Dict[str, Any]:
+    """Gibt die neuesten Log-Einträge zurück (älteste zuerst)
+
+    Gelesen wird blockweise vom Dateiende, die Dauer hängt daher von
+    `limit` und nicht von der Dateigröße ab. Mit dem Cursor einer
+    vorherigen Antwort werden die seitdem geschriebenen Einträge ab dem
+    Cursor vorwärts geliefert, höchstens `limit`; more=True bedeutet, dass
+    ab dem neuen Cursor weitere folgen. Wurde die Datei inzwischen rotiert
+    oder geleert, kommen wieder die neuesten (reset=True).
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return {"entries": [], "cursor": None, "reset": False, "more": False}
+
+    reset = False
+    with open(path, "rb") as f:
+        end = complete_end(f, stat.st_size)
+        if cursor is not None:
+            position = parse_cursor(cursor)
+            if position is not None and position[0] == stat.st_ino and position[1] <= end:
+                entries, end, more = read_entries_forward(
+                    f, position[1], end, limit, min_level, since
+                )
+                return {
+                    "entries": entries,
+                    "cursor": f"{stat.st_ino}:{end}",
+                    "reset": False,
+                    "more": more,
+                }
+            reset = True
+        entries = collect_entries(read_lines_reverse(f, end), limit, min_level, since)
+    return {"entries": entries, "cursor": f"{stat.st_ino}:{end}", "reset": reset, "more": False}
@@ -2,9 +2,13 @@
 
 import os
 import sys
+import time
+import atexit
 import logging
-from flask import Flask, render_template, jsonify, request
-from typing import Dict, Any
+import threading
+from datetime import date, datetime
+from flask import Flask, Response, g, render_template, jsonify, request, send_file
+from typing import Dict, Any, Tuple
 
 # bashio importieren (verfügbar in Home Assistant Add-Ons)
 try:
@@ -33,12 +37,51 @@ except ImportError:
             return default
     bashio = BashioMock()
 
-from .utils import setup_logging
+from .utils import setup_logging, parse_bool, parse_datetime
 from .database import get_database
 from .ha_client import HAClient
 from .sensors import SensorManager
 from .calculations import CalculationEngine
-from .const import DEFAULT_REFRESH_INTERVAL
+from .catalog import EntityCatalog
+from .collector import DataCollector
+from .fastjson import HAS_ORJSON, OrjsonProvider
+from .logtail import level_number, tail_logs
+from .metrics import CONTENT_TYPE, HTTP_REQUEST_SECONDS, REGISTRY
+from .profiling import PROFILER
+from .server import run_server
+from .stream import EventBroadcaster
+from .maintenance import (
+    HistoryBackfillTask,
+    LegacyImportTask,
+    MaintenanceWorker,
+    RetentionTask,
+    RollupBackfillTask,
+    StatisticsTask,
+    VacuumTask,
+)
+from .const import (
+    CATALOG_PAGE_SIZE,
+    DB_CACHE_SIZE,
+    DB_MMAP_SIZE,
+    DB_READ_POOL_SIZE,
+    DB_SYNCHRONOUS,
+    DB_TEMP_STORE,
+    DEFAULT_HA_REQUEST_TIMEOUT,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_REFRESH_INTERVAL,
+    DEFAULT_RETENTION_DAYS,
+    DEFAULT_SERVER,
+    DEFAULT_SERVER_THREADS,
+    DEFAULT_SNAPSHOT_MODE,
+    DEFAULT_WRITE_BUFFER_SECONDS,
+    HISTORY_BACKFILL_DAYS,
+    LOG_FILE,
+    LOG_PAGE_SIZE,
+    LOG_PAGE_SIZE_MAX,
+    PROFILE_SAMPLE_RATE,
+    SNAPSHOT_MODES,
+    TRUSTED_ADDRESSES,
+)
 
 # Logging einrichten
 logger = setup_logging()
@@ -53,16 +96,29 @@ app = Flask(
     template_folder=str(BASE_DIR / "templates"),
     static_folder=str(BASE_DIR / "static")
 )
+# Schnellere JSON-Antworten, falls orjson installiert ist
+if HAS_ORJSON:
+    app.json = OrjsonProvider(app)
 
 # Globale Instanzen
 ha_client: HAClient = None
 sensor_manager: SensorManager = None
 calculation_engine: CalculationEngine = None
+data_collector: DataCollector = None
+maintenance_worker: MaintenanceWorker = None
+event_broadcaster: EventBroadcaster = None
+entity_catalog: EntityCatalog = None
+history_backfill: HistoryBackfillTask = None
+# shutdown_app läuft über atexit und beim Stoppen des Servers
+_shutdown_lock = threading.Lock()
+_shut_down = False
 
 
 def init_app():
     """Initialisiert die Anwendung"""
-    global ha_client, sensor_manager, calculation_engine
+    global ha_client, sensor_manager, calculation_engine, data_collector, maintenance_worker
+    global event_broadcaster, entity_catalog, history_backfill, _shut_down
+    _shut_down = False
 
     # Konfiguration aus Home Assistant lesen
     ha_url = bashio.config("ha_url", "http://supervisor/core")
@@ -114,10 +170,46 @@ def init_app():
         else:
             logger.info("Verwende SUPERVISOR_TOKEN für Home Assistant Verbindung")
 
+    snapshot_mode = bashio.config("snapshot_mode", DEFAULT_SNAPSHOT_MODE)
+    if snapshot_mode not in SNAPSHOT_MODES:
+        logger.warning(
+            f"Unbekannter snapshot_mode '{snapshot_mode}', "
+            f"verwende '{DEFAULT_SNAPSHOT_MODE}'"
+        )
+        snapshot_mode = DEFAULT_SNAPSHOT_MODE
+
+    refresh_interval = int(bashio.config("refresh_interval", DEFAULT_REFRESH_INTERVAL))
+
+    # State-Cache lebt standardmäßig so lange wie ein Refresh-Intervall
+    cache_ttl = float(bashio.config("cache_ttl", refresh_interval))
+
     # Clients initialisieren
-    ha_client = HAClient(ha_url, ha_token)
+    ha_client = HAClient(
+        ha_url,
+        ha_token,
+        cache_ttl=cache_ttl,
+        max_concurrency=int(bashio.config("ha_max_concurrency", DEFAULT_MAX_CONCURRENCY)),
+        request_timeout=float(bashio.config("ha_request_timeout", DEFAULT_HA_REQUEST_TIMEOUT)),
+        use_async=parse_bool(bashio.config("ha_async", True), default=True),
+    )
+    get_database(
+        read_pool_size=int(bashio.config("db_read_pool_size", DB_READ_POOL_SIZE)),
+        synchronous=bashio.config("db_synchronous", DB_SYNCHRONOUS),
+        cache_size=-int(bashio.config("db_cache_size_kb", -DB_CACHE_SIZE)),
+        mmap_size=int(bashio.config("db_mmap_size_mb", DB_MMAP_SIZE // (1024 * 1024))) * 1024 * 1024,
+        temp_store=bashio.config("db_temp_store", DB_TEMP_STORE),
+    )
     sensor_manager = SensorManager()
-    calculation_engine = CalculationEngine(ha_client, sensor_manager)
+    sensor_manager.raw_spacing = refresh_interval
+    write_buffer_rows = int(bashio.config("write_buffer_rows", 0))
+    if write_buffer_rows > 0:
+        sensor_manager.enable_write_buffer(
+            write_buffer_rows,
+            float(bashio.config("write_buffer_seconds", DEFAULT_WRITE_BUFFER_SECONDS))
+        )
+    calculation_engine = CalculationEngine(
+        ha_client, sensor_manager, snapshot_mode=snapshot_mode
+    )
 
     # Verbindung testen
     if ha_client.test_connection():
@@ -125,9 +217,202 @@ def init_app():
     else:
         logger.warning("Home Assistant Verbindung fehlgeschlagen")
 
+    # Energie-Entities für die Konfiguration (aktualisiert im Hintergrund)
+    entity_catalog = EntityCatalog(ha_client)
+
+    # Live-States über WebSocket (Fallback: REST)
+    if parse_bool(bashio.config("websocket", True), default=True):
+        ha_client.enable_websocket(
+            get_tracked_entity_ids(),
+            event_listeners={"entity_registry_updated": entity_catalog.invalidate},
+        )
+
+    # Optionales Profiling (zur Laufzeit über /api/profiling umschaltbar)
+    PROFILER.configure(
+        parse_bool(bashio.config("profiling", False)),
+        float(bashio.config("profiling_sample_rate", PROFILE_SAMPLE_RATE)),
+    )
+
+    # Datenerfassung im Hintergrund starten
+    data_collector = DataCollector(
+        calculation_engine, sensor_manager, interval=refresh_interval
+    )
+    # Änderungen per Server-Sent Events an alle Dashboards verteilen
+    event_broadcaster = EventBroadcaster()
+    data_collector.add_listener(publish_state)
+    data_collector.start()
+
+    # Datenbank-Wartung (z.B. Übernahme von Altdaten) im Hintergrund
+    maintenance_worker = MaintenanceWorker()
+    legacy_import = LegacyImportTask(sensor_manager)
+    if legacy_import.pending():
+        maintenance_worker.add(legacy_import)
+    rollup_backfill = RollupBackfillTask(sensor_manager)
+    if rollup_backfill.pending():
+        maintenance_worker.add(rollup_backfill)
+    vacuum = VacuumTask(sensor_manager)
+    if vacuum.pending():
+        maintenance_worker.add(vacuum)
+    retention_days = {
+        tier: int(bashio.config(f"retention_{tier}_days", days))
+        for tier, days in DEFAULT_RETENTION_DAYS.items()
+    }
+    statistics = StatisticsTask(calculation_engine.energy_statistics, sensor_manager)
+    maintenance_worker.add(statistics)
+    maintenance_worker.add(RetentionTask(sensor_manager.db, retention_days, statistics=statistics))
+    # Verlauf neu aktivierter Sensoren aus dem Recorder nachladen
+    backfill_days = int(bashio.config("history_backfill_days", HISTORY_BACKFILL_DAYS))
+    if backfill_days > 0:
+        history_backfill = HistoryBackfillTask(
+            ha_client, sensor_manager, calculation_engine.energy_statistics, days=backfill_days
+        )
+        maintenance_worker.add(history_backfill)
+    maintenance_worker.start()
+    register_metrics()
+    atexit.register(shutdown_app)
+
     logger.info("HAminiEMS initialisiert")
 
 
+def shutdown_app():
+    """Stoppt Hintergrund-Threads und schließt Verbindungen (nur beim ersten Aufruf)
+
+    Die Instanzen bleiben erhalten, da laufende Anfragen und die Callbacks
+    von /metrics sie bis zum Ende des Prozesses lesen.
+    """
+    global _shut_down
+    with _shutdown_lock:
+        if _shut_down:
+            return
+        _shut_down = True
+
+    # Zuerst die Threads, die Werte erfassen und an den Stream verteilen
+    if data_collector is not None:
+        data_collector.stop()
+    if maintenance_worker is not None:
+        maintenance_worker.stop()
+    if event_broadcaster is not None:
+        event_broadcaster.close()
+    if calculation_engine is not None:
+        calculation_engine.balance.checkpoint()
+    if sensor_manager is not None:
+        # Gepufferte Werte vor dem Beenden schreiben
+        sensor_manager.close()
+    if ha_client is not None:
+        ha_client.close()
+
+
+def publish_state(values: Dict[str, Any], ha_connected: bool):
+    """Verteilt den Stand nach einer Erfassung an die SSE-Clients"""
+    event_broadcaster.publish_state(
+        values, calculation_engine.balance.snapshot(), ha_connected
+    )
+
+
+def register_metrics():
+    """Registriert die beim Abruf von /metrics gelesenen Werte"""
+    db_path = sensor_manager.db.db_path
+    REGISTRY.callback(
+        "haminiems_db_size_bytes", "Größe der Datenbank-Datei",
+        lambda: file_size(db_path),
+    )
+    REGISTRY.callback(
+        "haminiems_db_wal_size_bytes", "Größe der WAL-Datei",
+        lambda: file_size(f"{db_path}-wal"),
+    )
+    REGISTRY.callback(
+        "haminiems_cache_requests_total", "Zugriffe auf den State-Cache nach Ergebnis",
+        lambda: cache_requests(ha_client.cache.stats()), ("cache", "result"), "counter",
+    )
+    REGISTRY.callback(
+        "haminiems_cache_hit_ratio", "Anteil der Cache-Zugriffe ohne Anfrage an Home Assistant",
+        lambda: {(ha_client.cache.name,): ha_client.cache.stats()["hit_rate"]}, ("cache",),
+    )
+    REGISTRY.callback(
+        "haminiems_collector_runs_total", "Erfassungsdurchläufe",
+        lambda: data_collector.runs, metric_type="counter",
+    )
+    REGISTRY.callback(
+        "haminiems_collector_failures_total", "Fehlgeschlagene Erfassungsdurchläufe",
+        lambda: data_collector.failures, metric_type="counter",
+    )
+    REGISTRY.callback(
+        "haminiems_collector_skipped_total", "Übersprungene Erfassungsdurchläufe",
+        lambda: data_collector.skipped, metric_type="counter",
+    )
+    REGISTRY.callback(
+        "haminiems_collector_last_run_age_seconds", "Sekunden seit dem letzten Erfassungsdurchlauf",
+        lambda: (
+            (datetime.now() - data_collector.last_run).total_seconds()
+            if data_collector.last_run else None
+        ),
+    )
+    REGISTRY.callback(
+        "haminiems_ha_available", "Home Assistant erreichbar (Circuit Breaker geschlossen)",
+        lambda: int(ha_client.available),
+    )
+    REGISTRY.callback(
+        "haminiems_stream_subscribers", "Verbundene SSE-Clients",
+        lambda: event_broadcaster.subscribers,
+    )
+
+
+def file_size(path: str) -> int:
+    """Größe einer Datei in Bytes (0 wenn sie nicht existiert)"""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def cache_requests(stats: Dict[str, Any]) -> Dict[tuple, int]:
+    """Cache-Zugriffe je Ergebnis aus den Cache-Statistiken"""
+    return {
+        (stats["name"], result): stats[result]
+        for result in ("hits", "misses", "coalesced")
+    }
+
+
+def get_tracked_entity_ids():
+    """Gibt die Entity-IDs aller aktivierten Sensoren zurück"""
+    return [
+        config["entity_id"]
+        for config in sensor_manager.get_enabled_sensors()
+        if config.get("entity_id")
+    ]
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response: Response) -> Response:
+    """Erfasst die Antwortzeit je Route (Muster, nicht die konkrete URL)"""
+    started = g.pop("request_started", None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started, route, request.method, str(response.status_code)
+        )
+    return response
+
+
+@app.before_request
+def start_request_profile():
+    if PROFILER.enabled:
+        g.profile = PROFILER.start()
+
+
+@app.teardown_request
+def finish_request_profile(error=None):
+    profile = g.pop("profile", None)
+    if profile is not None:
+        route = request.url_rule.rule if request.url_rule is not None else request.path
+        PROFILER.finish(profile, "request", f"{request.method} {route}")
+
+
 @app.route("/")
 def index():
     """Hauptseite"""
@@ -158,8 +443,8 @@ def energy_costs_page():
 def api_entities():
     """Gibt alle konfigurierten Entitäten mit aktuellen Werten zurück"""
     try:
-        values = calculation_engine.get_current_values()
-        return jsonify({"success": True, "data": values})
+        values, status = calculation_engine.get_current_values_with_status()
+        return jsonify({"success": True, "data": values, **status})
     except Exception as e:
         logger.error(f"Fehler bei /api/entities: {e}", exc_info=True)
         return jsonify({"success": False, "error": str(e)}), 500
@@ -171,7 +456,16 @@ def api_entity(entity_id: str):
     try:
         state = ha_client.get_state(entity_id)
         if state:
-            return jsonify({"success": True, "data": state})
+            return jsonify({"success": True, "data": state, "stale": False})
+        if not ha_client.available:
+            # Home Assistant nicht erreichbar: zuletzt bekannten State liefern
+            last_known = ha_client.get_last_known_state(entity_id)
+            if last_known is not None:
+                state, age = last_known
+                return jsonify({
+                    "success": True, "data": state, "stale": True, "age_s": round(age, 1)
+                })
+            return jsonify({"success": False, "error": "Home Assistant nicht erreichbar"}), 503
         return jsonify({"success": False, "error": "Entity nicht gefunden"}), 404
     except Exception as e:
         logger.error(f"Fehler bei /api/entities/{entity_id}: {e}", exc_info=True)
@@ -180,32 +474,65 @@ def api_entity(entity_id: str):
 
 @app.route("/api/config", methods=["GET"])
 def api_get_config():
-    """Gibt die aktuelle Konfiguration zurück"""
+    """Gibt die aktuelle Konfiguration zurück
+
+    Mit entities=0 wird die Liste der verfügbaren Entities weggelassen
+    (Suche über /api/catalog).
+    """
     try:
         configs = sensor_manager.get_all_configs()
-        energy_entities = ha_client.get_energy_entities()
+        with_entities = parse_bool(request.args.get("entities"), default=True)
 
-        return jsonify({
+        return conditional_response(jsonify({
             "success": True,
             "data": {
                 "sensor_configs": configs,
-                "available_entities": [
-                    {
-                        "entity_id": e.get("entity_id"),
-                        "friendly_name": e.get("attributes", {}).get("friendly_name"),
-                        "state_class": e.get("attributes", {}).get("state_class"),
-                        "unit": e.get("attributes", {}).get("unit_of_measurement"),
-                    }
-                    for e in energy_entities
-                ],
+                "available_entities": entity_catalog.entries() if with_entities else None,
                 "sensor_keys": sensor_manager.get_all_sensor_keys(),
+                # Bei nicht erreichbarem HA stammt die Entity-Liste aus dem Cache
+                "entities_stale": not ha_client.available,
             }
-        })
+        }))
     except Exception as e:
         logger.error(f"Fehler bei /api/config: {e}", exc_info=True)
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+@app.route("/api/catalog")
+def api_catalog():
+    """Sucht in den Energie-Entities von Home Assistant (seitenweise)"""
+    try:
+        offset = request.args.get("offset", 0, type=int)
+        limit = request.args.get("limit", CATALOG_PAGE_SIZE, type=int)
+        items, total = entity_catalog.search(
+            domain=request.args.get("domain") or None,
+            unit=request.args.get("unit") or None,
+            state_class=request.args.get("state_class") or None,
+            query=request.args.get("q") or None,
+            offset=offset,
+            limit=limit,
+        )
+        return conditional_response(jsonify({
+            "success": True,
+            "data": items,
+            "total": total,
+            "offset": max(0, offset),
+            "limit": len(items),
+            "stale": not ha_client.available,
+        }))
+    except Exception as e:
+        logger.error(f"Fehler bei /api/catalog: {e}", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+def conditional_response(response: Response) -> Response:
+    """Versieht eine Antwort mit ETag und beantwortet If-None-Match mit 304"""
+    response.add_etag()
+    # Browser fragen jedes Mal nach, übertragen aber nur geänderte Daten
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
+
 @app.route("/api/config", methods=["POST"])
 def api_save_config():
     """Speichert die Konfiguration"""
@@ -214,6 +541,11 @@ def api_save_config():
         configs = data.get("configs", [])
 
         if sensor_manager.save_configs(configs):
+            if ha_client.live_states is not None:
+                ha_client.live_states.set_entity_ids(get_tracked_entity_ids())
+            data_collector.trigger()
+            if history_backfill is not None:
+                maintenance_worker.run_soon(history_backfill)
             return jsonify({"success": True})
         return jsonify({"success": False, "error": "Fehler beim Speichern"}), 500
     except Exception as e:
@@ -228,11 +560,16 @@ def api_data():
         entity_id = request.args.get("entity_id")
         start = request.args.get("start")
         end = request.args.get("end")
+        points = request.args.get("points", type=int)
 
         if not entity_id:
             return jsonify({"success": False, "error": "entity_id fehlt"}), 400
+        if points is not None and points < 1:
+            return jsonify({"success": False, "error": "points muss >= 1 sein"}), 400
 
-        values = sensor_manager.get_entity_values(entity_id, start, end)
+        values = sensor_manager.get_entity_values(
+            entity_id, start, end, max_points=points
+        )
         return jsonify({"success": True, "data": values})
     except Exception as e:
         logger.error(f"Fehler bei /api/data: {e}", exc_info=True)
@@ -244,12 +581,21 @@ def api_calculations():
     """Gibt Berechnungsergebnisse zurück"""
     try:
         calc_type = request.args.get("type", "balance")
+        day = request.args.get("date")
+        try:
+            day = date.fromisoformat(day) if day else None
+        except ValueError:
+            return jsonify({"success": False, "error": "date muss YYYY-MM-DD sein"}), 400
 
         if calc_type == "balance":
             balance = calculation_engine.calculate_energy_balance()
             return jsonify({"success": True, "data": balance})
         elif calc_type == "daily":
-            stats = calculation_engine.get_daily_statistics()
+            stats = calculation_engine.get_daily_statistics(day)
+            return jsonify({"success": True, "data": stats})
+        elif calc_type in ("weekly", "monthly"):
+            period = "week" if calc_type == "weekly" else "month"
+            stats = calculation_engine.get_period_statistics(period, day)
             return jsonify({"success": True, "data": stats})
         else:
             return jsonify({"success": False, "error": "Unbekannter Typ"}), 400
@@ -262,33 +608,12 @@ def api_calculations():
 def api_refresh():
     """Aktualisiert alle Werte von Home Assistant"""
     try:
-        configs = sensor_manager.get_enabled_sensors()
-        updated = 0
-
-        for config in configs:
-            entity_id = config.get("entity_id")
-            if not entity_id:
-                continue
-
-            state = ha_client.get_state(entity_id)
-            if state:
-                value = state.get("state")
-                if value:
-                    from .utils import parse_float, parse_datetime
-                    from datetime import datetime
-
-                    float_value = parse_float(value)
-                    if float_value is not None:
-                        sensor_manager.save_entity_value(
-                            entity_id=entity_id,
-                            value=float_value,
-                            state_class=state.get("attributes", {}).get("state_class"),
-                            unit=state.get("attributes", {}).get("unit_of_measurement"),
-                            timestamp=parse_datetime(state.get("last_updated")) or datetime.now()
-                        )
-                        updated += 1
-
-        return jsonify({"success": True, "updated": updated})
+        result = data_collector.run_once()
+        if result is None:
+            # Ein Erfassungsdurchlauf läuft bereits
+            return jsonify({"success": True, "updated": 0, "skipped": True})
+
+        return jsonify({"success": True, "updated": result["updated"]})
     except Exception as e:
         logger.error(f"Fehler bei /api/refresh: {e}", exc_info=True)
         return jsonify({"success": False, "error": str(e)}), 500
@@ -296,57 +621,213 @@ def api_refresh():
 
 @app.route("/api/health")
 def api_health():
-    """Health-Check Endpunkt"""
+    """Health-Check Endpunkt (ohne Anfrage an Home Assistant)"""
     try:
-        ha_connected = ha_client.test_connection() if ha_client else False
         return jsonify({
             "success": True,
-            "ha_connected": ha_connected,
+            "ha_connected": ha_client.available if ha_client else False,
+            "circuit": ha_client.breaker.state if ha_client else None,
             "status": "ok"
         })
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
 
-@app.route("/api/logs", methods=["GET"])
-def api_get_logs():
-    """Gibt die Logs zurück"""
+@app.route("/api/stream")
+def api_stream():
+    """Sendet Änderungen von Werten, Bilanz und Verbindung als Server-Sent Events"""
+    subscription = event_broadcaster.subscribe()
+    return Response(
+        event_broadcaster.stream(subscription),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Keine Pufferung durch Proxies (z.B. Ingress)
+            "X-Accel-Buffering": "no",
+        }
+    )
+
+
+@app.route("/api/status")
+def api_status():
+    """Gibt interne Status-Informationen zurück"""
     try:
-        # Lese Log-Datei falls vorhanden
-        log_file = "/config/haminiems.log"
-        logs = []
+        return jsonify({
+            "success": True,
+            "data": {
+                "collector": data_collector.status() if data_collector else None,
+                "write_buffer": (
+                    sensor_manager.write_buffer.stats()
+                    if sensor_manager and sensor_manager.write_buffer else None
+                ),
+                "cache": ha_client.cache.stats() if ha_client else None,
+                "breaker": ha_client.breaker.stats() if ha_client else None,
+                "catalog": entity_catalog.stats() if entity_catalog else None,
+                "http": (
+                    ha_client.async_client.stats()
+                    if ha_client and ha_client.async_client else None
+                ),
+                "maintenance": maintenance_worker.status() if maintenance_worker else None,
+                "database": get_database_status() if sensor_manager else None,
+                "websocket": (
+                    ha_client.live_states.stats()
+                    if ha_client and ha_client.live_states else None
+                ),
+                "stream": event_broadcaster.status() if event_broadcaster else None,
+                "profiling": PROFILER.status(),
+            }
+        })
+    except Exception as e:
+        logger.error(f"Fehler bei /api/status: {e}", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route("/metrics")
+def metrics():
+    """Laufzeit-Metriken im Prometheus-Textformat"""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+
+@app.route("/api/profiling", methods=["GET"])
+def api_get_profiling():
+    """Gibt Status und gespeicherte Profile zurück"""
+    try:
+        return jsonify({
+            "success": True,
+            "data": {
+                "status": PROFILER.status(),
+                "profiles": PROFILER.list_profiles(),
+            }
+        })
+    except Exception as e:
+        logger.error(f"Fehler bei /api/profiling: {e}", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+def trusted_request() -> bool:
+    """Prüft ob die Anfrage über Ingress oder lokal im Container kam
+
+    Der Header X-Ingress-Path wäre fälschbar, daher zählt nur der Absender:
+    Ingress-Anfragen kommen immer vom Proxy des Supervisors.
+    """
+    return request.remote_addr in TRUSTED_ADDRESSES
+
+
+def forbidden_response() -> Tuple[Response, int]:
+    """Antwort für Anfragen, die nicht über Ingress kamen"""
+    logger.warning(f"{request.method} {request.path} von {request.remote_addr} abgelehnt")
+    return jsonify({"success": False, "error": "Nur über Home Assistant Ingress erlaubt"}), 403
 
-        if os.path.exists(log_file):
+
+@app.route("/api/profiling", methods=["POST"])
+def api_set_profiling():
+    """Schaltet das Profiling zur Laufzeit ein oder aus (nur über Ingress)"""
+    if not trusted_request():
+        return forbidden_response()
+    try:
+        data = request.get_json(silent=True) or {}
+        enabled = parse_bool(data.get("enabled"), default=PROFILER.enabled)
+        sample_rate = data.get("sample_rate")
+        if sample_rate is not None:
             try:
-                with open(log_file, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                    # Nimm die letzten 100 Zeilen
-                    for line in lines[-100:]:
-                        line = line.strip()
-                        if line:
-                            # Einfaches Parsing der Log-Zeile
-                            # Format: YYYY-MM-DD HH:MM:SS,mmm - LEVEL - MESSAGE
-                            import re
-                            match = re.match(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) - (\w+) - (.+)', line)
-                            if match:
-                                logs.append({
-                                    "timestamp": match.group(1).replace(',', '.'),
-                                    "level": match.group(2),
-                                    "message": match.group(3)
-                                })
-                            else:
-                                logs.append({
-                                    "timestamp": "",
-                                    "level": "INFO",
-                                    "message": line
-                                })
-            except Exception as e:
-                logger.error(f"Fehler beim Lesen der Log-Datei: {e}")
-
-        # Falls keine Logs gefunden, gebe leere Liste zurück
+                sample_rate = float(sample_rate)
+            except (TypeError, ValueError):
+                sample_rate = -1.0
+            if not 0 < sample_rate <= 1:
+                return jsonify({
+                    "success": False, "error": "sample_rate muss zwischen 0 und 1 liegen"
+                }), 400
+        if not PROFILER.configure(enabled, sample_rate):
+            return jsonify({
+                "success": False,
+                "error": f"Verzeichnis {PROFILER.output_dir} nicht beschreibbar"
+            }), 500
+        return jsonify({"success": True, "data": PROFILER.status()})
+    except Exception as e:
+        logger.error(f"Fehler bei POST /api/profiling: {e}", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route("/api/profiling", methods=["DELETE"])
+def api_clear_profiling():
+    """Löscht alle gespeicherten Profile (nur über Ingress)"""
+    if not trusted_request():
+        return forbidden_response()
+    try:
+        return jsonify({"success": True, "deleted": PROFILER.clear()})
+    except Exception as e:
+        logger.error(f"Fehler bei DELETE /api/profiling: {e}", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route("/api/profiling/<profile_id>")
+def api_profile(profile_id: str):
+    """Gibt die Hot-Spot-Übersicht eines Profils zurück"""
+    profile = PROFILER.get_profile(profile_id)
+    if profile is None:
+        return jsonify({"success": False, "error": "Profil nicht gefunden"}), 404
+    return jsonify({"success": True, "data": profile})
+
+
+@app.route("/api/profiling/<profile_id>/raw")
+def api_profile_raw(profile_id: str):
+    """Gibt die Rohdaten eines Profils zurück (.prof oder pyinstrument-HTML)"""
+    path = PROFILER.raw_path(profile_id)
+    if path is None:
+        return jsonify({"success": False, "error": "Profil nicht gefunden"}), 404
+    return send_file(path, as_attachment=path.suffix == ".prof")
+
+
+def get_database_status() -> Dict[str, Any]:
+    """Gibt Größe und Größen-Historie der Datenbank zurück"""
+    stats = sensor_manager.db.storage_stats()
+    stats["history"] = sensor_manager.db.get_meta(RetentionTask.HISTORY_KEY, [])[-30:]
+    return stats
+
+
+@app.route("/api/logs", methods=["GET"])
+def api_get_logs():
+    """Gibt die neuesten Log-Einträge zurück (älteste zuerst)
+
+    Parameter: limit, level (Mindest-Level), since (ISO-Zeitpunkt) und
+    cursor (aus der vorherigen Antwort, liefert nur neue Einträge; bei
+    more=true folgen ab dem neuen Cursor weitere).
+    """
+    try:
+        limit = request.args.get("limit", LOG_PAGE_SIZE, type=int)
+        limit = max(1, min(limit, LOG_PAGE_SIZE_MAX))
+
+        min_level = None
+        level = request.args.get("level")
+        if level:
+            min_level = level_number(level)
+            if min_level is None:
+                return jsonify({"success": False, "error": f"Unbekannter Level: {level}"}), 400
+
+        since = None
+        since_param = request.args.get("since")
+        if since_param:
+            since_dt = parse_datetime(since_param)
+            if since_dt is None:
+                return jsonify({"success": False, "error": "since muss ein ISO-Zeitpunkt sein"}), 400
+            # Die Log-Datei enthält lokale Zeit
+            if since_dt.tzinfo is not None:
+                since_dt = since_dt.astimezone().replace(tzinfo=None)
+            since = since_dt.isoformat(timespec="milliseconds")
+
+        result = tail_logs(
+            LOG_FILE,
+            limit=limit,
+            min_level=min_level,
+            since=since,
+            cursor=request.args.get("cursor"),
+        )
         return jsonify({
             "success": True,
-            "data": logs
+            "data": result["entries"],
+            "cursor": result["cursor"],
+            "reset": result["reset"],
+            "more": result["more"],
         })
     except Exception as e:
         logger.error(f"Fehler bei /api/logs: {e}", exc_info=True)
@@ -357,9 +838,8 @@ def api_get_logs():
 def api_clear_logs():
     """Löscht die Logs"""
     try:
-        log_file = "/config/haminiems.log"
-        if os.path.exists(log_file):
-            with open(log_file, 'w') as f:
+        if os.path.exists(LOG_FILE):
+            with open(LOG_FILE, 'w') as f:
                 f.write('')
         return jsonify({"success": True})
     except Exception as e:
@@ -370,17 +850,20 @@ def api_clear_logs():
 def main():
     """Hauptfunktion - startet den Web-Server"""
     try:
-        init_app()
-
         # Port aus Umgebungsvariable lesen (Home Assistant)
         port = int(os.environ.get("PORT", 8099))
 
         logger.info(f"Starte HAminiEMS Web-Server auf Port {port}")
 
-        app.run(
+        # init_app läuft im Prozess, der die Anfragen bedient
+        run_server(
+            app,
             host="0.0.0.0",
             port=port,
-            debug=False
+            server=bashio.config("server", DEFAULT_SERVER),
+            threads=int(bashio.config("server_threads", DEFAULT_SERVER_THREADS)),
+            on_start=init_app,
+            on_stop=shutdown_app,
         )
     except Exception as e:
         logger.error(f"Fehler beim Starten der Anwendung: {e}", exc_info=True)
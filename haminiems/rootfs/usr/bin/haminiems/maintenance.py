@@ -0,0 +1,886 @@
+"""Hintergrund-Wartung der Datenbank für HAminiEMS"""
+
+import json
+import logging
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .const import (
+    DAY_MS,
+    DB_SIZE_HISTORY_DAYS,
+    DEFAULT_RETENTION_DAYS,
+    HISTORY_BACKFILL_DAYS,
+    HISTORY_BACKFILL_INTERVAL,
+    HISTORY_BACKFILL_MAX_POINTS,
+    HISTORY_BACKFILL_PAUSE,
+    HISTORY_BACKFILL_WINDOW,
+    INCREMENTAL_VACUUM_PAGES,
+    LEGACY_IMPORT_CHUNK,
+    MAINTENANCE_PAUSE,
+    MAINTENANCE_RETRY,
+    RETENTION_CHUNK,
+    RETENTION_INTERVAL,
+    RETENTION_MAX_CHUNK_SECONDS,
+    ROLLUP_BACKFILL_DAYS,
+    ROLLUP_RESOLUTIONS,
+    STATISTICS_CHUNK_DAYS,
+    STATISTICS_INTERVAL,
+    VACUUM_MIN_FREE_RATIO,
+    VACUUM_SMALL_DB_BYTES,
+)
+from .energy_stats import EnergyStatistics
+from .sensors import SensorManager
+from .utils import from_epoch_ms, get_state_class, get_unit, history_values, to_epoch_ms
+
+# Berechnet alle Buckets einer Auflösung im Zeitfenster neu (ersetzt vorhandene)
+REBUILD_ROLLUPS = """
+    WITH buckets AS (
+        SELECT ts - ts % :bucket_ms AS bucket_ts,
+               COUNT(*) AS sample_count, SUM(value) AS value_sum,
+               MIN(value) AS value_min, MAX(value) AS value_max,
+               MIN(ts) AS first_ts, MAX(ts) AS last_ts
+        FROM entity_values
+        WHERE entity_ref = :ref AND ts >= :start AND ts < :end AND value IS NOT NULL
+        GROUP BY bucket_ts
+    )
+    INSERT OR REPLACE INTO entity_rollups (
+        entity_ref, resolution, bucket_ts, sample_count, value_sum,
+        value_min, value_max, first_ts, first_value, last_ts, last_value
+    )
+    SELECT :ref, :resolution, bucket_ts, sample_count, value_sum, value_min, value_max,
+           first_ts, (SELECT value FROM entity_values WHERE entity_ref = :ref AND ts = first_ts),
+           last_ts, (SELECT value FROM entity_values WHERE entity_ref = :ref AND ts = last_ts)
+    FROM buckets
+"""
+
+logger = logging.getLogger("haminiems.maintenance")
+
+
+class MaintenanceTask:
+    """Basisklasse für Wartungsaufgaben, die in kleinen Schritten laufen
+
+    step() erledigt jeweils einen kurzen Arbeitsschritt und gibt True zurück,
+    solange sofort weitere Arbeit ansteht. Aufgaben mit interval=None laufen
+    einmalig bis zum Ende, alle anderen werden nach `interval` Sekunden
+    erneut eingeplant.
+    """
+
+    name = "task"
+    interval: Optional[float] = None
+
+    def __init__(self):
+        self.steps = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.next_run = 0.0
+
+    def ready(self) -> bool:
+        """Prüft ob die Aufgabe jetzt laufen darf (sonst später erneut prüfen)"""
+        return True
+
+    def step(self) -> bool:
+        raise NotImplementedError
+
+    def status(self) -> Dict[str, Any]:
+        """Gibt den Status der Aufgabe zurück"""
+        return {
+            "name": self.name,
+            "steps": self.steps,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+
+class LegacyImportTask(MaintenanceTask):
+    """Übernimmt die Altdaten aus entity_values_legacy (Migration 003)
+
+    Die Zeilen werden von neu nach alt in Blöcken übernommen, damit aktuelle
+    Verläufe zuerst wieder verfügbar sind. Der Fortschritt wird nach jedem
+    Block in app_meta gespeichert, ein Neustart setzt dort wieder an.
+    Danach wird die Alt-Tabelle gelöscht.
+    """
+
+    name = "legacy_import"
+    META_KEY = "legacy_import"
+
+    def __init__(self, sensor_manager: SensorManager, chunk_size: int = LEGACY_IMPORT_CHUNK):
+        super().__init__()
+        self.sensor_manager = sensor_manager
+        self.db = sensor_manager.db
+        self.chunk_size = max(1, chunk_size)
+        self.progress: Dict[str, Any] = {}
+
+    def pending(self) -> bool:
+        """Prüft ob noch Altdaten vorhanden sind"""
+        return self.db.table_exists("entity_values_legacy")
+
+    def step(self) -> bool:
+        if not self.pending():
+            return False
+
+        progress = self.db.get_meta(self.META_KEY)
+        if progress is None:
+            row = self.db.fetch_one(
+                "SELECT MIN(id) AS min_id, MAX(id) AS max_id FROM entity_values_legacy"
+            )
+            progress = {
+                "min_id": row["min_id"] or 0,
+                "max_id": row["max_id"] or 0,
+                "next_id": (row["max_id"] or 0) + 1,
+                "imported": 0,
+            }
+            logger.info("Übernehme Altdaten aus entity_values_legacy im Hintergrund...")
+
+        rows = self.db.fetch_all("""
+            SELECT id, timestamp, entity_id, value, state_class, unit
+            FROM entity_values_legacy
+            WHERE id < ?
+            ORDER BY id DESC
+            LIMIT ?
+        """, (progress["next_id"], self.chunk_size))
+
+        if not rows:
+            self._finish(progress)
+            return False
+
+        params = []
+        for row in rows:
+            ts = to_epoch_ms(row["timestamp"])
+            if ts is None:
+                continue
+            # Vorhandene Metadaten stammen aus neueren Werten und bleiben
+            # erhalten, fehlende werden aus den Altdaten ergänzt
+            meta = self.sensor_manager.get_entity_meta(row["entity_id"])
+            ref = self.sensor_manager.get_entity_ref(
+                row["entity_id"],
+                meta["state_class"] or row["state_class"],
+                meta["unit"] or row["unit"]
+            )
+            params.append((ref, ts, row["value"]))
+
+        progress["next_id"] = rows[-1]["id"]
+        progress["imported"] += len(params)
+
+        # Werte und Fortschritt in derselben Transaktion schreiben
+        with self.db.get_connection() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO entity_values (entity_ref, ts, value) VALUES (?, ?, ?)",
+                params
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO app_meta (key, value) VALUES (?, ?)",
+                (self.META_KEY, json.dumps(progress))
+            )
+
+        self.progress = progress
+        self.steps += 1
+        if self.steps % 20 == 0:
+            logger.info(
+                f"Altdaten-Übernahme: {progress['imported']} Zeilen "
+                f"({self._percent(progress):.0f}%)"
+            )
+        return True
+
+    def _finish(self, progress: Dict[str, Any]):
+        """Löscht die Alt-Tabelle nach vollständiger Übernahme"""
+        with self.db.get_connection() as conn:
+            conn.execute("DROP TABLE IF EXISTS entity_values_legacy")
+            conn.execute("DELETE FROM app_meta WHERE key = ?", (self.META_KEY,))
+        self.progress = dict(progress, next_id=progress["min_id"])
+        logger.info(
+            f"Altdaten-Übernahme abgeschlossen: {progress['imported']} Zeilen"
+        )
+
+    @staticmethod
+    def _percent(progress: Dict[str, Any]) -> float:
+        total = progress["max_id"] - progress["min_id"] + 1
+        if total <= 0:
+            return 100.0
+        done = progress["max_id"] + 1 - progress["next_id"]
+        return min(100.0, 100.0 * done / total)
+
+    def status(self) -> Dict[str, Any]:
+        status = super().status()
+        if self.progress:
+            status["imported"] = self.progress["imported"]
+            status["percent"] = round(self._percent(self.progress), 1)
+        return status
+
+
+class RollupBackfillTask(MaintenanceTask):
+    """Rechnet die Rollups für bereits gespeicherte Messwerte nach (Migration 004)
+
+    Neue Messwerte pflegt der Trigger auf entity_values. Vorhandene werden
+    pro Entity von neu nach alt in Fenstern ganzer Tage neu berechnet; da
+    jeder Bucket vollständig ersetzt wird, ist das Ergebnis auch korrekt,
+    wenn der Trigger den Bucket schon teilweise befüllt hat. Der Fortschritt
+    steht in app_meta.
+    """
+
+    name = "rollup_backfill"
+    META_KEY = "rollup_backfill"
+
+    def __init__(self, sensor_manager: SensorManager, days: int = ROLLUP_BACKFILL_DAYS):
+        super().__init__()
+        self.db = sensor_manager.db
+        self.window_ms = max(1, days) * DAY_MS
+        self.progress: Dict[str, Any] = {}
+
+    def pending(self) -> bool:
+        """Prüft ob das Nachrechnen noch aussteht"""
+        return self.db.get_meta(self.META_KEY) is not None
+
+    def step(self) -> bool:
+        progress = self.db.get_meta(self.META_KEY)
+        if progress is None:
+            return False
+
+        if "entities" not in progress:
+            # Alles vor dem Ende des heutigen Tages nachrechnen
+            now_ms = int(time.time() * 1000)
+            end_of_day = now_ms - now_ms % DAY_MS + DAY_MS
+            rows = self.db.fetch_all("SELECT id FROM entities ORDER BY id")
+            progress = {
+                "entities": [row["id"] for row in rows],
+                "start": end_of_day,
+                "cursor": end_of_day,
+                "windows": 0,
+            }
+            logger.info(
+                f"Berechne Rollups für {len(progress['entities'])} Entities im Hintergrund..."
+            )
+
+        if not progress["entities"]:
+            self.db.execute("DELETE FROM app_meta WHERE key = ?", (self.META_KEY,))
+            self.progress = progress
+            logger.info(f"Rollups berechnet ({progress['windows']} Zeitfenster)")
+            return False
+
+        ref = progress["entities"][0]
+        row = self.db.fetch_one(
+            "SELECT MAX(ts) FROM entity_values WHERE entity_ref = ? AND ts < ?",
+            (ref, progress["cursor"])
+        )
+        latest = row[0]
+
+        with self.db.get_connection() as conn:
+            if latest is None:
+                # Entity fertig, mit der nächsten wieder beim Anfang beginnen
+                progress["entities"].pop(0)
+                progress["cursor"] = progress["start"]
+            else:
+                end = latest - latest % DAY_MS + DAY_MS
+                start = end - self.window_ms
+                for resolution in ROLLUP_RESOLUTIONS.values():
+                    conn.execute(REBUILD_ROLLUPS, {
+                        "bucket_ms": resolution * 1000,
+                        "resolution": resolution,
+                        "ref": ref,
+                        "start": start,
+                        "end": end,
+                    })
+                progress["cursor"] = start
+                progress["windows"] += 1
+            conn.execute(
+                "INSERT OR REPLACE INTO app_meta (key, value) VALUES (?, ?)",
+                (self.META_KEY, json.dumps(progress))
+            )
+
+        self.progress = progress
+        self.steps += 1
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        status = super().status()
+        if self.progress:
+            status["remaining_entities"] = len(self.progress.get("entities", []))
+            status["windows"] = self.progress.get("windows", 0)
+        return status
+
+
+def imports_pending(db) -> bool:
+    """Prüft ob Altdaten-Übernahme oder Rollup-Nachberechnung noch laufen"""
+    return (
+        db.table_exists("entity_values_legacy")
+        or db.get_meta(RollupBackfillTask.META_KEY) is not None
+    )
+
+
+class VacuumTask(MaintenanceTask):
+    """Einmaliges VACUUM nach Migration 005, damit auto_vacuum wirksam wird
+
+    Wartet, bis Altdaten-Übernahme und Rollup-Nachberechnung fertig sind,
+    damit deren frei gewordener Platz gleich mit zurückgegeben wird. Größere
+    Datenbanken werden erst neu aufgebaut, wenn mindestens
+    `VACUUM_MIN_FREE_RATIO` der Seiten frei ist. Während des VACUUM sammelt
+    der Schreibpuffer die Werte der Datenerfassung und schreibt sie danach.
+    """
+
+    name = "vacuum"
+    META_KEY = "vacuum_pending"
+
+    def __init__(
+        self,
+        sensor_manager: SensorManager,
+        min_free_ratio: float = VACUUM_MIN_FREE_RATIO,
+        small_db_bytes: int = VACUUM_SMALL_DB_BYTES
+    ):
+        super().__init__()
+        self.sensor_manager = sensor_manager
+        self.db = sensor_manager.db
+        self.min_free_ratio = min_free_ratio
+        self.small_db_bytes = small_db_bytes
+        self.deferred = False
+
+    def pending(self) -> bool:
+        return bool(self.db.get_meta(self.META_KEY))
+
+    def ready(self) -> bool:
+        if imports_pending(self.db):
+            return False
+        stats = self.db.storage_stats()
+        if stats["auto_vacuum"] == "INCREMENTAL" or self.needed(stats):
+            return True
+        if not self.deferred:
+            logger.info(
+                f"VACUUM zurückgestellt: {stats['free_bytes'] / 1e6:.1f} von "
+                f"{stats['size_bytes'] / 1e6:.1f} MB frei"
+            )
+            self.deferred = True
+        return False
+
+    def needed(self, stats: Dict[str, Any]) -> bool:
+        """Prüft ob sich der Neuaufbau lohnt (kleine Datenbank oder viel freier Platz)"""
+        if stats["auto_vacuum"] == "INCREMENTAL":
+            return False
+        size = stats["size_bytes"]
+        return size <= self.small_db_bytes or stats["free_bytes"] >= size * self.min_free_ratio
+
+    def step(self) -> bool:
+        stats = self.db.storage_stats()
+        if stats["auto_vacuum"] != "INCREMENTAL":
+            logger.info(
+                f"Starte VACUUM ({stats['size_bytes'] / 1e6:.1f} MB), "
+                f"neue Werte werden währenddessen gepuffert..."
+            )
+            started = time.monotonic()
+            with self.sensor_manager.hold_writes():
+                self.db.vacuum()
+            logger.info(
+                f"VACUUM abgeschlossen in {time.monotonic() - started:.1f}s "
+                f"({self.db.storage_stats()['size_bytes'] / 1e6:.1f} MB)"
+            )
+        self.db.execute("DELETE FROM app_meta WHERE key = ?", (self.META_KEY,))
+        self.steps += 1
+        return False
+
+    def status(self) -> Dict[str, Any]:
+        status = super().status()
+        status["deferred"] = self.deferred
+        return status
+
+
+class StatisticsTask(MaintenanceTask):
+    """Speichert die Tagesenergie abgeschlossener Tage in daily_statistics
+
+    Läuft pro konfiguriertem Sensor in Blöcken von `chunk_days` Tagen, älteste
+    zuerst, und danach stündlich für neu abgeschlossene Tage. Abfragen müssen
+    so nur den aktuellen Tag aus den Rohwerten berechnen.
+    """
+
+    name = "statistics"
+    interval = STATISTICS_INTERVAL
+
+    def __init__(
+        self,
+        energy_statistics: EnergyStatistics,
+        sensor_manager: SensorManager,
+        chunk_days: int = STATISTICS_CHUNK_DAYS
+    ):
+        super().__init__()
+        self.energy_statistics = energy_statistics
+        self.sensor_manager = sensor_manager
+        self.db = sensor_manager.db
+        self.chunk_days = max(1, chunk_days)
+        self.caught_up = False
+        self.days_stored = 0
+        self._queue: Optional[List[Tuple[str, Optional[str]]]] = None
+
+    def ready(self) -> bool:
+        return self.energy_statistics.can_store()
+
+    def step(self) -> bool:
+        if self._queue is None:
+            self._queue = [
+                (config["entity_id"], config.get("daily_total"))
+                for config in self.sensor_manager.get_enabled_sensors()
+                if config.get("entity_id")
+            ]
+
+        if self._queue:
+            entity_id, daily_total = self._queue[0]
+            stored = self.energy_statistics.materialize(entity_id, daily_total, self.chunk_days)
+            self.steps += 1
+            self.days_stored += stored
+            if stored < self.chunk_days:
+                self._queue.pop(0)
+            return True
+
+        self._queue = None
+        self.caught_up = True
+        return False
+
+    def status(self) -> Dict[str, Any]:
+        status = super().status()
+        status.update({
+            "caught_up": self.caught_up,
+            "days_stored": self.days_stored,
+        })
+        return status
+
+
+class HistoryBackfillTask(MaintenanceTask):
+    """Lädt den Verlauf neu aktivierter Sensoren aus dem Recorder von Home Assistant
+
+    Pro Entity wird der Zeitraum vor dem ersten gespeicherten Wert (höchstens
+    `days` Tage) von neu nach alt in Zeitfenstern über /api/history/period
+    abgefragt, mit minimal_response und no_attributes. Die Werte eines
+    Fensters werden zusammen mit dem Fortschritt in einer Transaktion
+    geschrieben; ein Neustart setzt in app_meta wieder an. Die Fenstergröße
+    passt sich an die Anzahl der Werte an, zwischen zwei Anfragen wird
+    `pause` Sekunden gewartet.
+    """
+
+    name = "history_backfill"
+    interval = HISTORY_BACKFILL_INTERVAL
+    META_KEY = "history_backfill"
+
+    def __init__(
+        self,
+        ha_client,
+        sensor_manager: SensorManager,
+        energy_statistics: Optional[EnergyStatistics] = None,
+        days: int = HISTORY_BACKFILL_DAYS,
+        window: float = HISTORY_BACKFILL_WINDOW,
+        max_points: int = HISTORY_BACKFILL_MAX_POINTS,
+        pause: float = HISTORY_BACKFILL_PAUSE,
+        clock: Callable[[], float] = time.time
+    ):
+        super().__init__()
+        self.ha_client = ha_client
+        self.sensor_manager = sensor_manager
+        self.energy_statistics = energy_statistics
+        self.db = sensor_manager.db
+        self.days = days
+        self.window_ms = max(60, int(window)) * 1000
+        self.max_points = max(1, max_points)
+        self.pause = pause
+        self.clock = clock
+        self.requests = 0
+        self.progress: Dict[str, Any] = self.db.get_meta(self.META_KEY, {"entities": {}})
+
+    def ready(self) -> bool:
+        # Während eines Ausfalls nicht zusätzlich anfragen
+        return self.ha_client.available
+
+    def step(self) -> bool:
+        if self.days <= 0:
+            return False
+        progress = self._plan()
+        pending = [
+            entity_id for entity_id, job in progress["entities"].items()
+            if not job["done"]
+        ]
+        if not pending:
+            return False
+
+        entity_id = pending[0]
+        job = progress["entities"][entity_id]
+        end = job["cursor"]
+        start = max(job["start"], end - self.window_ms)
+        ref = self._entity_ref(entity_id)
+
+        self.requests += 1
+        states = self.ha_client.get_history(
+            entity_id,
+            from_epoch_ms(start),
+            from_epoch_ms(end),
+            minimal_response=True,
+            no_attributes=True,
+        )
+        if states is None:
+            # Timeout oder Fehler: beim nächsten Versuch kleineres Fenster
+            self.window_ms = max(3600 * 1000, self.window_ms // 2)
+            raise RuntimeError(f"Verlauf von {entity_id} konnte nicht geladen werden")
+
+        rows = [
+            (ref, ts, value)
+            for ts, value in history_values(states)
+            if start <= ts < end
+        ]
+        job["cursor"] = start
+        job["imported"] += len(rows)
+        # Leere Antwort: auch vor dem Fenster kein State mehr im Recorder
+        job["done"] = start <= job["start"] or not states
+
+        # Werte und Fortschritt in derselben Transaktion schreiben
+        with self.db.get_connection() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO entity_values (entity_ref, ts, value) VALUES (?, ?, ?)",
+                rows
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO app_meta (key, value) VALUES (?, ?)",
+                (self.META_KEY, json.dumps(progress))
+            )
+
+        if job["done"]:
+            self._finish(entity_id, ref, job)
+        self._adapt_window(len(rows))
+        self.steps += 1
+        # Home Assistant und Speicherkarte nicht dauerhaft auslasten
+        self.next_run = time.monotonic() + self.pause
+        return True
+
+    def _plan(self) -> Dict[str, Any]:
+        """Nimmt aktivierte Sensoren auf, deren Verlauf noch nicht geladen wurde"""
+        progress = self.progress
+        now_ms = int(self.clock() * 1000)
+        added = False
+        for config in self.sensor_manager.get_enabled_sensors():
+            entity_id = config.get("entity_id")
+            if not entity_id or entity_id in progress["entities"]:
+                continue
+            ref = self.sensor_manager.get_entity_ref(entity_id, create=False)
+            first_ts = None
+            if ref is not None:
+                first_ts = self.db.fetch_one(
+                    "SELECT MIN(ts) FROM entity_values WHERE entity_ref = ?", (ref,)
+                )[0]
+            start = now_ms - self.days * DAY_MS
+            end = first_ts if first_ts is not None else now_ms
+            progress["entities"][entity_id] = {
+                "start": start,
+                "cursor": end,
+                "imported": 0,
+                "done": end <= start,
+            }
+            added = True
+            if end > start:
+                logger.info(
+                    f"Lade Verlauf von {entity_id} ({(end - start) / DAY_MS:.1f} Tage) "
+                    f"aus Home Assistant im Hintergrund..."
+                )
+        if added:
+            self.db.set_meta(self.META_KEY, progress)
+        return progress
+
+    def _entity_ref(self, entity_id: str) -> int:
+        """ID der Entity, neue Entities mit Metadaten aus Home Assistant anlegen"""
+        ref = self.sensor_manager.get_entity_ref(entity_id, create=False)
+        if ref is not None:
+            return ref
+        state = self.ha_client.get_state(entity_id)
+        if state is None:
+            raise RuntimeError(f"Entity {entity_id} in Home Assistant nicht gefunden")
+        return self.sensor_manager.get_entity_ref(
+            entity_id, get_state_class(state), get_unit(state)
+        )
+
+    def _adapt_window(self, points: int):
+        """Passt die Fenstergröße an die Anzahl Werte pro Fenster an"""
+        if points > self.max_points:
+            self.window_ms = max(3600 * 1000, self.window_ms // 2)
+        elif points < self.max_points / 4:
+            self.window_ms = min(7 * DAY_MS, self.window_ms * 2)
+
+    def _finish(self, entity_id: str, ref: int, job: Dict[str, Any]):
+        """Verwirft die Tagesstatistiken ab dem ältesten geladenen Tag"""
+        if job["imported"] and self.energy_statistics is not None:
+            since = datetime.fromtimestamp(job["cursor"] / 1000).date()
+            self.energy_statistics.invalidate(ref, since)
+        logger.info(f"Verlauf von {entity_id} geladen: {job['imported']} Werte")
+
+    def status(self) -> Dict[str, Any]:
+        status = super().status()
+        jobs = self.progress["entities"].values()
+        status.update({
+            "days": self.days,
+            "pending_entities": sum(1 for job in jobs if not job["done"]),
+            "imported": sum(job["imported"] for job in jobs),
+            "requests": self.requests,
+            "window_hours": round(self.window_ms / 3600000, 1),
+        })
+        return status
+
+
+class RetentionTask(MaintenanceTask):
+    """Löscht Rohwerte und Rollups, die älter als die Aufbewahrungsdauer sind
+
+    Gelöscht wird pro Entity und Stufe in kleinen Blöcken, jeder Block in
+    einer eigenen kurzen Transaktion. Die Blockgröße wird so angepasst, dass
+    ein Block etwa `max_chunk_seconds` dauert. Anschließend wird der frei
+    gewordene Speicher per incremental_vacuum zurückgegeben. Gelöschte
+    Zeilen und die Datenbankgröße pro Tag werden in app_meta festgehalten.
+    """
+
+    name = "retention"
+    interval = RETENTION_INTERVAL
+    META_KEY = "retention"
+    HISTORY_KEY = "db_size_history"
+
+    def __init__(
+        self,
+        db,
+        retention_days: Optional[Dict[str, int]] = None,
+        chunk_size: int = RETENTION_CHUNK,
+        max_chunk_seconds: float = RETENTION_MAX_CHUNK_SECONDS,
+        clock: Callable[[], float] = time.time,
+        statistics: Optional[StatisticsTask] = None
+    ):
+        super().__init__()
+        self.db = db
+        self.statistics = statistics
+        self.clock = clock
+        self.retention_days = dict(DEFAULT_RETENTION_DAYS)
+        self.retention_days.update(retention_days or {})
+        self.chunk_size = max(1, chunk_size)
+        self.max_chunk_seconds = max_chunk_seconds
+        self.max_chunk_ms = 0.0
+        self.last_run: Optional[float] = None
+        self.last_pruned = 0
+        self._jobs: Optional[List[Tuple[str, int, int]]] = None
+        self._run_pruned = 0
+        self._run_started = 0.0
+        self.totals = db.get_meta(self.META_KEY, {"raw": 0, "rollups": 0})
+
+    def ready(self) -> bool:
+        # Rohwerte erst löschen, wenn sie in Rollups und Tagesstatistiken
+        # eingerechnet sind
+        if self.statistics is not None and not self.statistics.caught_up:
+            return False
+        return not imports_pending(self.db)
+
+    def step(self) -> bool:
+        if self._jobs is None:
+            self._jobs = self._plan()
+            self._run_pruned = 0
+            self._run_started = time.monotonic()
+
+        if self._jobs:
+            tier, ref, cutoff = self._jobs[0]
+            if not self._delete_chunk(tier, ref, cutoff):
+                self._jobs.pop(0)
+            return True
+
+        if self.db.storage_stats()["auto_vacuum"] == "INCREMENTAL":
+            if self.db.incremental_vacuum(INCREMENTAL_VACUUM_PAGES) > 0:
+                return True
+
+        self._finish()
+        return False
+
+    def _plan(self) -> List[Tuple[str, int, int]]:
+        """Erstellt die Liste (Stufe, Entity, Grenze) für einen Lauf"""
+        now_ms = int(self.clock() * 1000)
+        refs = [row["id"] for row in self.db.fetch_all("SELECT id FROM entities ORDER BY id")]
+        jobs = []
+        for tier, days in self.retention_days.items():
+            if not days or days <= 0:
+                continue
+            # Grenze auf Tagesanfang (UTC), damit Rohwerte tageweise enden
+            cutoff = now_ms - days * DAY_MS
+            cutoff -= cutoff % DAY_MS
+            jobs.extend((tier, ref, cutoff) for ref in refs)
+        return jobs
+
+    def _delete_chunk(self, tier: str, ref: int, cutoff: int) -> bool:
+        """Löscht einen Block und passt die Blockgröße an die Dauer an
+
+        Gibt True zurück, wenn noch weitere Zeilen zu löschen sein können.
+        """
+        started = time.monotonic()
+        if tier == "raw":
+            cursor = self.db.execute("""
+                DELETE FROM entity_values
+                WHERE entity_ref = ? AND ts IN (
+                    SELECT ts FROM entity_values
+                    WHERE entity_ref = ? AND ts < ?
+                    ORDER BY ts LIMIT ?
+                )
+            """, (ref, ref, cutoff, self.chunk_size))
+        else:
+            resolution = ROLLUP_RESOLUTIONS[tier]
+            cursor = self.db.execute("""
+                DELETE FROM entity_rollups
+                WHERE entity_ref = ? AND resolution = ? AND bucket_ts IN (
+                    SELECT bucket_ts FROM entity_rollups
+                    WHERE entity_ref = ? AND resolution = ? AND bucket_ts < ?
+                    ORDER BY bucket_ts LIMIT ?
+                )
+            """, (ref, resolution, ref, resolution, cutoff, self.chunk_size))
+        elapsed = time.monotonic() - started
+        deleted = cursor.rowcount
+        chunk_size = self.chunk_size
+
+        self.steps += 1
+        self.max_chunk_ms = max(self.max_chunk_ms, elapsed * 1000)
+        self._run_pruned += deleted
+        self.totals["raw" if tier == "raw" else "rollups"] += deleted
+
+        if deleted < chunk_size:
+            return False
+        if elapsed > self.max_chunk_seconds:
+            self.chunk_size = max(100, chunk_size // 2)
+        elif elapsed < self.max_chunk_seconds / 4:
+            self.chunk_size = min(50000, chunk_size * 2)
+        return True
+
+    def _finish(self):
+        """Schließt einen Lauf ab und speichert Zähler und Größen-Historie"""
+        self._jobs = None
+        self.last_run = self.clock()
+        self.last_pruned = self._run_pruned
+        duration = time.monotonic() - self._run_started
+
+        stats = self.db.storage_stats()
+        history = self.db.get_meta(self.HISTORY_KEY, [])
+        today = date.fromtimestamp(self.last_run).isoformat()
+        pruned_today = self._run_pruned
+        if history and history[-1]["date"] == today:
+            pruned_today += history[-1].get("pruned", 0)
+            history.pop()
+        history.append({
+            "date": today,
+            "size_bytes": stats["size_bytes"],
+            "pruned": pruned_today,
+        })
+        self.db.set_meta(self.HISTORY_KEY, history[-DB_SIZE_HISTORY_DAYS:])
+        self.db.set_meta(self.META_KEY, self.totals)
+
+        if self._run_pruned:
+            logger.info(
+                f"Aufräumen: {self._run_pruned} Zeilen gelöscht in {duration:.1f}s "
+                f"(Datenbank: {stats['size_bytes'] / 1e6:.1f} MB)"
+            )
+
+    def status(self) -> Dict[str, Any]:
+        status = super().status()
+        status.update({
+            "retention_days": self.retention_days,
+            "pruned_total": self.totals,
+            "last_pruned": self.last_pruned,
+            "last_run": (
+                datetime.fromtimestamp(self.last_run).isoformat()
+                if self.last_run else None
+            ),
+            "chunk_size": self.chunk_size,
+            "max_chunk_ms": round(self.max_chunk_ms, 1),
+        })
+        return status
+
+
+class MaintenanceWorker:
+    """Führt Wartungsaufgaben in einem Hintergrund-Thread aus
+
+    Zwischen zwei Arbeitsschritten wird kurz pausiert, damit die
+    Datenerfassung und API-Anfragen die Schreib-Verbindung nicht lange
+    entbehren müssen.
+    """
+
+    def __init__(self, pause: float = MAINTENANCE_PAUSE, retry: float = MAINTENANCE_RETRY):
+        self.pause = pause
+        self.retry = retry
+        self.tasks: List[MaintenanceTask] = []
+        self.finished: List[str] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, task: MaintenanceTask):
+        """Plant eine Aufgabe ein"""
+        with self._lock:
+            self.tasks.append(task)
+        self._wake.set()
+
+    def run_soon(self, task: MaintenanceTask):
+        """Führt eine eingeplante Aufgabe ohne Wartezeit aus (z.B. nach Konfigurationsänderung)"""
+        task.next_run = 0.0
+        self._wake.set()
+
+    def start(self):
+        """Startet den Hintergrund-Thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, name="maintenance", daemon=True
+        )
+        self._thread.start()
+        logger.info("Datenbank-Wartung gestartet")
+
+    def stop(self, timeout: float = 10.0):
+        """Stoppt den Hintergrund-Thread nach dem aktuellen Schritt"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+        logger.info("Datenbank-Wartung gestoppt")
+
+    def _loop(self):
+        while not self._stop.is_set():
+            now = time.monotonic()
+            with self._lock:
+                due = [task for task in self.tasks if task.next_run <= now]
+                upcoming = [task.next_run for task in self.tasks if task.next_run > now]
+
+            if not due:
+                timeout = min(upcoming) - now if upcoming else None
+                self._wake.wait(timeout)
+                self._wake.clear()
+                continue
+
+            for task in due:
+                if self._stop.is_set():
+                    break
+                self._run_step(task)
+
+            self._stop.wait(self.pause)
+
+    def _run_step(self, task: MaintenanceTask):
+        """Führt einen Schritt aus und plant die Aufgabe neu ein"""
+        try:
+            if not task.ready():
+                task.next_run = time.monotonic() + self.retry
+                return
+            more = task.step()
+        except Exception as e:
+            task.errors += 1
+            task.last_error = str(e)
+            task.next_run = time.monotonic() + self.retry
+            logger.error(f"Fehler bei Wartungsaufgabe {task.name}: {e}", exc_info=True)
+            return
+
+        if more:
+            return
+        if task.interval is None:
+            with self._lock:
+                self.tasks.remove(task)
+                self.finished.append(task.name)
+        else:
+            task.next_run = time.monotonic() + task.interval
+
+    def status(self) -> Dict[str, Any]:
+        """Gibt den Status der Wartung zurück"""
+        with self._lock:
+            tasks = [task.status() for task in self.tasks]
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "tasks": tasks,
+            "finished": list(self.finished),
+        }
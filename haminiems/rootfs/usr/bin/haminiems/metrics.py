@@ -0,0 +1,289 @@
+"""Laufzeit-Metriken im Prometheus-Format für HAminiEMS"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from .const import METRICS_BUCKETS, METRICS_SHARD_LIMIT
+
+logger = logging.getLogger("haminiems.metrics")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Rückgabe eines Callbacks: ein Wert oder Werte je Label-Kombination
+CallbackResult = Union[float, Dict[Tuple[str, ...], float]]
+
+# Endpunkte mit variablem Pfad (Entity-ID, Zeitpunkt) zusammenfassen
+ENDPOINT_PATTERNS = (
+    ("/api/states/", "/api/states/{entity_id}"),
+    ("/api/history/period/", "/api/history/period/{start}"),
+)
+
+
+class Histogram:
+    """Histogramm, dessen Messungen ohne Lock erfasst werden
+
+    Jeder Thread schreibt in seinen eigenen Satz Zähler; erst beim Abruf
+    von /metrics werden die Sätze aller Threads zusammengezählt. Die
+    Zähler beendeter Threads werden dabei in einen gemeinsamen Satz
+    übernommen, ebenso beim Anlegen eines Satzes, sobald mehr als
+    `shard_limit` Sätze vorhanden sind (kurzlebige Threads ohne Abruf).
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = METRICS_BUCKETS,
+        shard_limit: int = METRICS_SHARD_LIMIT
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self.shard_limit = shard_limit
+        self._local = threading.local()
+        self._shards: List[Tuple[threading.Thread, Dict[Tuple[str, ...], List[float]]]] = []
+        self._retired: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def _shard(self) -> Dict[Tuple[str, ...], List[float]]:
+        """Zähler des aktuellen Threads (beim ersten Aufruf angelegt)"""
+        try:
+            return self._local.series
+        except AttributeError:
+            series: Dict[Tuple[str, ...], List[float]] = {}
+            with self._lock:
+                if len(self._shards) >= self.shard_limit:
+                    self._retire_finished()
+                self._shards.append((threading.current_thread(), series))
+            self._local.series = series
+            return series
+
+    def observe(self, value: float, *labels: str):
+        """Erfasst einen Messwert (Label-Werte in der Reihenfolge von labels)"""
+        series = self._shard()
+        counts = series.get(labels)
+        if counts is None:
+            # Je Bucket ein Zähler, danach +Inf und die Summe
+            counts = series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def time(self, *labels: str) -> "_Timer":
+        """Context Manager, der die Laufzeit des Blocks erfasst"""
+        return _Timer(self, labels)
+
+    def collect(self) -> Dict[Tuple[str, ...], List[float]]:
+        """Summiert die Zähler aller Threads"""
+        with self._lock:
+            self._retire_finished()
+            alive = list(self._shards)
+            totals: Dict[Tuple[str, ...], List[float]] = {}
+            _merge(totals, self._retired)
+        for _, series in alive:
+            _merge(totals, series)
+        return totals
+
+    def _retire_finished(self):
+        """Übernimmt die Zähler beendeter Threads (Lock muss gehalten werden)"""
+        alive = []
+        for thread, series in self._shards:
+            if thread.is_alive():
+                alive.append((thread, series))
+            else:
+                # Der Thread schreibt nicht mehr, Zähler übernehmen
+                _merge(self._retired, series)
+        self._shards = alive
+
+    def render(self) -> List[str]:
+        lines = []
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        for labels, counts in sorted(self.collect().items()):
+            label_text = _format_labels(self.labels, labels)
+            # Labels einmal je Reihe formatieren, "le" wird angehängt
+            bucket_labels = label_text[:-1] + "," if label_text else "{"
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{bucket_labels}le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{label_text} {_format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class _Timer:
+    """Misst die Laufzeit eines with-Blocks für ein Histogramm"""
+
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: Tuple[str, ...]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+        return False
+
+
+class CallbackMetric:
+    """Gauge oder Counter, dessen Wert erst beim Abruf gelesen wird
+
+    Für Werte, die ohnehin gezählt werden (z.B. Cache-Statistiken) oder
+    nur zum Abrufzeitpunkt interessieren (z.B. Dateigrößen).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Optional[CallbackResult]],
+        labels: Sequence[str] = (),
+        metric_type: str = "gauge"
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.labels = tuple(labels)
+        self.type = metric_type
+
+    def render(self) -> List[str]:
+        value = self.callback()
+        if value is None:
+            return []
+        if not isinstance(value, dict):
+            value = {(): value}
+        return [
+            f"{self.name}{_format_labels(self.labels, labels)} {_format_value(number)}"
+            for labels, number in sorted(value.items())
+            if number is not None
+        ]
+
+
+class MetricsRegistry:
+    """Sammlung aller Metriken, Ausgabe im Prometheus-Textformat"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Union[Histogram, CallbackMetric]] = {}
+        self._lock = threading.Lock()
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = METRICS_BUCKETS
+    ) -> Histogram:
+        """Legt ein Histogramm an"""
+        metric = Histogram(name, documentation, labels, buckets)
+        with self._lock:
+            self._metrics[name] = metric
+        return metric
+
+    def callback(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Optional[CallbackResult]],
+        labels: Sequence[str] = (),
+        metric_type: str = "gauge"
+    ):
+        """Registriert eine beim Abruf gelesene Metrik (ersetzt gleichnamige)"""
+        with self._lock:
+            self._metrics[name] = CallbackMetric(name, documentation, callback, labels, metric_type)
+
+    def render(self) -> str:
+        """Gibt alle Metriken im Prometheus-Textformat zurück"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.render()
+            except Exception as e:
+                logger.warning(f"Metrik {metric.name} konnte nicht gelesen werden: {e}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+def endpoint_label(endpoint: str) -> str:
+    """Fasst HA-Endpunkte mit Entity-ID oder Zeitpunkt im Pfad zusammen"""
+    for prefix, label in ENDPOINT_PATTERNS:
+        if endpoint.startswith(prefix):
+            return label
+    return endpoint
+
+
+def _merge(target: Dict[Tuple[str, ...], List[float]], source: Dict[Tuple[str, ...], List[float]]):
+    """Addiert die Zähler von source zu target"""
+    # list() kopiert atomar, auch wenn der Thread gerade neue Labels anlegt
+    for labels, counts in list(source.items()):
+        current = target.get(labels)
+        if current is None:
+            target[labels] = list(counts)
+        else:
+            for index, count in enumerate(counts):
+                current[index] += count
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[Any, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, int):
+        return str(value)
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+# Globale Registry mit den Metriken der Hot Paths
+REGISTRY = MetricsRegistry()
+
+HA_REQUEST_SECONDS = REGISTRY.histogram(
+    "haminiems_ha_request_duration_seconds",
+    "Dauer der Anfragen an Home Assistant",
+    ("endpoint", "status"),
+)
+DB_QUERY_SECONDS = REGISTRY.histogram(
+    "haminiems_db_query_duration_seconds",
+    "Dauer der Datenbank-Abfragen (inkl. Warten auf die Verbindung)",
+    ("statement",),
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "haminiems_http_request_duration_seconds",
+    "Antwortzeit der Web-Oberfläche und API",
+    ("route", "method", "status"),
+)
+COLLECTOR_CYCLE_SECONDS = REGISTRY.histogram(
+    "haminiems_collector_cycle_duration_seconds",
+    "Dauer eines Erfassungsdurchlaufs",
+)
+COLLECTOR_LAG_SECONDS = REGISTRY.histogram(
+    "haminiems_collector_lag_seconds",
+    "Verspätung eines Erfassungsdurchlaufs gegenüber dem Zeitraster",
+)
@@ -0,0 +1,36 @@
+"""Zusammengesetzter Index für Verlaufsabfragen - Migration 002"""
+
+VERSION = 2
+
+
+def up(db_connection):
+    """Ersetzt die Einzel-Indizes durch einen Index auf (entity_id, timestamp)
+
+    Verlaufsabfragen filtern nach entity_id und Zeitbereich und sortieren
+    nach timestamp. Mit dem zusammengesetzten Index liefert SQLite die
+    Zeilen direkt in Index-Reihenfolge, ohne temporären Sortierbaum.
+    """
+    db_connection.execute("""
+        CREATE INDEX IF NOT EXISTS idx_entity_values_entity_timestamp
+        ON entity_values(entity_id, timestamp);
+    """)
+    
+    # Durch den neuen Index abgedeckt bzw. nicht mehr benötigt
+    db_connection.execute("DROP INDEX IF EXISTS idx_entity_values_entity_id;")
+    db_connection.execute("DROP INDEX IF EXISTS idx_entity_values_timestamp;")
+    
+    db_connection.commit()
+
+
+def down(db_connection):
+    """Rollback - stellt die Einzel-Indizes wieder her"""
+    db_connection.execute("""
+        CREATE INDEX IF NOT EXISTS idx_entity_values_timestamp
+        ON entity_values(timestamp);
+    """)
+    db_connection.execute("""
+        CREATE INDEX IF NOT EXISTS idx_entity_values_entity_id
+        ON entity_values(entity_id);
+    """)
+    db_connection.execute("DROP INDEX IF EXISTS idx_entity_values_entity_timestamp;")
+    db_connection.commit()
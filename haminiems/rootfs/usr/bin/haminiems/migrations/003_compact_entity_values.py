@@ -0,0 +1,69 @@
+"""Kompakte Speicherung der Messwerte - Migration 003"""
+
+VERSION = 3
+
+
+def up(db_connection):
+    """Stellt entity_values auf Epoch-Millisekunden und Entity-IDs um
+
+    Die bisherige Tabelle wird nur umbenannt (entity_values_legacy), damit
+    die Migration auch bei großen Datenbanken sofort fertig ist. Die
+    Altdaten werden anschließend im Hintergrund in kleinen Blöcken
+    übernommen (siehe maintenance.LegacyImportTask).
+    """
+    # Entity-Verzeichnis mit Metadaten pro Entity
+    db_connection.execute("""
+        CREATE TABLE IF NOT EXISTS entities (
+            id INTEGER PRIMARY KEY,
+            entity_id TEXT UNIQUE NOT NULL,
+            state_class TEXT,
+            unit TEXT
+        );
+    """)
+    
+    # Schlüssel-Wert-Tabelle für Checkpoints von Hintergrund-Jobs
+    db_connection.execute("""
+        CREATE TABLE IF NOT EXISTS app_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """)
+    
+    db_connection.execute("DROP INDEX IF EXISTS idx_entity_values_entity_timestamp;")
+    db_connection.execute("ALTER TABLE entity_values RENAME TO entity_values_legacy;")
+    
+    # ts = Epoch-Millisekunden (UTC); der Primärschlüssel ist zugleich der
+    # Index für Verlaufsabfragen (entity_ref, ts)
+    db_connection.execute("""
+        CREATE TABLE entity_values (
+            entity_ref INTEGER NOT NULL REFERENCES entities(id),
+            ts INTEGER NOT NULL,
+            value REAL,
+            PRIMARY KEY (entity_ref, ts)
+        ) WITHOUT ROWID;
+    """)
+    
+    db_connection.commit()
+
+
+def down(db_connection):
+    """Rollback - stellt das alte Tabellenformat wieder her (ohne Datenübernahme)"""
+    db_connection.execute("DROP TABLE IF EXISTS entity_values;")
+    db_connection.execute("""
+        CREATE TABLE IF NOT EXISTS entity_values_legacy (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            entity_id TEXT NOT NULL,
+            value REAL,
+            state_class TEXT,
+            unit TEXT
+        );
+    """)
+    db_connection.execute("ALTER TABLE entity_values_legacy RENAME TO entity_values;")
+    db_connection.execute("""
+        CREATE INDEX IF NOT EXISTS idx_entity_values_entity_timestamp
+        ON entity_values(entity_id, timestamp);
+    """)
+    db_connection.execute("DROP TABLE IF EXISTS app_meta;")
+    db_connection.execute("DROP TABLE IF EXISTS entities;")
+    db_connection.commit()
@@ -0,0 +1,93 @@
+"""Verdichtete Messwerte (Rollups) - Migration 004"""
+
+VERSION = 4
+
+# Bucket-Größen in Sekunden: 1 Minute, 15 Minuten, 1 Stunde, 1 Tag (UTC)
+RESOLUTIONS = (60, 900, 3600, 86400)
+
+TRIGGER_NAME = "trg_entity_values_rollup"
+
+UPSERT_ROLLUP = """
+    INSERT INTO entity_rollups (
+        entity_ref, resolution, bucket_ts, sample_count, value_sum,
+        value_min, value_max, first_ts, first_value, last_ts, last_value
+    )
+    VALUES (
+        NEW.entity_ref, {resolution}, NEW.ts - NEW.ts % {bucket_ms}, 1, NEW.value,
+        NEW.value, NEW.value, NEW.ts, NEW.value, NEW.ts, NEW.value
+    )
+    ON CONFLICT (entity_ref, resolution, bucket_ts) DO UPDATE SET
+        sample_count = sample_count + 1,
+        value_sum = value_sum + excluded.value_sum,
+        value_min = MIN(value_min, excluded.value_min),
+        value_max = MAX(value_max, excluded.value_max),
+        first_value = CASE WHEN excluded.first_ts < first_ts
+            THEN excluded.first_value ELSE first_value END,
+        first_ts = MIN(first_ts, excluded.first_ts),
+        last_value = CASE WHEN excluded.last_ts > last_ts
+            THEN excluded.last_value ELSE last_value END,
+        last_ts = MAX(last_ts, excluded.last_ts);
+"""
+
+
+def up(db_connection):
+    """Legt die Tabelle entity_rollups und den Trigger zur Pflege an
+
+    Jeder neue Messwert wird per Trigger in alle Auflösungen eingerechnet.
+    Bereits vorhandene Messwerte werden im Hintergrund nachgerechnet
+    (siehe maintenance.RollupBackfillTask).
+    """
+    db_connection.execute("""
+        CREATE TABLE IF NOT EXISTS entity_rollups (
+            entity_ref INTEGER NOT NULL REFERENCES entities(id),
+            resolution INTEGER NOT NULL,
+            bucket_ts INTEGER NOT NULL,
+            sample_count INTEGER NOT NULL,
+            value_sum REAL NOT NULL,
+            value_min REAL NOT NULL,
+            value_max REAL NOT NULL,
+            first_ts INTEGER NOT NULL,
+            first_value REAL NOT NULL,
+            last_ts INTEGER NOT NULL,
+            last_value REAL NOT NULL,
+            PRIMARY KEY (entity_ref, resolution, bucket_ts)
+        ) WITHOUT ROWID;
+    """)
+
+    create_trigger(db_connection)
+
+    # Nachrechnen der vorhandenen Messwerte einplanen
+    db_connection.execute("""
+        INSERT OR REPLACE INTO app_meta (key, value)
+        VALUES ('rollup_backfill', '{}')
+    """)
+
+    db_connection.commit()
+
+
+def create_trigger(db_connection):
+    """Legt den Trigger an, der neue Messwerte in alle Auflösungen einrechnet
+
+    Auch von Database beim Start verwendet, falls der Trigger fehlt.
+    """
+    # Nur tatsächlich eingefügte Zeilen lösen den Trigger aus (INSERT OR IGNORE)
+    body = "".join(
+        UPSERT_ROLLUP.format(resolution=resolution, bucket_ms=resolution * 1000)
+        for resolution in RESOLUTIONS
+    )
+    db_connection.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {TRIGGER_NAME}
+        AFTER INSERT ON entity_values
+        WHEN NEW.value IS NOT NULL
+        BEGIN
+        {body}
+        END;
+    """)
+
+
+def down(db_connection):
+    """Rollback - entfernt Rollups und Trigger"""
+    db_connection.execute(f"DROP TRIGGER IF EXISTS {TRIGGER_NAME};")
+    db_connection.execute("DROP TABLE IF EXISTS entity_rollups;")
+    db_connection.execute("DELETE FROM app_meta WHERE key = 'rollup_backfill';")
+    db_connection.commit()
@@ -0,0 +1,26 @@
+"""Inkrementelles Freigeben von Speicher - Migration 005"""
+
+VERSION = 5
+
+
+def up(db_connection):
+    """Stellt auf auto_vacuum = INCREMENTAL um
+
+    Die Einstellung wird bei bestehenden Datenbanken erst durch ein
+    einmaliges VACUUM wirksam. Dieses läuft im Hintergrund
+    (siehe maintenance.VacuumTask), danach werden durch Aufräumen frei
+    gewordene Seiten schrittweise per incremental_vacuum zurückgegeben.
+    """
+    db_connection.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+    db_connection.execute("""
+        INSERT OR REPLACE INTO app_meta (key, value)
+        VALUES ('vacuum_pending', 'true')
+    """)
+    db_connection.commit()
+
+
+def down(db_connection):
+    """Rollback - stellt auf auto_vacuum = NONE zurück (wirksam nach VACUUM)"""
+    db_connection.execute("PRAGMA auto_vacuum = NONE;")
+    db_connection.execute("DELETE FROM app_meta WHERE key = 'vacuum_pending';")
+    db_connection.commit()
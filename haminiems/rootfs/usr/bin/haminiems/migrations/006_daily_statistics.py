@@ -0,0 +1,29 @@
+"""Materialisierte Tagesstatistiken - Migration 006"""
+
+VERSION = 6
+
+
+def up(db_connection):
+    """Legt die Tabelle daily_statistics für abgeschlossene Tage an
+
+    day ist das lokale Datum (YYYY-MM-DD), energy die Energie des Tages in
+    kWh. Der aktuelle Tag wird nie gespeichert, sondern immer neu berechnet.
+    """
+    db_connection.execute("""
+        CREATE TABLE IF NOT EXISTS daily_statistics (
+            entity_ref INTEGER NOT NULL REFERENCES entities(id),
+            day TEXT NOT NULL,
+            energy REAL NOT NULL,
+            samples INTEGER NOT NULL,
+            max_gap_s REAL,
+            computed_at INTEGER NOT NULL,
+            PRIMARY KEY (entity_ref, day)
+        ) WITHOUT ROWID;
+    """)
+    db_connection.commit()
+
+
+def down(db_connection):
+    """Rollback - entfernt die Tagesstatistiken"""
+    db_connection.execute("DROP TABLE IF EXISTS daily_statistics;")
+    db_connection.commit()
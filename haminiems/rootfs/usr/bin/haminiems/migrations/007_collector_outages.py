@@ -0,0 +1,33 @@
+"""Ausfälle der Datenerfassung - Migration 007"""
+
+VERSION = 7
+
+
+def up(db_connection):
+    """Legt die Tabelle collector_outages an
+
+    Home Assistant meldet Leistungswerte nur bei Änderungen; ohne neue Zeile
+    gilt der letzte Wert weiter. Lange Intervalle werden bei der Integration
+    daher nur noch dort nicht gezählt, wo die Erfassung nachweislich
+    ausgefallen war (Add-On gestoppt oder Home Assistant nicht erreichbar).
+    Die bisher gespeicherten Tage von Leistungssensoren werden verworfen und
+    neu berechnet.
+    """
+    db_connection.execute("""
+        CREATE TABLE IF NOT EXISTS collector_outages (
+            start_ts INTEGER PRIMARY KEY,
+            end_ts INTEGER NOT NULL,
+            reason TEXT
+        ) WITHOUT ROWID;
+    """)
+    db_connection.execute("""
+        DELETE FROM daily_statistics
+        WHERE entity_ref IN (SELECT id FROM entities WHERE unit IN ('W', 'kW', 'MW'))
+    """)
+    db_connection.commit()
+
+
+def down(db_connection):
+    """Rollback - entfernt die Ausfallzeiten"""
+    db_connection.execute("DROP TABLE IF EXISTS collector_outages;")
+    db_connection.commit()
@@ -0,0 +1,289 @@
+"""Optionales Profiling von Anfragen und Datenerfassung für HAminiEMS"""
+
+import cProfile
+import json
+import logging
+import pstats
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import pyinstrument
+    HAS_PYINSTRUMENT = True
+except ImportError:
+    pyinstrument = None
+    HAS_PYINSTRUMENT = False
+
+from .const import PROFILE_DIR, PROFILE_MAX_FILES, PROFILE_SAMPLE_RATE, PROFILE_TOP_FUNCTIONS
+
+logger = logging.getLogger("haminiems.profiling")
+
+BACKEND_CPROFILE = "cprofile"
+BACKEND_PYINSTRUMENT = "pyinstrument"
+
+# Eigenzeit nach Bereich, erkannt an "<datei>:<funktion>" (erster Treffer zählt).
+# pyinstrument nennt C-Funktionen ohne Modul, z.B. "<built-in>:Connection.execute"
+CATEGORIES = (
+    ("http", ("requests/", "urllib3/", "aiohttp/", "http/client", "socket", "ssl")),
+    ("sqlite", ("sqlite3", ":connection.", ":cursor.")),
+    ("json", ("json", ":dumps", ":loads")),
+    ("wait", ("acquire", "wait", "sleep")),
+)
+
+PROFILE_ID = re.compile(r"[\w-]+")
+
+# Funktion (Datei, Zeile, Name) -> Aufrufe, Eigenzeit, Gesamtzeit in Sekunden
+FunctionStats = Dict[Tuple[str, int, str], Tuple[Optional[int], float, float]]
+
+
+class _Session:
+    """Ein laufendes Profil"""
+
+    def __init__(self, backend: str):
+        self.backend = backend
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        if backend == BACKEND_PYINSTRUMENT:
+            self.profiler = pyinstrument.Profiler(interval=0.001, async_mode="disabled")
+            self.profiler.start()
+        else:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def stop(self) -> float:
+        """Beendet das Profil und gibt die Dauer in Sekunden zurück"""
+        if self.backend == BACKEND_PYINSTRUMENT:
+            self.profiler.stop()
+        else:
+            self.profiler.disable()
+        return time.perf_counter() - self.started
+
+
+class Profiler:
+    """Profiliert einen Anteil der Anfragen und Erfassungsdurchläufe
+
+    Ist das Profiling aus, prüfen die Aufrufer nur `enabled`. Es läuft
+    immer höchstens ein Profil gleichzeitig; ausgewählte Ausführungen,
+    während ein anderes Profil läuft, werden nicht profiliert. Verwendet
+    pyinstrument (Sampling), falls installiert, sonst cProfile.
+
+    Je Profil werden die Rohdaten (.prof für pstats/snakeviz bzw. .html)
+    und eine Übersicht (.json) mit den Funktionen mit der höchsten
+    Eigenzeit und der Eigenzeit nach Bereich (SQLite, HTTP, JSON, Warten)
+    geschrieben.
+    """
+
+    def __init__(
+        self,
+        output_dir: str = PROFILE_DIR,
+        max_profiles: int = PROFILE_MAX_FILES,
+        top_functions: int = PROFILE_TOP_FUNCTIONS
+    ):
+        self.output_dir = Path(output_dir)
+        self.max_profiles = max(1, max_profiles)
+        self.top_functions = top_functions
+        self.backend = BACKEND_PYINSTRUMENT if HAS_PYINSTRUMENT else BACKEND_CPROFILE
+        self.enabled = False
+        self.sample_rate = PROFILE_SAMPLE_RATE
+        self.profiles_written = 0
+        self.skipped = 0
+        self._busy = threading.Lock()
+        self._counter = 0
+
+    def configure(self, enabled: bool, sample_rate: Optional[float] = None) -> bool:
+        """Schaltet das Profiling ein oder aus (False, wenn das Verzeichnis fehlt)"""
+        if sample_rate is not None:
+            self.sample_rate = min(1.0, max(0.0, float(sample_rate)))
+        if enabled:
+            try:
+                self.output_dir.mkdir(parents=True, exist_ok=True)
+            except OSError as e:
+                logger.error(f"Profiling nicht möglich, Verzeichnis {self.output_dir}: {e}")
+                self.enabled = False
+                return False
+        if enabled != self.enabled:
+            logger.info(
+                f"Profiling {'eingeschaltet' if enabled else 'ausgeschaltet'} "
+                f"({self.backend}, Anteil {self.sample_rate:.0%}, Ablage {self.output_dir})"
+            )
+        self.enabled = enabled
+        return True
+
+    def start(self) -> Optional[_Session]:
+        """Startet ein Profil, falls diese Ausführung ausgewählt wird"""
+        if random.random() >= self.sample_rate:
+            return None
+        if not self._busy.acquire(blocking=False):
+            self.skipped += 1
+            return None
+        try:
+            return _Session(self.backend)
+        except Exception as e:
+            self._busy.release()
+            logger.warning(f"Profil konnte nicht gestartet werden: {e}")
+            return None
+
+    def finish(self, session: _Session, kind: str, name: str):
+        """Beendet ein Profil und schreibt Rohdaten und Übersicht"""
+        try:
+            duration = session.stop()
+            self._write(session, kind, name, duration)
+        except Exception as e:
+            logger.warning(f"Profil {kind} {name} konnte nicht gespeichert werden: {e}")
+        finally:
+            self._busy.release()
+
+    def status(self) -> Dict[str, Any]:
+        """Gibt den Status des Profilings zurück"""
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "backend": self.backend,
+            "output_dir": str(self.output_dir),
+            "profiles_written": self.profiles_written,
+            "skipped": self.skipped,
+        }
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        """Übersichten aller gespeicherten Profile ohne Hot Spots, neueste zuerst"""
+        profiles = []
+        for path in sorted(self.output_dir.glob("*.json"), reverse=True):
+            try:
+                summary = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            summary.pop("hotspots", None)
+            profiles.append(summary)
+        return profiles
+
+    def get_profile(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        """Übersicht eines Profils mit Hot Spots (None wenn unbekannt)"""
+        if not PROFILE_ID.fullmatch(profile_id):
+            return None
+        try:
+            return json.loads((self.output_dir / f"{profile_id}.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def raw_path(self, profile_id: str) -> Optional[Path]:
+        """Pfad der Rohdaten eines Profils (None wenn unbekannt)"""
+        summary = self.get_profile(profile_id)
+        if summary is None:
+            return None
+        path = self.output_dir / summary["raw"]
+        return path if path.exists() else None
+
+    def clear(self) -> int:
+        """Löscht alle gespeicherten Profile, gibt deren Anzahl zurück"""
+        removed = 0
+        for path in self.output_dir.glob("*.json"):
+            self._remove(path.stem)
+            removed += 1
+        return removed
+
+    # Interne Hilfsfunktionen
+
+    def _write(self, session: _Session, kind: str, name: str, duration: float):
+        """Speichert Rohdaten und Übersicht eines Profils"""
+        self._counter += 1
+        profile_id = f"{session.started_at:%Y%m%d-%H%M%S}-{self._counter:04d}-{kind}"
+        if session.backend == BACKEND_PYINSTRUMENT:
+            raw = f"{profile_id}.html"
+            (self.output_dir / raw).write_text(session.profiler.output_html(), encoding="utf-8")
+            functions = pyinstrument_functions(session.profiler.last_session.root_frame())
+        else:
+            raw = f"{profile_id}.prof"
+            stats = pstats.Stats(session.profiler)
+            stats.dump_stats(str(self.output_dir / raw))
+            functions = {
+                key: (calls, self_time, total_time)
+                for key, (_, calls, self_time, total_time, _) in stats.stats.items()
+            }
+
+        summary = {
+            "id": profile_id,
+            "kind": kind,
+            "name": name,
+            "started": session.started_at.isoformat(),
+            "duration_ms": round(duration * 1000, 3),
+            "backend": session.backend,
+            "raw": raw,
+            "categories": categorize(functions),
+            "hotspots": hotspots(functions, self.top_functions),
+        }
+        (self.output_dir / f"{profile_id}.json").write_text(json.dumps(summary, indent=2), encoding="utf-8")
+        self.profiles_written += 1
+        self._prune()
+
+    def _prune(self):
+        """Löscht die ältesten Profile über max_profiles"""
+        summaries = sorted(self.output_dir.glob("*.json"))
+        for path in summaries[:max(0, len(summaries) - self.max_profiles)]:
+            self._remove(path.stem)
+
+    def _remove(self, profile_id: str):
+        for path in self.output_dir.glob(f"{profile_id}.*"):
+            try:
+                path.unlink()
+            except OSError as e:
+                logger.warning(f"Profil {path} konnte nicht gelöscht werden: {e}")
+
+
+def pyinstrument_functions(root) -> FunctionStats:
+    """Eigen- und Gesamtzeit je Funktion aus dem Frame-Baum von pyinstrument"""
+    functions: FunctionStats = {}
+    stack = [root] if root is not None else []
+    while stack:
+        frame = stack.pop()
+        # Synthetische Frames wie "[self]" enthalten nur die Eigenzeit des Aufrufers
+        children = [child for child in frame.children if not child.function.startswith("[")]
+        stack.extend(children)
+        if frame.function.startswith("["):
+            continue
+        key = (frame.file_path or "~", frame.line_no or 0, frame.function)
+        _, self_time, total_time = functions.get(key, (None, 0.0, 0.0))
+        functions[key] = (
+            None,
+            self_time + frame.time - sum(child.time for child in children),
+            total_time + frame.time,
+        )
+    return functions
+
+
+def categorize(functions: FunctionStats) -> Dict[str, float]:
+    """Summiert die Eigenzeit (ms) nach Bereich"""
+    totals = {category: 0.0 for category, _ in CATEGORIES}
+    totals["other"] = 0.0
+    for (path, _, function), (_, self_time, _) in functions.items():
+        text = f"{path}:{function}".lower()
+        category = next(
+            (name for name, markers in CATEGORIES if any(marker in text for marker in markers)),
+            "other",
+        )
+        totals[category] += self_time
+    return {category: round(seconds * 1000, 3) for category, seconds in totals.items()}
+
+
+def hotspots(functions: FunctionStats, limit: int) -> List[Dict[str, Any]]:
+    """Funktionen mit der höchsten Eigenzeit"""
+    ranked = sorted(functions.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+    return [
+        {
+            "function": function,
+            "file": path,
+            "line": line,
+            "calls": calls,
+            "self_ms": round(self_time * 1000, 3),
+            "total_ms": round(total_time * 1000, 3),
+        }
+        for (path, line, function), (calls, self_time, total_time) in ranked
+    ]
+
+
+# Globaler Profiler (standardmäßig aus)
+PROFILER = Profiler()
@@ -1,21 +1,283 @@
 """Sensor-Management für HAminiEMS"""
 
 import logging
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, List, Dict, Any, Optional, Tuple, Union
+from datetime import datetime, timezone
 
 from .database import get_database
-from .const import SENSOR_KEYS
-from .utils import parse_float
+from .const import DAY_MS, DEFAULT_REFRESH_INTERVAL, ROLLUP_RESOLUTIONS, SENSOR_KEYS
+from .utils import from_epoch_ms, parse_float, to_epoch_ms
 
 logger = logging.getLogger("haminiems.sensors")
 
+# Derselbe Zeitpunkt wird nur einmal gespeichert (z.B. unveränderter State
+# bei mehreren Abrufen); nur neue Zeilen fließen per Trigger in die Rollups
+INSERT_ENTITY_VALUE = """
+    INSERT OR IGNORE INTO entity_values (entity_ref, ts, value)
+    VALUES (?, ?, ?)
+"""
+
+# Legt eine Entity an bzw. ergänzt/aktualisiert ihre Metadaten
+UPSERT_ENTITY = """
+    INSERT INTO entities (entity_id, state_class, unit)
+    VALUES (?, ?, ?)
+    ON CONFLICT(entity_id) DO UPDATE SET
+        state_class = COALESCE(excluded.state_class, entities.state_class),
+        unit = COALESCE(excluded.unit, entities.unit)
+"""
+
+# app_meta-Schlüssel der letzten erfolgreichen Erfassung
+HEARTBEAT_KEY = "collector_heartbeat"
+
+TimeValue = Union[datetime, str, int, float, None]
+
+
+def build_entity_values_query(
+    entity_ref: int,
+    start_time: TimeValue = None,
+    end_time: TimeValue = None,
+    limit: Optional[int] = None
+) -> Tuple[str, tuple]:
+    """Baut die Verlaufsabfrage für eine Entity (nutzt den Primärschlüssel entity_ref, ts)"""
+    query = "SELECT ts, value FROM entity_values WHERE entity_ref = ?"
+    params: List[Any] = [entity_ref]
+    
+    start_ms = to_epoch_ms(start_time)
+    if start_ms is not None:
+        query += " AND ts >= ?"
+        params.append(start_ms)
+    
+    end_ms = to_epoch_ms(end_time)
+    if end_ms is not None:
+        query += " AND ts <= ?"
+        params.append(end_ms)
+    
+    query += " ORDER BY ts DESC"
+    
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    
+    return query, tuple(params)
+
+
+def build_rollup_query(
+    entity_ref: int,
+    resolution: int,
+    start_time: TimeValue = None,
+    end_time: TimeValue = None,
+    limit: Optional[int] = None
+) -> Tuple[str, tuple]:
+    """Baut die Abfrage für verdichtete Werte einer Auflösung (Sekunden)"""
+    query = """
+        SELECT bucket_ts, sample_count, value_sum, value_min, value_max,
+               first_value, last_value
+        FROM entity_rollups
+        WHERE entity_ref = ? AND resolution = ?
+    """
+    params: List[Any] = [entity_ref, resolution]
+    
+    start_ms = to_epoch_ms(start_time)
+    if start_ms is not None:
+        # Auch den Bucket einschließen, in dem der Start liegt
+        query += " AND bucket_ts >= ?"
+        params.append(start_ms - start_ms % (resolution * 1000))
+    
+    end_ms = to_epoch_ms(end_time)
+    if end_ms is not None:
+        query += " AND bucket_ts <= ?"
+        params.append(end_ms)
+    
+    query += " ORDER BY bucket_ts DESC"
+    
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    
+    return query, tuple(params)
+
+
+# Ältester Zeitpunkt je Quelle: Rohwerte (resolution NULL) und jede Rollup-Auflösung
+ROLLUP_COVERAGE_QUERY = """
+    SELECT NULL AS resolution, MIN(ts) AS first_ts FROM entity_values WHERE entity_ref = ?
+    UNION ALL
+    SELECT resolution, MIN(bucket_ts) FROM entity_rollups WHERE entity_ref = ? GROUP BY resolution
+"""
+
+
+class WriteBuffer:
+    """Sammelt Zeilen im Speicher und schreibt sie gebündelt
+
+    Geschrieben wird, sobald max_rows Zeilen gesammelt sind oder die älteste
+    Zeile max_age Sekunden alt ist, sowie beim Stoppen. Nach hold() wird nur
+    noch gesammelt, bis release() alles schreibt.
+    """
+    
+    def __init__(
+        self,
+        flush_func: Callable[[List[tuple]], Optional[int]],
+        max_rows: int,
+        max_age: float
+    ):
+        self.flush_func = flush_func
+        self.max_rows = max(1, max_rows)
+        self.max_age = max_age
+        self._rows: List[tuple] = []
+        self._oldest: Optional[float] = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._held = False
+        self._thread: Optional[threading.Thread] = None
+        self.flushes = 0
+        self.rows_written = 0
+    
+    def start(self):
+        """Startet den Thread für das zeitgesteuerte Schreiben"""
+        if self.max_age <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="write-buffer", daemon=True
+        )
+        self._thread.start()
+    
+    def stop(self):
+        """Stoppt den Thread und schreibt alle gepufferten Zeilen"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+    
+    def add(self, rows: List[tuple]):
+        """Fügt Zeilen hinzu und schreibt bei Erreichen von max_rows"""
+        with self._lock:
+            if not self._rows:
+                self._oldest = time.monotonic()
+            self._rows.extend(rows)
+            full = len(self._rows) >= self.max_rows and not self._held
+        if full:
+            self.flush()
+    
+    def hold(self):
+        """Sammelt nur noch, ohne zu schreiben (z.B. während eines VACUUM)"""
+        with self._lock:
+            self._held = True
+    
+    def release(self) -> int:
+        """Hebt hold() auf und schreibt die gesammelten Zeilen"""
+        with self._lock:
+            self._held = False
+        return self.flush()
+    
+    def flush(self) -> int:
+        """Schreibt alle gepufferten Zeilen in einer Transaktion"""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+                self._oldest = None
+            if not rows:
+                return 0
+            try:
+                written = self.flush_func(rows)
+            except Exception as e:
+                logger.error(f"Fehler beim Schreiben des Puffers: {e}")
+                # Zeilen behalten und beim nächsten Mal erneut versuchen
+                with self._lock:
+                    self._rows = rows + self._rows
+                    self._oldest = self._oldest or time.monotonic()
+                return 0
+            # flush_func meldet die tatsächlich geschriebenen Zeilen
+            written = len(rows) if written is None else written
+            self.flushes += 1
+            self.rows_written += written
+            return written
+    
+    def _run(self):
+        interval = min(self.max_age, 1.0)
+        while not self._stop.wait(interval):
+            with self._lock:
+                due = (
+                    self._oldest is not None
+                    and not self._held
+                    and time.monotonic() - self._oldest >= self.max_age
+                )
+            if due:
+                self.flush()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Gibt Puffer-Statistiken zurück"""
+        with self._lock:
+            pending = len(self._rows)
+        return {
+            "pending": pending,
+            "held": self._held,
+            "max_rows": self.max_rows,
+            "max_age": self.max_age,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+        }
+
 
 class SensorManager:
     """Verwaltet Sensor-Konfigurationen und Werte"""
     
     def __init__(self):
         self.db = get_database()
+        self.write_buffer: Optional[WriteBuffer] = None
+        # entity_id -> (id, state_class, unit) aus der Tabelle entities
+        self._entities: Dict[str, Tuple[int, Optional[str], Optional[str]]] = {}
+        self._entities_lock = threading.Lock()
+        # entity_ref -> Zeitpunkt des zuletzt gespeicherten Werts
+        self._last_saved_ts: Dict[int, int] = {}
+        # Höchstens ein Rohwert pro Erfassung (Sekunden), für das Punkte-Budget
+        self.raw_spacing = DEFAULT_REFRESH_INTERVAL
+    
+    def enable_write_buffer(self, max_rows: int, max_age: float):
+        """Aktiviert den Schreibpuffer für Entity-Werte"""
+        if self.write_buffer is not None:
+            self.write_buffer.stop()
+        self.write_buffer = WriteBuffer(self._write_rows, max_rows, max_age)
+        self.write_buffer.start()
+        logger.info(
+            f"Schreibpuffer aktiviert ({max_rows} Zeilen / {max_age:.0f}s)"
+        )
+    
+    def flush(self) -> int:
+        """Schreibt gepufferte Entity-Werte sofort in die Datenbank"""
+        if self.write_buffer is None:
+            return 0
+        return self.write_buffer.flush()
+    
+    @contextmanager
+    def hold_writes(self):
+        """Sammelt Entity-Werte im Speicher, statt auf die Datenbank zu warten
+
+        Ohne aktivierten Schreibpuffer wird dafür vorübergehend einer
+        angelegt. Beim Verlassen werden die gesammelten Werte geschrieben.
+        """
+        buffer = self.write_buffer
+        temporary = buffer is None
+        if temporary:
+            buffer = WriteBuffer(self._write_rows, max_rows=1, max_age=0)
+        buffer.hold()
+        if temporary:
+            self.write_buffer = buffer
+        try:
+            yield
+        finally:
+            if temporary:
+                self.write_buffer = None
+            buffer.release()
+    
+    def close(self):
+        """Stoppt den Schreibpuffer und schreibt alle offenen Werte"""
+        if self.write_buffer is not None:
+            self.write_buffer.stop()
     
     def get_all_configs(self) -> List[Dict[str, Any]]:
         """Holt alle Sensor-Konfigurationen"""
@@ -89,53 +351,268 @@ class SensorManager:
         timestamp: Optional[datetime] = None
     ) -> bool:
         """Speichert einen Entity-Wert"""
+        return self.save_entity_values([{
+            "entity_id": entity_id,
+            "value": value,
+            "state_class": state_class,
+            "unit": unit,
+            "timestamp": timestamp,
+        }]) == 1
+    
+    def save_entity_values(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Speichert mehrere Entity-Werte in einer Transaktion
+
+        Jede Zeile enthält entity_id, value und optional state_class, unit
+        und timestamp. Werte mit demselben Zeitpunkt wie der zuletzt
+        gespeicherte (unveränderter State) werden übersprungen. Gibt die
+        Anzahl neu gespeicherter bzw. gepufferter Zeilen zurück.
+        """
+        now_ms = to_epoch_ms(datetime.now(timezone.utc))
         try:
-            if timestamp is None:
-                timestamp = datetime.now()
+            params = [
+                (
+                    self.get_entity_ref(
+                        row["entity_id"], row.get("state_class"), row.get("unit")
+                    ),
+                    to_epoch_ms(row.get("timestamp")) or now_ms,
+                    row["value"],
+                )
+                for row in rows
+            ]
+            with self._entities_lock:
+                params = [
+                    row for row in params if self._last_saved_ts.get(row[0]) != row[1]
+                ]
+            if not params:
+                return 0
             
-            self.db.execute("""
-                INSERT INTO entity_values
-                (timestamp, entity_id, value, state_class, unit)
-                VALUES (?, ?, ?, ?, ?)
-            """, (timestamp, entity_id, value, state_class, unit))
-            return True
+            buffer = self.write_buffer
+            if buffer is not None:
+                buffer.add(params)
+                self._remember_saved(params)
+                return len(params)
+            
+            written = self._write_rows(params)
+            self._remember_saved(params)
+            return written
         except Exception as e:
-            logger.error(f"Fehler beim Speichern des Entity-Werts: {e}")
-            return False
+            logger.error(f"Fehler beim Speichern der Entity-Werte: {e}")
+            return 0
+    
+    def _remember_saved(self, params: List[tuple]):
+        """Merkt sich den jüngsten gespeicherten Zeitpunkt je Entity"""
+        with self._entities_lock:
+            for ref, ts, _ in params:
+                if ts > self._last_saved_ts.get(ref, ts - 1):
+                    self._last_saved_ts[ref] = ts
+    
+    def _write_rows(self, params: List[tuple]) -> int:
+        """Schreibt vorbereitete Zeilen in einer Transaktion, gibt die neuen Zeilen zurück"""
+        # INSERT OR IGNORE: bereits vorhandene (entity_ref, ts) zählen nicht
+        return self.db.execute_many(INSERT_ENTITY_VALUE, params).rowcount
+    
+    def get_entity_ref(
+        self,
+        entity_id: str,
+        state_class: Optional[str] = None,
+        unit: Optional[str] = None,
+        create: bool = True
+    ) -> Optional[int]:
+        """Gibt die numerische ID einer Entity zurück
+
+        Unbekannte Entities werden angelegt (create=True), geänderte
+        Metadaten (state_class, unit) in der Tabelle entities aktualisiert.
+        """
+        with self._entities_lock:
+            cached = self._entities.get(entity_id)
+            if cached is None:
+                row = self.db.fetch_one(
+                    "SELECT id, state_class, unit FROM entities WHERE entity_id = ?",
+                    (entity_id,)
+                )
+                if row is not None:
+                    cached = (row["id"], row["state_class"], row["unit"])
+                    self._entities[entity_id] = cached
+            
+            if cached is not None:
+                ref, known_class, known_unit = cached
+                if state_class in (None, known_class) and unit in (None, known_unit):
+                    return ref
+            
+            if not create:
+                return cached[0] if cached else None
+            
+            with self.db.get_connection() as conn:
+                conn.execute(UPSERT_ENTITY, (entity_id, state_class, unit))
+                row = conn.execute(
+                    "SELECT id, state_class, unit FROM entities WHERE entity_id = ?",
+                    (entity_id,)
+                ).fetchone()
+            self._entities[entity_id] = (row["id"], row["state_class"], row["unit"])
+            return row["id"]
+    
+    def get_entity_meta(self, entity_id: str) -> Dict[str, Optional[str]]:
+        """Gibt state_class und unit einer Entity zurück"""
+        ref = self.get_entity_ref(entity_id, create=False)
+        if ref is None:
+            return {"state_class": None, "unit": None}
+        _, state_class, unit = self._entities[entity_id]
+        return {"state_class": state_class, "unit": unit}
     
     def get_entity_values(
         self,
         entity_id: str,
-        start_time: Optional[datetime] = None,
-        end_time: Optional[datetime] = None,
-        limit: Optional[int] = None
+        start_time: TimeValue = None,
+        end_time: TimeValue = None,
+        limit: Optional[int] = None,
+        max_points: Optional[int] = None
     ) -> List[Dict[str, Any]]:
-        """Holt historische Werte für eine Entity"""
-        query = "SELECT * FROM entity_values WHERE entity_id = ?"
-        params = [entity_id]
+        """Holt historische Werte für eine Entity (neueste zuerst)
+
+        start_time/end_time akzeptieren datetime, ISO-Strings oder
+        Epoch-Millisekunden. Zeitstempel werden als ISO-Format (UTC)
+        zurückgegeben. Mit max_points wird die feinste Auflösung gewählt,
+        die höchstens so viele Punkte liefert (Rohwerte oder Rollups).
+        """
+        ref = self.get_entity_ref(entity_id, create=False)
+        if ref is None:
+            return []
+        meta = self.get_entity_meta(entity_id)
+        
+        if max_points:
+            resolution = self.select_resolution(ref, start_time, end_time, max_points)
+            if resolution is not None:
+                return self._get_rollup_values(
+                    entity_id, ref, resolution, start_time, end_time, limit, meta
+                )
+        
+        query, params = build_entity_values_query(ref, start_time, end_time, limit)
+        rows = self.db.fetch_all(query, params)
+        state_class, unit = meta["state_class"], meta["unit"]
+        return [
+            {
+                "timestamp": from_epoch_ms(ts).isoformat(),
+                "entity_id": entity_id,
+                "value": value,
+                "state_class": state_class,
+                "unit": unit,
+            }
+            for ts, value in rows
+        ]
+    
+    def select_resolution(
+        self,
+        entity_ref: int,
+        start_time: TimeValue,
+        end_time: TimeValue,
+        max_points: int
+    ) -> Optional[int]:
+        """Wählt die Auflösung (Sekunden) für ein Punkte-Budget, None = Rohwerte
+
+        Die Auflösung ergibt sich aus Zeitraum und Budget; Rohwerte werden
+        gewählt, wenn sie selbst bei einem Wert pro Erfassung (raw_spacing)
+        ins Budget passen. Nach Ablauf der Aufbewahrungsdauer sind ältere
+        Zeiträume nur noch in gröberen Auflösungen vorhanden. Eine Quelle
+        kommt daher nur in Frage, wenn ihre Daten (tagesgenau) bis zum
+        Beginn des Zeitraums zurückreichen; das prüft eine einzige Abfrage.
+        """
+        start_ms = to_epoch_ms(start_time)
+        end_ms = to_epoch_ms(end_time)
+        resolutions = sorted(ROLLUP_RESOLUTIONS.values())
         
-        if start_time:
-            query += " AND timestamp >= ?"
-            params.append(start_time)
+        coverage: Dict[Optional[int], Optional[int]] = {None: None}
+        coverage.update((resolution, None) for resolution in resolutions)
+        for row in self.db.fetch_all(ROLLUP_COVERAGE_QUERY, (entity_ref, entity_ref)):
+            coverage[row["resolution"]] = row["first_ts"]
+        known = [ts for ts in coverage.values() if ts is not None]
+        if not known:
+            return None
+        effective_start = min(known) if start_ms is None else max(start_ms, min(known))
         
-        if end_time:
-            query += " AND timestamp <= ?"
-            params.append(end_time)
+        def covers(source: Optional[int]) -> bool:
+            first = coverage[source]
+            return first is not None and first - first % DAY_MS <= effective_start
         
-        query += " ORDER BY timestamp DESC"
+        if end_ms is None:
+            end_ms = to_epoch_ms(datetime.now(timezone.utc))
+        span_ms = max(0, end_ms - effective_start)
         
-        if limit:
-            query += " LIMIT ?"
-            params.append(limit)
+        if covers(None) and span_ms // int(self.raw_spacing * 1000) + 1 <= max_points:
+            return None
         
-        rows = self.db.fetch_all(query, tuple(params))
-        return [dict(row) for row in rows]
+        fitting = [
+            resolution for resolution in resolutions
+            if span_ms // (resolution * 1000) + 1 <= max_points
+        ]
+        for resolution in fitting:
+            if covers(resolution):
+                return resolution
+        return fitting[0] if fitting else resolutions[-1]
+    
+    def _get_rollup_values(
+        self,
+        entity_id: str,
+        entity_ref: int,
+        resolution: int,
+        start_time: TimeValue,
+        end_time: TimeValue,
+        limit: Optional[int],
+        meta: Dict[str, Optional[str]]
+    ) -> List[Dict[str, Any]]:
+        """Holt verdichtete Werte; value ist der Mittelwert des Buckets"""
+        query, params = build_rollup_query(
+            entity_ref, resolution, start_time, end_time, limit
+        )
+        rows = self.db.fetch_all(query, params)
+        state_class, unit = meta["state_class"], meta["unit"]
+        return [
+            {
+                "timestamp": from_epoch_ms(bucket_ts).isoformat(),
+                "entity_id": entity_id,
+                "value": value_sum / count,
+                "min": value_min,
+                "max": value_max,
+                "first": first_value,
+                "last": last_value,
+                "count": count,
+                "resolution": resolution,
+                "state_class": state_class,
+                "unit": unit,
+            }
+            for bucket_ts, count, value_sum, value_min, value_max, first_value, last_value in rows
+        ]
     
     def get_latest_value(self, entity_id: str) -> Optional[Dict[str, Any]]:
         """Holt den neuesten Wert für eine Entity"""
         rows = self.get_entity_values(entity_id, limit=1)
         return rows[0] if rows else None
     
+    def record_outage(self, start_ms: int, end_ms: int, reason: str):
+        """Speichert einen Zeitraum, in dem keine Werte erfasst wurden"""
+        if end_ms <= start_ms:
+            return
+        self.db.execute(
+            "INSERT OR REPLACE INTO collector_outages (start_ts, end_ts, reason) VALUES (?, ?, ?)",
+            (int(start_ms), int(end_ms), reason)
+        )
+    
+    def get_outages(self, start_ms: int, end_ms: int) -> List[Tuple[int, int]]:
+        """Ausfälle der Erfassung, die den Zeitraum berühren (aufsteigend)"""
+        rows = self.db.fetch_all(
+            "SELECT start_ts, end_ts FROM collector_outages "
+            "WHERE start_ts < ? AND end_ts > ? ORDER BY start_ts",
+            (int(end_ms), int(start_ms))
+        )
+        return [(row["start_ts"], row["end_ts"]) for row in rows]
+    
+    def get_heartbeat(self) -> Optional[int]:
+        """Zeitpunkt (Epoch-ms) der zuletzt gesicherten erfolgreichen Erfassung"""
+        return self.db.get_meta(HEARTBEAT_KEY)
+    
+    def set_heartbeat(self, ts_ms: int):
+        """Sichert den Zeitpunkt der letzten erfolgreichen Erfassung"""
+        self.db.set_meta(HEARTBEAT_KEY, int(ts_ms))
+    
     def get_all_sensor_keys(self) -> List[str]:
         """Gibt alle definierten Sensor-Keys zurück"""
         return SENSOR_KEYS
@@ -0,0 +1,108 @@
+"""Web-Server für HAminiEMS (waitress, gunicorn oder Werkzeug)"""
+
+import logging
+import signal
+from typing import Callable
+
+from .const import (
+    DEFAULT_SERVER,
+    DEFAULT_SERVER_THREADS,
+    SERVER_CHANNEL_TIMEOUT,
+    SERVER_KEEPALIVE,
+    SERVERS,
+)
+
+logger = logging.getLogger("haminiems.server")
+
+
+def run_server(
+    app,
+    host: str,
+    port: int,
+    server: str = DEFAULT_SERVER,
+    threads: int = DEFAULT_SERVER_THREADS,
+    on_start: Callable[[], None] = lambda: None,
+    on_stop: Callable[[], None] = lambda: None
+):
+    """Startet den gewählten Server und blockiert bis zum Beenden
+
+    on_start initialisiert die Anwendung (Hintergrund-Threads, Datenbank)
+    in dem Prozess, der die Anfragen bedient; on_stop wird beim Beenden
+    aufgerufen. Datenerfassung, Schreib-Verbindung und SSE-Verteiler
+    existieren pro Prozess, daher läuft immer genau ein Worker-Prozess;
+    parallel bearbeitet wird über Threads.
+    """
+    if server not in SERVERS:
+        logger.warning(f"Unbekannter Server '{server}', verwende {DEFAULT_SERVER}")
+        server = DEFAULT_SERVER
+    threads = max(1, threads)
+
+    if server == "gunicorn":
+        _run_gunicorn(app, host, port, threads, on_start, on_stop)
+        return
+
+    # SIGTERM (Stoppen des Add-ons) wie Strg+C behandeln, damit on_stop läuft
+    signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+    on_start()
+    try:
+        if server == "waitress":
+            _run_waitress(app, host, port, threads)
+        else:
+            logger.warning("Werkzeug-Entwicklungsserver aktiv (nicht für den Dauerbetrieb)")
+            app.run(host=host, port=port, debug=False, threaded=True)
+    except KeyboardInterrupt:
+        logger.info("Server wird beendet...")
+    finally:
+        on_stop()
+
+
+def _raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def _run_waitress(app, host: str, port: int, threads: int):
+    """Startet waitress (Threads, ein Prozess)"""
+    import waitress
+
+    # create_server statt serve(): serve() richtet das Root-Logging ein
+    # (doppelte Log-Zeilen)
+    server = waitress.create_server(
+        app,
+        host=host,
+        port=port,
+        threads=threads,
+        channel_timeout=SERVER_CHANNEL_TIMEOUT,
+        ident="HAminiEMS",
+    )
+    logger.info(f"Starte waitress auf {host}:{port} ({threads} Threads)")
+    server.run()
+
+
+def _run_gunicorn(app, host: str, port: int, threads: int, on_start, on_stop):
+    """Startet gunicorn mit einem gthread-Worker"""
+    from gunicorn.app.base import BaseApplication
+
+    class HAminiEMSApplication(BaseApplication):
+        def load_config(self):
+            settings = {
+                "bind": f"{host}:{port}",
+                "workers": 1,
+                "worker_class": "gthread",
+                "threads": threads,
+                "keepalive": SERVER_KEEPALIVE,
+                # SSE-Verbindungen bleiben offen, gthread meldet sich trotzdem regelmäßig
+                "timeout": 60,
+                "graceful_timeout": 15,
+                "accesslog": None,
+                # Initialisierung im Worker-Prozess, nicht im Master (Threads überleben kein fork)
+                "post_worker_init": lambda worker: on_start(),
+                "worker_exit": lambda server, worker: on_stop(),
+            }
+            for key, value in settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    logger.info(f"Starte gunicorn auf {host}:{port} (1 Worker, {threads} Threads)")
+    HAminiEMSApplication().run()
@@ -1,10 +1,13 @@
 // HAminiEMS Configuration JavaScript
 
 const API_BASE = '';
+const ENTITY_PAGE_SIZE = 500;
 
 let availableEntities = [];
+let entityTotal = 0;
 let sensorKeys = [];
 let currentConfigs = {};
+let searchTimer = null;
 
 document.addEventListener('DOMContentLoaded', () => {
     loadConfig();
@@ -17,18 +20,24 @@ document.addEventListener('DOMContentLoaded', () => {
     document.getElementById('cancel-btn').addEventListener('click', () => {
         window.location.href = '/';
     });
+
+    document.getElementById('entity-search').addEventListener('input', (e) => {
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(() => searchEntities(e.target.value.trim()), 250);
+    });
 });
 
 async function loadConfig() {
     try {
-        const response = await fetch(`${API_BASE}/api/config`);
+        // Entities werden separat und durchsuchbar über /api/catalog geladen
+        const response = await fetch(`${API_BASE}/api/config?entities=0`);
         const data = await response.json();
         
         if (!data.success) {
             throw new Error(data.error || 'Fehler beim Laden');
         }
         
-        availableEntities = data.data.available_entities || [];
+        await loadEntities('');
         sensorKeys = data.data.sensor_keys || [];
         currentConfigs = {};
         
@@ -45,6 +54,61 @@ async function loadConfig() {
     }
 }
 
+async function loadEntities(query) {
+    const params = new URLSearchParams({ limit: ENTITY_PAGE_SIZE });
+    if (query) {
+        params.set('q', query);
+    }
+    const response = await fetch(`${API_BASE}/api/catalog?${params}`);
+    const data = await response.json();
+
+    if (!data.success) {
+        throw new Error(data.error || 'Fehler beim Laden der Entities');
+    }
+
+    availableEntities = data.data || [];
+    entityTotal = data.total || 0;
+    updateSearchInfo();
+}
+
+async function searchEntities(query) {
+    try {
+        await loadEntities(query);
+        // Nur die Auswahllisten neu aufbauen, aktuelle Auswahl bleibt erhalten
+        document.querySelectorAll('select[name$="_entity"]').forEach(select => {
+            select.innerHTML = entityOptions(select.value);
+        });
+    } catch (error) {
+        console.error('Error searching entities:', error);
+        showMessage(`Fehler bei der Suche: ${error.message}`, 'error');
+    }
+}
+
+function updateSearchInfo() {
+    const info = document.getElementById('entity-search-info');
+    info.textContent = entityTotal > availableEntities.length
+        ? `${availableEntities.length} von ${entityTotal} Entities angezeigt - Suche verwenden`
+        : `${entityTotal} Entities`;
+}
+
+function entityOptions(selectedId) {
+    const entities = availableEntities.slice();
+    // Ausgewählte Entity immer anbieten, auch wenn sie nicht im Suchergebnis ist
+    if (selectedId && !entities.some(entity => entity.entity_id === selectedId)) {
+        entities.unshift({ entity_id: selectedId });
+    }
+    return `
+        <option value="">-- Keine Auswahl --</option>
+        ${entities.map(entity => `
+            <option value="${entity.entity_id}" 
+                    ${entity.entity_id === selectedId ? 'selected' : ''}>
+                ${entity.friendly_name || entity.entity_id}
+                ${entity.unit ? ` (${entity.unit})` : ''}
+            </option>
+        `).join('')}
+    `;
+}
+
 function displayConfigForm() {
     const container = document.getElementById('sensor-configs');
     
@@ -74,14 +138,7 @@ function displayConfigForm() {
             <div class="sensor-config">
                 <label>${formatSensorKey(key)}</label>
                 <select name="${key}_entity" data-sensor-key="${key}">
-                    <option value="">-- Keine Auswahl --</option>
-                    ${availableEntities.map(entity => `
-                        <option value="${entity.entity_id}" 
-                                ${entity.entity_id === entityId ? 'selected' : ''}>
-                            ${entity.friendly_name || entity.entity_id}
-                            ${entity.unit ? ` (${entity.unit})` : ''}
-                        </option>
-                    `).join('')}
+                    ${entityOptions(entityId)}
                 </select>
                 <select name="${key}_type" data-sensor-key="${key}">
                     <option value="">--</option>
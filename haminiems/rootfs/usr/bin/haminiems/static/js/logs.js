@@ -1,6 +1,13 @@
 // HAminiEMS Logs JavaScript
 
 const API_BASE = '';
+const POLL_INTERVAL = 5000;
+const MAX_ENTRIES = 1000;
+
+// Position des letzten gelesenen Eintrags (vom Server vergeben)
+let logCursor = null;
+let pollTimer = null;
+let polling = false;
 
 // Initialisierung
 document.addEventListener('DOMContentLoaded', () => {
@@ -10,25 +17,49 @@ document.addEventListener('DOMContentLoaded', () => {
         loadLogs();
     });
 
+    document.getElementById('log-level-select').addEventListener('change', () => {
+        loadLogs();
+    });
+
+    document.getElementById('auto-refresh-checkbox').addEventListener('change', (event) => {
+        if (event.target.checked) {
+            startPolling();
+        } else {
+            stopPolling();
+        }
+    });
+
     document.getElementById('clear-logs-btn').addEventListener('click', () => {
         if (confirm('Möchten Sie wirklich alle Logs löschen?')) {
             clearLogs();
         }
     });
+
+    startPolling();
 });
 
+function logsUrl(cursor) {
+    const params = new URLSearchParams();
+    const level = document.getElementById('log-level-select').value;
+    if (level) params.set('level', level);
+    if (cursor) params.set('cursor', cursor);
+    const query = params.toString();
+    return `${API_BASE}/api/logs${query ? '?' + query : ''}`;
+}
+
 async function loadLogs() {
     try {
         const container = document.getElementById('logs-container');
         container.innerHTML = '<div class="loading">Lade Logs...</div>';
 
-        const response = await fetch(`${API_BASE}/api/logs`);
+        const response = await fetch(logsUrl(null));
         const data = await response.json();
 
         if (!data.success) {
             throw new Error(data.error || 'Fehler beim Laden');
         }
 
+        logCursor = data.cursor;
         displayLogs(data.data || []);
     } catch (error) {
         console.error('Error loading logs:', error);
@@ -37,6 +68,45 @@ async function loadLogs() {
     }
 }
 
+// Holt nur die seit dem letzten Aufruf geschriebenen Einträge
+async function pollLogs() {
+    if (polling || !logCursor) return;
+    polling = true;
+    let more = false;
+    try {
+        const response = await fetch(logsUrl(logCursor));
+        const data = await response.json();
+        if (!data.success) return;
+
+        logCursor = data.cursor;
+        if (data.reset) {
+            // Datei wurde rotiert oder gelöscht
+            displayLogs(data.data || []);
+        } else if (data.data && data.data.length > 0) {
+            appendLogs(data.data);
+        }
+        more = Boolean(data.more);
+    } catch (error) {
+        console.error('Error polling logs:', error);
+    } finally {
+        polling = false;
+    }
+    // Weitere Einträge seit dem Cursor sofort nachladen
+    if (more) pollLogs();
+}
+
+function startPolling() {
+    stopPolling();
+    pollTimer = setInterval(pollLogs, POLL_INTERVAL);
+}
+
+function stopPolling() {
+    if (pollTimer) {
+        clearInterval(pollTimer);
+        pollTimer = null;
+    }
+}
+
 function displayLogs(logs) {
     const container = document.getElementById('logs-container');
 
@@ -45,24 +115,43 @@ function displayLogs(logs) {
         return;
     }
 
-    const html = `
-        <div class="logs-list">
-            ${logs.map(log => `
-                <div class="log-entry log-${log.level?.toLowerCase() || 'info'}">
-                    <div class="log-timestamp">${formatTimestamp(log.timestamp)}</div>
-                    <div class="log-level">${log.level || 'INFO'}</div>
-                    <div class="log-message">${escapeHtml(log.message || '')}</div>
-                </div>
-            `).join('')}
-        </div>
-    `;
-
-    container.innerHTML = html;
+    container.innerHTML = `<div class="logs-list">${logs.map(renderLog).join('')}</div>`;
 
     // Scroll zum Ende
     container.scrollTop = container.scrollHeight;
 }
 
+function appendLogs(logs) {
+    const container = document.getElementById('logs-container');
+    const list = container.querySelector('.logs-list');
+    if (!list) {
+        displayLogs(logs);
+        return;
+    }
+
+    // Nur mitscrollen, wenn der Nutzer bereits am Ende ist
+    const atBottom = container.scrollHeight - container.scrollTop - container.clientHeight < 20;
+
+    list.insertAdjacentHTML('beforeend', logs.map(renderLog).join(''));
+    while (list.children.length > MAX_ENTRIES) {
+        list.removeChild(list.firstElementChild);
+    }
+
+    if (atBottom) {
+        container.scrollTop = container.scrollHeight;
+    }
+}
+
+function renderLog(log) {
+    return `
+        <div class="log-entry log-${log.level?.toLowerCase() || 'info'}">
+            <div class="log-timestamp">${formatTimestamp(log.timestamp)}</div>
+            <div class="log-level">${log.level || 'INFO'}</div>
+            <div class="log-message">${escapeHtml(log.message || '')}</div>
+        </div>
+    `;
+}
+
 async function clearLogs() {
     try {
         const response = await fetch(`${API_BASE}/api/logs`, {
@@ -103,4 +192,3 @@ function escapeHtml(text) {
     div.textContent = text;
     return div.innerHTML;
 }
-
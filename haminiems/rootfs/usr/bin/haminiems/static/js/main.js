@@ -1,15 +1,20 @@
 // HAminiEMS Main JavaScript
 
 const API_BASE = '';
-const REFRESH_INTERVAL = 30000; // 30 Sekunden
+const REFRESH_INTERVAL = 30000; // 30 Sekunden (nur ohne Event-Stream)
 
 let refreshTimer = null;
+let eventSource = null;
 
 // Initialisierung
 document.addEventListener('DOMContentLoaded', () => {
-    checkHealth();
-    loadSensors();
-    setupAutoRefresh();
+    if (window.EventSource) {
+        // Änderungen werden vom Server gesendet, kein Polling nötig
+        connectStream();
+    } else {
+        refreshAll();
+        setupAutoRefresh();
+    }
 
     const refreshBtn = document.getElementById('refresh-btn');
     if (refreshBtn) {
@@ -19,19 +24,66 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 });
 
+function connectStream() {
+    eventSource = new EventSource(`${API_BASE}/api/stream`);
+
+    // Vollständiger Stand beim Verbinden
+    eventSource.addEventListener('snapshot', (event) => {
+        const data = JSON.parse(event.data);
+        stopAutoRefresh();
+        displaySensors(data.entities || {});
+        if (data.balance) {
+            displayEnergyBalance(data.balance);
+        }
+        if (data.health) {
+            displayHealth(data.health.ha_connected);
+        }
+        updateLastUpdate();
+    });
+
+    // Nur geänderte Sensoren
+    eventSource.addEventListener('entities', (event) => {
+        const data = JSON.parse(event.data);
+        displaySensors(data.changed || {});
+        (data.removed || []).forEach(key => {
+            displaySensors({ [key]: { value: null, unit: '', entity_id: null } });
+        });
+        updateLastUpdate();
+    });
+
+    eventSource.addEventListener('balance', (event) => {
+        displayEnergyBalance(JSON.parse(event.data));
+    });
+
+    eventSource.addEventListener('health', (event) => {
+        displayHealth(JSON.parse(event.data).ha_connected);
+    });
+
+    eventSource.onerror = () => {
+        // Der Browser verbindet sich selbst neu, bis dahin per Polling aktualisieren
+        if (!refreshTimer) {
+            refreshAll();
+            setupAutoRefresh();
+        }
+    };
+}
+
+function displayHealth(connected) {
+    const statusEl = document.getElementById('connection-status');
+    if (connected) {
+        statusEl.textContent = 'Verbunden';
+        statusEl.style.color = '#4caf50';
+    } else {
+        statusEl.textContent = 'Nicht verbunden (letzte bekannte Werte)';
+        statusEl.style.color = '#f44336';
+    }
+}
+
 async function checkHealth() {
     try {
         const response = await fetch(`${API_BASE}/api/health`);
         const data = await response.json();
-
-        const statusEl = document.getElementById('connection-status');
-        if (data.ha_connected) {
-            statusEl.textContent = 'Verbunden';
-            statusEl.style.color = '#4caf50';
-        } else {
-            statusEl.textContent = 'Nicht verbunden';
-            statusEl.style.color = '#f44336';
-        }
+        displayHealth(data.ha_connected);
     } catch (error) {
         console.error('Health check failed:', error);
         document.getElementById('connection-status').textContent = 'Fehler';
@@ -122,6 +174,9 @@ async function loadEnergyBalance() {
 
 function displayEnergyBalance(balance) {
     const container = document.getElementById('energy-balance');
+    if (!container) {
+        return;
+    }
 
     // Prüfe ob balance die erwartete Struktur hat
     if (!balance || !balance.production || !balance.consumption || !balance.grid || !balance.balance) {
@@ -182,6 +237,13 @@ function setupAutoRefresh() {
     }, REFRESH_INTERVAL);
 }
 
+function stopAutoRefresh() {
+    if (refreshTimer) {
+        clearInterval(refreshTimer);
+        refreshTimer = null;
+    }
+}
+
 function refreshAll() {
     loadSensors();
     checkHealth();
@@ -189,8 +251,9 @@ function refreshAll() {
 
 // Cleanup beim Verlassen der Seite
 window.addEventListener('beforeunload', () => {
-    if (refreshTimer) {
-        clearInterval(refreshTimer);
+    stopAutoRefresh();
+    if (eventSource) {
+        eventSource.close();
     }
 });
 
@@ -0,0 +1,189 @@
+"""Server-Sent Events für das Dashboard von HAminiEMS"""
+
+import json
+import logging
+import queue
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+from .const import STREAM_KEEPALIVE, STREAM_QUEUE_SIZE
+from .fastjson import dumps
+
+logger = logging.getLogger("haminiems.stream")
+
+# Felder, die sich bei jeder Erfassung ändern und allein kein Ereignis auslösen
+VOLATILE_VALUE_FIELDS = ("last_updated",)
+VOLATILE_BALANCE_FIELDS = ("timestamp", "today")
+
+
+def format_event(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    """Formatiert ein Ereignis im SSE-Format"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class Subscription:
+    """Warteschlange eines verbundenen Clients"""
+
+    def __init__(self, max_queue: int):
+        # Ein Platz mehr für das Ende-Signal beim Schließen
+        self.queue: "queue.Queue[Optional[str]]" = queue.Queue(max_queue + 1)
+
+
+class EventBroadcaster:
+    """Verteilt Änderungen eines einzigen Erzeugers an alle SSE-Clients
+
+    Die Datenerfassung meldet jeden Durchlauf per publish_state(); daraus
+    werden nur Ereignisse für tatsächlich geänderte Werte erzeugt und an
+    alle Abonnenten verteilt. Die Last auf Home Assistant und Server bleibt
+    damit unabhängig von der Anzahl offener Dashboards.
+
+    Ereignisse:
+    - snapshot: vollständiger Stand (beim Verbinden und nach Resync)
+    - entities: geänderte (changed) und entfernte (removed) Sensor-Werte
+    - balance: Energiebilanz, wenn sich ein Wert geändert hat
+    - health: Verbindungsstatus zu Home Assistant
+    """
+
+    def __init__(self, max_queue: int = STREAM_QUEUE_SIZE, keepalive: float = STREAM_KEEPALIVE):
+        self.max_queue = max(1, max_queue)
+        self.keepalive = keepalive
+        self._lock = threading.Lock()
+        self._subscribers: List[Subscription] = []
+        self._entities: Dict[str, Any] = {}
+        self._balance: Optional[Dict[str, Any]] = None
+        self._balance_key: Optional[str] = None
+        self._health: Optional[Dict[str, Any]] = None
+        self._event_id = 0
+        self._closed = False
+        self.events_published = 0
+        self.resyncs = 0
+
+    @property
+    def subscribers(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def subscribe(self) -> Subscription:
+        """Meldet einen Client an, das erste Ereignis ist der aktuelle Stand"""
+        subscription = Subscription(self.max_queue)
+        with self._lock:
+            if self._closed:
+                subscription.queue.put_nowait(None)
+                return subscription
+            subscription.queue.put_nowait(self._snapshot_event())
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Meldet einen Client ab"""
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def publish_state(
+        self,
+        values: Dict[str, Any],
+        balance: Optional[Dict[str, Any]] = None,
+        ha_connected: Optional[bool] = None
+    ):
+        """Vergleicht den neuen Stand mit dem letzten und verteilt die Änderungen"""
+        with self._lock:
+            changed = {
+                key: value for key, value in values.items()
+                if self._strip(self._entities.get(key), VOLATILE_VALUE_FIELDS)
+                != self._strip(value, VOLATILE_VALUE_FIELDS)
+            }
+            removed = [key for key in self._entities if key not in values]
+            self._entities = dict(values)
+            if changed or removed:
+                self._publish("entities", {"changed": changed, "removed": removed})
+
+            if balance is not None:
+                balance_key = json.dumps(
+                    self._strip(balance, VOLATILE_BALANCE_FIELDS), sort_keys=True
+                )
+                self._balance = balance
+                if balance_key != self._balance_key:
+                    self._balance_key = balance_key
+                    self._publish("balance", balance)
+
+            if ha_connected is not None:
+                health = {"ha_connected": ha_connected}
+                if health != self._health:
+                    self._health = health
+                    self._publish("health", health)
+
+    def stream(self, subscription: Subscription) -> Iterator[str]:
+        """Liefert die Ereignisse eines Clients im SSE-Format (blockierend)"""
+        try:
+            # Wiederverbindung des Browsers nach 3 Sekunden
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    message = subscription.queue.get(timeout=self.keepalive)
+                except queue.Empty:
+                    # Kommentarzeile hält Proxies und Verbindung offen
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    break
+                yield message
+        finally:
+            self.unsubscribe(subscription)
+
+    def close(self):
+        """Beendet alle Streams"""
+        with self._lock:
+            self._closed = True
+            for subscription in self._subscribers:
+                self._drain(subscription)
+                subscription.queue.put_nowait(None)
+
+    def status(self) -> Dict[str, Any]:
+        """Gibt den Status des Streams zurück"""
+        return {
+            "subscribers": self.subscribers,
+            "events_published": self.events_published,
+            "resyncs": self.resyncs,
+        }
+
+    def _publish(self, event: str, data: Any):
+        """Stellt ein Ereignis allen Abonnenten zu (Lock muss gehalten werden)"""
+        self._event_id += 1
+        self.events_published += 1
+        message = format_event(event, data, self._event_id)
+        for subscription in self._subscribers:
+            if subscription.queue.qsize() < self.max_queue:
+                subscription.queue.put_nowait(message)
+            else:
+                # Langsamer Client: Warteschlange verwerfen, vollständigen Stand nachliefern
+                self._drain(subscription)
+                subscription.queue.put_nowait(self._snapshot_event())
+                self.resyncs += 1
+
+    def _snapshot_event(self) -> str:
+        """Vollständiger Stand als Ereignis (Lock muss gehalten werden)"""
+        return format_event("snapshot", {
+            "entities": self._entities,
+            "balance": self._balance,
+            "health": self._health,
+        }, self._event_id)
+
+    @staticmethod
+    def _drain(subscription: Subscription):
+        while True:
+            try:
+                subscription.queue.get_nowait()
+            except queue.Empty:
+                break
+
+    @staticmethod
+    def _strip(value: Optional[Dict[str, Any]], fields) -> Optional[Dict[str, Any]]:
+        if value is None:
+            return None
+        return {key: item for key, item in value.items() if key not in fields}
@@ -1,12 +1,25 @@
 """Hilfsfunktionen für HAminiEMS"""
 
 import logging
-from typing import Any, Dict, Optional
-from datetime import datetime
+import os
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple, Union
+from datetime import datetime, timezone
 
+from .const import LOG_BACKUP_COUNT, LOG_FILE, LOG_MAX_BYTES
 
-def setup_logging(level: str = "INFO") -> logging.Logger:
-    """Konfiguriert das Logging-System"""
+
+def setup_logging(
+    level: str = "INFO",
+    log_file: Optional[str] = LOG_FILE,
+    max_bytes: int = LOG_MAX_BYTES,
+    backup_count: int = LOG_BACKUP_COUNT
+) -> logging.Logger:
+    """Konfiguriert das Logging-System
+
+    Zusätzlich zur Konsole wird in log_file geschrieben (für die Logs-Seite),
+    sofern das Verzeichnis existiert. Die Datei wird ab max_bytes rotiert.
+    """
     logger = logging.getLogger("haminiems")
     logger.setLevel(getattr(logging, level.upper()))
     
@@ -17,6 +30,20 @@ def setup_logging(level: str = "INFO") -> logging.Logger:
     handler.setFormatter(formatter)
     logger.addHandler(handler)
     
+    if log_file and os.path.isdir(os.path.dirname(log_file) or "."):
+        try:
+            file_handler = RotatingFileHandler(
+                log_file,
+                maxBytes=max_bytes,
+                backupCount=backup_count,
+                encoding="utf-8"
+            )
+        except OSError as e:
+            logger.warning(f"Log-Datei {log_file} kann nicht geöffnet werden: {e}")
+        else:
+            file_handler.setFormatter(formatter)
+            logger.addHandler(file_handler)
+    
     return logger
 
 
@@ -30,6 +57,15 @@ def parse_float(value: Any) -> Optional[float]:
         return None
 
 
+def parse_bool(value: Any, default: bool = False) -> bool:
+    """Konvertiert einen Konfigurationswert zu bool"""
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+
 def parse_datetime(dt_str: str) -> Optional[datetime]:
     """Konvertiert einen ISO-Format String zu datetime"""
     if not dt_str:
@@ -41,6 +77,28 @@ def parse_datetime(dt_str: str) -> Optional[datetime]:
         return None
 
 
+def to_epoch_ms(value: Union[datetime, str, int, float, None]) -> Optional[int]:
+    """Konvertiert einen Zeitpunkt zu Epoch-Millisekunden (UTC)
+
+    Naive datetime-Werte werden als lokale Zeit interpretiert (wie von
+    datetime.now() geliefert), Werte mit Zeitzone entsprechend umgerechnet.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        value = parse_datetime(value.strip())
+        if value is None:
+            return None
+    return int(round(value.timestamp() * 1000))
+
+
+def from_epoch_ms(value: int) -> datetime:
+    """Konvertiert Epoch-Millisekunden zu einem datetime (UTC)"""
+    return datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+
+
 def get_state_class(entity: Dict[str, Any]) -> Optional[str]:
     """Extrahiert state_class aus Entity-Attributen"""
     attributes = entity.get("attributes", {})
@@ -53,6 +111,20 @@ def get_unit(entity: Dict[str, Any]) -> Optional[str]:
     return attributes.get("unit_of_measurement")
 
 
+def history_values(states: Iterable[Dict[str, Any]]) -> Iterator[Tuple[int, float]]:
+    """Liefert (Epoch-ms, Zahlenwert) aus einer History-Antwort
+
+    Einträge ohne Zahlenwert (z.B. "unavailable") werden übersprungen.
+    """
+    for state in states:
+        value = parse_float(state.get("state"))
+        if value is None:
+            continue
+        ts = to_epoch_ms(state.get("last_changed") or state.get("last_updated"))
+        if ts is not None:
+            yield ts, value
+
+
 def is_energy_entity(entity: Dict[str, Any]) -> bool:
     """Prüft ob eine Entity eine Energie-Entity ist"""
     state_class = get_state_class(entity)
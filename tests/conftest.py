@@ -0,0 +1,107 @@
+"""Gemeinsame Fixtures für die HAminiEMS Tests"""
+
+import importlib.util
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+# Python-Paket des Add-Ons importierbar machen
+PACKAGE_ROOT = Path(__file__).resolve().parents[1] / "haminiems" / "rootfs" / "usr" / "bin"
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.insert(0, str(PACKAGE_ROOT))
+DATASET_PATH = Path(__file__).resolve().parents[1] / "benchmarks" / "dataset.py"
+
+# Zeitraum des synthetischen Datensatzes (fixture dataset)
+DATASET_START = datetime(2025, 1, 1)
+DATASET_END = datetime(2025, 1, 3)
+
+from haminiems import database  # noqa: E402
+from haminiems.ha_client import HAClient  # noqa: E402
+from haminiems.sensors import SensorManager  # noqa: E402
+
+
+def ha_state(entity_id, state, unit=None, state_class=None, last_updated=None):
+    """State-Objekt wie von /api/states"""
+    attributes = {}
+    if unit:
+        attributes["unit_of_measurement"] = unit
+    if state_class:
+        attributes["state_class"] = state_class
+    return {
+        "entity_id": entity_id,
+        "state": str(state),
+        "attributes": attributes,
+        "last_updated": last_updated or "2026-01-01T12:00:00+00:00",
+    }
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Leere Datenbank mit allen Migrationen als globale Instanz"""
+    instance = database.Database(str(tmp_path / "haminiems.db"))
+    database._db_instance = instance
+    yield instance
+    instance.close()
+    database._db_instance = None
+
+
+@pytest.fixture
+def sensor_manager(db):
+    """SensorManager auf der Test-Datenbank"""
+    return SensorManager()
+
+
+def load_dataset_module():
+    """Lädt benchmarks/dataset.py (Generator des synthetischen Datensatzes)"""
+    module = sys.modules.get("dataset")
+    if module is None:
+        spec = importlib.util.spec_from_file_location("dataset", DATASET_PATH)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules["dataset"] = module
+        spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def dataset(sensor_manager):
+    """Synthetischer Datensatz über zwei Tage (5-Minuten-Raster) in der Test-Datenbank
+
+    Gibt die Statistik von generate() zurück, ergänzt um start und end.
+    """
+    stats = load_dataset_module().generate(
+        sensor_manager, DATASET_START, DATASET_END, step_s=300
+    )
+    stats.update(start=DATASET_START, end=DATASET_END)
+    return stats
+
+
+@pytest.fixture
+def ha_client(monkeypatch):
+    """HAClient ohne Netzwerk: Anfragen werden aus ha_client.states beantwortet
+
+    Alle Anfragen werden als (Methode, Endpunkt) in ha_client.requests
+    aufgezeichnet.
+    """
+    client = HAClient("http://homeassistant:8123", "token")
+    client.states = {}
+    client.requests = []
+
+    def request(method, endpoint, **kwargs):
+        client.requests.append((method, endpoint))
+        if endpoint.startswith("/api/states/"):
+            return client.states.get(endpoint[len("/api/states/"):])
+        return None
+
+    def request_items(endpoint, select=None, depth=1, **kwargs):
+        client.requests.append(("GET", endpoint))
+        items = list(client.states.values()) if endpoint == "/api/states" else []
+        if select is not None:
+            items = [item for item in map(select, items) if item is not None]
+        return items
+
+    monkeypatch.setattr(client, "_request", request)
+    monkeypatch.setattr(client, "_request_items", request_items)
+    yield client
+    client.close()
@@ -0,0 +1,138 @@
+"""Inkrementelle Energiebilanz, Tagesenergie und Sicherung in app_meta"""
+
+from datetime import datetime
+
+import pytest
+
+from haminiems.balance import BalanceModel, build_balance
+
+MORNING = datetime(2026, 1, 1, 8, 0, 0).timestamp()
+
+
+class Clock:
+    def __init__(self, now=MORNING):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def entry(value, unit):
+    return {"value": value, "unit": unit}
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def model(db, clock, **kwargs):
+    kwargs.setdefault("checkpoint_interval", 3600)
+    return BalanceModel(db, clock=clock, **kwargs)
+
+
+def test_snapshot_matches_full_rebuild_and_is_reused(db, clock):
+    balance = model(db, clock)
+    values = {
+        "pv_production": entry(3000.0, "W"),
+        "grid_import": entry(200.0, "W"),
+        "house_consumption": entry(1800.0, "W"),
+        "battery_charge": entry(1400.0, "W"),
+        "battery_soc": entry(55.0, "%"),
+    }
+    balance.update_values(values)
+    first = balance.snapshot()
+    assert balance.snapshot() is first
+    assert balance.rebuilds == 1
+
+    # Sensor fällt weg, andere ändern sich: nur die Deltas fließen in die Summen
+    values = {key: value for key, value in values.items() if key != "battery_charge"}
+    values["pv_production"] = entry(1000.0, "W")
+    balance.update_values(values)
+    snapshot = balance.snapshot()
+    expected = build_balance({key: value["value"] for key, value in values.items()})
+    for section in ("production", "consumption", "grid", "balance"):
+        assert snapshot[section] == pytest.approx(expected[section])
+    assert snapshot["battery"]["soc"] == 55.0
+    assert balance.rebuilds == 2
+
+
+def test_power_is_held_until_next_update(db, clock):
+    balance = model(db, clock, max_gap_s=900)
+    balance.update_values({"pv_production": entry(2.0, "kW")})
+    clock.advance(600)
+    balance.update_values({"pv_production": entry(1000.0, "W")})
+    clock.advance(1800)
+    # Lücke über max_gap_s zählt nicht
+    balance.update_values({"pv_production": entry(1000.0, "W")})
+    assert balance.today()["energy"]["pv_production"] == pytest.approx(2.0 / 6)
+
+
+def test_counter_differences_and_reset(db, clock):
+    balance = model(db, clock)
+    for value in (100.0, 101.5, 101.4, 0.5):
+        balance.update_values({"grid_import": entry(value, "kWh")})
+        clock.advance(30)
+    # +1.5, kleiner Rückgang ignoriert, Reset zählt den neuen Wert
+    assert balance.today()["energy"]["grid_import"] == pytest.approx(2.0)
+
+
+def test_checkpoint_and_restore_same_day(db, clock):
+    balance = model(db, clock)
+    balance.update_values({"grid_import": entry(100.0, "kWh")})
+    balance.update_values({"grid_import": entry(102.0, "kWh")})
+    balance.checkpoint()
+    assert db.get_meta(BalanceModel.META_KEY)["energy"] == {"grid_import": 2.0}
+
+    clock.advance(600)
+    restored = model(db, clock)
+    assert restored.today()["energy"] == {"grid_import": 2.0}
+    # Der gesicherte Zählerstand bleibt Bezugswert nach dem Neustart
+    restored.update_values({"grid_import": entry(103.0, "kWh")})
+    assert restored.today()["energy"]["grid_import"] == pytest.approx(3.0)
+
+
+def test_checkpoint_of_previous_day_is_not_restored(db, clock):
+    balance = model(db, clock)
+    balance.update_values({"grid_import": entry(100.0, "kWh")})
+    balance.update_values({"grid_import": entry(102.0, "kWh")})
+    balance.checkpoint()
+
+    clock.advance(24 * 3600)
+    restored = model(db, clock)
+    assert restored.today()["energy"] == {}
+
+
+def test_update_checkpoints_after_interval(db, clock):
+    balance = model(db, clock, checkpoint_interval=300)
+    balance.update_values({"grid_import": entry(100.0, "kWh")})
+    clock.advance(60)
+    balance.update_values({"grid_import": entry(101.0, "kWh")})
+    assert db.get_meta(BalanceModel.META_KEY)["energy"] == {"grid_import": 0.0}
+    clock.advance(300)
+    balance.update_values({"grid_import": entry(102.0, "kWh")})
+    assert db.get_meta(BalanceModel.META_KEY)["energy"] == {"grid_import": 2.0}
+
+
+def test_day_rollover_keeps_counter_reference(db, clock):
+    balance = model(db, clock)
+    balance.update_values({
+        "grid_import": entry(100.0, "kWh"),
+        "pv_production": entry(1000.0, "W"),
+    })
+    balance.update_values({
+        "grid_import": entry(105.0, "kWh"),
+        "pv_production": entry(1000.0, "W"),
+    })
+    clock.advance(24 * 3600)
+    balance.update_values({
+        "grid_import": entry(106.0, "kWh"),
+        "pv_production": entry(1000.0, "W"),
+    })
+    today = balance.today()
+    assert today["date"] == "2026-01-02"
+    # Zähler: Differenz zum letzten Stand des Vortags, Leistung beginnt neu
+    assert today["energy"] == {"grid_import": pytest.approx(1.0), "pv_production": 0.0}
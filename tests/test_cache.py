@@ -0,0 +1,111 @@
+"""Thread-sicherer State-Cache mit TTL, LRU und Single-Flight"""
+
+import threading
+import time
+import types
+
+from haminiems import cache as cache_module
+from haminiems.cache import TTLCache
+
+
+def test_disabled_cache_keeps_last_known_value():
+    cache = TTLCache(0)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return {"state": "1500"}
+
+    assert cache.get_or_load(("state", "sensor.pv_power"), loader) == {"state": "1500"}
+    assert cache.get_or_load(("state", "sensor.pv_power"), loader) == {"state": "1500"}
+    assert len(calls) == 2
+    assert cache.get(("state", "sensor.pv_power")) is None
+
+    value, age = cache.get_stale(("state", "sensor.pv_power"))
+    assert value == {"state": "1500"}
+    assert age >= 0
+
+
+def test_disabled_cache_set_and_failed_load():
+    cache = TTLCache(0)
+    cache.set(("states",), [{"entity_id": "sensor.grid"}])
+    assert cache.get_many([("states",)]) == {}
+    assert cache.get_stale(("states",))[0] == [{"entity_id": "sensor.grid"}]
+
+    # Fehlgeschlagene Abrufe überschreiben den letzten Wert nicht
+    assert cache.get_or_load(("states",), lambda: None) is None
+    assert cache.get_stale(("states",))[0] == [{"entity_id": "sensor.grid"}]
+
+
+def test_ttl_expiry_and_lru_eviction(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache_module, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    cache = TTLCache(10, max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    # "b" ist am längsten ungenutzt und wird verdrängt
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+
+    now[0] += 11
+    assert cache.get("a") is None
+    assert cache.get_stale("a") == (1, 11.0)
+
+
+def test_concurrent_misses_load_once():
+    cache = TTLCache(10)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_load("key", loader)))
+        for _ in range(5)
+    ]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    # Warten, bis alle Nachzügler auf den laufenden Ladevorgang warten
+    for _ in range(500):
+        if cache.stats()["coalesced"] == 4:
+            break
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ["value"] * 5
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_failed_load_is_not_cached():
+    cache = TTLCache(10)
+    assert cache.get_or_load("key", lambda: None) is None
+    assert cache.get_or_load("key", lambda: "value") == "value"
+    assert cache.get_or_load("key", lambda: "other") == "value"
+
+
+def test_snapshot_shared_between_callers(ha_client):
+    ha_client.cache = TTLCache(30, name="ha_states")
+    ha_client.states = {"sensor.pv_power": {"entity_id": "sensor.pv_power", "state": "1"}}
+    first = ha_client.get_states_snapshot(["sensor.pv_power"], mode="serial")
+    second = ha_client.get_states_snapshot(["sensor.pv_power"], mode="serial")
+    assert first == second
+    assert ha_client.requests == [("GET", "/api/states/sensor.pv_power")]
+
+    # use_cache=False fragt erneut ab und aktualisiert den Cache
+    ha_client.states["sensor.pv_power"] = {"entity_id": "sensor.pv_power", "state": "2"}
+    ha_client.get_states_snapshot(["sensor.pv_power"], mode="serial", use_cache=False)
+    assert ha_client.get_state("sensor.pv_power")["state"] == "2"
+    assert len(ha_client.requests) == 2
@@ -0,0 +1,131 @@
+"""Entity-Katalog: Index, Suche, Seiten und ETag"""
+
+import time
+
+import pytest
+from conftest import ha_state
+
+from haminiems import main
+from haminiems.catalog import EntityCatalog
+from haminiems.const import CATALOG_PAGE_SIZE_MAX
+
+
+@pytest.fixture
+def catalog(ha_client):
+    ha_client.states = {
+        state["entity_id"]: state for state in (
+            ha_state("sensor.pv_power", 1500, "W", "measurement"),
+            ha_state("sensor.grid_import", 1200.5, "kWh", "total_increasing"),
+            ha_state("sensor.grid_export", 300.1, "kWh", "total_increasing"),
+            ha_state("sensor.outdoor_temperature", 12, "°C", "measurement"),
+            ha_state("number.pv_limit", 80, "%", "measurement"),
+            ha_state("light.kitchen", "on"),
+        )
+    }
+    ha_client.states["sensor.pv_power"]["attributes"]["friendly_name"] = "Solar Leistung"
+    return EntityCatalog(ha_client)
+
+
+def ids(entries):
+    return [entry["entity_id"] for entry in entries]
+
+
+def test_entries_contain_only_energy_entities_sorted(catalog):
+    assert ids(catalog.entries()) == [
+        "number.pv_limit",
+        "sensor.grid_export",
+        "sensor.grid_import",
+        "sensor.outdoor_temperature",
+        "sensor.pv_power",
+    ]
+    assert catalog.entries()[-1] == {
+        "entity_id": "sensor.pv_power",
+        "friendly_name": "Solar Leistung",
+        "state_class": "measurement",
+        "unit": "W",
+    }
+
+
+def test_search_by_index_and_prefix(catalog):
+    assert ids(catalog.search(unit="kWh")[0]) == ["sensor.grid_export", "sensor.grid_import"]
+    assert ids(catalog.search(domain="number")[0]) == ["number.pv_limit"]
+    assert ids(catalog.search(domain="sensor", state_class="measurement")[0]) == [
+        "sensor.outdoor_temperature", "sensor.pv_power"
+    ]
+    # Präfix von entity_id (mit oder ohne Domain) oder friendly_name
+    assert ids(catalog.search(query="pv_")[0]) == ["number.pv_limit", "sensor.pv_power"]
+    assert ids(catalog.search(query="Sensor.Grid_I")[0]) == ["sensor.grid_import"]
+    assert ids(catalog.search(query="solar")[0]) == ["sensor.pv_power"]
+    assert ids(catalog.search(domain="number", query="solar")[0]) == []
+    assert catalog.search(unit="Wh") == ([], 0)
+
+
+def test_search_pages(catalog):
+    first, total = catalog.search(limit=2)
+    second, _ = catalog.search(offset=2, limit=2)
+    last, _ = catalog.search(offset=4, limit=2)
+    assert total == 5
+    assert ids(first + second + last) == ids(catalog.entries())
+    assert len(last) == 1
+    # Ungültige Werte werden begrenzt
+    assert ids(catalog.search(offset=-3, limit=0)[0]) == ["number.pv_limit"]
+    assert len(catalog.search(limit=CATALOG_PAGE_SIZE_MAX + 100)[0]) == 5
+
+
+def test_etag_changes_only_with_entries(catalog, ha_client):
+    catalog.entries()
+    etag = catalog.etag
+    assert etag is not None
+
+    # Geänderter Zustand, gleiche Metadaten: Version bleibt
+    ha_client.states["sensor.pv_power"]["state"] = "1800"
+    assert not catalog.refresh()
+    assert catalog.etag == etag
+
+    ha_client.states["sensor.pv_power"]["attributes"]["unit_of_measurement"] = "kW"
+    assert catalog.refresh()
+    assert catalog.etag != etag
+    assert catalog.search(unit="kW")[1] == 1
+    assert catalog.stats()["changes"] == 2
+
+
+def test_failed_refresh_keeps_catalog(catalog, ha_client, monkeypatch):
+    catalog.entries()
+    etag = catalog.etag
+    monkeypatch.setattr(ha_client, "select_states", lambda select: None)
+    assert not catalog.refresh()
+    assert catalog.etag == etag
+    assert len(catalog.entries()) == 5
+
+
+def test_invalidate_refreshes_in_background(catalog, ha_client):
+    catalog.entries()
+    ha_client.states["sensor.battery_charge"] = ha_state(
+        "sensor.battery_charge", 1, "kWh", "total_increasing"
+    )
+    catalog.invalidate({"action": "create", "entity_id": "sensor.battery_charge"})
+    deadline = time.monotonic() + 5
+    while catalog.stats()["entities"] != 6 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert "sensor.battery_charge" in ids(catalog.entries())
+
+
+def test_api_catalog_answers_if_none_match_with_304(catalog, ha_client, monkeypatch):
+    monkeypatch.setattr(main, "entity_catalog", catalog)
+    monkeypatch.setattr(main, "ha_client", ha_client)
+    client = main.app.test_client()
+
+    response = client.get("/api/catalog?unit=kWh&limit=1")
+    assert response.status_code == 200
+    assert response.json["total"] == 2
+    assert ids(response.json["data"]) == ["sensor.grid_export"]
+    assert response.headers["Cache-Control"] == "no-cache"
+    etag = response.headers["ETag"]
+
+    response = client.get("/api/catalog?unit=kWh&limit=1", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+
+    response = client.get("/api/catalog?unit=kWh&limit=1&offset=1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert ids(response.json["data"]) == ["sensor.grid_import"]
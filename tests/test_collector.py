@@ -0,0 +1,75 @@
+"""Erfassung der Sensor-Werte im Hintergrund"""
+
+import time
+
+import pytest
+
+from conftest import ha_state
+from haminiems.calculations import CalculationEngine
+from haminiems.collector import DataCollector
+
+
+@pytest.fixture
+def collector(ha_client, sensor_manager):
+    ha_client.states = {
+        "sensor.pv_power": ha_state("sensor.pv_power", 1500, "W", "measurement"),
+    }
+    sensor_manager.save_configs([{"sensor_key": "pv_production", "entity_id": "sensor.pv_power"}])
+    engine = CalculationEngine(ha_client, sensor_manager)
+    instance = DataCollector(engine, sensor_manager, interval=60)
+    yield instance
+    instance.stop()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_run_once_stores_values_and_notifies(collector, sensor_manager):
+    notified = []
+    collector.add_listener(lambda values, connected: notified.append((values, connected)))
+
+    assert collector.run_once() == {"configured": 1, "fetched": 1, "updated": 1}
+    assert sensor_manager.get_latest_value("sensor.pv_power")["value"] == 1500.0
+    assert notified[0][0]["pv_production"]["value"] == 1500.0
+    assert notified[0][1] is True
+    # Erfasste Werte werden ohne Anfrage an Home Assistant geliefert
+    requests = len(collector.calculation_engine.ha_client.requests)
+    assert collector.calculation_engine.get_current_values()["pv_production"]["value"] == 1500.0
+    assert len(collector.calculation_engine.ha_client.requests) == requests
+
+
+def test_unreachable_home_assistant_counts_as_failure(collector):
+    collector.calculation_engine.ha_client.states = {}
+    notified = []
+    collector.add_listener(lambda values, connected: notified.append(connected))
+
+    collector.run_once()
+    collector.run_once()
+    assert collector.failures == 2
+    assert collector.consecutive_failures == 2
+    assert notified == [False, False]
+
+
+def test_overlapping_run_is_skipped(collector):
+    collector._run_lock.acquire()
+    try:
+        assert collector.run_once() is None
+    finally:
+        collector._run_lock.release()
+    assert collector.skipped == 1
+    assert collector.runs == 0
+
+
+def test_loop_runs_immediately_and_on_trigger(collector):
+    collector.start()
+    assert wait_for(lambda: collector.runs == 1)
+    collector.trigger()
+    assert wait_for(lambda: collector.runs == 2)
+    # Das Raster bleibt: der nächste reguläre Durchlauf erst nach dem Intervall
+    assert collector.status()["next_run_in"] > 50
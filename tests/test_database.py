@@ -0,0 +1,81 @@
+"""Schreib-Verbindung, Pragmas und Read-Pool der Datenbank"""
+
+import threading
+
+import pytest
+
+from haminiems import database
+
+
+def test_wal_and_pragmas(tmp_path):
+    db = database.Database(
+        str(tmp_path / "pragmas.db"), synchronous="normal", cache_size=-4000, temp_store="memory"
+    )
+    try:
+        assert db.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert db.conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+        assert db.conn.execute("PRAGMA cache_size").fetchone()[0] == -4000
+        assert db.conn.execute("PRAGMA temp_store").fetchone()[0] == 2
+        with db.read_connection() as conn:
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+    finally:
+        db.close()
+
+
+def test_invalid_pragma_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        database.Database(str(tmp_path / "invalid.db"), synchronous="sometimes")
+
+
+def test_read_connections_are_read_only(db):
+    with db.read_connection() as conn:
+        assert conn is not db.conn
+        with pytest.raises(Exception, match="readonly"):
+            conn.execute("INSERT INTO app_meta (key, value) VALUES ('x', '1')")
+
+
+def test_read_pool_is_bounded_and_reused(tmp_path):
+    db = database.Database(str(tmp_path / "pool.db"), read_pool_size=2)
+    try:
+        with db.read_connection() as first, db.read_connection() as second:
+            assert first is not second
+            waiting = threading.Event()
+            got = []
+
+            def third():
+                waiting.set()
+                with db.read_connection() as conn:
+                    got.append(conn)
+
+            thread = threading.Thread(target=third)
+            thread.start()
+            waiting.wait(5)
+            thread.join(0.2)
+            # Pool ausgeschöpft: der dritte Leser wartet auf eine freie Verbindung
+            assert thread.is_alive()
+        thread.join(5)
+        assert got[0] in (first, second)
+        assert db._read_connections == 2
+    finally:
+        db.close()
+
+
+def test_reader_sees_committed_writes_while_writer_holds_lock(db):
+    db.set_meta("value", 1)
+    with db._write_lock:
+        # Leser blockieren nicht, solange die Schreib-Verbindung belegt ist
+        result = []
+        thread = threading.Thread(target=lambda: result.append(db.get_meta("value")))
+        thread.start()
+        thread.join(5)
+        assert result == [1]
+
+
+def test_memory_database_uses_write_connection():
+    db = database.Database(":memory:")
+    try:
+        assert db.read_pool_size == 0
+        db.set_meta("key", "value")
+        assert db.get_meta("key") == "value"
+    finally:
+        db.close()
@@ -0,0 +1,77 @@
+"""Synthetischer Datensatz und Wiederherstellung des Rollup-Triggers"""
+
+from datetime import datetime
+
+import pytest
+from conftest import DATASET_END, DATASET_START, load_dataset_module
+
+from haminiems import database
+from haminiems.const import SENSOR_KEYS
+
+ROLLUP_TRIGGER = "trg_entity_values_rollup"
+
+
+def has_trigger(db):
+    return db.fetch_one(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (ROLLUP_TRIGGER,)
+    ) is not None
+
+
+def test_dataset_writes_values_rollups_and_configs(dataset, sensor_manager):
+    db = sensor_manager.db
+    # 2 Tage im 5-Minuten-Raster für alle Sensoren, abzüglich Lücken
+    assert 0 < dataset["rows"] <= 2 * 288 * len(SENSOR_KEYS)
+    assert db.fetch_one("SELECT COUNT(*) FROM entity_values")[0] == dataset["rows"]
+    assert {config["sensor_key"] for config in sensor_manager.get_enabled_sensors()} == set(SENSOR_KEYS)
+
+    # Jede Auflösung enthält alle Werte genau einmal
+    for resolution, samples in db.fetch_all(
+        "SELECT resolution, SUM(sample_count) FROM entity_rollups GROUP BY resolution"
+    ):
+        assert samples == dataset["rows"], resolution
+    assert has_trigger(db)
+    assert db.get_meta("rollup_backfill") is None
+
+
+def test_generate_rows_is_reproducible():
+    module = load_dataset_module()
+    refs = {key: n for n, key in enumerate(SENSOR_KEYS)}
+    start, end = datetime(2025, 6, 1), datetime(2025, 6, 2)
+    assert list(module.generate_rows(refs, start, end, 600)) == list(
+        module.generate_rows(refs, start, end, 600)
+    )
+
+
+def test_interrupted_generate_restores_trigger(sensor_manager, monkeypatch):
+    module = load_dataset_module()
+
+    def interrupt(*args, **kwargs):
+        raise KeyboardInterrupt()
+
+    monkeypatch.setattr(module, "rebuild_rollups", interrupt)
+    with pytest.raises(KeyboardInterrupt):
+        module.generate(sensor_manager, DATASET_START, DATASET_END, step_s=3600)
+    assert has_trigger(sensor_manager.db)
+    assert sensor_manager.db.get_meta("rollup_backfill") == {}
+
+
+def test_database_restores_missing_trigger_at_startup(tmp_path):
+    path = str(tmp_path / "haminiems.db")
+    db = database.Database(path)
+    # Zustand nach hartem Abbruch des Generators: Trigger fehlt, nichts geplant
+    db.execute(f"DROP TRIGGER {ROLLUP_TRIGGER}")
+    db.execute("DELETE FROM app_meta WHERE key = 'rollup_backfill'")
+    db.close()
+
+    db = database.Database(path)
+    try:
+        assert has_trigger(db)
+        assert db.get_meta("rollup_backfill") == {}
+        # Bei vorhandenem Trigger bleibt ein laufendes Nachrechnen unverändert
+        db.set_meta("rollup_backfill", {"entities": [1], "cursor": 0, "start": 0, "windows": 3})
+        db.close()
+        db = database.Database(path)
+        assert has_trigger(db)
+        assert db.get_meta("rollup_backfill")["windows"] == 3
+    finally:
+        db.close()
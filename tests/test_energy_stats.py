@@ -0,0 +1,97 @@
+"""Tagesenergie aus Zählerständen und gespeicherte Tagesstatistiken"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from haminiems.energy_stats import EnergyStatistics
+from haminiems.maintenance import LegacyImportTask
+
+DAY = date(2024, 3, 5)
+MIDNIGHT = datetime.combine(DAY, datetime.min.time())
+
+
+def save_counter(sensor_manager, entity_id, readings, unit="kWh"):
+    """Speichert Zählerstände als (Stunden nach Mitternacht, Wert)"""
+    sensor_manager.save_entity_values([
+        {
+            "entity_id": entity_id, "value": value, "unit": unit,
+            "state_class": "total_increasing",
+            "timestamp": MIDNIGHT + timedelta(hours=hours),
+        }
+        for hours, value in readings
+    ])
+    return sensor_manager.get_entity_ref(entity_id, create=False)
+
+
+@pytest.fixture
+def stats(sensor_manager):
+    while LegacyImportTask(sensor_manager).step():
+        pass
+    # Alle Tage vor "heute" (DAY + 10) gelten als abgeschlossen
+    now = datetime.combine(DAY + timedelta(days=10), datetime.min.time()).timestamp()
+    return EnergyStatistics(sensor_manager, clock=lambda: now)
+
+
+def stored_days(db):
+    return {row["day"]: row["energy"] for row in db.fetch_all("SELECT * FROM daily_statistics")}
+
+
+def test_counter_differences_include_value_before_midnight(stats, sensor_manager):
+    ref = save_counter(sensor_manager, "sensor.grid", [(-1, 100.0), (6, 103.0), (18, 110.0), (30, 112.0)])
+    result = stats.compute_days(ref, [DAY, DAY + timedelta(days=1)])
+    assert result[DAY.isoformat()]["energy"] == pytest.approx(10.0)
+    assert result[DAY.isoformat()]["samples"] == 2
+    assert result[DAY.isoformat()]["max_gap_s"] == 12 * 3600
+    assert result[(DAY + timedelta(days=1)).isoformat()]["energy"] == pytest.approx(2.0)
+
+
+def test_counter_reset_counts_new_value(stats, sensor_manager):
+    # Reset auf 0 und Neustart bei 1.5: danach gezählte Energie wird übernommen
+    ref = save_counter(sensor_manager, "sensor.grid", [(1, 100.0), (2, 104.0), (3, 1.5), (4, 3.0)])
+    assert stats.compute_days(ref, [DAY])[DAY.isoformat()]["energy"] == pytest.approx(4.0 + 1.5 + 1.5)
+
+
+def test_small_decrease_is_ignored(stats, sensor_manager):
+    # Rückgang um 5 % ist kein Reset (z.B. Rundung), nur der Anstieg danach zählt
+    ref = save_counter(sensor_manager, "sensor.grid", [(1, 100.0), (2, 95.0), (3, 97.0)])
+    assert stats.compute_days(ref, [DAY])[DAY.isoformat()]["energy"] == pytest.approx(2.0)
+
+
+def test_daily_total_treats_every_decrease_as_reset(stats, sensor_manager):
+    # Tageszähler mit 4.6 kWh beim ersten Wert nach Mitternacht
+    save_counter(sensor_manager, "sensor.grid_today", [(23, 5.0), (24.5, 4.6), (26, 5.0)])
+    next_day = DAY + timedelta(days=1)
+    total = stats.get_daily_energy("sensor.grid_today", [next_day])
+    daily = stats.get_daily_energy("sensor.grid_today", [next_day], daily_total="daily")
+    assert total[next_day.isoformat()]["energy"] == pytest.approx(0.4)
+    assert daily[next_day.isoformat()]["energy"] == pytest.approx(5.0)
+
+
+def test_unit_factor_and_day_without_samples(stats, sensor_manager):
+    save_counter(sensor_manager, "sensor.grid_wh", [(1, 1000.0), (2, 3500.0)], unit="Wh")
+    empty = DAY + timedelta(days=1)
+    result = stats.get_daily_energy("sensor.grid_wh", [DAY, empty])
+    assert result[DAY.isoformat()]["energy"] == pytest.approx(2.5)
+    assert result[empty.isoformat()] == {"energy": 0.0, "samples": 0, "max_gap_s": None}
+
+
+def test_reads_do_not_store_days(stats, sensor_manager):
+    save_counter(sensor_manager, "sensor.grid", [(1, 100.0), (2, 104.0)])
+    stats.get_daily_energy("sensor.grid", [DAY - timedelta(days=1), DAY, DAY + timedelta(days=1)])
+    assert stored_days(sensor_manager.db) == {}
+
+
+def test_materialize_stores_closed_days_and_reads_use_them(stats, sensor_manager):
+    save_counter(sensor_manager, "sensor.grid", [(1, 100.0), (2, 104.0), (50, 110.0)])
+    assert stats.materialize("sensor.grid", None, max_days=10) == 3
+    assert stored_days(sensor_manager.db) == pytest.approx({
+        DAY.isoformat(): 4.0,
+        (DAY + timedelta(days=1)).isoformat(): 0.0,
+        (DAY + timedelta(days=2)).isoformat(): 6.0,
+    })
+    assert stats.materialize("sensor.grid", None, max_days=10) == 0
+
+    # Gespeicherte Tage werden gelesen statt neu berechnet
+    sensor_manager.db.execute("UPDATE daily_statistics SET energy = 42.0 WHERE day = ?", (DAY.isoformat(),))
+    assert stats.get_daily_energy("sensor.grid", [DAY])[DAY.isoformat()]["energy"] == 42.0
@@ -0,0 +1,82 @@
+"""Blockweises Lesen von JSON-Arrays über beliebige Blockgrenzen"""
+
+import json
+
+import pytest
+
+from haminiems.fastjson import ArrayItemParser, collect_items, dumps
+
+STATES = [
+    {"entity_id": "sensor.pv_power", "state": "1500", "attributes": {"unit_of_measurement": "W"}},
+    {"entity_id": "sensor.küche_temperatur", "state": "21.5", "attributes": {"friendly_name": "Küche °C ✓"}},
+    {"entity_id": "sensor.text", "state": "a ] , [ \\\" b", "attributes": {}},
+]
+SCALARS = [0, -12, 1.5, 2e3, -0.25e-2, 123456789, True, False, None, "x", [1, [2]], {}]
+
+
+def chunked(data: bytes, size: int):
+    return [data[n:n + size] for n in range(0, len(data), size)]
+
+
+def split_everywhere(data: bytes):
+    """Alle Aufteilungen in zwei Blöcke"""
+    for n in range(len(data) + 1):
+        yield [data[:n], data[n:]]
+
+
+@pytest.mark.parametrize("items", [STATES, SCALARS], ids=["states", "scalars"])
+def test_every_split_point_gives_same_items(items):
+    data = json.dumps(items, ensure_ascii=False).encode()
+    for chunks in split_everywhere(data):
+        assert collect_items(chunks) == items, chunks
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64])
+def test_small_chunks(size):
+    data = json.dumps(SCALARS + STATES, ensure_ascii=False, indent=2).encode()
+    assert collect_items(chunked(data, size)) == SCALARS + STATES
+
+
+def test_items_are_returned_as_soon_as_complete():
+    parser = ArrayItemParser()
+    assert parser.feed(b'[{"a": 1}, {"b"') == [{"a": 1}]
+    assert parser.feed(b': 2}, 1') == [{"b": 2}]
+    # Die Zahl kann im nächsten Block weitergehen
+    assert parser.feed(b'2') == []
+    assert parser.feed(b']') == [12]
+    assert parser.close() == []
+
+
+def test_history_depth_two_and_trailing_content():
+    data = json.dumps([STATES[:2], STATES[2:]]).encode()
+    assert collect_items(chunked(data, 5), depth=2) == STATES[:2]
+    # Nach dem Ende des Arrays wird nichts mehr gelesen
+    assert collect_items([b"[1, 2] garbage"]) == [1, 2]
+
+
+def test_select_reduces_and_drops_items():
+    data = json.dumps(STATES).encode()
+    select = lambda state: state["entity_id"] if state["state"][0].isdigit() else None  # noqa: E731
+    assert collect_items(chunked(data, 9), select) == ["sensor.pv_power", "sensor.küche_temperatur"]
+
+
+def test_empty_array():
+    assert collect_items([b" [ ", b" ] "]) == []
+    assert collect_items([b"[[]]"], depth=2) == []
+
+
+@pytest.mark.parametrize("data", [b"", b'[{"a": 1}, {"b":', b"[1, 2", b"[1.", b"[\"abc"])
+def test_incomplete_array_raises(data):
+    with pytest.raises(ValueError):
+        collect_items(chunked(data, 2))
+
+
+def test_non_array_raises():
+    with pytest.raises(ValueError, match="JSON-Array erwartet"):
+        collect_items([b'{"message": "error"}'])
+
+
+def test_dumps_is_compact_json():
+    data = {"a": [1, 2.5, None], "b": "ä"}
+    assert json.loads(dumps(data)) == data
+    assert " " not in dumps(data)
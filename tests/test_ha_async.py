@@ -0,0 +1,171 @@
+"""Asynchroner Client gegen einen lokalen Stand-in für die REST API"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("aiohttp")
+from aiohttp import web  # noqa: E402
+
+from haminiems import ha_client as ha_client_module  # noqa: E402
+from haminiems.breaker import CircuitBreaker  # noqa: E402
+from haminiems.ha_async import AsyncHAClient  # noqa: E402
+from haminiems.ha_client import HAClient  # noqa: E402
+
+TOKEN = "secret"
+
+
+class FakeRestApi:
+    """Home Assistant REST API mit einstellbarer Verzögerung je Entity"""
+
+    def __init__(self):
+        self.delays = {}
+        self.active = 0
+        self.max_active = 0
+        self.requests = []
+        self.loop = asyncio.new_event_loop()
+        self.port = None
+
+    async def get_state(self, request):
+        entity_id = request.match_info["entity_id"]
+        self.requests.append((request.path, request.headers.get("Authorization")))
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delays.get(entity_id, 0))
+        finally:
+            self.active -= 1
+        if entity_id == "sensor.broken":
+            raise web.HTTPInternalServerError()
+        if entity_id == "sensor.missing":
+            raise web.HTTPNotFound()
+        return web.json_response({"entity_id": entity_id, "state": "1", "attributes": {}})
+
+    async def get_states(self, request):
+        states = [{"entity_id": f"sensor.test_{n}", "state": str(n)} for n in range(500)]
+        return web.json_response(states)
+
+    def start(self):
+        app = web.Application()
+        app.router.add_get("/api/states", self.get_states)
+        app.router.add_get("/api/states/{entity_id}", self.get_state)
+        # Verbindungsabbruch des Clients beendet den Handler
+        self.runner = web.AppRunner(app, handler_cancellation=True)
+        self.loop.run_until_complete(self.runner.setup())
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        self.loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.loop.close()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+
+@pytest.fixture
+def api():
+    server = FakeRestApi()
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def client(api):
+    instance = AsyncHAClient(api.url, TOKEN, max_concurrency=4, request_timeout=2)
+    yield instance
+    instance.close()
+
+
+def test_request_sends_token_and_decodes_json(api, client):
+    assert client.request("GET", "/api/states/sensor.pv_power")["entity_id"] == "sensor.pv_power"
+    assert api.requests == [("/api/states/sensor.pv_power", f"Bearer {TOKEN}")]
+    assert client.stats()["requests"] == 1
+
+
+def test_get_states_runs_concurrently_up_to_the_limit(api, client):
+    entity_ids = [f"sensor.test_{n}" for n in range(8)]
+    api.delays = {entity_id: 0.2 for entity_id in entity_ids}
+    started = time.perf_counter()
+    states = client.get_states(entity_ids + entity_ids[:2])
+    elapsed = time.perf_counter() - started
+
+    assert sorted(states) == sorted(entity_ids)
+    # 8 Anfragen bei 4 gleichzeitig: zwei Runden statt acht
+    assert api.max_active == 4
+    assert elapsed < 0.2 * 8 / 2
+
+
+def test_get_states_cancels_slow_requests_after_timeout(api, client):
+    api.delays = {"sensor.slow": 3}
+    states = client.get_states(["sensor.fast", "sensor.slow"], timeout=0.3)
+    assert list(states) == ["sensor.fast"]
+    assert client.cancelled == 1
+    # Abgebrochene Anfragen schließen ihre Verbindung sofort
+    assert wait_for(lambda: api.active == 0, timeout=1.0)
+
+
+def test_errors_return_none_and_only_server_errors_trip_the_breaker(api):
+    breaker = CircuitBreaker(failure_threshold=2)
+    instance = AsyncHAClient(api.url, TOKEN, breaker=breaker)
+    try:
+        assert instance.request("GET", "/api/states/sensor.missing") is None
+        assert instance.request("GET", "/api/states/sensor.missing") is None
+        assert breaker.closed
+        assert instance.request("GET", "/api/states/sensor.broken") is None
+        assert instance.request("GET", "/api/states/sensor.broken") is None
+        assert not breaker.closed
+        # Offener Breaker: keine weitere Anfrage an Home Assistant
+        sent = len(api.requests)
+        assert instance.request("GET", "/api/states/sensor.pv_power") is None
+        assert len(api.requests) == sent
+        assert instance.errors == 4
+    finally:
+        instance.close()
+
+
+def test_request_timeout_counts_as_failure(api, client):
+    api.delays = {"sensor.slow": 3}
+    assert client.request("GET", "/api/states/sensor.slow", timeout=0.2) is None
+    assert client.timeouts == 1
+
+
+def test_request_items_streams_array(api, client):
+    items = client.request_items("/api/states", select=lambda item: item["entity_id"])
+    assert len(items) == 500
+    assert items[-1] == "sensor.test_499"
+
+
+def test_ha_client_uses_async_client(api):
+    instance = HAClient(api.url, TOKEN, use_async=True)
+    try:
+        assert instance.async_client is not None
+        assert instance.get_state("sensor.pv_power")["state"] == "1"
+        assert instance.async_client.requests == 1
+    finally:
+        instance.close()
+
+
+def test_ha_client_without_aiohttp_falls_back_to_requests(monkeypatch):
+    monkeypatch.setattr(ha_client_module, "HAS_AIOHTTP", False)
+    instance = HAClient("http://homeassistant:8123", TOKEN, use_async=True)
+    assert instance.async_client is None
+    instance.close()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
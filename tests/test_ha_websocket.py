@@ -0,0 +1,224 @@
+"""WebSocket-Client gegen einen Stand-in für die Home Assistant WebSocket API"""
+
+import json
+import queue
+import threading
+import time
+import types
+
+import pytest
+
+from haminiems import ha_websocket
+from haminiems.ha_client import HAClient
+from haminiems.ha_websocket import AuthenticationError, HAWebSocketClient
+
+TOKEN = "secret"
+
+
+def state(entity_id, value):
+    return {"entity_id": entity_id, "state": str(value), "attributes": {}}
+
+
+class FakeTimeout(Exception):
+    """Ersetzt websocket.WebSocketTimeoutException"""
+
+
+class FakeConnection:
+    """Eine Verbindung zum Stand-in: beantwortet Befehle wie Home Assistant"""
+
+    def __init__(self, server):
+        self.server = server
+        self.inbox: "queue.Queue[str]" = queue.Queue()
+        self.sent = []
+        self.closed = False
+        self.subscriptions = []
+        self.push({"type": "auth_required"})
+
+    def push(self, message):
+        self.inbox.put(json.dumps(message))
+
+    def send(self, raw):
+        message = json.loads(raw)
+        self.sent.append(message)
+        if message["type"] == "auth":
+            if message["access_token"] == self.server.token:
+                self.push({"type": "auth_ok"})
+            else:
+                self.push({"type": "auth_invalid", "message": "Invalid access token"})
+        elif message["type"] == "subscribe_events":
+            self.subscriptions.append(message["id"])
+            self.push({"id": message["id"], "type": "result", "success": True, "result": None})
+        elif message["type"] == "get_states":
+            self.push({
+                "id": message["id"], "type": "result", "success": True,
+                "result": list(self.server.states.values()),
+            })
+
+    def fire(self, entity_id, new_state):
+        """Sendet ein state_changed Event an alle Abonnements"""
+        for subscription in self.subscriptions:
+            self.push({
+                "id": subscription, "type": "event",
+                "event": {"event_type": "state_changed", "data": {
+                    "entity_id": entity_id, "new_state": new_state,
+                }},
+            })
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def recv(self):
+        if self.closed:
+            return ""
+        try:
+            return self.inbox.get(timeout=0.05)
+        except queue.Empty:
+            raise FakeTimeout()
+
+    def close(self):
+        self.closed = True
+
+
+class FakeHomeAssistant:
+    """Stand-in für Home Assistant, ersetzt das websocket-Modul"""
+
+    def __init__(self, token=TOKEN):
+        self.token = token
+        self.states = {}
+        self.connections = []
+
+    def create_connection(self, url, timeout=None):
+        connection = FakeConnection(self)
+        self.connections.append(connection)
+        return connection
+
+    def module(self):
+        return types.SimpleNamespace(
+            create_connection=self.create_connection,
+            WebSocketTimeoutException=FakeTimeout,
+        )
+
+
+@pytest.fixture
+def ha(monkeypatch):
+    server = FakeHomeAssistant()
+    server.states = {
+        "sensor.pv_power": state("sensor.pv_power", 1500),
+        "sensor.grid_power": state("sensor.grid_power", 200),
+        "sensor.untracked": state("sensor.untracked", 1),
+    }
+    monkeypatch.setattr(ha_websocket, "websocket", server.module())
+    monkeypatch.setattr(ha_websocket, "HAS_WEBSOCKET", True)
+    return server
+
+
+def drain(client):
+    """Verarbeitet alle anstehenden Nachrichten der aktuellen Verbindung"""
+    while not client._ws.inbox.empty():
+        client._handle(client._receive())
+
+
+def connect(entity_ids, token=TOKEN):
+    client = HAWebSocketClient("http://supervisor/core", token, entity_ids)
+    client._connect()
+    drain(client)
+    return client
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_auth_handshake_and_initial_sync(ha):
+    client = connect(["sensor.pv_power", "sensor.grid_power"])
+    sent = ha.connections[0].sent
+    assert client.url == "ws://supervisor/core/websocket"
+    assert sent[0] == {"type": "auth", "access_token": TOKEN}
+    assert [m["type"] for m in sent[1:]] == ["subscribe_events", "get_states"]
+    assert client.connected
+    assert client.get_state("sensor.pv_power")["state"] == "1500"
+    # Nur verfolgte Entities landen in der Tabelle
+    assert client.get_state("sensor.untracked") is None
+
+
+def test_auth_invalid_raises(ha):
+    client = HAWebSocketClient("http://homeassistant:8123", "wrong", ["sensor.pv_power"])
+    with pytest.raises(AuthenticationError, match="Invalid access token"):
+        client._connect()
+    assert not client.connected
+
+
+def test_state_changed_only_for_tracked_entities(ha):
+    client = connect(["sensor.pv_power"])
+    connection = ha.connections[0]
+    connection.fire("sensor.pv_power", state("sensor.pv_power", 1800))
+    connection.fire("sensor.untracked", state("sensor.untracked", 2))
+    drain(client)
+    assert client.get_state("sensor.pv_power")["state"] == "1800"
+    assert client.get_state("sensor.untracked") is None
+    assert client.events_received == 1
+
+
+def test_removed_entity_deletes_state(ha):
+    client = connect(["sensor.pv_power"])
+    ha.connections[0].fire("sensor.pv_power", None)
+    drain(client)
+    assert client.get_state("sensor.pv_power") is None
+    assert client.connected
+
+
+def test_listen_resyncs_added_entities(ha):
+    client = connect(["sensor.pv_power"])
+    client.set_entity_ids(["sensor.pv_power", "sensor.grid_power"])
+    listener = threading.Thread(target=client._listen)
+    listener.start()
+    try:
+        assert wait_for(lambda: client.get_state("sensor.grid_power") is not None)
+    finally:
+        client._stop.set()
+        listener.join()
+    assert [m["type"] for m in ha.connections[0].sent].count("get_states") == 2
+
+
+def test_reconnect_resyncs_states(ha):
+    client = HAWebSocketClient(
+        "http://homeassistant:8123", TOKEN, ["sensor.pv_power"], backoff_min=0.01, backoff_max=0.02
+    )
+    assert client.start()
+    try:
+        assert wait_for(lambda: client.connected)
+        # Verbindung bricht ab, währenddessen ändert sich der Wert
+        ha.states["sensor.pv_power"] = state("sensor.pv_power", 900)
+        ha.connections[0].close()
+        assert wait_for(lambda: len(ha.connections) == 2 and client.connected)
+        assert client.get_state("sensor.pv_power")["state"] == "900"
+        assert client.connects == 2
+    finally:
+        client.stop()
+    assert not client.connected
+
+
+def test_ha_client_falls_back_to_rest_while_disconnected(ha, monkeypatch):
+    client = HAClient("http://homeassistant:8123", TOKEN)
+    client.live_states = HAWebSocketClient("http://homeassistant:8123", TOKEN, ["sensor.pv_power"])
+    requests_made = []
+
+    def fake_request(method, endpoint, **kwargs):
+        requests_made.append(endpoint)
+        return state("sensor.pv_power", 700)
+
+    monkeypatch.setattr(client, "_request", fake_request)
+    assert not client.live_states.connected
+    assert client.get_state("sensor.pv_power")["state"] == "700"
+    assert requests_made == ["/api/states/sensor.pv_power"]
+
+    # Verbunden kommt der State aus der WebSocket-Tabelle
+    client.live_states._connect()
+    drain(client.live_states)
+    assert client.get_state("sensor.pv_power")["state"] == "1500"
+    assert len(requests_made) == 1
@@ -0,0 +1,147 @@
+"""Nachladen des Verlaufs neu aktivierter Sensoren aus dem Recorder"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from conftest import ha_state
+
+from haminiems.energy_stats import EnergyStatistics
+from haminiems.maintenance import HistoryBackfillTask, LegacyImportTask
+from haminiems.utils import to_epoch_ms
+
+NOW = datetime(2026, 3, 10, 12, 0, tzinfo=timezone.utc)
+HOUR = timedelta(hours=1)
+
+
+class FakeRecorder:
+    """Beantwortet /api/history/period aus einer Liste von (Zeitpunkt, Wert)"""
+
+    def __init__(self, history):
+        self.history = history
+        self.available = True
+        self.calls = []
+        self.fail = False
+
+    def get_history(self, entity_id, start_time, end_time=None, **kwargs):
+        self.calls.append((entity_id, start_time, end_time, kwargs))
+        if self.fail:
+            return None
+        return [
+            {"state": str(value), "last_changed": ts.isoformat()}
+            for ts, value in self.history.get(entity_id, [])
+            if start_time <= ts <= end_time
+        ]
+
+    def get_state(self, entity_id):
+        return ha_state(entity_id, 0, "kWh", "total_increasing")
+
+
+def stored(db, entity_id):
+    return db.fetch_all(
+        "SELECT ts, value FROM entity_values JOIN entities ON entities.id = entity_ref "
+        "WHERE entity_id = ? ORDER BY ts",
+        (entity_id,)
+    )
+
+
+@pytest.fixture
+def recorder():
+    # Stündliche Zählerstände der letzten zwei Tage
+    return FakeRecorder({
+        "sensor.grid_import": [(NOW - HOUR * n, 1000.0 - n) for n in range(1, 49)],
+    })
+
+
+@pytest.fixture
+def manager(sensor_manager):
+    while LegacyImportTask(sensor_manager).step():
+        pass
+    sensor_manager.save_config("grid_import", "sensor.grid_import")
+    return sensor_manager
+
+
+def backfill(recorder, manager, **kwargs):
+    kwargs.setdefault("days", 1)
+    kwargs.setdefault("pause", 0)
+    return HistoryBackfillTask(recorder, manager, clock=NOW.timestamp, **kwargs)
+
+
+def run(task):
+    while task.step():
+        pass
+
+
+def test_loads_window_by_window_from_new_to_old(recorder, manager):
+    task = backfill(recorder, manager, window=6 * 3600, max_points=2)
+    run(task)
+
+    rows = stored(manager.db, "sensor.grid_import")
+    assert len(rows) == 24
+    assert rows[0]["value"] == 976.0
+    ends = [call[2] for call in recorder.calls]
+    assert ends == sorted(ends, reverse=True)
+    assert all(call[3] == {"minimal_response": True, "no_attributes": True} for call in recorder.calls)
+    # Mehr Werte als max_points: Fenster halbiert sich, bis sie passen
+    assert task.status()["window_hours"] == 1.5
+    assert task.status()["pending_entities"] == 0
+    assert task.status()["imported"] == 24
+
+
+def test_only_loads_before_first_stored_value(recorder, manager):
+    manager.save_entity_values([{
+        "entity_id": "sensor.grid_import", "value": 990.0, "timestamp": NOW - HOUR * 10,
+    }])
+    run(backfill(recorder, manager))
+    rows = stored(manager.db, "sensor.grid_import")
+    assert len(rows) == 24 - 10 + 1
+    assert rows[-1]["ts"] == to_epoch_ms(NOW - HOUR * 10)
+
+
+def test_failed_request_halves_window_and_raises(recorder, manager):
+    task = backfill(recorder, manager, window=8 * 3600)
+    recorder.fail = True
+    with pytest.raises(RuntimeError):
+        task.step()
+    assert task.window_ms == 4 * 3600 * 1000
+    assert stored(manager.db, "sensor.grid_import") == []
+
+    recorder.fail = False
+    run(task)
+    assert len(stored(manager.db, "sensor.grid_import")) == 24
+
+
+def test_resumes_from_app_meta(recorder, manager):
+    task = backfill(recorder, manager, window=6 * 3600, max_points=100)
+    task.step()
+    first = len(stored(manager.db, "sensor.grid_import"))
+    assert 0 < first < 24
+
+    # Neustart: neue Aufgabe setzt am gespeicherten Fortschritt an
+    recorder.calls.clear()
+    resumed = backfill(recorder, manager, window=6 * 3600, max_points=100)
+    run(resumed)
+    assert len(stored(manager.db, "sensor.grid_import")) == 24
+    assert recorder.calls[0][2] == NOW - HOUR * 6
+    assert resumed.status()["imported"] == 24
+
+
+def test_empty_answer_finishes_entity(recorder, manager):
+    recorder.history = {}
+    task = backfill(recorder, manager, days=10)
+    assert task.step()
+    assert not task.step()
+    assert len(recorder.calls) == 1
+
+
+def test_finish_invalidates_daily_statistics(recorder, manager):
+    statistics = EnergyStatistics(manager)
+    calls = []
+    statistics.invalidate = lambda ref, since: calls.append((ref, since))
+    run(backfill(recorder, manager, energy_statistics=statistics))
+    ref = manager.get_entity_ref("sensor.grid_import", create=False)
+    assert calls == [(ref, datetime.fromtimestamp((NOW - HOUR * 24).timestamp()).date())]
+
+
+def test_disabled_with_zero_days(recorder, manager):
+    assert not backfill(recorder, manager, days=0).step()
+    assert recorder.calls == []
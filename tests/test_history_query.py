@@ -0,0 +1,42 @@
+"""Query-Plan der Verlaufsabfrage (entity_values)"""
+
+from datetime import datetime, timedelta
+
+from haminiems.const import DB_VERSION
+from haminiems.migrations.migration_manager import MigrationManager
+
+START = datetime(2024, 1, 1)
+
+
+def test_migrations_applied(db):
+    assert MigrationManager(db.conn).get_current_version() == DB_VERSION
+
+
+def test_range_query_uses_primary_key(sensor_manager, monkeypatch):
+    sensor_manager.save_entity_values([
+        {"entity_id": f"sensor.test_{s}", "value": float(n), "timestamp": START + timedelta(seconds=30 * n)}
+        for n in range(500)
+        for s in range(3)
+    ])
+    db = sensor_manager.db
+    queries = []
+    fetch_all = db.fetch_all
+
+    def recording_fetch_all(query, params=()):
+        queries.append((query, params))
+        return fetch_all(query, params)
+
+    monkeypatch.setattr(db, "fetch_all", recording_fetch_all)
+    values = sensor_manager.get_entity_values(
+        "sensor.test_1", START + timedelta(minutes=10), START + timedelta(minutes=20)
+    )
+    monkeypatch.undo()
+
+    assert len(values) == 21
+    assert values[0]["value"] > values[-1]["value"]
+    range_queries = [(q, p) for q, p in queries if "FROM entity_values" in q]
+    assert len(range_queries) == 1
+
+    plan = db.explain_query_plan(*range_queries[0])
+    assert any("entity_values USING PRIMARY KEY" in line for line in plan), plan
+    assert not any("USE TEMP B-TREE" in line for line in plan), plan
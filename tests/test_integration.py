@@ -0,0 +1,74 @@
+"""Integration von Leistungswerten mit gehaltenen Werten und Ausfällen"""
+
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from haminiems import integration  # noqa: E402
+from haminiems.collector import DataCollector  # noqa: E402
+from haminiems.energy_stats import EnergyStatistics  # noqa: E402
+
+HOUR_MS = 3_600_000
+
+
+def test_constant_value_held_over_several_gaps():
+    # 2 kW, nur bei Attributänderungen neu gemeldet, nach 2,5 h aus
+    ts = np.array([0, 1 * HOUR_MS, 2 * HOUR_MS, 2.5 * HOUR_MS])
+    values = np.array([2000.0, 2000.0, 2000.0, 0.0])
+    assert integration.integrate(ts, values, max_gap_s=900) == pytest.approx(5000.0)
+
+
+def test_long_outage_is_not_counted():
+    ts = np.array([0, 3 * HOUR_MS])
+    values = np.array([1000.0, 1000.0])
+    outages = [(1 * HOUR_MS, 2 * HOUR_MS)]
+    assert integration.integrate(ts, values, max_gap_s=900, outages=outages) == pytest.approx(2000.0)
+
+
+def test_short_outage_is_bridged():
+    ts = np.array([0, 1 * HOUR_MS])
+    values = np.array([1000.0, 1000.0])
+    outages = [(0.5 * HOUR_MS, 0.5 * HOUR_MS + 600_000)]
+    assert integration.integrate(ts, values, max_gap_s=900, outages=outages) == pytest.approx(1000.0)
+
+
+def test_window_split_and_hold_until():
+    ts = np.array([0.0])
+    values = np.array([500.0])
+    energy = integration.integrate_windows(
+        ts, values, [0, HOUR_MS, 2 * HOUR_MS], max_gap_s=900, hold_until_ms=1.5 * HOUR_MS
+    )
+    assert energy.tolist() == pytest.approx([500.0, 250.0])
+
+
+def test_daily_energy_of_value_held_over_a_whole_day(sensor_manager):
+    # 2 kW von 22 Uhr bis 2 Uhr übermorgen, dazwischen keine neue Zeile
+    day = date(2024, 3, 5)
+    start = datetime.combine(day - timedelta(days=1), datetime.min.time()) + timedelta(hours=22)
+    sensor_manager.save_entity_values([
+        {"entity_id": "sensor.load", "value": 2000.0, "unit": "W", "timestamp": start},
+        {"entity_id": "sensor.load", "value": 0.0, "unit": "W", "timestamp": start + timedelta(hours=28)},
+    ])
+    stats = EnergyStatistics(sensor_manager)
+
+    days = [day - timedelta(days=1), day, day + timedelta(days=1)]
+    result = stats.get_daily_energy("sensor.load", days)
+
+    assert [result[d.isoformat()]["energy"] for d in days] == pytest.approx([4.0, 48.0, 4.0])
+
+
+def test_collector_records_outage(sensor_manager):
+    collector = DataCollector(None, sensor_manager, interval=30)
+    now_ms = int(time.time() * 1000)
+    collector._last_success_ms = now_ms - 20 * 60 * 1000
+
+    collector._track_availability(False)
+    collector._track_availability(True)
+
+    outages = sensor_manager.get_outages(now_ms - HOUR_MS, now_ms + HOUR_MS)
+    assert len(outages) == 1
+    assert outages[0][0] == now_ms - 20 * 60 * 1000
+    assert sensor_manager.get_heartbeat() >= now_ms
@@ -0,0 +1,87 @@
+"""Migration 003: Übernahme der Altdaten in das kompakte Format"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from haminiems import database
+from haminiems.maintenance import LegacyImportTask
+from haminiems.migrations.migration_manager import MigrationManager
+from haminiems.sensors import SensorManager
+from haminiems.utils import to_epoch_ms
+
+START = datetime(2025, 6, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    """Datenbank im Format vor Migration 003 mit Altdaten"""
+    path = str(tmp_path / "legacy.db")
+    conn = sqlite3.connect(path)
+    MigrationManager(conn).migrate_to(2)
+    conn.executemany(
+        "INSERT INTO entity_values (timestamp, entity_id, value, state_class, unit) "
+        "VALUES (?, ?, ?, ?, ?)",
+        [
+            (str(START + timedelta(minutes=i)), entity_id, float(i), state_class, unit)
+            for i in range(25)
+            for entity_id, state_class, unit in (
+                ("sensor.grid_import", "total_increasing", "kWh"),
+                ("sensor.pv_power", "measurement", "W"),
+            )
+        ] + [("kein Zeitpunkt", "sensor.pv_power", 1.0, None, None)]
+    )
+    conn.commit()
+    conn.close()
+
+    instance = database.Database(path)
+    database._db_instance = instance
+    yield instance
+    instance.close()
+    database._db_instance = None
+
+
+def test_migration_keeps_legacy_rows_for_background_import(legacy_db):
+    assert legacy_db.table_exists("entity_values_legacy")
+    assert legacy_db.fetch_one("SELECT COUNT(*) AS n FROM entity_values")["n"] == 0
+    assert legacy_db.fetch_one("SELECT COUNT(*) AS n FROM entity_values_legacy")["n"] == 51
+
+
+def test_legacy_import_converts_rows_in_chunks(legacy_db):
+    manager = SensorManager()
+    task = LegacyImportTask(manager, chunk_size=10)
+    assert task.pending()
+
+    steps = 0
+    while task.step():
+        steps += 1
+        # Fortschritt steht nach jedem Block in app_meta
+        assert legacy_db.get_meta(LegacyImportTask.META_KEY)["imported"] > 0
+    assert steps == 6
+    assert not task.pending()
+    assert legacy_db.get_meta(LegacyImportTask.META_KEY) is None
+
+    rows = manager.get_entity_values("sensor.grid_import")
+    assert len(rows) == 25
+    assert manager.get_entity_meta("sensor.grid_import") == {
+        "state_class": "total_increasing", "unit": "kWh",
+    }
+    ref = manager.get_entity_ref("sensor.pv_power", create=False)
+    first = legacy_db.fetch_one(
+        "SELECT ts, value FROM entity_values WHERE entity_ref = ? ORDER BY ts LIMIT 1", (ref,)
+    )
+    assert first["ts"] == to_epoch_ms(START)
+    assert first["value"] == 0.0
+
+
+def test_import_resumes_after_restart(legacy_db):
+    first = LegacyImportTask(SensorManager(), chunk_size=20)
+    first.step()
+    first.step()
+    # Neuer Prozess setzt am gespeicherten Fortschritt an
+    second = LegacyImportTask(SensorManager(), chunk_size=20)
+    while second.step():
+        pass
+    assert legacy_db.fetch_one("SELECT COUNT(*) AS n FROM entity_values")["n"] == 50
+    assert not legacy_db.table_exists("entity_values_legacy")
@@ -0,0 +1,132 @@
+"""Log-Datei vom Ende lesen, Cursor und Rotation"""
+
+import logging
+import os
+
+import pytest
+
+from haminiems.logtail import tail_logs
+
+
+def line(n, level="INFO", message=None):
+    return f"2026-01-15 10:{n // 60:02d}:{n % 60:02d},000 - haminiems.test - {level} - {message or f'Eintrag {n}'}\n"
+
+
+def messages(result):
+    return [entry["message"] for entry in result["entries"]]
+
+
+@pytest.fixture
+def log(tmp_path):
+    path = tmp_path / "haminiems.log"
+    path.write_text("".join(line(n) for n in range(10)))
+    return path
+
+
+def append(path, text):
+    with open(path, "a") as f:
+        f.write(text)
+
+
+def test_tail_returns_newest_entries_oldest_first(log):
+    result = tail_logs(str(log), limit=3)
+    assert messages(result) == ["Eintrag 7", "Eintrag 8", "Eintrag 9"]
+    assert result["entries"][0] == {
+        "timestamp": "2026-01-15T10:00:07.000",
+        "level": "INFO",
+        "logger": "haminiems.test",
+        "message": "Eintrag 7",
+    }
+    assert result["cursor"] == f"{os.stat(log).st_ino}:{log.stat().st_size}"
+    assert not result["reset"] and not result["more"]
+
+
+def test_cursor_returns_only_new_entries(log):
+    cursor = tail_logs(str(log), limit=3)["cursor"]
+    assert messages(tail_logs(str(log), cursor=cursor)) == []
+
+    append(log, line(10) + line(11))
+    result = tail_logs(str(log), cursor=cursor)
+    assert messages(result) == ["Eintrag 10", "Eintrag 11"]
+    assert tail_logs(str(log), cursor=result["cursor"])["entries"] == []
+
+
+def test_cursor_pages_forward_without_skipping(log):
+    cursor = tail_logs(str(log))["cursor"]
+    append(log, "".join(line(n) for n in range(10, 35)))
+
+    delivered = []
+    pages = 0
+    while True:
+        result = tail_logs(str(log), limit=10, cursor=cursor)
+        delivered += messages(result)
+        cursor = result["cursor"]
+        pages += 1
+        if not result["more"]:
+            break
+    assert delivered == [f"Eintrag {n}" for n in range(10, 35)]
+    assert pages == 3
+
+
+def test_traceback_stays_with_its_entry_across_pages(log):
+    cursor = tail_logs(str(log))["cursor"]
+    append(log, line(10, "ERROR", "Fehler") + "Traceback (most recent call last):\n  File x\n" + line(11))
+
+    first = tail_logs(str(log), limit=1, cursor=cursor)
+    assert messages(first) == ["Fehler\nTraceback (most recent call last):\n  File x"]
+    assert first["more"]
+    second = tail_logs(str(log), limit=1, cursor=first["cursor"])
+    assert messages(second) == ["Eintrag 11"]
+    assert not second["more"]
+
+
+def test_cursor_with_level_filter(log):
+    cursor = tail_logs(str(log))["cursor"]
+    append(log, line(10, "ERROR", "Fehler A") + "  Folgezeile\n" + line(11) + line(12, "WARNING", "Warnung"))
+    result = tail_logs(str(log), limit=10, min_level=logging.WARNING, cursor=cursor)
+    assert messages(result) == ["Fehler A\n  Folgezeile", "Warnung"]
+
+    # Ausgelassene Einträge zählen nicht zum Limit und lösen kein more aus
+    result = tail_logs(str(log), limit=1, min_level=logging.WARNING, cursor=cursor)
+    assert messages(result) == ["Fehler A\n  Folgezeile"]
+    assert result["more"]
+    result = tail_logs(str(log), limit=1, min_level=logging.WARNING, cursor=result["cursor"])
+    assert messages(result) == ["Warnung"]
+    assert not result["more"]
+
+
+def test_incomplete_last_line_waits_for_newline(log):
+    cursor = tail_logs(str(log))["cursor"]
+    append(log, line(10)[:20])
+    result = tail_logs(str(log), cursor=cursor)
+    assert result["entries"] == [] and result["cursor"] == cursor
+
+    append(log, line(10)[20:])
+    assert messages(tail_logs(str(log), cursor=cursor)) == ["Eintrag 10"]
+
+
+def test_rotation_and_truncation_reset(log, tmp_path):
+    cursor = tail_logs(str(log))["cursor"]
+
+    # Rotation: neue Datei unter demselben Namen
+    os.rename(log, tmp_path / "haminiems.log.1")
+    log.write_text(line(20) + line(21))
+    result = tail_logs(str(log), limit=5, cursor=cursor)
+    assert result["reset"]
+    assert messages(result) == ["Eintrag 20", "Eintrag 21"]
+
+    # Geleert: Cursor liegt hinter dem Dateiende
+    cursor = tail_logs(str(log))["cursor"]
+    log.write_text(line(30))
+    result = tail_logs(str(log), cursor=cursor)
+    assert result["reset"]
+    assert messages(result) == ["Eintrag 30"]
+
+    assert tail_logs(str(log), cursor="kaputt")["reset"]
+
+
+def test_since_and_missing_file(log, tmp_path):
+    assert messages(tail_logs(str(log), since="2026-01-15T10:00:08.000")) == ["Eintrag 8", "Eintrag 9"]
+    assert tail_logs(str(tmp_path / "fehlt.log")) == {
+        "entries": [], "cursor": None, "reset": False, "more": False
+    }
@@ -0,0 +1,56 @@
+"""VACUUM im Hintergrund ohne Blockieren der Datenerfassung"""
+
+import threading
+from datetime import datetime, timezone
+
+from haminiems.maintenance import LegacyImportTask, RollupBackfillTask, VacuumTask
+
+
+def vacuum_task(sensor_manager, **kwargs) -> VacuumTask:
+    """VacuumTask nach abgeschlossener Altdaten-Übernahme und Rollup-Nachberechnung"""
+    for task in (LegacyImportTask(sensor_manager), RollupBackfillTask(sensor_manager)):
+        while task.step():
+            pass
+    return VacuumTask(sensor_manager, **kwargs)
+
+
+def test_vacuum_deferred_for_large_db_without_free_pages(db, sensor_manager):
+    task = vacuum_task(sensor_manager, small_db_bytes=0)
+    assert task.pending()
+    assert db.storage_stats()["auto_vacuum"] != "INCREMENTAL"
+    assert not task.ready()
+    assert task.status()["deferred"]
+
+
+def test_vacuum_buffers_collector_writes(db, sensor_manager, monkeypatch):
+    run_vacuum = db.vacuum
+    saved = []
+
+    def slow_vacuum():
+        # Während das VACUUM die Schreib-Verbindung hält, speichert der Collector
+        with db._write_lock:
+            db.vacuum_running.set()
+            collector = threading.Thread(target=lambda: saved.append(
+                sensor_manager.save_entity_values([{
+                    "entity_id": "sensor.pv_power",
+                    "value": 1500.0,
+                    "unit": "W",
+                    "timestamp": datetime(2026, 1, 1, tzinfo=timezone.utc),
+                }])
+            ))
+            collector.start()
+            collector.join(timeout=5)
+            assert not collector.is_alive()
+        run_vacuum()
+
+    monkeypatch.setattr(db, "vacuum", slow_vacuum)
+    sensor_manager.get_entity_ref("sensor.pv_power", None, "W")
+    task = vacuum_task(sensor_manager)
+    assert task.ready()
+    assert task.step() is False
+
+    assert saved == [1]
+    assert sensor_manager.write_buffer is None
+    assert db.fetch_one("SELECT COUNT(*) AS n FROM entity_values")["n"] == 1
+    assert db.storage_stats()["auto_vacuum"] == "INCREMENTAL"
+    assert not task.pending()
@@ -0,0 +1,117 @@
+"""Histogramme pro Thread und Ausgabe im Prometheus-Format"""
+
+import threading
+
+from haminiems.metrics import Histogram, MetricsRegistry, endpoint_label
+
+
+def run_in_threads(count, target):
+    threads = [threading.Thread(target=target, args=(n,)) for n in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_buckets_are_cumulative_and_upper_bound_inclusive():
+    histogram = Histogram("test_seconds", "Test", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 1.0, 7.0):
+        histogram.observe(value)
+    assert histogram.collect() == {(): [2, 2, 1, 8.65]}
+    assert histogram.render() == [
+        'test_seconds_bucket{le="0.1"} 2',
+        'test_seconds_bucket{le="1.0"} 4',
+        'test_seconds_bucket{le="+Inf"} 5',
+        "test_seconds_sum 8.65",
+        "test_seconds_count 5",
+    ]
+
+
+def test_labels_are_escaped_and_sorted():
+    histogram = Histogram("test_seconds", "Test", ("endpoint", "status"), buckets=(1.0,))
+    histogram.observe(0.5, "/api/b", "200")
+    histogram.observe(2.0, '/api/"a"', "500")
+    assert histogram.render() == [
+        'test_seconds_bucket{endpoint="/api/\\"a\\"",status="500",le="1.0"} 0',
+        'test_seconds_bucket{endpoint="/api/\\"a\\"",status="500",le="+Inf"} 1',
+        'test_seconds_sum{endpoint="/api/\\"a\\"",status="500"} 2.0',
+        'test_seconds_count{endpoint="/api/\\"a\\"",status="500"} 1',
+        'test_seconds_bucket{endpoint="/api/b",status="200",le="1.0"} 1',
+        'test_seconds_bucket{endpoint="/api/b",status="200",le="+Inf"} 1',
+        'test_seconds_sum{endpoint="/api/b",status="200"} 0.5',
+        'test_seconds_count{endpoint="/api/b",status="200"} 1',
+    ]
+
+
+def test_collect_merges_threads_and_keeps_finished_ones():
+    histogram = Histogram("test_seconds", "Test", ("worker",), buckets=(1.0,))
+    histogram.observe(0.5, "main")
+    run_in_threads(4, lambda n: [histogram.observe(2.0, str(n % 2)) for _ in range(10)])
+
+    totals = histogram.collect()
+    assert totals == {("main",): [1, 0, 0.5], ("0",): [0, 20, 40.0], ("1",): [0, 20, 40.0]}
+    # Beendete Threads sind übernommen, ihre Zähler bleiben erhalten
+    assert len(histogram._shards) == 1
+    assert histogram.collect() == totals
+
+
+def test_finished_shards_retired_when_limit_is_reached():
+    histogram = Histogram("test_seconds", "Test", buckets=(1.0,), shard_limit=8)
+    for _ in range(5):
+        run_in_threads(10, lambda n: histogram.observe(0.5))
+        # Ohne Abruf von /metrics wächst die Liste nicht über die Grenze hinaus
+        assert len(histogram._shards) <= 8
+    assert histogram.collect() == {(): [50, 0, 25.0]}
+    assert histogram._shards == []
+
+
+def test_running_threads_are_not_retired():
+    histogram = Histogram("test_seconds", "Test", buckets=(1.0,), shard_limit=2)
+    release = threading.Event()
+    ready = threading.Barrier(4)
+
+    def worker(n):
+        histogram.observe(0.5)
+        ready.wait()
+        release.wait()
+        histogram.observe(0.5)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(3)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    assert len(histogram._shards) == 3
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert histogram.collect() == {(): [6, 0, 3.0]}
+
+
+def test_timer_and_registry_render():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("test_seconds", "Laufzeit", ("step",), buckets=(60.0,))
+    with histogram.time("load"):
+        pass
+    registry.callback("test_entries", "Einträge", lambda: {("a",): 3, ("b",): None}, ("cache",))
+    registry.callback("test_missing", "Ohne Wert", lambda: None)
+
+    lines = registry.render().splitlines()
+    assert lines[:3] == [
+        "# HELP test_seconds Laufzeit",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{step="load",le="60.0"} 1',
+    ]
+    # Werte None werden ausgelassen, die Beschreibung bleibt
+    assert lines[6:] == [
+        "# HELP test_entries Einträge",
+        "# TYPE test_entries gauge",
+        'test_entries{cache="a"} 3',
+        "# HELP test_missing Ohne Wert",
+        "# TYPE test_missing gauge",
+    ]
+
+
+def test_endpoint_label_groups_variable_paths():
+    assert endpoint_label("/api/states/sensor.pv_power") == "/api/states/{entity_id}"
+    assert endpoint_label("/api/history/period/2026-01-01T00:00:00") == "/api/history/period/{start}"
+    assert endpoint_label("/api/states") == "/api/states"
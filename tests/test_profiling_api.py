@@ -0,0 +1,32 @@
+"""Zugriffsschutz der Profiling-Endpunkte"""
+
+import pytest
+
+from haminiems import main
+from haminiems.profiling import PROFILER
+
+
+@pytest.fixture
+def client():
+    main.app.config["TESTING"] = True
+    return main.app.test_client()
+
+
+@pytest.mark.parametrize("method", ["post", "delete"])
+def test_profiling_changes_rejected_outside_ingress(client, method):
+    response = getattr(client, method)(
+        "/api/profiling", json={"enabled": True},
+        headers={"X-Ingress-Path": "/api/hassio_ingress/abc"},
+        environ_base={"REMOTE_ADDR": "192.168.1.20"},
+    )
+    assert response.status_code == 403
+    assert not PROFILER.enabled
+
+
+def test_profiling_changes_allowed_through_ingress(client):
+    response = client.post(
+        "/api/profiling", json={"enabled": False},
+        environ_base={"REMOTE_ADDR": "172.30.32.2"},
+    )
+    assert response.status_code == 200
+    assert response.json["data"]["enabled"] is False
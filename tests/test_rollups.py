@@ -0,0 +1,109 @@
+"""Rollup-Trigger und Wahl der Auflösung für ein Punkte-Budget"""
+
+from datetime import datetime, timedelta, timezone
+
+from haminiems.utils import to_epoch_ms
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def save_series(sensor_manager, entity_id, values, step=timedelta(seconds=30), start=START):
+    sensor_manager.save_entity_values([
+        {"entity_id": entity_id, "value": value, "timestamp": start + step * n}
+        for n, value in enumerate(values)
+    ])
+
+
+def rollups(db, resolution):
+    return db.fetch_all(
+        "SELECT * FROM entity_rollups WHERE resolution = ? ORDER BY bucket_ts",
+        (resolution,)
+    )
+
+
+def test_trigger_aggregates_new_values_into_all_resolutions(sensor_manager):
+    # 4 Werte im Abstand von 30 s: zwei Minuten-Buckets, sonst je einer
+    save_series(sensor_manager, "sensor.pv_power", [3.0, 1.0, 4.0, 2.0])
+    db = sensor_manager.db
+
+    minutes = rollups(db, 60)
+    assert [row["sample_count"] for row in minutes] == [2, 2]
+    assert [row["bucket_ts"] for row in minutes] == [
+        to_epoch_ms(START), to_epoch_ms(START + timedelta(minutes=1))
+    ]
+    for resolution in (900, 3600, 86400):
+        (row,) = rollups(db, resolution)
+        assert row["bucket_ts"] == to_epoch_ms(START)
+        assert row["sample_count"] == 4
+        assert row["value_sum"] == 10.0
+        assert (row["value_min"], row["value_max"]) == (1.0, 4.0)
+        assert (row["first_value"], row["last_value"]) == (3.0, 2.0)
+        assert row["last_ts"] == to_epoch_ms(START + timedelta(seconds=90))
+
+
+def test_trigger_ignores_duplicates_and_late_values(sensor_manager):
+    later = START + timedelta(minutes=5)
+    save_series(sensor_manager, "sensor.pv_power", [5.0, 6.0], start=later)
+    # Derselbe Zeitpunkt erneut (INSERT OR IGNORE) und ein verspäteter Wert davor
+    sensor_manager._last_saved_ts.clear()
+    save_series(sensor_manager, "sensor.pv_power", [5.0], start=later)
+    save_series(sensor_manager, "sensor.pv_power", [9.0])
+
+    (row,) = rollups(sensor_manager.db, 3600)
+    assert row["sample_count"] == 3
+    assert row["first_value"] == 9.0
+    assert row["last_value"] == 6.0
+    assert row["value_max"] == 9.0
+
+
+def test_select_resolution_from_span_and_budget(sensor_manager):
+    save_series(sensor_manager, "sensor.pv_power", [float(n) for n in range(2 * 24 * 120)])
+    ref = sensor_manager.get_entity_ref("sensor.pv_power", create=False)
+    select = sensor_manager.select_resolution
+
+    # 1 Stunde bei 30 s Erfassung: 121 Rohwerte passen ins Budget
+    assert select(ref, START, START + timedelta(hours=1), 200) is None
+    assert select(ref, START, START + timedelta(hours=1), 100) == 60
+    assert select(ref, START, START + timedelta(days=1), 100) == 900
+    assert select(ref, START, START + timedelta(days=2), 60) == 3600
+    assert select(ref, START, START + timedelta(days=2), 10) == 86400
+    # Offene Grenzen: Beginn der Daten bis jetzt
+    assert select(ref, None, None, 10) == 86400
+
+
+def test_select_resolution_uses_one_coverage_query(sensor_manager, monkeypatch):
+    save_series(sensor_manager, "sensor.pv_power", [float(n) for n in range(240)])
+    ref = sensor_manager.get_entity_ref("sensor.pv_power", create=False)
+    db = sensor_manager.db
+    queries = []
+    for name in ("fetch_one", "fetch_all"):
+        original = getattr(db, name)
+
+        def recording(query, params=(), original=original):
+            queries.append(query)
+            return original(query, params)
+
+        monkeypatch.setattr(db, name, recording)
+
+    assert sensor_manager.select_resolution(ref, START, START + timedelta(hours=2), 50) == 900
+    assert len(queries) == 1
+
+
+def test_select_resolution_skips_sources_without_coverage(sensor_manager):
+    save_series(sensor_manager, "sensor.pv_power", [float(n) for n in range(240)])
+    ref = sensor_manager.get_entity_ref("sensor.pv_power", create=False)
+    db = sensor_manager.db
+    # Rohwerte und Minuten-Rollups des ersten Tages sind abgelaufen
+    later = START + timedelta(days=3)
+    save_series(sensor_manager, "sensor.pv_power", [1.0, 2.0], step=later - START)
+    cutoff = to_epoch_ms(later)
+    db.execute("DELETE FROM entity_values WHERE ts < ?", (cutoff,))
+    db.execute("DELETE FROM entity_rollups WHERE resolution = 60 AND bucket_ts < ?", (cutoff,))
+
+    span = (START, later + timedelta(hours=1))
+    assert sensor_manager.select_resolution(ref, *span, 10000) == 900
+    assert sensor_manager.select_resolution(ref, *span, 10) == 86400
+
+    # Trotz Budget für Rohwerte liefert get_entity_values 15-Minuten-Werte
+    values = sensor_manager.get_entity_values("sensor.pv_power", *span, max_points=10000)
+    assert len(values) == 8 + 1
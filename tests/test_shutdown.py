@@ -0,0 +1,40 @@
+"""Beenden der Anwendung über atexit und on_stop des Servers"""
+
+from haminiems import main
+
+
+class Recorder:
+    """Zeichnet Aufrufe von stop/close/checkpoint in gemeinsamer Reihenfolge auf"""
+
+    def __init__(self, name, calls):
+        self.name = name
+        self.calls = calls
+        self.balance = self
+
+    def __getattr__(self, method):
+        return lambda *args, **kwargs: self.calls.append(f"{self.name}.{method}")
+
+
+def test_shutdown_runs_once_in_order_and_keeps_instances(monkeypatch):
+    calls = []
+    for name in (
+        "data_collector", "maintenance_worker", "event_broadcaster",
+        "calculation_engine", "sensor_manager", "ha_client",
+    ):
+        monkeypatch.setattr(main, name, Recorder(name, calls))
+    monkeypatch.setattr(main, "_shut_down", False)
+
+    main.shutdown_app()
+    main.shutdown_app()
+
+    assert calls == [
+        "data_collector.stop",
+        "maintenance_worker.stop",
+        "event_broadcaster.close",
+        "calculation_engine.checkpoint",
+        "sensor_manager.close",
+        "ha_client.close",
+    ]
+    # Noch laufende Anfragen und Listener lesen die Instanzen weiter
+    assert isinstance(main.event_broadcaster, Recorder)
+    assert isinstance(main.calculation_engine, Recorder)
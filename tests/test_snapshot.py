@@ -0,0 +1,50 @@
+"""States aller Sensoren als ein Snapshot statt einer Anfrage pro Sensor"""
+
+import pytest
+
+from conftest import ha_state
+from haminiems.calculations import CalculationEngine
+
+ENTITIES = ["sensor.pv_power", "sensor.grid_import", "sensor.missing"]
+
+
+@pytest.fixture
+def states(ha_client):
+    ha_client.states = {
+        "sensor.pv_power": ha_state("sensor.pv_power", 1500, "W", "measurement"),
+        "sensor.grid_import": ha_state("sensor.grid_import", "unavailable", "kWh"),
+        "sensor.other": ha_state("sensor.other", 1),
+    }
+    return ha_client
+
+
+def test_bulk_snapshot_uses_one_request(states):
+    snapshot = states.get_states_snapshot(ENTITIES, mode="bulk")
+    assert set(snapshot) == {"sensor.pv_power", "sensor.grid_import"}
+    assert states.requests == [("GET", "/api/states")]
+
+
+@pytest.mark.parametrize("mode", ["serial", "concurrent"])
+def test_single_modes_fetch_each_entity_once(states, mode):
+    snapshot = states.get_states_snapshot(ENTITIES + ["sensor.pv_power"], mode=mode)
+    assert set(snapshot) == {"sensor.pv_power", "sensor.grid_import"}
+    assert sorted(endpoint for _, endpoint in states.requests) == [
+        f"/api/states/{entity_id}" for entity_id in sorted(ENTITIES)
+    ]
+
+
+def test_fetch_current_values_maps_sensor_keys(states, sensor_manager):
+    sensor_manager.save_configs([
+        {"sensor_key": "pv_production", "entity_id": "sensor.pv_power"},
+        {"sensor_key": "grid_import", "entity_id": "sensor.grid_import"},
+        {"sensor_key": "grid_export", "entity_id": None},
+    ])
+    engine = CalculationEngine(states, sensor_manager)
+    values = engine.fetch_current_values()
+
+    # Nicht numerische States (unavailable) werden ausgelassen
+    assert list(values) == ["pv_production"]
+    assert values["pv_production"]["value"] == 1500.0
+    assert values["pv_production"]["unit"] == "W"
+    assert values["pv_production"]["state_class"] == "measurement"
+    assert states.requests == [("GET", "/api/states")]
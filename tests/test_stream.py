@@ -0,0 +1,97 @@
+"""Server-Sent Events: Änderungen eines Erzeugers an alle Abonnenten"""
+
+import json
+
+from haminiems.stream import EventBroadcaster
+
+
+def value(v, last_updated="2026-01-01T12:00:00"):
+    return {"value": v, "unit": "W", "last_updated": last_updated}
+
+
+def pending(subscription):
+    """Entnimmt alle wartenden Ereignisse als (event, data)"""
+    events = []
+    while not subscription.queue.empty():
+        message = subscription.queue.get_nowait()
+        if message is None:
+            events.append((None, None))
+            continue
+        fields = dict(line.split(": ", 1) for line in message.strip().split("\n"))
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_subscribe_starts_with_snapshot():
+    broadcaster = EventBroadcaster()
+    broadcaster.publish_state({"pv_production": value(1500)}, ha_connected=True)
+    subscription = broadcaster.subscribe()
+    ((event, data),) = pending(subscription)
+    assert event == "snapshot"
+    assert data["entities"]["pv_production"]["value"] == 1500
+    assert data["health"] == {"ha_connected": True}
+    assert broadcaster.subscribers == 1
+
+
+def test_publish_state_sends_only_changes():
+    broadcaster = EventBroadcaster()
+    broadcaster.publish_state({"pv_production": value(1500), "grid_import": value(200)})
+    subscription = broadcaster.subscribe()
+    pending(subscription)
+
+    # Nur last_updated geändert: kein Ereignis
+    broadcaster.publish_state({
+        "pv_production": value(1500, "2026-01-01T12:00:30"),
+        "grid_import": value(200, "2026-01-01T12:00:30"),
+    })
+    assert pending(subscription) == []
+
+    broadcaster.publish_state({"pv_production": value(1600)})
+    assert pending(subscription) == [
+        ("entities", {"changed": {"pv_production": value(1600)}, "removed": ["grid_import"]}),
+    ]
+
+
+def test_balance_and_health_only_on_change():
+    broadcaster = EventBroadcaster()
+    subscription = broadcaster.subscribe()
+    pending(subscription)
+    balance = {"grid": {"import": 0.2}, "timestamp": "12:00:00", "today": {"energy": {}}}
+
+    broadcaster.publish_state({}, balance=balance, ha_connected=True)
+    broadcaster.publish_state({}, balance=dict(balance, timestamp="12:00:30"), ha_connected=True)
+    broadcaster.publish_state({}, balance=dict(balance, grid={"import": 0.3}), ha_connected=False)
+    assert [event for event, _ in pending(subscription)] == ["balance", "health", "balance", "health"]
+
+
+def test_slow_subscriber_gets_snapshot_instead_of_backlog():
+    broadcaster = EventBroadcaster(max_queue=2)
+    slow = broadcaster.subscribe()
+    for n in range(5):
+        broadcaster.publish_state({"pv_production": value(n)})
+    # Volle Warteschlange bei 1 und 3: verworfen und durch den Stand ersetzt
+    (snapshot, changes) = pending(slow)
+    assert snapshot[0] == "snapshot"
+    assert snapshot[1]["entities"]["pv_production"]["value"] == 3
+    assert changes == ("entities", {"changed": {"pv_production": value(4)}, "removed": []})
+    assert broadcaster.resyncs == 2
+
+
+def test_stream_ends_on_close_and_unsubscribes():
+    broadcaster = EventBroadcaster(keepalive=0.01)
+    subscription = broadcaster.subscribe()
+    stream = broadcaster.stream(subscription)
+    assert next(stream) == "retry: 3000\n\n"
+    assert next(stream).startswith("id: 0\nevent: snapshot\n")
+    assert next(stream) == ": keepalive\n\n"
+
+    broadcaster.publish_state({"pv_production": value(1)})
+    broadcaster.close()
+    # Beim Schließen werden wartende Ereignisse verworfen
+    assert list(stream) == []
+    assert broadcaster.subscribers == 0
+
+    # Nach dem Schließen endet ein neuer Stream sofort
+    late = broadcaster.subscribe()
+    assert list(broadcaster.stream(late)) == ["retry: 3000\n\n"]
+    assert broadcaster.subscribers == 0
@@ -0,0 +1,94 @@
+"""Gebündeltes Schreiben der Entity-Werte"""
+
+import time
+from datetime import datetime, timedelta, timezone
+
+from haminiems.sensors import WriteBuffer
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def rows(count, offset=0, entity_id="sensor.pv_power"):
+    return [
+        {"entity_id": entity_id, "value": float(i), "unit": "W",
+         "timestamp": START + timedelta(seconds=10 * i)}
+        for i in range(offset, offset + count)
+    ]
+
+
+def stored(db):
+    return db.fetch_one("SELECT COUNT(*) AS n FROM entity_values")["n"]
+
+
+def test_bulk_write_in_one_transaction(db, sensor_manager, monkeypatch):
+    transactions = []
+    execute_many = db.execute_many
+    monkeypatch.setattr(db, "execute_many", lambda *a: transactions.append(1) or execute_many(*a))
+
+    assert sensor_manager.save_entity_values(rows(50)) == 50
+    assert transactions == [1]
+    assert stored(db) == 50
+
+
+def test_unchanged_and_duplicate_rows_are_not_counted(db, sensor_manager):
+    assert sensor_manager.save_entity_values(rows(3)) == 3
+    # Gleicher last_updated wie beim letzten Durchlauf: nichts Neues
+    assert sensor_manager.save_entity_values(rows(1, offset=2)) == 0
+    # Ältere, bereits gespeicherte Zeile: INSERT OR IGNORE schreibt nichts
+    assert sensor_manager.save_entity_values(rows(1, offset=0)) == 0
+    assert sensor_manager.save_entity_values(rows(2, offset=2)) == 1
+    assert stored(db) == 4
+
+
+def test_write_buffer_flushes_on_size_and_close(db, sensor_manager):
+    sensor_manager.enable_write_buffer(max_rows=10, max_age=3600)
+    assert sensor_manager.save_entity_values(rows(6)) == 6
+    assert stored(db) == 0
+    sensor_manager.save_entity_values(rows(6, offset=6))
+    assert stored(db) == 12
+
+    sensor_manager.save_entity_values(rows(3, offset=12))
+    sensor_manager.close()
+    assert stored(db) == 15
+    assert sensor_manager.write_buffer.stats()["rows_written"] == 15
+
+
+def test_write_buffer_flushes_by_age():
+    written = []
+    buffer = WriteBuffer(lambda batch: written.extend(batch) or len(batch), max_rows=100, max_age=0.1)
+    buffer.start()
+    try:
+        buffer.add([(1, 1, 1.0)])
+        deadline = time.monotonic() + 5
+        while not written and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        buffer.stop()
+    assert written == [(1, 1, 1.0)]
+
+
+def test_write_buffer_keeps_rows_after_failure():
+    attempts = []
+
+    def flush(batch):
+        attempts.append(len(batch))
+        if len(attempts) == 1:
+            raise RuntimeError("database is locked")
+        return len(batch)
+
+    buffer = WriteBuffer(flush, max_rows=100, max_age=0)
+    buffer.add([(1, 1, 1.0), (1, 2, 2.0)])
+    assert buffer.flush() == 0
+    buffer.add([(1, 3, 3.0)])
+    assert buffer.flush() == 3
+    assert attempts == [2, 3]
+
+
+def test_buffer_counts_rows_actually_written(db, sensor_manager):
+    sensor_manager.save_entity_values(rows(2))
+    sensor_manager.enable_write_buffer(max_rows=100, max_age=3600)
+    # Neuer SensorManager-Zustand kennt die Zeilen nicht, die Datenbank schon
+    sensor_manager._last_saved_ts.clear()
+    sensor_manager.save_entity_values(rows(3))
+    assert sensor_manager.flush() == 1
+    assert sensor_manager.write_buffer.stats()["rows_written"] == 1